@@ -0,0 +1,811 @@
+import argparse
+import gc
+import itertools
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass as _dataclass, field as _field
+from datetime import datetime, timezone
+from typing import Callable, Sequence
+from PIL import Image, ImageFilter
+from .core import CudaImage, DistanceField, RGBA, get_backend, set_backend
+from .core.buffer import copy_buffers_same_size
+from .core.cuda_interface import _lib
+from .io import load_image, load_images
+from .operations.blend import blend, blend_many
+from .operations.cache import EffectCache, content_hash
+from .operations.fill import fill_color, fill_gradient
+from .operations.filters import (apply_chroma_key, apply_corner_radius, apply_flip, apply_gaussian_blur,
+                                 apply_grayscale, apply_opacity, apply_shadow, apply_stroke,
+                                 compute_alpha_distance_field)
+from .operations.resize import ResizeMethod, build_pyramid, crop_margins, resize, resize_many
+from .operations.text import TextRenderer, render_text
+from .operations.utils import (blend_aligned, cover_image_in_container, create_image_collage,
+                               create_image_grid, get_cover_resize_dimensions)
+from .pipeline import Pipeline
+
+DEFAULT_SIZES = [(640, 480), (1920, 1080), (3840, 2160)]
+QUICK_SIZES = [(640, 480)]
+
+
+@_dataclass
+class BenchResult:
+    """
+    Timings of one benchmark case.
+
+    Attributes:
+        name (str): Unique case name, e.g. `apply_gaussian_blur[radius=8]@1920x1080`.
+            Pillow reference cases are prefixed with `pillow:`.
+        operation (str): Operation timed.
+        params (dict): Parameters of the case.
+        width (int): Width of the image the case works on, 0 if it has none.
+        height (int): Height of the image the case works on, 0 if it has none.
+        iterations (int): Calls timed per sample.
+        samples (list[float]): Seconds per call, averaged over each sample.
+        batch (int): Images of `width` x `height` processed per call.
+    """
+    name: str
+    operation: str
+    params: dict
+    width: int
+    height: int
+    iterations: int
+    samples: list[float] = _field(default_factory=list)
+    batch: int = 1
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.samples)
+
+    @property
+    def p95(self) -> float:
+        ordered = sorted(self.samples)
+        return ordered[max(math.ceil(0.95 * len(ordered)) - 1, 0)]
+
+    @property
+    def mpix_per_s(self) -> float | None:
+        pixels = self.width * self.height
+        return pixels * self.batch / self.median / 1e6 if pixels and self.median else None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "operation": self.operation,
+            "params": self.params,
+            "width": self.width,
+            "height": self.height,
+            "iterations": self.iterations,
+            "batch": self.batch,
+            "median_s": self.median,
+            "p95_s": self.p95,
+            "mpix_per_s": self.mpix_per_s,
+            "samples_s": self.samples,
+        }
+
+
+@_dataclass
+class Comparison:
+    """
+    Median of a case against a baseline run.
+
+    Attributes:
+        name (str): Case name.
+        baseline (float): Baseline median, in seconds per call.
+        current (float): Current median, in seconds per call.
+        regression (bool): Whether the case slowed down beyond the threshold.
+    """
+    name: str
+    baseline: float
+    current: float
+    regression: bool
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else math.inf
+
+
+class _Fixture:
+    # Images, fields and caches allocated by a case's setup, freed after it is timed.
+
+    def __init__(self):
+        self._cleanups: list[Callable[[], None]] = []
+
+    def image(self, width: int, height: int) -> CudaImage:
+        # A gradient with rounded, transparent corners, so alpha-dependent
+        # operations have edges to work on.
+        image = self.keep(CudaImage(width, height))
+        fill_gradient(image, RGBA(255, 64, 0, 255), RGBA(0, 64, 255, 255), direction=2)
+        apply_corner_radius(image, max(min(width, height) // 4, 1))
+        return image
+
+    def pristine(self, image: CudaImage) -> Callable[[], None]:
+        # Returns a call restoring `image` to its current pixels, for operations
+        # that would otherwise keep working on their own output. The timer runs
+        # it before each call without timing it.
+        copy = self.keep(CudaImage(image.width, image.height))
+        copy_buffers_same_size(copy.buffer, image.buffer, image.width, image.height, copy.pitch, image.pitch)
+        return lambda: copy_buffers_same_size(image.buffer, copy.buffer, image.width, image.height,
+                                              image.pitch, copy.pitch)
+
+    def keep(self, resource, cleanup: Callable[[], None] | None = None):
+        self._cleanups.append(cleanup if cleanup is not None else resource.free)
+        return resource
+
+    def free(self) -> None:
+        for cleanup in self._cleanups:
+            cleanup()
+        self._cleanups.clear()
+
+
+@_dataclass
+class _Benchmark:
+    operation: str
+    setup: Callable
+    matrix: dict[str, list]
+    sized: bool
+    needs_font: bool
+    batch: int = 1
+    reference: Callable | None = None
+
+
+_BENCHMARKS: list[_Benchmark] = []
+
+
+def _benchmark(operation: str, sized: bool = True, needs_font: bool = False, batch: int = 1, **matrix):
+    # Registers setup(fixture, width, height, **params) -> run, where run() is
+    # one call of the operation on preallocated images, or -> (run, restore)
+    # for operations that modify their input, where restore() is untimed.
+    # `batch` is the number of images a call processes.
+    def register(setup):
+        _BENCHMARKS.append(_Benchmark(operation, setup, matrix, sized, needs_font, batch))
+        return setup
+    return register
+
+
+def _reference(operation: str):
+    # Registers a Pillow equivalent, setup(width, height, **params) -> run or
+    # None when the case has no equivalent.
+    def register(setup):
+        for bench in _BENCHMARKS:
+            if bench.operation == operation:
+                bench.reference = setup
+        return setup
+    return register
+
+
+def _sample_pil(width: int, height: int) -> Image.Image:
+    return Image.linear_gradient("L").resize((width, height)).convert("RGBA")
+
+
+# Blending ---------------------------------------------------------------------
+
+@_benchmark("blend")
+def _bench_blend(fx, width, height):
+    background = fx.image(width, height)
+    over = fx.image(width // 2, height // 2)
+    return lambda: blend(background, over, width // 4, height // 4)
+
+
+@_reference("blend")
+def _pillow_blend(width, height):
+    background = _sample_pil(width, height)
+    over = _sample_pil(width // 2, height // 2)
+    return lambda: background.alpha_composite(over, (width // 4, height // 4))
+
+
+@_benchmark("blend_many", layers=[4, 16])
+def _bench_blend_many(fx, width, height, layers):
+    background = fx.image(width, height)
+    over = fx.image(width // 4, height // 4)
+    placed = [(over, (i % 4) * width // 4, (i // 4) * height // 4) for i in range(layers)]
+    return lambda: blend_many(background, placed)
+
+
+@_benchmark("blend_aligned")
+def _bench_blend_aligned(fx, width, height):
+    background = fx.image(width, height)
+    over = fx.image(width // 2, height // 2)
+    return lambda: blend_aligned(background, over, "center")
+
+
+# Fills and pointwise filters --------------------------------------------------
+
+@_benchmark("fill_color")
+def _bench_fill_color(fx, width, height):
+    image = fx.image(width, height)
+    return lambda: fill_color(image, RGBA(32, 64, 128, 255))
+
+
+@_reference("fill_color")
+def _pillow_fill_color(width, height):
+    img = _sample_pil(width, height)
+    return lambda: img.paste((32, 64, 128, 255), (0, 0, width, height))
+
+
+@_benchmark("fill_gradient", direction=[0, 2])
+def _bench_fill_gradient(fx, width, height, direction):
+    image = fx.image(width, height)
+    return lambda: fill_gradient(image, RGBA(255, 0, 0, 255), RGBA(0, 0, 255, 255), direction)
+
+
+@_benchmark("apply_corner_radius", size=[16, 128])
+def _bench_corner_radius(fx, width, height, size):
+    image = fx.image(width, height)
+    return lambda: apply_corner_radius(image, size)
+
+
+@_benchmark("apply_opacity")
+def _bench_opacity(fx, width, height):
+    image = fx.image(width, height)
+    return lambda: apply_opacity(image, 0.98), fx.pristine(image)
+
+
+@_benchmark("apply_grayscale")
+def _bench_grayscale(fx, width, height):
+    image = fx.image(width, height)
+    return lambda: apply_grayscale(image)
+
+
+@_reference("apply_grayscale")
+def _pillow_grayscale(width, height):
+    img = _sample_pil(width, height)
+    return lambda: img.convert("LA").convert("RGBA")
+
+
+@_benchmark("apply_flip", axis=["horizontal", "vertical"])
+def _bench_flip(fx, width, height, axis):
+    image = fx.image(width, height)
+    return lambda: apply_flip(image, flip_horizontal=axis == "horizontal", flip_vertical=axis == "vertical")
+
+
+@_reference("apply_flip")
+def _pillow_flip(width, height, axis):
+    img = _sample_pil(width, height)
+    method = Image.Transpose.FLIP_LEFT_RIGHT if axis == "horizontal" else Image.Transpose.FLIP_TOP_BOTTOM
+    return lambda: img.transpose(method)
+
+
+@_benchmark("apply_chroma_key")
+def _bench_chroma_key(fx, width, height):
+    image = fx.image(width, height)
+    key = fx.image(width, height)
+    return lambda: apply_chroma_key(image, key, "A", 128, invert=True), fx.pristine(image)
+
+
+@_benchmark("Pipeline.run")
+def _bench_pipeline(fx, width, height):
+    image = fx.image(width, height)
+    pipeline = (Pipeline()
+                .add(apply_grayscale)
+                .add(apply_opacity, 0.98)
+                .add(apply_flip, flip_horizontal=True)
+                .add(apply_corner_radius, 32))
+    return lambda: pipeline.run(image), fx.pristine(image)
+
+
+# Neighbourhood filters --------------------------------------------------------
+
+@_benchmark("compute_alpha_distance_field")
+def _bench_distance_field(fx, width, height):
+    image = fx.image(width, height)
+    field = fx.keep(DistanceField(width, height))
+    scratch = fx.image(width, height)
+    row_scratch = fx.image(width, height)
+    return lambda: compute_alpha_distance_field(image, field, scratch, row_scratch)
+
+
+@_benchmark("apply_stroke", stroke_width=[2, 8, 32])
+def _bench_stroke(fx, width, height, stroke_width):
+    image = fx.image(width, height)
+    scratch = fx.image(width, height)
+    return lambda: apply_stroke(image, stroke_width, RGBA(255, 255, 255, 255), scratch), fx.pristine(image)
+
+
+@_benchmark("apply_shadow", radius=[4, 16, 64])
+def _bench_shadow(fx, width, height, radius):
+    image = fx.image(width, height)
+    scratch = fx.image(width, height)
+    return lambda: apply_shadow(image, radius, 0.6, RGBA(0, 0, 0, 255), scratch, inner=True), fx.pristine(image)
+
+
+@_benchmark("apply_gaussian_blur", radius=[2, 8, 32])
+def _bench_blur(fx, width, height, radius):
+    image = fx.image(width, height)
+    scratch = fx.image(width, height)
+    return lambda: apply_gaussian_blur(image, radius, scratch), fx.pristine(image)
+
+
+@_reference("apply_gaussian_blur")
+def _pillow_blur(width, height, radius):
+    img = _sample_pil(width, height)
+    # photoff's kernel has sigma = radius / 2.
+    blur = ImageFilter.GaussianBlur(radius / 2)
+    return lambda: img.filter(blur)
+
+
+# Resampling -------------------------------------------------------------------
+
+_PILLOW_FILTERS = {
+    ResizeMethod.NEAREST: Image.Resampling.NEAREST,
+    ResizeMethod.BILINEAR: Image.Resampling.BILINEAR,
+    ResizeMethod.BICUBIC: Image.Resampling.BICUBIC,
+    ResizeMethod.AREA: Image.Resampling.BOX,
+    ResizeMethod.LANCZOS3: Image.Resampling.LANCZOS,
+}
+
+
+def _scaled(width: int, height: int, scale: float) -> tuple[int, int]:
+    return max(int(width * scale), 1), max(int(height * scale), 1)
+
+
+@_benchmark("resize", method=list(ResizeMethod), scale=[0.5, 2.0])
+def _bench_resize(fx, width, height, method, scale):
+    image = fx.image(width, height)
+    result = fx.image(*_scaled(width, height, scale))
+    return lambda: resize(image, result.width, result.height, method, result)
+
+
+@_reference("resize")
+def _pillow_resize(width, height, method, scale):
+    if method not in _PILLOW_FILTERS:
+        return None
+    img = _sample_pil(width, height)
+    size = _scaled(width, height, scale)
+    return lambda: img.resize(size, _PILLOW_FILTERS[method])
+
+
+@_benchmark("resize_many",
+            method=[ResizeMethod.NEAREST, ResizeMethod.BILINEAR, ResizeMethod.BICUBIC, ResizeMethod.AREA],
+            strategy=["cascade", "direct", "separate"])
+def _bench_resize_many(fx, width, height, method, strategy):
+    # 'separate' is one resize call per rendition, the pattern resize_many replaces.
+    image = fx.image(width, height)
+    caches = [fx.image(*_scaled(width, height, 0.5 ** level)) for level in (1, 2, 3, 4)]
+    sizes = [(cache.width, cache.height) for cache in caches]
+    if strategy == "separate":
+        def run():
+            for cache in caches:
+                resize(image, cache.width, cache.height, method, cache)
+        return run
+    return lambda: resize_many(image, sizes, method, caches, cascade=strategy == "cascade")
+
+
+@_benchmark("build_pyramid", levels=[4])
+def _bench_pyramid(fx, width, height, levels):
+    image = fx.image(width, height)
+    caches = []
+    w, h = width, height
+    for _ in range(levels):
+        w, h = max(w // 2, 1), max(h // 2, 1)
+        caches.append(fx.image(w, h))
+    return lambda: build_pyramid(image, levels, pyramid_cache=caches)
+
+
+@_benchmark("crop_margins")
+def _bench_crop(fx, width, height):
+    image = fx.image(width, height)
+    margin_x, margin_y = width // 10, height // 10
+    result = fx.image(width - 2 * margin_x, height - 2 * margin_y)
+    return lambda: crop_margins(image, margin_x, margin_y, margin_x, margin_y, result)
+
+
+@_reference("crop_margins")
+def _pillow_crop(width, height):
+    img = _sample_pil(width, height)
+    margin_x, margin_y = width // 10, height // 10
+    return lambda: img.crop((margin_x, margin_y, width - margin_x, height - margin_y))
+
+
+@_benchmark("cover_image_in_container")
+def _bench_cover(fx, width, height):
+    image = fx.image(width, height)
+    container_width, container_height = width // 2, height
+    resized = fx.image(*get_cover_resize_dimensions(image, container_width, container_height))
+    container = fx.image(container_width, container_height)
+    return lambda: cover_image_in_container(image, container_width, container_height,
+                                            container_image_cache=container,
+                                            resize_image_cache=resized)
+
+
+# Loading ----------------------------------------------------------------------
+
+_LOAD_BATCH = 8
+
+
+def _jpeg_files(fx, width: int, height: int) -> list[str]:
+    # Noise, so the decoder has real work to do.
+    folder = tempfile.TemporaryDirectory()
+    fx.keep(folder, folder.cleanup)
+    noise = Image.effect_noise((width, height), 64).convert("RGB")
+    paths = []
+    for i in range(_LOAD_BATCH):
+        path = os.path.join(folder.name, f"frame_{i:03d}.jpg")
+        noise.rotate(i * 7.5).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+@_benchmark("load_image", batch=_LOAD_BATCH)
+def _bench_load_image(fx, width, height):
+    paths = _jpeg_files(fx, width, height)
+    container = fx.image(width, height)
+
+    def run():
+        for path in paths:
+            load_image(path, container)
+    return run
+
+
+@_benchmark("load_images", batch=_LOAD_BATCH, workers=[1, 2, 4])
+def _bench_load_images(fx, width, height, workers):
+    paths = _jpeg_files(fx, width, height)
+
+    def run():
+        for _ in load_images(paths, workers=workers):
+            pass
+    return run
+
+
+# Layouts ----------------------------------------------------------------------
+
+@_benchmark("create_image_grid")
+def _bench_grid(fx, width, height):
+    tile = fx.image(width // 4, height // 4)
+    result = fx.image(tile.width * 4, tile.height * 4)
+    return lambda: create_image_grid(tile, 4, 4, 16, grid_image_cache=result)
+
+
+@_benchmark("create_image_collage")
+def _bench_collage(fx, width, height):
+    tiles = [fx.image(width // 4, height // 4) for _ in range(16)]
+    result = fx.image(tiles[0].width * 4, tiles[0].height * 4)
+    return lambda: create_image_collage(tiles, 4, 4, collage_image_cache=result)
+
+
+# Caching ----------------------------------------------------------------------
+
+@_benchmark("content_hash")
+def _bench_content_hash(fx, width, height):
+    image = fx.image(width, height)
+    return lambda: content_hash(image)
+
+
+@_benchmark("EffectCache.apply")
+def _bench_effect_cache(fx, width, height):
+    image = fx.image(width, height)
+    cache = EffectCache()
+    fx.keep(cache, cache.clear)
+    effects = Pipeline().add(apply_stroke, 4, RGBA(255, 255, 255, 255))
+    return lambda: cache.apply(image, effects, key="bench")
+
+
+# Text -------------------------------------------------------------------------
+
+_TEXT = "PhotoFF 0123456789"
+
+
+@_benchmark("render_text", sized=False, needs_font=True, font_size=[24, 96])
+def _bench_render_text(fx, width, height, font_size, font):
+    return lambda: render_text(_TEXT, font, font_size).free()
+
+
+@_benchmark("TextRenderer.draw", sized=False, needs_font=True, font_size=[24, 96])
+def _bench_text_renderer(fx, width, height, font_size, font):
+    renderer = fx.keep(TextRenderer())
+    target = fx.image(*renderer.measure(_TEXT, font, font_size))
+    return lambda: renderer.draw(target, _TEXT, 0, 0, font, font_size, background=RGBA(0, 0, 0, 0))
+
+
+def _label(value) -> str:
+    if isinstance(value, ResizeMethod):
+        return value.name
+    return str(value)
+
+
+def _case_name(operation: str, params: dict, width: int, height: int) -> str:
+    name = operation
+    if params:
+        name += "[" + ",".join(f"{key}={_label(value)}" for key, value in params.items()) + "]"
+    if width and height:
+        name += f"@{width}x{height}"
+    return name
+
+
+def _time(run: Callable, warmup: int, repeat: int, min_time: float,
+          restore: Callable | None = None) -> tuple[int, list[float]]:
+    # Calls per sample are calibrated so each sample lasts at least min_time,
+    # which keeps timer resolution and per-call jitter out of fast cases.
+    # With restore, each call is timed on its own after an untimed restore().
+    for _ in range(warmup):
+        if restore is not None:
+            restore()
+        run()
+
+    def batch(number: int) -> float:
+        if restore is not None:
+            elapsed = 0.0
+            for _ in range(number):
+                restore()
+                start = time.perf_counter()
+                run()
+                elapsed += time.perf_counter() - start
+            return elapsed
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        return time.perf_counter() - start
+
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        number = 1
+        while True:
+            elapsed = batch(number)
+            if elapsed >= min_time:
+                break
+            number = max(number * 2, int(number * min_time / elapsed * 1.1)) if elapsed else number * 10
+        return number, [batch(number) / number for _ in range(repeat)]
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def run_benchmarks(sizes: Sequence[tuple[int, int]] = DEFAULT_SIZES,
+                   filters: Sequence[str] = (),
+                   warmup: int = 2,
+                   repeat: int = 10,
+                   min_time: float = 0.05,
+                   pillow: bool = False,
+                   font: str | None = None,
+                   progress: Callable[[BenchResult], None] | None = None) -> list[BenchResult]:
+    """
+    Times every operation of `photoff.operations` over a matrix of sizes and parameters.
+
+    Each case allocates its images up front, so only the operation is timed.
+    Operations that modify their input in place, such as blurs and strokes,
+    get it restored before every call, outside the timed region, so each call
+    works on the same content. After `warmup` untimed calls, `repeat` samples are taken, each averaging as
+    many calls as needed to last `min_time`. Operations run on the active
+    backend; on machines without a GPU select the CPU backend, the host
+    implementation of the same operations.
+
+    Args:
+        sizes (Sequence[tuple[int, int]], optional): Image sizes `(width, height)`.
+            Defaults to 640x480, 1920x1080 and 3840x2160.
+        filters (Sequence[str], optional): Only run cases whose name contains one
+            of these strings. Defaults to every case.
+        warmup (int, optional): Untimed calls before sampling. Defaults to 2.
+        repeat (int, optional): Samples per case. Defaults to 10.
+        min_time (float, optional): Minimum duration of a sample, in seconds.
+            Defaults to 0.05.
+        pillow (bool, optional): Also time Pillow's equivalent of the operations
+            that have one, as `pillow:` cases. Defaults to False.
+        font (str, optional): TrueType font for the text benchmarks, which are
+            skipped without one.
+        progress (Callable[[BenchResult], None], optional): Called after each case.
+
+    Returns:
+        list[BenchResult]: One result per case, in execution order.
+
+    Raises:
+        ValueError: If `warmup` is negative, or `repeat` or `min_time` is not positive.
+
+    Example:
+        >>> results = run_benchmarks(sizes=[(1920, 1080)], filters=["blur"])
+        >>> print(results[0].name, results[0].mpix_per_s)
+    """
+
+    if warmup < 0 or repeat < 1 or min_time <= 0:
+        raise ValueError(f"warmup must be >= 0, repeat >= 1 and min_time > 0, got {warmup}, {repeat} and {min_time}")
+
+    results = []
+    for bench in _BENCHMARKS:
+        if bench.needs_font and font is None:
+            continue
+        keys = list(bench.matrix)
+        for values in itertools.product(*(bench.matrix[key] for key in keys)):
+            params = dict(zip(keys, values))
+            for width, height in (sizes if bench.sized else [(0, 0)]):
+                name = _case_name(bench.operation, params, width, height)
+                if filters and not any(pattern in name for pattern in filters):
+                    continue
+                extra = {"font": font} if bench.needs_font else {}
+
+                fixture = _Fixture()
+                try:
+                    run = bench.setup(fixture, width, height, **params, **extra)
+                    restore = None
+                    if isinstance(run, tuple):
+                        run, restore = run
+                    number, samples = _time(run, warmup, repeat, min_time, restore)
+                finally:
+                    fixture.free()
+                results.append(BenchResult(name, bench.operation, _jsonable(params), width, height, number, samples,
+                                           bench.batch))
+                if progress is not None:
+                    progress(results[-1])
+
+                if pillow and bench.reference is not None:
+                    run = bench.reference(width, height, **params)
+                    if run is not None:
+                        number, samples = _time(run, warmup, repeat, min_time)
+                        results.append(BenchResult("pillow:" + name, bench.operation, _jsonable(params),
+                                                   width, height, number, samples))
+                        if progress is not None:
+                            progress(results[-1])
+    return results
+
+
+def _jsonable(params: dict) -> dict:
+    return {key: _label(value) if isinstance(value, ResizeMethod) else value for key, value in params.items()}
+
+
+def compare(results: Sequence[BenchResult], baseline: dict, threshold: float = 0.1) -> list[Comparison]:
+    """
+    Compares results with a baseline report written by `to_json`.
+
+    Pillow reference cases are not compared.
+
+    Args:
+        results (Sequence[BenchResult]): Current results.
+        baseline (dict): Parsed JSON report of an earlier run.
+        threshold (float, optional): Relative slowdown of the median flagged as a
+            regression. Defaults to 0.1 (10%).
+
+    Returns:
+        list[Comparison]: One entry per case present in both runs.
+    """
+
+    medians = {entry["name"]: entry["median_s"] for entry in baseline.get("results", [])}
+    comparisons = []
+    for result in results:
+        previous = medians.get(result.name)
+        if previous is None or result.name.startswith("pillow:"):
+            continue
+        comparisons.append(_compare_result(result, previous, threshold))
+    return comparisons
+
+
+def _compare_result(result: BenchResult, baseline: float, threshold: float) -> Comparison:
+    return Comparison(result.name, baseline, result.median, result.median > baseline * (1.0 + threshold))
+
+
+def to_json(results: Sequence[BenchResult]) -> dict:
+    """
+    Builds a JSON-serializable report of results and the machine they ran on.
+    """
+
+    return {
+        "environment": {
+            "backend": get_backend(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": [result.to_dict() for result in results],
+    }
+
+
+def _format_row(result: BenchResult, reference: BenchResult | None, comparison: Comparison | None) -> str:
+    mpix = result.mpix_per_s
+    row = (f"{result.name:<58} {result.median * 1e3:>10.3f} {result.p95 * 1e3:>10.3f} "
+           f"{f'{mpix:.1f}' if mpix is not None else '-':>10}")
+    if reference is not None:
+        row += f" {reference.median / result.median:>8.2f}x"
+    if comparison is not None:
+        row += f" {(comparison.ratio - 1.0) * 100:>+7.1f}%"
+        if comparison.regression:
+            row += " REGRESSION"
+    return row
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m photoff.bench",
+                                     description="Benchmark the photoff operations.")
+    parser.add_argument("--backend", choices=["cuda", "cpu"],
+                        help="backend to time; defaults to the active one, or cpu if CUDA cannot be loaded")
+    parser.add_argument("--sizes", help="comma-separated WIDTHxHEIGHT list, e.g. 640x480,1920x1080")
+    parser.add_argument("--filter", action="append", default=[], help="only run cases whose name contains this (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="small images and few samples, for CI")
+    parser.add_argument("--warmup", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=None)
+    parser.add_argument("--min-time", type=float, default=None, help="minimum seconds per sample")
+    parser.add_argument("--pillow", action="store_true", help="also time Pillow equivalents")
+    parser.add_argument("--font", help="TrueType font for the text benchmarks")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="report of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown flagged as a regression (default 0.1)")
+    parser.add_argument("--list", action="store_true", help="list the operations covered and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for bench in _BENCHMARKS:
+            matrix = ", ".join(f"{key}: {', '.join(_label(v) for v in values)}" for key, values in bench.matrix.items())
+            notes = [note for note, applies in (("needs --font", bench.needs_font),
+                                                ("pillow reference", bench.reference is not None)) if applies]
+            print(f"{bench.operation:<30} {matrix}{'  (' + '; '.join(notes) + ')' if notes else ''}")
+        return 0
+
+    if args.backend is not None:
+        set_backend(args.backend)
+    else:
+        try:
+            _lib.load()
+        except OSError:
+            print(f"photoff.bench: the {get_backend()} backend cannot be loaded, timing the cpu backend", file=sys.stderr)
+            set_backend("cpu")
+
+    if args.sizes:
+        sizes = [tuple(int(v) for v in size.lower().split("x")) for size in args.sizes.split(",")]
+    else:
+        sizes = QUICK_SIZES if args.quick else DEFAULT_SIZES
+    warmup = args.warmup if args.warmup is not None else (1 if args.quick else 2)
+    repeat = args.repeat if args.repeat is not None else (5 if args.quick else 10)
+    min_time = args.min_time if args.min_time is not None else (0.01 if args.quick else 0.05)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        previous_backend = baseline.get("environment", {}).get("backend")
+        if previous_backend not in (None, get_backend()):
+            print(f"photoff.bench: baseline ran on the {previous_backend} backend, now {get_backend()}", file=sys.stderr)
+        medians = {entry["name"]: entry["median_s"] for entry in baseline.get("results", [])}
+
+    header = f"{'Case':<58} {'median ms':>10} {'p95 ms':>10} {'MPix/s':>10}"
+    if args.pillow:
+        header += f" {'vs Pillow':>9}"
+    if baseline is not None:
+        header += f" {'vs base':>8}"
+    print(f"photoff benchmarks, {get_backend()} backend")
+    print(header)
+    print("-" * len(header))
+
+    pending = {}
+
+    def compare_one(result: BenchResult) -> Comparison | None:
+        if baseline is None or result.name not in medians:
+            return None
+        return _compare_result(result, medians[result.name], args.threshold)
+
+    def flush() -> None:
+        for result in pending.values():
+            print(_format_row(result, None, compare_one(result)))
+        pending.clear()
+
+    def report(result: BenchResult) -> None:
+        # A Pillow case follows its photoff case; print the pair on one row.
+        if result.name.startswith("pillow:"):
+            own = pending.pop(result.name[len("pillow:"):])
+            print(_format_row(own, result, compare_one(own)))
+        elif args.pillow:
+            flush()
+            pending[result.name] = result
+        else:
+            print(_format_row(result, None, compare_one(result)))
+
+    results = run_benchmarks(sizes, args.filter, warmup, repeat, min_time, args.pillow, args.font, report)
+    flush()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(to_json(results), f, indent=2)
+
+    if baseline is not None:
+        regressions = [c for c in compare(results, baseline, args.threshold) if c.regression]
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for comparison in regressions:
+                print(f"  {comparison.name}: {comparison.baseline * 1e3:.3f} ms -> {comparison.current * 1e3:.3f} ms")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
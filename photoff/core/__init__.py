@@ -1,2 +1,15 @@
-from .cuda_interface import _lib, ffi
-from .types import CudaImage, RGBA
+from .cuda_interface import _lib, ffi, set_backend, get_backend
+from .types import CudaImage, RGBA, DistanceField
+from .pool import BufferPool, PoolStats, get_buffer_pool
+from .stream import Stream, Event, current_stream
+from .profile import Profiler, CallRecord, CallStats
+
+# Without this, `from .core import *` in photoff/__init__.py would also export
+# the submodules, and photoff.stream would name photoff.core.stream.
+__all__ = [
+    "ffi", "set_backend", "get_backend",
+    "CudaImage", "RGBA", "DistanceField",
+    "BufferPool", "PoolStats", "get_buffer_pool",
+    "Stream", "Event", "current_stream",
+    "Profiler", "CallRecord", "CallStats",
+]
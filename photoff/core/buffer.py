@@ -40,15 +40,16 @@ def free_buffer(buffer: "CudaBuffer") -> None:
     _lib.free_buffer(buffer)
 
 
-def copy_to_host(h_dst: "CudaBuffer", d_src: "CudaBuffer", width: int, height: int) -> None:
+def copy_to_host(h_dst: "CudaBuffer", d_src: "CudaBuffer", width: int, height: int, pitch: int | None = None) -> None:
     """
     Copies image data from device (GPU) to host (CPU) memory.
 
     Args:
-        h_dst (CudaBuffer): Destination buffer in host memory.
+        h_dst (CudaBuffer): Destination buffer in host memory, packed rows.
         d_src (CudaBuffer): Source buffer in device memory.
         width (int): Width of the image.
         height (int): Height of the image.
+        pitch (int, optional): Distance in pixels between source rows. Defaults to `width`.
 
     Returns:
         None
@@ -57,18 +58,19 @@ def copy_to_host(h_dst: "CudaBuffer", d_src: "CudaBuffer", width: int, height: i
         >>> copy_to_host(cpu_buf, gpu_buf, 256, 256)
     """
 
-    _lib.copy_to_host(h_dst, d_src, width, height)
+    _lib.copy_to_host(h_dst, d_src, width, height, width if pitch is None else pitch)
 
 
-def copy_to_device(d_dst: "CudaBuffer", h_src: "CudaBuffer", width: int, height: int) -> None:
+def copy_to_device(d_dst: "CudaBuffer", h_src: "CudaBuffer", width: int, height: int, pitch: int | None = None) -> None:
     """
     Copies image data from host (CPU) to device (GPU) memory.
 
     Args:
         d_dst (CudaBuffer): Destination buffer in device memory.
-        h_src (CudaBuffer): Source buffer in host memory.
+        h_src (CudaBuffer): Source buffer in host memory, packed rows.
         width (int): Width of the image.
         height (int): Height of the image.
+        pitch (int, optional): Distance in pixels between destination rows. Defaults to `width`.
 
     Returns:
         None
@@ -77,10 +79,15 @@ def copy_to_device(d_dst: "CudaBuffer", h_src: "CudaBuffer", width: int, height:
         >>> copy_to_device(gpu_buf, cpu_buf, 256, 256)
     """
 
-    _lib.copy_to_device(d_dst, h_src, width, height)
+    _lib.copy_to_device(d_dst, h_src, width, height, width if pitch is None else pitch)
 
 
-def copy_buffers_same_size(dst: "CudaBuffer", src: "CudaBuffer", width: int, height: int) -> None:
+def copy_buffers_same_size(dst: "CudaBuffer",
+                           src: "CudaBuffer",
+                           width: int,
+                           height: int,
+                           dst_pitch: int | None = None,
+                           src_pitch: int | None = None) -> None:
     """
     Copies data between two CUDA buffers of the same size.
 
@@ -92,6 +99,8 @@ def copy_buffers_same_size(dst: "CudaBuffer", src: "CudaBuffer", width: int, hei
         src (CudaBuffer): Source buffer on the device.
         width (int): Width of the image.
         height (int): Height of the image.
+        dst_pitch (int, optional): Distance in pixels between destination rows. Defaults to `width`.
+        src_pitch (int, optional): Distance in pixels between source rows. Defaults to `width`.
 
     Returns:
         None
@@ -100,4 +109,6 @@ def copy_buffers_same_size(dst: "CudaBuffer", src: "CudaBuffer", width: int, hei
         >>> copy_buffers_same_size(tmp_buf, original_buf, 512, 512)
     """
 
-    _lib.copy_buffers_same_size(dst, src, width, height)
+    _lib.copy_buffers_same_size(dst, src, width, height,
+                                width if dst_pitch is None else dst_pitch,
+                                width if src_pitch is None else src_pitch)
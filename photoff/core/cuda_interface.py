@@ -1,3 +1,4 @@
+import os
 import sys
 from cffi import FFI
 
@@ -5,6 +6,7 @@ ffi = FFI()
 
 ffi.cdef("""
     typedef unsigned int uint32_t;
+    typedef unsigned long long uint64_t;
     typedef int int32_t;
     typedef _Bool bool;
 
@@ -12,27 +14,60 @@ ffi.cdef("""
         unsigned char x, y, z, w; 
     } uchar4;
 
+    // Execution Context
+    void* create_stream(void);
+    void destroy_stream(void* stream);
+    void set_current_stream(void* stream);
+    void synchronize_stream(void* stream);
+
+    void* create_event(void);
+    void destroy_event(void* event);
+    void record_event(void* event, void* stream);
+    void synchronize_event(void* event);
+    bool query_event(void* event);
+    void* create_timing_event(void);
+    float event_elapsed_ms(void* start, void* end);
+
     // Buffer Management
     uchar4* create_buffer(uint32_t width, uint32_t height);
     void free_buffer(uchar4* buffer);
-    void copy_buffers_same_size(uchar4* dst, const uchar4* src, uint32_t width, uint32_t height);
+    void copy_buffers_same_size(uchar4* dst, const uchar4* src, uint32_t width, uint32_t height,
+                                uint32_t dst_pitch, uint32_t src_pitch);
+    uint64_t hash_image(const uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch);
 
     // Host - Device Memory Transfer
-    void copy_to_host(uchar4* h_dst, const uchar4* d_src, uint32_t width, uint32_t height);
-    void copy_to_device(uchar4* d_dst, const uchar4* h_src, uint32_t width, uint32_t height);
+    uchar4* create_host_buffer(uint32_t width, uint32_t height);
+    void free_host_buffer(uchar4* buffer);
+
+    void copy_to_host(uchar4* h_dst, const uchar4* d_src, uint32_t width, uint32_t height,
+                      uint32_t src_pitch);
+    void copy_to_device(uchar4* d_dst, const uchar4* h_src, uint32_t width, uint32_t height,
+                        uint32_t dst_pitch);
 
     // Blend
     void blend_buffers(uchar4* dst, const uchar4* src,
-                       uint32_t dst_width, uint32_t dst_height,
-                       uint32_t src_width, uint32_t src_height,
+                       uint32_t dst_width, uint32_t dst_height, uint32_t dst_pitch,
+                       uint32_t src_width, uint32_t src_height, uint32_t src_pitch,
                        int32_t x, int32_t y);
 
+    typedef struct {
+        const uchar4* src;
+        uint32_t width;
+        uint32_t height;
+        uint32_t pitch;
+        int32_t x;
+        int32_t y;
+    } BlendLayer;
+
+    void blend_layers(uchar4* dst, uint32_t dst_width, uint32_t dst_height, uint32_t dst_pitch,
+                      const BlendLayer* layers, uint32_t count);
+
     // Fill effects
-    void fill_color(uchar4* buffer, uint32_t width, uint32_t height,
+    void fill_color(uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch,
                     unsigned char r, unsigned char g,
                     unsigned char b, unsigned char a);
 
-    void fill_gradient(uchar4* buffer, uint32_t width, uint32_t height,
+    void fill_gradient(uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch,
                        unsigned char r1, unsigned char g1,
                        unsigned char b1, unsigned char a1,
                        unsigned char r2, unsigned char g2,
@@ -40,57 +75,246 @@ ffi.cdef("""
                        int direction, bool seamless);
 
     // Filters
-    void apply_corner_radius(uchar4* buffer, uint32_t width, uint32_t height, uint32_t size);
-    void apply_opacity(uchar4* buffer, uint32_t width, uint32_t height, float opacity);
-    void apply_flip(uchar4* buffer, uint32_t width, uint32_t height, bool flip_horizontal, bool flip_vertical);
-    void apply_grayscale(uchar4* buffer, uint32_t width, uint32_t height);
+    void apply_corner_radius(uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch, uint32_t size);
+    void apply_opacity(uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch, float opacity);
+    void apply_flip(uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch,
+                    bool flip_horizontal, bool flip_vertical);
+    void apply_grayscale(uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch);
 
     void apply_chroma_key(uchar4* buffer, const uchar4* key_buffer,
-                          uint32_t buffer_width, uint32_t buffer_height,
-                          uint32_t key_width, uint32_t key_height,
+                          uint32_t buffer_width, uint32_t buffer_height, uint32_t buffer_pitch,
+                          uint32_t key_width, uint32_t key_height, uint32_t key_pitch,
                           int channel, unsigned char threshold,
                           bool invert, bool zero_all_channels);
 
-    void apply_stroke(uchar4* buffer, const uchar4* copy_buffer,
-                      uint32_t width, uint32_t height,
+    void compute_distance_field(float* field, uint32_t* column_scratch, uint32_t* row_scratch,
+                                const uchar4* src, uint32_t width, uint32_t height,
+                                uint32_t src_pitch);
+
+    void apply_stroke(uchar4* buffer, const float* field,
+                      uint32_t width, uint32_t height, uint32_t pitch,
                       int stroke_width,
                       unsigned char stroke_r, unsigned char stroke_g,
                       unsigned char stroke_b, unsigned char stroke_a,
                       int mode);
 
-    void apply_shadow(uchar4* buffer, const uchar4* copy_buffer,
-                      uint32_t width, uint32_t height,
+    void apply_shadow(uchar4* buffer, const float* field,
+                      uint32_t width, uint32_t height, uint32_t pitch,
                       float radius, float intensity,
                       unsigned char shadow_r, unsigned char shadow_g,
                       unsigned char shadow_b, unsigned char shadow_a,
                       int mode);
 
-    void apply_gaussian_blur(uchar4* buffer, const uchar4* copy_buffer,
-                             uint32_t width, uint32_t height, float radius);
+    void apply_gaussian_blur(uchar4* buffer, uchar4* temp_buffer,
+                             uint32_t width, uint32_t height, uint32_t pitch, float radius);
+
+    // Pointwise chains
+    typedef struct {
+        int32_t kind;
+        int32_t mirror;
+        uchar4 color1;
+        uchar4 color2;
+        int32_t param;
+        int32_t flags;
+        float amount;
+        uint32_t threshold;
+        const uchar4* key;
+        uint32_t key_width;
+        uint32_t key_height;
+        uint32_t key_pitch;
+    } PointwiseOp;
+
+    void apply_pointwise_ops(uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch,
+                             const PointwiseOp* ops, uint32_t count, int32_t load_mirror);
 
     // Resize / Crop
     void resize_bilinear(uchar4* dst, const uchar4* src,
-                         uint32_t dst_width, uint32_t dst_height,
-                         uint32_t src_width, uint32_t src_height);
+                         uint32_t dst_width, uint32_t dst_height, uint32_t dst_pitch,
+                         uint32_t src_width, uint32_t src_height, uint32_t src_pitch);
 
     void resize_nearest(uchar4* dst, const uchar4* src,
-                        uint32_t dst_width, uint32_t dst_height,
-                        uint32_t src_width, uint32_t src_height);
+                        uint32_t dst_width, uint32_t dst_height, uint32_t dst_pitch,
+                        uint32_t src_width, uint32_t src_height, uint32_t src_pitch);
+
+    void resize_area(uchar4* dst, const uchar4* src,
+                     uint32_t dst_width, uint32_t dst_height, uint32_t dst_pitch,
+                     uint32_t src_width, uint32_t src_height, uint32_t src_pitch);
+
+    typedef struct ResampleTable ResampleTable;
+
+    ResampleTable* create_resample_table(uint32_t src_size, uint32_t dst_size, int32_t method,
+                                         uint32_t dst_first, uint32_t dst_count,
+                                         uint32_t src_first, uint32_t src_count);
+
+    void free_resample_table(ResampleTable* table);
+
+    void resize_separable(uchar4* dst, const uchar4* src,
+                          uint32_t dst_width, uint32_t dst_height, uint32_t dst_pitch,
+                          uint32_t src_width, uint32_t src_height, uint32_t src_pitch,
+                          uchar4* temp, uint32_t temp_pitch,
+                          const ResampleTable* horizontal, const ResampleTable* vertical);
 
-    void resize_bicubic(uchar4* dst, const uchar4* src,
-                        uint32_t dst_width, uint32_t dst_height,
-                        uint32_t src_width, uint32_t src_height);
+    typedef struct {
+        uchar4* dst;
+        uint32_t width;
+        uint32_t height;
+        uint32_t pitch;
+        int32_t source;
+        uchar4* temp;
+        uint32_t temp_pitch;
+        const ResampleTable* horizontal;
+        const ResampleTable* vertical;
+    } ResizeTarget;
+
+    void resize_many(const uchar4* src, uint32_t src_width, uint32_t src_height, uint32_t src_pitch,
+                     const ResizeTarget* targets, uint32_t count, int32_t method);
 
     void crop_image(uchar4* dst, const uchar4* src,
-                    uint32_t src_width, uint32_t src_height,
-                    uint32_t dst_width, uint32_t dst_height,
+                    uint32_t src_width, uint32_t src_height, uint32_t src_pitch,
+                    uint32_t dst_width, uint32_t dst_height, uint32_t dst_pitch,
                     int crop_x, int crop_y);
 """)
 
 
-if sys.platform == "win32":
-    lib_name = "photoff.dll"
-else:
-    lib_name = "photoff.so"
+BACKENDS = {
+    "cuda": "photoff",
+    "cpu": "photoff_cpu",
+}
+
+# Backends whose image buffers live in ordinary host memory.
+HOST_MEMORY_BACKENDS = {"cpu"}
+
+
+def _library_file(backend: str) -> str:
+    lib_name = BACKENDS[backend]
+    if sys.platform == "win32":
+        return f"{lib_name}.dll"
+    return f"{lib_name}.so"
+
+
+class _Backend:
+    """
+    Forwards native calls to the shared library of the selected backend.
+
+    Every backend exports the same ABI (see `photoff_cuda_src/photoff.h`), so
+    operations call `_lib.<entry_point>` without knowing which one is active.
+    The library is opened on first use, which lets `set_backend()` run before
+    anything touches the device.
+    """
+
+    def __init__(self, backend: str):
+        self._name = backend
+        self._handle = None
+        self._listeners = []
+        self._call_wrappers = []
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def host_memory(self) -> bool:
+        return self._name in HOST_MEMORY_BACKENDS
+
+    def select(self, backend: str) -> None:
+        handle = ffi.dlopen(_library_file(backend))
+        if self._handle is not None:
+            for listener in self._listeners:
+                listener()
+        self._clear_cache()
+        self._name = backend
+        self._handle = handle
+
+    def wrap_calls(self, wrapper, innermost: bool = False) -> None:
+        """
+        Routes entry points through `wrapper(backend, name, func)`, which returns
+        the callable to cache in place of `func`.
+
+        Wrappers compose: each one wraps the result of those registered before
+        it, unless `innermost` puts it directly around the native function.
+        """
+
+        if innermost:
+            self._call_wrappers.insert(0, wrapper)
+        else:
+            self._call_wrappers.append(wrapper)
+        self._clear_cache()
+
+    def rewrap_calls(self) -> None:
+        """
+        Makes the next access of every entry point ask the wrappers again, e.g.
+        after a wrapper switched between passing `func` through and wrapping it.
+        """
+
+        self._clear_cache()
+
+    def load(self) -> None:
+        if self._handle is None:
+            self._handle = ffi.dlopen(_library_file(self._name))
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        self.load()
+        func = getattr(self._handle, name)
+        for wrapper in self._call_wrappers:
+            func = wrapper(self._name, name, func)
+        # Cache the bound entry point so later calls skip __getattr__.
+        self.__dict__[name] = func
+        return func
+
+    def _clear_cache(self) -> None:
+        for attr in [a for a in self.__dict__ if not a.startswith("_")]:
+            del self.__dict__[attr]
+
+
+def _validate_backend(backend: str) -> str:
+    key = backend.lower()
+    if key not in BACKENDS:
+        raise ValueError(f"Invalid backend: {backend}, must be one of {', '.join(repr(b) for b in BACKENDS)}")
+    return key
+
+
+_lib = _Backend(_validate_backend(os.environ.get("PHOTOFF_BACKEND", "cuda")))
+
+
+def set_backend(backend: str) -> None:
+    """
+    Selects the native library that executes every photoff operation.
+
+    The backend can also be chosen before import with the `PHOTOFF_BACKEND`
+    environment variable. Buffers belong to the backend that created them, so
+    switch before allocating any `CudaImage`.
+
+    Args:
+        backend (str): 'cuda' for the GPU library (`photoff.so` / `photoff.dll`)
+            or 'cpu' for the multi-threaded host library (`photoff_cpu.so` / `photoff_cpu.dll`).
+
+    Raises:
+        ValueError: If the backend name is unknown.
+        OSError: If the backend's shared library cannot be loaded.
+
+    Example:
+        >>> set_backend("cpu")
+    """
+
+    _lib.select(_validate_backend(backend))
+
+
+def add_backend_listener(callback) -> None:
+    """
+    Registers a callable run just before the active backend is replaced.
+
+    The previous library is still loaded while the callback runs, so it can
+    release resources that belong to it.
+    """
+
+    _lib._listeners.append(callback)
+
+
+def get_backend() -> str:
+    """
+    Returns the name of the active backend ('cuda' or 'cpu').
+    """
 
-_lib = ffi.dlopen(lib_name)
+    return _lib.name
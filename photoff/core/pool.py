@@ -0,0 +1,289 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass as _dataclass
+from .buffer import create_buffer, free_buffer
+from .cuda_interface import ffi, add_backend_listener
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .types import CudaBuffer
+    from .stream import Event
+
+
+DEFAULT_MAX_IDLE_BYTES = 512 * 1024 * 1024
+SIZE_CLASS_STEPS = 4
+
+
+def size_class(pixels: int) -> int:
+    """
+    Rounds a pixel count up to its allocation size class.
+
+    Classes are powers of two split into `SIZE_CLASS_STEPS` equal steps, so a
+    pooled buffer is never more than 25% larger than requested.
+
+    Args:
+        pixels (int): Number of RGBA pixels requested.
+
+    Returns:
+        int: Number of pixels actually allocated.
+
+    Example:
+        >>> size_class(1920 * 1080)
+        2097152
+    """
+
+    if pixels <= SIZE_CLASS_STEPS:
+        return max(pixels, 1)
+    base = 1 << ((pixels - 1).bit_length() - 1)
+    step = base // SIZE_CLASS_STEPS
+    return (pixels + step - 1) // step * step
+
+
+@_dataclass
+class PoolStats:
+    """
+    Snapshot of buffer pool counters.
+
+    Attributes:
+        hits (int): Acquisitions served from an idle buffer.
+        misses (int): Acquisitions that had to allocate a new buffer.
+        evictions (int): Idle buffers released back to the backend by LRU trimming.
+        bytes_in_use (int): Bytes held by live buffers.
+        bytes_idle (int): Bytes held by idle buffers waiting for reuse.
+        max_idle_bytes (int): Budget for idle bytes.
+    """
+    hits: int
+    misses: int
+    evictions: int
+    bytes_in_use: int
+    bytes_idle: int
+    max_idle_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class BufferPool:
+    """
+    Recycles image buffers by size class instead of allocating and freeing them.
+
+    Released buffers stay idle until a request of the same size class reuses them.
+    Idle memory is bounded by `max_idle_bytes`; when it is exceeded the least
+    recently released buffers are freed first. All methods are thread-safe.
+
+    Attributes:
+        max_idle_bytes (int): Budget for idle buffers. 0 disables recycling.
+
+    Example:
+        >>> pool = get_buffer_pool()
+        >>> pool.max_idle_bytes = 256 * 1024 * 1024
+        >>> print(pool.stats().hit_rate)
+    """
+
+    def __init__(self, max_idle_bytes: int = DEFAULT_MAX_IDLE_BYTES):
+        self._lock = threading.Lock()
+        self._max_idle_bytes = max_idle_bytes
+        self._idle: dict[int, list["CudaBuffer"]] = {}
+        self._lru: OrderedDict[int, int] = OrderedDict()
+        self._live: dict[int, int] = {}
+        self._orphans: set[int] = set()
+        self._deferred: list[tuple["Event", list["CudaBuffer"]]] = []
+        self._sinks = threading.local()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._bytes_in_use = 0
+        self._bytes_idle = 0
+
+    @property
+    def max_idle_bytes(self) -> int:
+        return self._max_idle_bytes
+
+    @max_idle_bytes.setter
+    def max_idle_bytes(self, value: int):
+        if value < 0:
+            raise ValueError(f"max_idle_bytes must be >= 0, got {value}")
+        with self._lock:
+            self._max_idle_bytes = value
+            self._trim_locked(value)
+
+    def acquire(self, width: int, height: int) -> "CudaBuffer":
+        """
+        Returns a buffer that can hold at least `width` x `height` pixels.
+
+        Args:
+            width (int): Width in pixels.
+            height (int): Height in pixels.
+
+        Returns:
+            CudaBuffer: A recycled or newly allocated buffer. Its contents are undefined.
+
+        Raises:
+            MemoryError: If the backend cannot allocate the buffer even after
+                releasing every idle buffer.
+        """
+
+        pixels = size_class(width * height)
+        nbytes = pixels * 4
+
+        with self._lock:
+            if self._deferred:
+                self._reclaim_locked()
+            bucket = self._idle.get(pixels)
+            if bucket:
+                buffer = bucket.pop()
+                address = _address(buffer)
+                del self._lru[address]
+                self._bytes_idle -= nbytes
+                self._hits += 1
+            else:
+                buffer = create_buffer(pixels, 1)
+                if buffer == ffi.NULL:
+                    self._trim_locked(0)
+                    buffer = create_buffer(pixels, 1)
+                if buffer == ffi.NULL:
+                    raise MemoryError(f"Could not allocate a buffer for {width}x{height} pixels")
+                address = _address(buffer)
+                self._misses += 1
+
+            self._live[address] = pixels
+            self._bytes_in_use += nbytes
+        return buffer
+
+    def release(self, buffer: "CudaBuffer") -> None:
+        """
+        Returns a buffer obtained from `acquire` to the pool.
+
+        Args:
+            buffer (CudaBuffer): Buffer to recycle. It must not be used afterwards.
+                Inside a `Stream` it is recycled once the work queued so far is done.
+        """
+
+        sink = getattr(self._sinks, "sink", None)
+        if sink is not None:
+            sink.append(buffer)
+            return
+
+        with self._lock:
+            self._release_locked(buffer)
+
+    def trim(self, max_idle_bytes: int = 0) -> None:
+        """
+        Frees least recently used idle buffers until at most `max_idle_bytes` remain idle.
+
+        Args:
+            max_idle_bytes (int, optional): Idle bytes to keep. Defaults to 0 (free all).
+        """
+
+        with self._lock:
+            self._trim_locked(max_idle_bytes)
+
+    def stats(self) -> PoolStats:
+        """
+        Returns a snapshot of the pool counters.
+        """
+
+        with self._lock:
+            return PoolStats(hits=self._hits,
+                             misses=self._misses,
+                             evictions=self._evictions,
+                             bytes_in_use=self._bytes_in_use,
+                             bytes_idle=self._bytes_idle,
+                             max_idle_bytes=self._max_idle_bytes,
+                             )
+
+    def reset_stats(self) -> None:
+        """
+        Zeroes the hit, miss and eviction counters.
+        """
+
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    def _release_locked(self, buffer: "CudaBuffer") -> None:
+        address = _address(buffer)
+        pixels = self._live.pop(address, None)
+        if pixels is None:
+            if address in self._orphans:
+                self._orphans.discard(address)
+            else:
+                free_buffer(buffer)
+            return
+
+        nbytes = pixels * 4
+        self._bytes_in_use -= nbytes
+        self._idle.setdefault(pixels, []).append(buffer)
+        self._lru[address] = pixels
+        self._bytes_idle += nbytes
+        self._trim_locked(self._max_idle_bytes)
+
+    def _hold_releases(self, sink: list | None) -> list | None:
+        # Buffers released on this thread go to `sink` until it is reset, so
+        # queued work can keep using them. Returns the previous sink.
+        previous = getattr(self._sinks, "sink", None)
+        self._sinks.sink = sink
+        return previous
+
+    def _release_when(self, event: "Event", buffers: list["CudaBuffer"]) -> None:
+        # Recycles `buffers` once `event` has completed.
+        with self._lock:
+            self._deferred.append((event, buffers))
+
+    def _reclaim_locked(self) -> None:
+        pending, self._deferred = self._deferred, []
+        for event, buffers in pending:
+            if event.query():
+                for buffer in buffers:
+                    self._release_locked(buffer)
+            else:
+                self._deferred.append((event, buffers))
+
+    def _trim_locked(self, max_idle_bytes: int) -> None:
+        while self._bytes_idle > max_idle_bytes and self._lru:
+            address, pixels = self._lru.popitem(last=False)
+            bucket = self._idle[pixels]
+            for i, buffer in enumerate(bucket):
+                if _address(buffer) == address:
+                    del bucket[i]
+                    break
+            free_buffer(buffer)
+            self._bytes_idle -= pixels * 4
+            self._evictions += 1
+
+    def _on_backend_switch(self) -> None:
+        # Runs while the previous backend is still loaded: idle buffers are freed
+        # by it, and live ones are forgotten since the new backend cannot free them.
+        with self._lock:
+            for event, buffers in self._deferred:
+                event.synchronize()
+                for buffer in buffers:
+                    self._release_locked(buffer)
+            self._deferred.clear()
+            self._trim_locked(0)
+            self._orphans.update(self._live)
+            self._live.clear()
+            self._bytes_in_use = 0
+
+
+def _address(buffer: "CudaBuffer") -> int:
+    return int(ffi.cast("uintptr_t", buffer))
+
+
+_pool = BufferPool()
+add_backend_listener(_pool._on_backend_switch)
+
+
+def get_buffer_pool() -> BufferPool:
+    """
+    Returns the process-wide pool used by every `CudaImage`.
+
+    Example:
+        >>> stats = get_buffer_pool().stats()
+        >>> print(stats.hits, stats.misses, stats.bytes_idle)
+    """
+
+    return _pool
@@ -0,0 +1,412 @@
+import json
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass as _dataclass
+from typing import Callable
+from .cuda_interface import _lib, ffi, add_backend_listener
+from .stream import current_stream
+
+# Entry points the profiler uses itself, or that only manage execution contexts.
+_UNPROFILED = {"create_timing_event", "event_elapsed_ms", "record_event", "destroy_event",
+               "create_event", "synchronize_event", "query_event", "create_stream",
+               "destroy_stream", "set_current_stream"}
+
+
+def _same_size(width: int, height: int, passes: int):
+    # Calls whose image is args[width], args[height] and that touch every pixel
+    # `passes` times (a read and a write count as two).
+    return lambda args: (args[width], args[height], args[width] * args[height] * 4 * passes)
+
+
+def _resize(args) -> tuple[int, int, int]:
+    dst_width, dst_height, _, src_width, src_height = args[2:7]
+    return dst_width, dst_height, (dst_width * dst_height + src_width * src_height) * 4
+
+
+def _blend_layers(args) -> tuple[int, int, int]:
+    layers, count = args[4], args[5]
+    touched = sum(layers[i].width * layers[i].height for i in range(count))
+    return args[1], args[2], touched * 4 * 3
+
+
+def _resize_many(args) -> tuple[int, int, int]:
+    targets, count = args[4], args[5]
+    touched = args[1] * args[2] + sum(targets[i].width * targets[i].height for i in range(count))
+    return args[1], args[2], touched * 4
+
+
+def _allocation(args) -> tuple[int, int, int]:
+    # The buffer pool allocates by pixel count, as create_buffer(pixels, 1), so
+    # the arguments say nothing about the image; report the bytes allocated.
+    return 0, 0, args[0] * args[1] * 4
+
+
+# Entry point -> args -> (width, height, bytes touched). Bytes are estimates of
+# image memory read plus written, or allocated for allocations; entry points
+# missing here report zeros.
+_SHAPES = {
+    "create_buffer": _allocation,
+    "create_host_buffer": _allocation,
+    "copy_buffers_same_size": _same_size(2, 3, 2),
+    "hash_image": _same_size(1, 2, 1),
+    "copy_to_host": _same_size(2, 3, 2),
+    "copy_to_device": _same_size(2, 3, 2),
+    "blend_buffers": lambda args: (args[5], args[6], args[5] * args[6] * 4 * 3),
+    "blend_layers": _blend_layers,
+    "fill_color": _same_size(1, 2, 1),
+    "fill_gradient": _same_size(1, 2, 1),
+    "apply_corner_radius": _same_size(1, 2, 2),
+    "apply_opacity": _same_size(1, 2, 2),
+    "apply_flip": _same_size(1, 2, 2),
+    "apply_grayscale": _same_size(1, 2, 2),
+    "apply_chroma_key": _same_size(2, 3, 3),
+    # Source, field and the two scratch passes.
+    "compute_distance_field": _same_size(4, 5, 6),
+    "apply_stroke": _same_size(2, 3, 3),
+    "apply_shadow": _same_size(2, 3, 3),
+    # Horizontal then vertical pass, each reading and writing the image.
+    "apply_gaussian_blur": _same_size(2, 3, 4),
+    "apply_pointwise_ops": _same_size(1, 2, 2),
+    "resize_bilinear": _resize,
+    "resize_nearest": _resize,
+    "resize_area": _resize,
+    "resize_separable": _resize,
+    "resize_many": _resize_many,
+    "crop_image": lambda args: (args[5], args[6], args[5] * args[6] * 4 * 2),
+}
+
+
+@_dataclass
+class CallRecord:
+    """
+    One native call observed by a `Profiler`.
+
+    Attributes:
+        name (str): Native entry point, e.g. 'apply_gaussian_blur'.
+        width (int): Width of the image the call works on, 0 if not applicable.
+        height (int): Height of the image the call works on, 0 if not applicable.
+        bytes (int): Estimated image memory read plus written, or the size of
+            the allocation for `create_buffer` and `create_host_buffer`.
+        start (float): `time.perf_counter()` when the call started, in seconds.
+        wall_time (float): Host time spent in the call, in seconds.
+        device_time (float | None): GPU time between events recorded around the
+            call, in seconds. None on the CPU backend or without `device_time=True`.
+        thread (int): Identifier of the thread that ran the call. Inside a `Stream`
+            on the CPU backend this is the stream's worker thread.
+    """
+    name: str
+    width: int
+    height: int
+    bytes: int
+    start: float
+    wall_time: float
+    device_time: float | None
+    thread: int
+
+
+@_dataclass
+class CallStats:
+    """
+    Aggregate counters of one entry point.
+
+    Attributes:
+        calls (int): Number of calls.
+        wall_time (float): Total host time, in seconds.
+        device_time (float): Total measured device time, in seconds.
+        bytes (int): Total estimated bytes touched.
+    """
+    calls: int = 0
+    wall_time: float = 0.0
+    device_time: float = 0.0
+    bytes: int = 0
+
+    @property
+    def mean_wall_time(self) -> float:
+        return self.wall_time / self.calls if self.calls else 0.0
+
+    @property
+    def throughput(self) -> float:
+        # Bytes per second of host time.
+        return self.bytes / self.wall_time if self.wall_time else 0.0
+
+
+class Profiler:
+    """
+    Records every native call made while it is active.
+
+    Each call yields a `CallRecord` with the entry point, image dimensions,
+    estimated bytes touched, wall time and, on CUDA with `device_time=True`,
+    the device time measured with events around the call. Records feed the
+    per-entry-point counters of `stats()`, an optional callback and
+    `save_chrome_trace()`, which writes a file for chrome://tracing or Perfetto.
+
+    While no profiler is active the native entry points are called directly,
+    without any instrumentation in between. Calls from every thread are
+    recorded, including the worker threads of CPU streams. Inside a CUDA
+    `Stream` the wall time is only the time to enqueue; measure `device_time`,
+    which waits for each call and therefore serializes the stream.
+
+    Args:
+        device_time (bool, optional): Measure device time with CUDA events. Defaults to False.
+        callback (Callable[[CallRecord], None], optional): Called with every
+            record, on the thread that made the call.
+        max_records (int, optional): Records kept for `records` and the trace;
+            the oldest are dropped first. Counters are never dropped. Defaults
+            to 1,000,000.
+
+    Example:
+        >>> with Profiler() as profiler:
+        ...     apply_gaussian_blur(image, 8)
+        ...     resize(image, 800, 600)
+        >>> print(profiler.summary())
+        >>> profiler.save_chrome_trace("trace.json")
+    """
+
+    def __init__(self,
+                 device_time: bool = False,
+                 callback: Callable[[CallRecord], None] | None = None,
+                 max_records: int = 1_000_000):
+        if max_records < 0:
+            raise ValueError(f"max_records must be >= 0, got {max_records}")
+
+        self.device_time = device_time
+        self.callback = callback
+        self._lock = threading.Lock()
+        self._records: deque[CallRecord] = deque(maxlen=max_records)
+        self._stats: dict[str, CallStats] = {}
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    @property
+    def active(self) -> bool:
+        return self in _active
+
+    def start(self) -> None:
+        """
+        Starts recording. Does nothing if the profiler is already active.
+        """
+
+        global _active
+        with _active_lock:
+            if self in _active:
+                return
+            was_idle = not _active
+            _active = _active + (self,)
+        if was_idle:
+            _lib.rewrap_calls()
+
+    def stop(self) -> None:
+        """
+        Stops recording. Records and counters are kept.
+        """
+
+        global _active
+        with _active_lock:
+            if self not in _active:
+                return
+            _active = tuple(p for p in _active if p is not self)
+            now_idle = not _active
+        if now_idle:
+            _lib.rewrap_calls()
+
+    @property
+    def records(self) -> list[CallRecord]:
+        """
+        The records kept so far, in the order the calls finished.
+        """
+
+        with self._lock:
+            return list(self._records)
+
+    def stats(self) -> dict[str, CallStats]:
+        """
+        Returns a snapshot of the counters, keyed by entry point.
+        """
+
+        with self._lock:
+            return {name: CallStats(s.calls, s.wall_time, s.device_time, s.bytes)
+                    for name, s in self._stats.items()}
+
+    def clear(self) -> None:
+        """
+        Drops every record and counter.
+        """
+
+        with self._lock:
+            self._records.clear()
+            self._stats.clear()
+
+    def summary(self) -> str:
+        """
+        Formats the counters as a table, most expensive entry point first.
+
+        Returns:
+            str: One row per entry point with calls, total and mean wall time,
+                device time and throughput.
+        """
+
+        stats = sorted(self.stats().items(), key=lambda item: item[1].wall_time, reverse=True)
+        lines = [f"{'operation':<26} {'calls':>8} {'total ms':>10} {'mean ms':>9} {'device ms':>10} {'GB/s':>7}"]
+        for name, s in stats:
+            device = f"{s.device_time * 1e3:10.3f}" if s.device_time else f"{'-':>10}"
+            lines.append(f"{name:<26} {s.calls:>8} {s.wall_time * 1e3:10.3f} "
+                         f"{s.mean_wall_time * 1e3:9.3f} {device} {s.throughput / 1e9:7.2f}")
+        return "\n".join(lines)
+
+    def to_chrome_trace(self) -> dict:
+        """
+        Converts the records to the Chrome trace event format.
+
+        Returns:
+            dict: `{"traceEvents": [...]}` with one complete ('X') event per call,
+                timestamps in microseconds.
+        """
+
+        pid = os.getpid()
+        events = []
+        for record in self.records:
+            args = {"width": record.width, "height": record.height, "bytes": record.bytes}
+            if record.device_time is not None:
+                args["device_us"] = record.device_time * 1e6
+            events.append({"name": record.name,
+                           "cat": "photoff",
+                           "ph": "X",
+                           "ts": record.start * 1e6,
+                           "dur": record.wall_time * 1e6,
+                           "pid": pid,
+                           "tid": record.thread,
+                           "args": args,
+                           })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, filename: str) -> None:
+        """
+        Writes the records as a Chrome trace JSON file.
+
+        Args:
+            filename (str): Destination path, conventionally ending in `.json`.
+
+        Example:
+            >>> profiler.save_chrome_trace("trace.json")  # open in ui.perfetto.dev
+        """
+
+        with open(filename, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def _record(self, record: CallRecord) -> None:
+        with self._lock:
+            self._records.append(record)
+            stats = self._stats.get(record.name)
+            if stats is None:
+                stats = self._stats[record.name] = CallStats()
+            stats.calls += 1
+            stats.wall_time += record.wall_time
+            stats.bytes += record.bytes
+            if record.device_time is not None:
+                stats.device_time += record.device_time
+        if self.callback is not None:
+            self.callback(record)
+
+
+# Replaced, never mutated, so calls read it without taking the lock.
+_active: tuple[Profiler, ...] = ()
+_active_lock = threading.Lock()
+
+
+class _TimingEvents:
+    # The (start, end) events of one thread, created on first use. Only the
+    # thread's locals reference them, so they are destroyed when it exits.
+
+    def __init__(self):
+        # Bound now so the events are destroyed by the backend that created them.
+        self._destroy_event = _lib.destroy_event
+        self.pair = None
+        self.pair = (_lib.create_timing_event(), _lib.create_timing_event())
+        if ffi.NULL in self.pair:
+            self.close()
+            raise RuntimeError("Could not create a CUDA event")
+
+    def close(self) -> None:
+        if self.pair is not None:
+            for event in self.pair:
+                if event != ffi.NULL:
+                    self._destroy_event(event)
+            self.pair = None
+
+    def __del__(self):
+        self.close()
+
+
+_timing = threading.local()
+_timing_events_of_threads: "weakref.WeakSet[_TimingEvents]" = weakref.WeakSet()
+_timing_lock = threading.Lock()
+
+
+def _timing_events() -> tuple:
+    events = getattr(_timing, "events", None)
+    if events is None or events.pair is None:
+        events = _timing.events = _TimingEvents()
+        with _timing_lock:
+            _timing_events_of_threads.add(events)
+    return events.pair
+
+
+def _destroy_timing_events() -> None:
+    # Events belong to the backend being replaced; threads create new ones.
+    with _timing_lock:
+        events = list(_timing_events_of_threads)
+    for thread_events in events:
+        thread_events.close()
+
+
+def _wrap_profiled_call(backend: str, name: str, func):
+    # Wraps the native function itself, so host stream workers time the actual
+    # work. Re-evaluated by Profiler.start/stop through _lib.rewrap_calls.
+    if not _active or name in _UNPROFILED:
+        return func
+    shape = _SHAPES.get(name)
+    timed_device = backend == "cuda"
+
+    def call(*args):
+        profilers = _active
+        if not profilers:
+            return func(*args)
+
+        events = None
+        if timed_device and any(p.device_time for p in profilers):
+            stream = current_stream()
+            stream_handle = stream._queue.handle if stream is not None else ffi.NULL
+            events = _timing_events()
+            _lib.record_event(events[0], stream_handle)
+
+        start = time.perf_counter()
+        result = func(*args)
+        wall_time = time.perf_counter() - start
+
+        device_time = None
+        if events is not None:
+            _lib.record_event(events[1], stream_handle)
+            elapsed = _lib.event_elapsed_ms(events[0], events[1])
+            if elapsed >= 0:
+                device_time = elapsed / 1e3
+
+        width, height, touched = shape(args) if shape is not None else (0, 0, 0)
+        record = CallRecord(name, width, height, touched, start, wall_time, device_time,
+                            threading.get_ident())
+        for profiler in profilers:
+            profiler._record(record)
+        return result
+
+    return call
+
+
+_lib.wrap_calls(_wrap_profiled_call, innermost=True)
+add_backend_listener(_destroy_timing_events)
@@ -0,0 +1,285 @@
+import queue
+from abc import ABC, abstractmethod
+import threading
+import weakref
+from .cuda_interface import _lib, ffi
+from .pool import get_buffer_pool
+
+# Entry points that host streams never queue: allocation returns a value the
+# caller needs right away, and copy_to_host and hash_image hand data to the caller.
+# free_resample_table is queued, so it runs after the calls that use the table.
+_IMMEDIATE_CALLS = {"create_buffer", "free_buffer", "create_host_buffer", "free_host_buffer",
+                    "create_resample_table"}
+_BARRIER_CALLS = {"copy_to_host", "hash_image"}
+
+_local = threading.local()
+_outstanding: set["_HostQueue"] = set()
+_outstanding_lock = threading.Lock()
+
+
+class Event(ABC):
+    """
+    Marks a point in a stream's queue of work.
+
+    Obtained from `Stream.record_event()`. It completes once every operation
+    enqueued on the stream before it has finished.
+
+    Example:
+        >>> with photoff.Stream() as s:
+        ...     apply_gaussian_blur(image, 8)
+        ...     done = s.record_event()
+        >>> done.synchronize()
+    """
+
+    @abstractmethod
+    def query(self) -> bool:
+        """
+        Returns True if the work before the event has finished, without blocking.
+        """
+
+    @abstractmethod
+    def synchronize(self) -> None:
+        """
+        Blocks until the work before the event has finished.
+        """
+
+
+class _HostEvent(Event):
+    def __init__(self):
+        self._done = threading.Event()
+
+    def query(self) -> bool:
+        return self._done.is_set()
+
+    def synchronize(self) -> None:
+        self._done.wait()
+
+
+class _DeviceEvent(Event):
+    def __init__(self, stream_handle):
+        handle = _lib.create_event()
+        if handle == ffi.NULL:
+            raise RuntimeError("Could not create a CUDA event")
+        _lib.record_event(handle, stream_handle)
+        self._handle = handle
+        weakref.finalize(self, _lib.destroy_event, handle)
+
+    def query(self) -> bool:
+        return bool(_lib.query_event(self._handle))
+
+    def synchronize(self) -> None:
+        _lib.synchronize_event(self._handle)
+
+
+class _HostQueue:
+    # Runs queued native calls in order on a worker thread. cffi releases the
+    # GIL during each call, so the caller keeps building the frame meanwhile.
+
+    def __init__(self):
+        self._tasks = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="photoff-stream", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                self._tasks.task_done()
+                return
+            func, args = task
+            try:
+                func(*args)
+            except BaseException as error:
+                if self._error is None:
+                    self._error = error
+            finally:
+                self._tasks.task_done()
+
+    def submit(self, func, args: tuple) -> None:
+        with _outstanding_lock:
+            _outstanding.add(self)
+            self._tasks.put((func, args))
+
+    def record_event(self) -> Event:
+        event = _HostEvent()
+        self.submit(event._done.set, ())
+        return event
+
+    def synchronize(self) -> None:
+        self._tasks.join()
+        with _outstanding_lock:
+            if not self._tasks.unfinished_tasks:
+                _outstanding.discard(self)
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        self._tasks.put(None)
+        self._thread.join()
+        with _outstanding_lock:
+            _outstanding.discard(self)
+
+
+class _DeviceQueue:
+    def __init__(self):
+        handle = _lib.create_stream()
+        if handle == ffi.NULL:
+            raise RuntimeError("Could not create a CUDA stream")
+        self.handle = handle
+
+    def record_event(self) -> Event:
+        return _DeviceEvent(self.handle)
+
+    def synchronize(self) -> None:
+        _lib.synchronize_stream(self.handle)
+
+    def close(self) -> None:
+        _lib.destroy_stream(self.handle)
+
+
+class Stream:
+    """
+    Execution context in which operations are enqueued instead of run to completion.
+
+    Outside a stream every native call waits for the device before returning.
+    Inside `with Stream():` calls made on the current thread only enqueue their
+    work, in order, and return immediately. The host catches up on
+    `image_to_pil` / `save_image`, on `synchronize()` or on an `Event`.
+
+    On the CUDA backend the stream is a `cudaStream_t`. On the CPU backend it is a
+    worker thread that executes the queued calls over host memory, which gives the
+    same ordering guarantees without a GPU.
+
+    Buffers freed inside the block, including the temporaries of operations
+    called without caches, are recycled only after the queued work that may
+    use them has finished. Errors raised by a queued call on the CPU backend
+    surface on the next synchronization. Synchronize every stream before
+    calling `set_backend()`.
+
+    Example:
+        >>> with photoff.Stream() as s:
+        ...     fill_color(background, RGBA(255, 255, 255))
+        ...     blend(background, logo, 20, 20)
+        ...     apply_gaussian_blur(background, 4)
+        >>> save_image(background, "frame.png")  # waits for the stream
+    """
+
+    def __init__(self):
+        if _lib.name == "cuda":
+            self._queue = _DeviceQueue()
+        else:
+            self._queue = _HostQueue()
+        self._pending = []
+        self._saved = []
+        self._finalizer = weakref.finalize(self, self._queue.close)
+
+    def __enter__(self) -> "Stream":
+        previous = current_stream()
+        self._saved.append((previous, get_buffer_pool()._hold_releases(self._pending)))
+        _local.stream = self
+        if isinstance(self._queue, _DeviceQueue):
+            _lib.set_current_stream(self._queue.handle)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        previous, sink = self._saved.pop()
+        _local.stream = previous
+        if isinstance(self._queue, _DeviceQueue):
+            _lib.set_current_stream(previous._queue.handle if previous is not None else ffi.NULL)
+        get_buffer_pool()._hold_releases(sink)
+
+        if self._pending:
+            # Hand the freed buffers to the pool without waiting for the stream.
+            get_buffer_pool()._release_when(self._queue.record_event(), list(self._pending))
+            self._pending.clear()
+
+    def record_event(self) -> Event:
+        """
+        Records an event after the work enqueued so far.
+
+        Returns:
+            Event: Completes once that work has finished.
+        """
+
+        return self._queue.record_event()
+
+    def synchronize(self) -> None:
+        """
+        Blocks until every operation enqueued on the stream has finished.
+
+        Raises:
+            Exception: The first error raised by a queued call (CPU backend).
+        """
+
+        try:
+            self._queue.synchronize()
+        finally:
+            pool = get_buffer_pool()
+            buffers = list(self._pending)
+            self._pending.clear()
+            sink = pool._hold_releases(None)
+            for buffer in buffers:
+                pool.release(buffer)
+            pool._hold_releases(sink)
+
+    def close(self) -> None:
+        """
+        Synchronizes the stream and releases its native resources.
+        """
+
+        self.synchronize()
+        self._finalizer()
+
+
+def current_stream() -> Stream | None:
+    """
+    Returns the stream active on the calling thread, or None outside any `with Stream()`.
+    """
+
+    return getattr(_local, "stream", None)
+
+
+def _wait_for_host_work() -> None:
+    # Called before the host reads image memory directly (CPU backend views).
+    stream = current_stream()
+    if stream is not None:
+        stream.synchronize()
+    if _outstanding:
+        _drain_host_streams()
+
+
+def _drain_host_streams() -> None:
+    with _outstanding_lock:
+        queues = list(_outstanding)
+    for host_queue in queues:
+        host_queue.synchronize()
+
+
+def _wrap_host_call(backend: str, name: str, func):
+    # CUDA orders work natively: the legacy default stream waits for every
+    # stream. Host backends get the same semantics here.
+    if backend == "cuda" or name in _IMMEDIATE_CALLS:
+        return func
+
+    def call(*args):
+        stream = getattr(_local, "stream", None)
+        if stream is None:
+            if _outstanding:
+                _drain_host_streams()
+            return func(*args)
+        if name in _BARRIER_CALLS:
+            stream.synchronize()
+            return func(*args)
+        if name == "copy_to_device":
+            # The source may be gone by the time the worker runs; queue a copy.
+            dst, src, width, height, pitch = args
+            staged = ffi.from_buffer("uchar4[]", ffi.buffer(src, width * height * 4)[:])
+            args = (dst, staged, width, height, pitch)
+        stream._queue.submit(func, args)
+
+    return call
+
+
+_lib.wrap_calls(_wrap_host_call)
@@ -1,5 +1,8 @@
 from dataclasses import dataclass as _dataclass
-from .buffer import create_buffer, free_buffer
+from .pool import get_buffer_pool
+from .buffer import copy_to_host, copy_to_device
+from .cuda_interface import _lib, ffi
+from .stream import _wait_for_host_work
 
 
 @_dataclass
@@ -30,16 +33,31 @@ class CudaImage:
 
     The image has an underlying GPU buffer and stores its logical and allocated dimensions.
     Use `.width` and `.height` to manage the actual used size, while the allocation
-    size is fixed on creation. Memory is managed via `create_buffer` and `free_buffer`.
+    size is fixed on creation. Buffers come from the process-wide `BufferPool`, so
+    freeing an image and creating another of a similar size reuses the allocation.
+
+    An image can also be a view of a rectangle inside another image, created with
+    `view()`. A view shares its parent's memory: its rows are `pitch` pixels apart
+    and every operation reads and writes the parent's pixels in place.
 
     Attributes:
         width (int): Logical width (can be set lower than allocated width).
         height (int): Logical height (can be set lower than allocated height).
-        buffer (CudaBuffer): Pointer to the underlying CUDA buffer.
+        pitch (int): Distance in pixels between the starts of consecutive rows.
+        buffer (CudaBuffer): Pointer to the first pixel of the image.
 
     Methods:
-        init_image(): Allocates the GPU buffer if not already allocated.
-        free(): Frees the associated GPU buffer.
+        holds(width, height): Whether a size fits in the allocation.
+        view(x, y, width, height): Zero-copy sub-image sharing this image's memory.
+        init_image(): Acquires the GPU buffer from the pool if not already allocated.
+        free(): Returns the associated GPU buffer to the pool.
+        from_array(arr, out): Creates an image from a HxWx4 uint8 array.
+        to_array(out): Copies the pixels into a HxWx4 uint8 NumPy array.
+
+    On the CPU backend the pixels live in host memory, and the image also exposes
+    `__array_interface__` and `__dlpack__`, so `np.asarray(img)` and
+    `np.from_dlpack(img)` are views of the buffer without a copy. The view is only
+    valid until the image is freed.
 
     Example:
         >>> img = CudaImage(512, 512)
@@ -63,6 +81,12 @@ class CudaImage:
         self._width  = width
         self._height = height
 
+        # Set for views: the image whose memory is shared, the pitch of its
+        # rows and the offset of the view's first pixel in its buffer.
+        self._parent: "CudaImage | None" = None
+        self._pitch = 0
+        self._offset = 0
+
         self.buffer = None
         if auto_init:
             self.init_image()
@@ -87,11 +111,230 @@ class CudaImage:
             raise ValueError(f"height {value} > alloc_height {self._alloc_height}")
         self._height = value
 
+    @property
+    def pitch(self) -> int:
+        # Owned images are packed at their logical width.
+        return self._pitch if self._parent is not None else self._width
+
+    @property
+    def parent(self) -> "CudaImage | None":
+        """
+        The image a view shares its memory with, or None for an owned image.
+        """
+
+        return self._parent
+
+    def holds(self, width: int, height: int) -> bool:
+        """
+        Returns True if a `width` x `height` image fits in the allocation.
+        """
+
+        return width <= self._alloc_width and height <= self._alloc_height
+
+    def view(self, x: int, y: int, width: int, height: int) -> "CudaImage":
+        """
+        Returns a zero-copy sub-image covering a rectangle of this image.
+
+        The view can be the input or the output of any operation: writes land in
+        this image's pixels, e.g. resizing straight into a grid cell or filtering
+        one region in place. It stays valid while this image keeps its buffer and
+        logical size; freeing the view does not free the memory.
+
+        Args:
+            x (int): Left edge of the rectangle in pixels.
+            y (int): Top edge of the rectangle in pixels.
+            width (int): Width of the rectangle in pixels.
+            height (int): Height of the rectangle in pixels.
+
+        Returns:
+            CudaImage: A `width` x `height` image whose rows are `self.pitch` pixels apart.
+
+        Raises:
+            ValueError: If the rectangle is empty or not inside the image.
+            RuntimeError: If the image has been freed.
+
+        Example:
+            >>> cell = canvas.view(256, 0, 256, 256)
+            >>> resize(photo, 256, 256, resize_image_cache=cell)
+        """
+
+        if width <= 0 or height <= 0:
+            raise ValueError(f"Invalid view size: {width}x{height}")
+        if x < 0 or y < 0 or x + width > self._width or y + height > self._height:
+            raise ValueError(f"View {width}x{height} at ({x}, {y}) exceeds image of {self._width}x{self._height}")
+        if self.buffer is None:
+            raise RuntimeError("Cannot view a freed image")
+
+        view = CudaImage(width, height, auto_init=False)
+        view._parent = self
+        view._pitch = self.pitch
+        view._offset = y * self.pitch + x
+        view.buffer = self.buffer + view._offset
+        return view
+
     def init_image(self):
         if self.buffer is None:
-            self.buffer = create_buffer(self._alloc_width, self._alloc_height)
+            if self._parent is not None:
+                if self._parent.buffer is not None:
+                    self.buffer = self._parent.buffer + self._offset
+                return
+            self.buffer = get_buffer_pool().acquire(self._alloc_width, self._alloc_height)
 
     def free(self):
         if self.buffer is not None:
-            free_buffer(self.buffer)
-            self.buffer = None
\ No newline at end of file
+            if self._parent is None:
+                get_buffer_pool().release(self.buffer)
+            self.buffer = None
+
+    @classmethod
+    def from_array(cls, arr, out: "CudaImage" = None) -> "CudaImage":
+        """
+        Uploads a HxWx4 uint8 RGBA array into an image.
+
+        Args:
+            arr: A NumPy array, or any object NumPy can read through the buffer
+                protocol, `__array_interface__` or DLPack.
+            out (CudaImage, optional): Image to upload into. Its logical size is set
+                to the array's. A new image is created if not provided.
+
+        Returns:
+            CudaImage: The image holding the pixels.
+
+        Raises:
+            ImportError: If NumPy is not installed.
+            ValueError: If the array is not HxWx4 uint8, or does not fit in `out`.
+
+        Example:
+            >>> frame = np.zeros((1080, 1920, 4), dtype=np.uint8)
+            >>> img = CudaImage.from_array(frame)
+        """
+
+        np = _import_numpy()
+        if not isinstance(arr, np.ndarray) and hasattr(arr, "__dlpack__"):
+            arr = np.from_dlpack(arr)
+        arr = np.asarray(arr)
+        if arr.ndim != 3 or arr.shape[2] != 4 or arr.dtype != np.uint8:
+            raise ValueError(f"Expected a HxWx4 uint8 array, got shape {arr.shape} and dtype {arr.dtype}")
+        arr = np.ascontiguousarray(arr)
+
+        height, width = arr.shape[:2]
+        if out is None:
+            out = cls(width, height)
+        elif not out.holds(width, height):
+            raise ValueError(f"Array of {width}x{height} does not fit in image of {out._alloc_width}x{out._alloc_height}")
+        else:
+            out.width = width
+            out.height = height
+
+        copy_to_device(out.buffer, ffi.cast("uchar4*", ffi.from_buffer(arr)), width, height, out.pitch)
+        return out
+
+    def to_array(self, out=None):
+        """
+        Downloads the image into a HxWx4 uint8 NumPy array.
+
+        Args:
+            out (numpy.ndarray, optional): C-contiguous uint8 array of shape
+                (height, width, 4) to write into. A new array is allocated if not provided.
+
+        Returns:
+            numpy.ndarray: The array holding the pixels.
+
+        Raises:
+            ImportError: If NumPy is not installed.
+            ValueError: If `out` has the wrong shape, dtype or layout.
+
+        Example:
+            >>> frame = np.empty((img.height, img.width, 4), dtype=np.uint8)
+            >>> img.to_array(out=frame)
+        """
+
+        np = _import_numpy()
+        shape = (self._height, self._width, 4)
+        if out is None:
+            out = np.empty(shape, dtype=np.uint8)
+        elif (out.shape != shape or out.dtype != np.uint8 or
+              not out.flags.c_contiguous or not out.flags.writeable):
+            raise ValueError(f"Expected a writable C-contiguous uint8 array of shape {shape}, "
+                             f"got shape {out.shape} and dtype {out.dtype}")
+
+        copy_to_host(ffi.cast("uchar4*", ffi.from_buffer(out)), self.buffer, self._width, self._height, self.pitch)
+        return out
+
+    @property
+    def __array_interface__(self) -> dict:
+        if not _lib.host_memory:
+            raise AttributeError(f"Image memory of the {_lib.name} backend is not host-accessible; use to_array()")
+        if self.buffer is None:
+            raise AttributeError("Image buffer has been freed")
+
+        _wait_for_host_work()
+        return {"shape": (self._height, self._width, 4),
+                "typestr": "|u1",
+                "data": (int(ffi.cast("uintptr_t", self.buffer)), False),
+                "strides": None if self.pitch == self._width else (self.pitch * 4, 4, 1),
+                "version": 3,
+                }
+
+    def __dlpack__(self, **kwargs):
+        if not _lib.host_memory:
+            raise BufferError(f"Image memory of the {_lib.name} backend cannot be exported; use to_array()")
+        np = _import_numpy()
+        kwargs = {name: value for name, value in kwargs.items() if value is not None}
+        return np.asarray(self).__dlpack__(**kwargs)
+
+    def __dlpack_device__(self) -> tuple[int, int]:
+        # DLPack device types: 1 is kDLCPU, 2 is kDLCUDA.
+        return (1, 0) if _lib.host_memory else (2, 0)
+
+
+class DistanceField:
+    """
+    Signed distance from every pixel of an image to the edge of its alpha mask.
+
+    Each pixel holds a 32-bit float: the distance to the nearest opaque pixel for
+    transparent pixels (positive), or minus the distance to the nearest transparent
+    pixel for opaque ones (negative). Pixels with no counterpart in the image hold
+    +/- infinity. The field is a snapshot of the alpha channel at the time it was
+    computed, so several strokes and shadows can share it.
+
+    Attributes:
+        width (int): Width of the field in pixels.
+        height (int): Height of the field in pixels.
+        buffer (FloatBuffer): Pointer to the underlying float buffer.
+
+    Example:
+        >>> field = compute_alpha_distance_field(img)
+        >>> field.free()
+    """
+
+    def __init__(self, width: int, height: int):
+        """
+        Allocates an uninitialised distance field.
+
+        Args:
+            width (int): Width in pixels.
+            height (int): Height in pixels.
+        """
+
+        self.width = width
+        self.height = height
+        self._storage = CudaImage(width, height)
+
+    @property
+    def buffer(self):
+        if self._storage.buffer is None:
+            return None
+        return ffi.cast("float*", self._storage.buffer)
+
+    def free(self):
+        self._storage.free()
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError as error:
+        raise ImportError("NumPy is required for array interop: pip install numpy") from error
+    return numpy
+
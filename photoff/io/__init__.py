@@ -1,92 +1,307 @@
-from ..core import ffi
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator
+from ..core import ffi, current_stream
 from ..core.buffer import copy_to_host, copy_to_device
 from ..core.types import CudaImage
+from .staging import StagingBuffer, _paste_rgba, _staging_slot
+from .saving import SaveQueue, save_image_async, _write
+from .raw import RAW_EXTENSION, save_raw, load_raw, map_raw, _disk_cache_path, _raw_header, _write_raw
+from .assets import AssetCache, AssetCacheStats, get_asset_cache
 from PIL import Image
 
 
-def image_to_pil(image: CudaImage) -> Image:
+def image_to_pil(image: CudaImage, staging: StagingBuffer | None = None) -> Image:
     """
     Converts a CudaImage to a PIL.Image in RGBA format.
 
-    The image is copied from GPU memory to host memory and returned
-    as a Pillow image object.
+    The pixels are copied from GPU memory once, into host memory that the returned
+    Pillow image wraps without copying again. Inside a `Stream` this waits for
+    the work queued so far.
 
     Args:
         image (CudaImage): The image in GPU memory.
+        staging (StagingBuffer, optional): Host buffer to download into. The returned
+            image shares its memory, so it is only valid until the buffer is reused
+            or freed. Defaults to a new buffer owned by the returned image.
 
     Returns:
-        PIL.Image: A new PIL Image with RGBA channels.
+        PIL.Image: A new read-only PIL Image with RGBA channels.
+
+    Raises:
+        ValueError: If the staging buffer is too small for the image.
 
     Example:
         >>> pil_img = image_to_pil(cuda_img)
         >>> pil_img.show()
     """
 
-    img_data = bytearray(image.width * image.height * 4)
-    data_ptr = ffi.from_buffer(img_data)
-    copy_to_host(ffi.cast("uchar4*", data_ptr), image.buffer, image.width,
-                 image.height)
-    return Image.frombytes("RGBA", (image.width, image.height),
-                           bytes(img_data))
+    width, height = image.width, image.height
+
+    if staging is None:
+        memory = bytearray(width * height * 4)
+        pointer = ffi.cast("uchar4*", ffi.from_buffer(memory))
+    else:
+        memory = staging.memory(width, height)
+        pointer = staging.buffer
+
+    copy_to_host(pointer, image.buffer, width, height, image.pitch)
+    return Image.frombuffer("RGBA", (width, height), memory, "raw", "RGBA", 0, 1)
 
 
-def save_image(image: CudaImage, filename: str) -> None:
+def save_image(image: CudaImage,
+               filename: str,
+               staging: StagingBuffer | None = None,
+               format: str | None = None,
+               **params) -> None:
     """
     Saves a CudaImage to disk as a standard image file.
 
     This function converts the image from GPU memory to a Pillow image and saves it
-    using the given filename. The format is inferred from the file extension.
+    using the given filename. The format is inferred from the file extension; the
+    alpha channel is dropped for formats without one, such as JPEG.
+    Pixels are downloaded into a per-thread staging buffer that is reused by later
+    calls.
 
     Args:
         image (CudaImage): The image to save.
         filename (str): Destination path, including extension (e.g., 'output.png').
+        staging (StagingBuffer, optional): Host buffer to download into instead of
+            the per-thread one.
+        format (str, optional): Pillow format name, e.g. 'PNG'. Inferred from the
+            extension by default.
+        **params: Encoder options forwarded to `PIL.Image.save`, such as
+            `compress_level` for PNG or `quality` for JPEG.
 
     Returns:
         None
 
+    Raises:
+        ValueError: If the staging buffer is too small for the image.
+
     Example:
         >>> save_image(cuda_img, "output.png")
+        >>> save_image(cuda_img, "output.jpg", quality=90)
     """
 
-    img = image_to_pil(image)
-    img.save(filename)
+    if staging is None:
+        staging = _staging_slot("download").get(image.width, image.height)
+
+    img = image_to_pil(image, staging)
+    _write(img, filename, format, params)
     img.close()
 
 
-def load_image(filename: str, container: CudaImage | None = None) -> CudaImage:
+def pil_to_image(img: Image,
+                 container: CudaImage | None = None,
+                 staging: StagingBuffer | None = None) -> CudaImage:
     """
-    Loads an image from disk and transfers it to a CudaImage.
+    Uploads a Pillow image to a CudaImage.
 
-    The image is loaded using Pillow and converted to RGBA format. It is then copied
-    to GPU memory. Optionally, a pre-allocated CudaImage container can be used to avoid allocation.
+    The image is converted to RGBA if needed, its pixels are written by Pillow
+    straight into a staging buffer and uploaded from there, with no intermediate
+    `bytes` copy.
 
     Args:
-        filename (str): Path to the image file to load.
+        img (PIL.Image): Image to upload.
         container (CudaImage, optional): Pre-allocated image buffer. Must be large enough to hold the image.
+        staging (StagingBuffer, optional): Host buffer to upload from. With a pinned
+            buffer inside a `Stream` the upload is asynchronous, so do not reuse the
+            buffer before the stream has synchronized. Defaults to a per-thread
+            buffer that is reused by later calls.
 
     Returns:
-        CudaImage: A new or reused image object with the loaded data.
+        CudaImage: A new or reused image object with the uploaded data.
 
     Raises:
         ValueError: If the input image is larger than the provided container.
+        ValueError: If the staging buffer is too small for the image.
 
     Example:
-        >>> cuda_img = load_image("texture.png")
+        >>> cuda_img = pil_to_image(Image.new("RGBA", (64, 64), (255, 0, 0, 255)))
     """
 
-    img = Image.open(filename).convert("RGBA")
+    if img.mode != "RGBA":
+        img = img.convert("RGBA")
     width, height = img.size
 
     if container is None:
         container = CudaImage(width, height)
-    if width > container.width or height > container.height:
+    if not container.holds(width, height):
         raise ValueError("Image dimensions exceed container dimensions")
 
-    host_buf = bytearray(img.tobytes())
+    slot = None
+    if staging is None:
+        slot = _staging_slot("upload")
+        staging = slot.get(width, height)
 
-    src_ptr = ffi.cast("uchar4*", ffi.from_buffer(host_buf))
-    copy_to_device(container.buffer, src_ptr, width, height)
+    img.load()
+    _paste_rgba(img, staging.memory(width, height))
 
+    # Set the logical size first: it determines an owned container's pitch.
     container.width = width
     container.height = height
+    copy_to_device(container.buffer, staging.buffer, width, height, container.pitch)
+
+    stream = current_stream()
+    if slot is not None and stream is not None:
+        slot.pending = stream.record_event()
+
     return container
+
+
+def load_image(filename: str,
+               container: CudaImage | None = None,
+               staging: StagingBuffer | None = None,
+               cache_dir: str | None = None,
+               cache: "bool | AssetCache" = False) -> CudaImage:
+    """
+    Loads an image from disk and transfers it to a CudaImage.
+
+    The image is decoded by Pillow (and converted to RGBA if needed), copied once
+    into a staging buffer and uploaded from there. Optionally, a pre-allocated
+    CudaImage container can be used to avoid allocation.
+
+    With `cache_dir`, the decoded pixels are also kept on disk in the raw format
+    of `save_raw`, keyed by the file's path, modification time and size. Later
+    loads of the unchanged file, in this or any other process, upload from a
+    memory map of the cached copy and skip decoding. Entries of modified files
+    are not removed; delete the directory to reclaim the space.
+
+    With `cache`, the image is kept resident in device memory by an `AssetCache`
+    and later loads of the unchanged file return it without touching the file's
+    contents. The returned image is then a view shared with the cache: do not
+    modify it, or pass a `container` to receive a copy. Freeing it only drops the
+    view. It stays valid while it is referenced, even if the cache evicts it.
+
+    Args:
+        filename (str): Path to the image file to load.
+        container (CudaImage, optional): Pre-allocated image buffer. Must be large enough to hold the image.
+        staging (StagingBuffer, optional): Host buffer to upload from. See `pil_to_image`.
+            Unused when the image is read from `cache_dir`.
+        cache_dir (str, optional): Directory of decoded copies, created if needed.
+            Defaults to no disk cache.
+        cache (bool | AssetCache, optional): Cache to keep the image resident in;
+            True uses the shared `get_asset_cache()`. Defaults to False.
+
+    Returns:
+        CudaImage: A new or reused image object with the loaded data.
+
+    Raises:
+        ValueError: If the input image is larger than the provided container.
+        ValueError: If the staging buffer is too small for the image.
+
+    Example:
+        >>> cuda_img = load_image("texture.png")
+        >>> cuda_img = load_image("texture.png", cache_dir=".photoff-cache")
+        >>> logo = load_image("logo.png", cache=True)  # resident after the first call
+    """
+
+    if cache:
+        assets = get_asset_cache() if cache is True else cache
+        return assets.load(filename, container, staging, cache_dir)
+
+    if cache_dir is not None:
+        cached = _disk_cache_path(cache_dir, filename)
+        if _raw_header(cached) is not None:
+            return load_raw(cached, container)
+
+    with Image.open(filename) as img:
+        img.load()
+        if cache_dir is None:
+            return pil_to_image(img, container, staging)
+
+        if img.mode != "RGBA":
+            img = img.convert("RGBA")
+        width, height = img.size
+
+        def fill(payload: memoryview) -> None:
+            _paste_rgba(img, payload)
+
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            _write_raw(cached, width, height, fill)
+        except OSError:
+            # An unwritable cache only costs the decode next time.
+            return pil_to_image(img, container, staging)
+    return load_raw(cached, container)
+
+
+def _decode(filename: str) -> Image:
+    with Image.open(filename) as img:
+        img.load()
+        return img if img.mode == "RGBA" else img.convert("RGBA")
+
+
+def load_images(filenames: Iterable[str],
+                workers: int = 4,
+                prefetch: int | None = None,
+                ring: int = 2) -> Iterator[CudaImage]:
+    """
+    Loads a sequence of images, decoding ahead of the caller on a thread pool.
+
+    Files are decoded by Pillow on `workers` threads (decoding releases the GIL)
+    while the caller processes the previous images, and uploaded in order into a
+    ring of reusable containers. Each container grows to the largest image seen,
+    so a batch of similar images allocates only `ring` device buffers.
+
+    Args:
+        filenames (Iterable[str]): Paths of the images, consumed lazily.
+        workers (int, optional): Decoding threads. Defaults to 4.
+        prefetch (int, optional): Maximum images decoded ahead of the caller.
+            Bounds host memory use. Defaults to `2 * workers`.
+        ring (int, optional): Containers cycled through. A yielded image stays
+            valid until `ring` more images have been yielded. Defaults to 2.
+
+    Yields:
+        CudaImage: The next image, in the order of `filenames`. The containers are
+            owned by the generator and freed when it finishes or is closed.
+
+    Raises:
+        ValueError: If `workers`, `prefetch` or `ring` is smaller than 1.
+        OSError: If a file cannot be read or decoded, when its turn comes.
+
+    Example:
+        >>> for image in load_images(paths, workers=8):
+        ...     resize(image, thumb, 256, 256)
+        ...     save_image(thumb, out_path(image))
+    """
+
+    if prefetch is None:
+        prefetch = 2 * workers
+    if workers < 1 or prefetch < 1 or ring < 1:
+        raise ValueError(f"workers, prefetch and ring must be >= 1, got {workers}, {prefetch} and {ring}")
+
+    containers: list[CudaImage | None] = [None] * ring
+    pending = deque()
+    names = iter(filenames)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="photoff-load")
+    try:
+        for filename in islice(names, prefetch):
+            pending.append(executor.submit(_decode, filename))
+
+        index = 0
+        while pending:
+            img = pending.popleft().result()
+            filename = next(names, None)
+            if filename is not None:
+                pending.append(executor.submit(_decode, filename))
+
+            container = containers[index]
+            if container is None or not container.holds(*img.size):
+                if container is not None:
+                    container.free()
+                container = CudaImage(*img.size)
+                containers[index] = container
+            pil_to_image(img, container)
+            img.close()
+
+            index = (index + 1) % ring
+            yield container
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        for container in containers:
+            if container is not None:
+                container.free()
@@ -0,0 +1,334 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass as _dataclass
+from ..core.buffer import copy_buffers_same_size
+from ..core.pool import get_buffer_pool
+from ..core.cuda_interface import add_backend_listener
+from ..core.types import CudaImage
+from .staging import StagingBuffer
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+@_dataclass
+class AssetCacheStats:
+    """
+    Snapshot of asset cache counters.
+
+    Attributes:
+        hits (int): Loads served from a resident image.
+        misses (int): Loads that read the file.
+        evictions (int): Images freed by LRU trimming.
+        invalidations (int): Images dropped because their file changed or by `invalidate`.
+        entries (int): Images currently resident.
+        bytes_in_use (int): Bytes held by resident images.
+        max_bytes (int): Budget for resident images.
+    """
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    entries: int
+    bytes_in_use: int
+    max_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class AssetCache:
+    """
+    Keeps decoded images resident in device memory across `load_image` calls.
+
+    Images are keyed by absolute path and validated against the file's
+    modification time and size on every load, so an edited file is read again.
+    A hit costs a `stat` call instead of reading, decoding, uploading and
+    allocating. Resident images are bounded by `max_bytes`; the least recently
+    loaded ones are dropped first. `load` returns a view of the resident image,
+    so freeing it never releases the cache's memory, and an image is never
+    freed under its caller: when it is dropped, its memory is released once the
+    last view of it goes away. All methods are thread-safe.
+
+    `load_image(path, cache=True)` goes through the shared cache returned by
+    `get_asset_cache()`.
+
+    Attributes:
+        max_bytes (int): Budget for resident images.
+
+    Example:
+        >>> assets = AssetCache(max_bytes=512 * 1024 * 1024)
+        >>> for item in batch:
+        ...     background = assets.load("assets/background.png")
+        ...     blend(canvas, background, 0, 0)
+        >>> print(assets.stats().hit_rate)
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Creates an empty cache.
+
+        Args:
+            max_bytes (int, optional): Budget for resident images. Defaults to 256 MiB.
+
+        Raises:
+            ValueError: If `max_bytes` is negative.
+        """
+
+        if max_bytes < 0:
+            raise ValueError(f"max_bytes must be >= 0, got {max_bytes}")
+
+        self._lock = threading.Lock()
+        self._max_bytes = max_bytes
+        # Absolute path -> ((mtime, size), image)
+        self._entries: OrderedDict[str, tuple[tuple[int, int], CudaImage]] = OrderedDict()
+        # Paths whose resident image was returned to a caller as a view.
+        self._lent: set[str] = set()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._bytes_in_use = 0
+        _caches.add(self)
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int):
+        if value < 0:
+            raise ValueError(f"max_bytes must be >= 0, got {value}")
+        with self._lock:
+            self._max_bytes = value
+            self._trim_locked(None)
+
+    def load(self,
+             filename: str,
+             container: CudaImage | None = None,
+             staging: StagingBuffer | None = None,
+             cache_dir: str | None = None) -> CudaImage:
+        """
+        Returns the image of a file, reading it only if it is not resident or changed.
+
+        Args:
+            filename (str): Path to the image file.
+            container (CudaImage, optional): Image to copy the resident pixels into.
+                Must be large enough to hold the image.
+            staging (StagingBuffer, optional): Host buffer to upload from on a miss.
+                See `pil_to_image`.
+            cache_dir (str, optional): Disk cache of decoded copies consulted on a
+                miss. See `load_image`.
+
+        Returns:
+            CudaImage: `container` if provided. Otherwise a view of the resident
+                image, which must not be modified; freeing it only drops the
+                view. It stays valid for as long as it is referenced, even after
+                the cache evicts, invalidates or clears it; only `set_backend`
+                frees it immediately.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the image is larger than the provided container.
+        """
+
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(path)
+                self._hits += 1
+                image = entry[1]
+                if container is None:
+                    self._lent.add(path)
+            else:
+                self._misses += 1
+                image = None
+
+        if image is None:
+            from . import load_image
+            image = load_image(path, staging=staging, cache_dir=cache_dir)
+            with self._lock:
+                entry = self._entries.get(path)
+                if entry is not None and entry[0] == version:
+                    # Another thread loaded the same file meanwhile.
+                    duplicate, image = image, entry[1]
+                    self._entries.move_to_end(path)
+                    if container is None:
+                        self._lent.add(path)
+                else:
+                    duplicate = None
+                    if entry is not None:
+                        self._drop_locked(path)
+                        self._invalidations += 1
+                    self._entries[path] = (version, image)
+                    self._bytes_in_use += _nbytes(image)
+                    if container is None:
+                        self._lent.add(path)
+                    self._trim_locked(path)
+            if duplicate is not None:
+                duplicate.free()
+
+        if container is None:
+            return _lend(image)
+        if not container.holds(image.width, image.height):
+            raise ValueError("Image dimensions exceed container dimensions")
+        container.width = image.width
+        container.height = image.height
+        copy_buffers_same_size(container.buffer, image.buffer, image.width, image.height,
+                               container.pitch, image.pitch)
+        return container
+
+    def invalidate(self, filename: str | None = None) -> None:
+        """
+        Drops the resident image of a file, or of every file.
+
+        Args:
+            filename (str, optional): Path of the file. Defaults to all files.
+        """
+
+        with self._lock:
+            if filename is None:
+                paths = list(self._entries)
+            else:
+                path = os.path.abspath(filename)
+                paths = [path] if path in self._entries else []
+            for path in paths:
+                self._drop_locked(path)
+            self._invalidations += len(paths)
+
+    def clear(self) -> None:
+        """
+        Drops every resident image. The counters are kept.
+        """
+
+        with self._lock:
+            for path in list(self._entries):
+                self._drop_locked(path)
+
+    def stats(self) -> AssetCacheStats:
+        """
+        Returns a snapshot of the cache counters.
+        """
+
+        with self._lock:
+            return AssetCacheStats(hits=self._hits,
+                                   misses=self._misses,
+                                   evictions=self._evictions,
+                                   invalidations=self._invalidations,
+                                   entries=len(self._entries),
+                                   bytes_in_use=self._bytes_in_use,
+                                   max_bytes=self._max_bytes,
+                                   )
+
+    def reset_stats(self) -> None:
+        """
+        Zeroes the hit, miss, eviction and invalidation counters.
+        """
+
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+            self._invalidations = 0
+
+    def _drop_locked(self, path: str) -> None:
+        _, image = self._entries.pop(path)
+        self._bytes_in_use -= _nbytes(image)
+        if path in self._lent:
+            self._lent.discard(path)
+            _release_when_unreferenced(image)
+        else:
+            image.free()
+
+    def _trim_locked(self, keep: str | None) -> None:
+        for path in list(self._entries):
+            if self._bytes_in_use <= self._max_bytes:
+                break
+            if path == keep:
+                continue
+            self._drop_locked(path)
+            self._evictions += 1
+
+
+def _nbytes(image: CudaImage) -> int:
+    return image.width * image.height * 4
+
+
+_caches: "weakref.WeakSet[AssetCache]" = weakref.WeakSet()
+_default_cache: AssetCache | None = None
+_default_lock = threading.Lock()
+
+
+def get_asset_cache() -> AssetCache:
+    """
+    Returns the shared cache used by `load_image(..., cache=True)`.
+
+    Example:
+        >>> get_asset_cache().max_bytes = 1024 * 1024 * 1024
+        >>> print(get_asset_cache().stats())
+    """
+
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = AssetCache()
+        return _default_cache
+
+
+# Views handed to callers, and finalizers of dropped images they may still hold.
+_views: "weakref.WeakSet[CudaImage]" = weakref.WeakSet()
+_orphans: set[weakref.finalize] = set()
+_orphans_lock = threading.Lock()
+
+
+def _lend(image: CudaImage) -> CudaImage:
+    # A view keeps the resident image alive through its parent, and freeing it
+    # releases nothing, so a caller cannot free memory the cache still owns.
+    view = image.view(0, 0, image.width, image.height)
+    with _orphans_lock:
+        _views.add(view)
+    return view
+
+
+def _release_when_unreferenced(image: CudaImage) -> None:
+    # Only the cache frees `image` itself; callers hold views of it.
+    global _orphans
+    if image.buffer is None:
+        return
+    with _orphans_lock:
+        _orphans = {orphan for orphan in _orphans if orphan.alive}
+        _orphans.add(weakref.finalize(image, _release_buffer, image.buffer))
+
+
+def _release_buffer(buffer) -> None:
+    get_buffer_pool().release(buffer)
+
+
+def _clear_asset_caches() -> None:
+    # Resident images belong to the backend being replaced, including those
+    # still held by callers.
+    for cache in list(_caches):
+        with cache._lock:
+            cache._lent.clear()
+        cache.clear()
+    with _orphans_lock:
+        orphans = list(_orphans)
+        _orphans.clear()
+        views = list(_views)
+        _views.clear()
+    for orphan in orphans:
+        detached = orphan.detach()
+        if detached is not None:
+            detached[0].free()
+    for view in views:
+        view.free()
+
+
+add_backend_listener(_clear_asset_caches)
@@ -0,0 +1,197 @@
+import contextlib
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from typing import Callable
+from ..core import ffi
+from ..core.buffer import copy_to_device, copy_to_host
+from ..core.types import CudaImage, _import_numpy
+
+RAW_EXTENSION = ".praw"
+
+# Header of a raw file, padded to _RAW_HEADER_SIZE bytes: magic, version, then
+# width, height and pitch in pixels. The RGBA payload of pitch * height pixels
+# follows, rows top to bottom.
+_RAW_MAGIC = b"PHOTOFF\x00"
+_RAW_VERSION = 1
+_RAW_HEADER = struct.Struct("<8sIIII")
+_RAW_HEADER_SIZE = 64
+
+
+def _raw_header(filename: str) -> tuple[int, int, int] | None:
+    # Returns (width, height, pitch), or None if the file is missing, not a raw
+    # file or truncated.
+    try:
+        with open(filename, "rb") as f:
+            header = f.read(_RAW_HEADER.size)
+            size = os.fstat(f.fileno()).st_size
+    except FileNotFoundError:
+        return None
+    if len(header) != _RAW_HEADER.size:
+        return None
+    magic, version, width, height, pitch = _RAW_HEADER.unpack(header)
+    if magic != _RAW_MAGIC or version != _RAW_VERSION or pitch < width:
+        return None
+    if size < _RAW_HEADER_SIZE + pitch * height * 4:
+        return None
+    return width, height, pitch
+
+
+def _write_raw(filename: str, width: int, height: int, fill: Callable[[memoryview], None]) -> None:
+    # Creates a raw file whose payload is written by fill(). The file is written
+    # under a temporary name and renamed into place, so readers never map a
+    # partial file.
+    size = _RAW_HEADER_SIZE + width * height * 4
+    temporary = f"{os.fspath(filename)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temporary, "wb+") as f:
+            f.truncate(size)
+            with mmap.mmap(f.fileno(), size) as mapped:
+                mapped[:_RAW_HEADER.size] = _RAW_HEADER.pack(_RAW_MAGIC, _RAW_VERSION, width, height, width)
+                with memoryview(mapped)[_RAW_HEADER_SIZE:] as payload:
+                    fill(payload)
+        os.replace(temporary, filename)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temporary)
+        raise
+
+
+def save_raw(image: CudaImage, filename: str) -> None:
+    """
+    Saves a CudaImage as an uncompressed raw RGBA file.
+
+    The file is a 64-byte header (width, height, pitch) followed by the pixels,
+    downloaded straight into a memory map of the file. Loading it back with
+    `load_raw` costs a read of the file and an upload, with no decoding, which
+    makes it the format of choice for assets loaded on every run. The file is
+    written under a temporary name and renamed into place.
+
+    Args:
+        image (CudaImage): The image to save. Inside a `Stream` this waits for
+            the work queued so far.
+        filename (str): Destination path, conventionally ending in `.praw`.
+
+    Returns:
+        None
+
+    Example:
+        >>> save_raw(load_image("background.png"), "background.praw")
+    """
+
+    width, height = image.width, image.height
+
+    def fill(payload: memoryview) -> None:
+        with ffi.from_buffer(payload, require_writable=True) as data:
+            copy_to_host(ffi.cast("uchar4*", data), image.buffer, width, height, image.pitch)
+
+    _write_raw(filename, width, height, fill)
+
+
+def load_raw(filename: str, container: CudaImage | None = None) -> CudaImage:
+    """
+    Loads a raw RGBA file written by `save_raw`.
+
+    The file is memory-mapped and uploaded from the mapping, so the pixels are
+    not copied on the host and pages already in the OS cache are not read again.
+
+    Args:
+        filename (str): Path of the raw file.
+        container (CudaImage, optional): Pre-allocated image buffer. Must be large
+            enough to hold the image.
+
+    Returns:
+        CudaImage: A new or reused image object with the loaded data.
+
+    Raises:
+        ValueError: If the file is not a complete raw file.
+        ValueError: If the image is larger than the provided container.
+
+    Example:
+        >>> background = load_raw("background.praw")
+    """
+
+    header = _raw_header(filename)
+    if header is None:
+        if not os.path.exists(filename):
+            raise FileNotFoundError(filename)
+        raise ValueError(f"{filename} is not a raw image file or is truncated")
+    width, height, pitch = header
+
+    if container is None:
+        container = CudaImage(width, height)
+    if not container.holds(width, height):
+        raise ValueError(f"Image of {width}x{height} does not fit in container of {container._alloc_width}x{container._alloc_height}")
+    container.width = width
+    container.height = height
+
+    if width and height:
+        with open(filename, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+                ffi.from_buffer(mapped) as data:
+            pixels = ffi.cast("uchar4*", data + _RAW_HEADER_SIZE)
+            if pitch == width:
+                copy_to_device(container.buffer, pixels, width, height, container.pitch)
+            else:
+                for y in range(height):
+                    copy_to_device(container.buffer + y * container.pitch, pixels + y * pitch,
+                                   width, 1, container.pitch)
+    return container
+
+
+def map_raw(filename: str, mode: str = "r", size: tuple[int, int] | None = None):
+    """
+    Maps the pixels of a raw file as a HxWx4 uint8 NumPy array.
+
+    The array reads and writes the file through the OS page cache, so images
+    larger than host memory can be passed to `process_tiled` or processed in
+    slices.
+
+    Args:
+        filename (str): Path of the raw file.
+        mode (str, optional): 'r' for read-only, 'r+' to modify the file in place,
+            or 'w+' to create a new file of `size`. Defaults to 'r'.
+        size (tuple[int, int], optional): `(width, height)` of the file to create.
+            Required with mode 'w+'.
+
+    Returns:
+        numpy.memmap: The pixels, shape (height, width, 4).
+
+    Raises:
+        ImportError: If NumPy is not installed.
+        ValueError: If the file is not a complete raw file, or the mode or size
+            are invalid.
+
+    Example:
+        >>> output = map_raw("poster.praw", "w+", size=(20000, 30000))
+        >>> process_tiled("poster.tif", output, effects)
+    """
+
+    np = _import_numpy()
+    if mode == "w+":
+        if size is None:
+            raise ValueError("size is required to create a raw file")
+        width, height = size
+        _write_raw(filename, width, height, lambda payload: None)
+    elif mode not in ("r", "r+"):
+        raise ValueError(f"mode must be 'r', 'r+' or 'w+', got {mode!r}")
+
+    header = _raw_header(filename)
+    if header is None:
+        raise ValueError(f"{filename} is not a raw image file or is truncated")
+    width, height, pitch = header
+    if not width or not height:
+        return np.zeros((height, width, 4), dtype=np.uint8)
+    pixels = np.memmap(filename, dtype=np.uint8, mode="r" if mode == "r" else "r+",
+                       offset=_RAW_HEADER_SIZE, shape=(height, pitch, 4))
+    return pixels[:, :width] if pitch != width else pixels
+
+
+def _disk_cache_path(cache_dir: str, filename: str) -> str:
+    # Decoded copies are keyed by the source's path, modification time and size,
+    # so an edited file gets a new entry.
+    stat = os.stat(filename)
+    key = f"{os.path.abspath(filename)}\0{stat.st_mtime_ns}\0{stat.st_size}"
+    return os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest() + RAW_EXTENSION)
@@ -0,0 +1,274 @@
+import os
+import threading
+import weakref
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from ..core.buffer import copy_to_host
+from ..core.cuda_interface import add_backend_listener
+from ..core.types import CudaImage
+from .staging import StagingBuffer
+from PIL import Image
+
+
+class SaveQueue:
+    """
+    Encodes and writes images in the background so the caller can keep rendering.
+
+    `save()` downloads the image synchronously into one of the queue's reusable
+    page-locked host buffers, which is all the device work a save needs, then hands
+    the encode and the file write to a pool of workers and returns a `Future`.
+    At most `max_pending` saves are in flight; beyond that `save()` blocks until
+    one finishes, so a fast producer cannot queue unbounded host memory.
+
+    Attributes:
+        workers (int): Number of encoding workers.
+        max_pending (int): Maximum saves in flight.
+        processes (bool): Whether workers are processes instead of threads.
+
+    Example:
+        >>> with SaveQueue(workers=4) as saver:
+        ...     for i, frame in enumerate(frames):
+        ...         render(frame)
+        ...         saver.save(frame, f"out/{i:05d}.png", compress_level=1)
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int | None = None, processes: bool = False):
+        """
+        Starts the worker pool.
+
+        Args:
+            workers (int, optional): Number of encoding workers. Defaults to 2.
+            max_pending (int, optional): Maximum saves in flight, each holding one
+                host buffer. Defaults to `2 * workers`.
+            processes (bool, optional): Encode in worker processes instead of threads.
+                Pillow releases the GIL in its encoders, so threads usually suffice;
+                processes cost an extra copy of the pixels per save. Defaults to False.
+
+        Raises:
+            ValueError: If `workers` or `max_pending` is smaller than 1.
+        """
+
+        if max_pending is None:
+            max_pending = 2 * workers
+        if workers < 1 or max_pending < 1:
+            raise ValueError(f"workers and max_pending must be >= 1, got {workers} and {max_pending}")
+
+        self.workers = workers
+        self.max_pending = max_pending
+        self.processes = processes
+
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._idle: list[StagingBuffer] = []
+        self._futures: set[Future] = set()
+        self._error = None
+        self._closed = False
+        self._executor: Executor
+        if processes:
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="photoff-save")
+        _queues.add(self)
+
+    def save(self, image: CudaImage, filename: str, format: str | None = None, **params) -> Future:
+        """
+        Queues an image to be saved.
+
+        The pixels are downloaded before this returns, so the image can be modified
+        or freed right away. Inside a `Stream` this waits for the work queued so far.
+
+        Args:
+            image (CudaImage): The image to save.
+            filename (str): Destination path. The format is inferred from the
+                extension unless `format` is given.
+            format (str, optional): Pillow format name, e.g. 'PNG' or 'JPEG'.
+            **params: Encoder options forwarded to `PIL.Image.save`, such as
+                `compress_level` for PNG or `quality` for JPEG.
+
+        Returns:
+            concurrent.futures.Future: Resolves to `filename` once the file is written,
+                or raises the encoder's error.
+
+        Raises:
+            RuntimeError: If the queue has been closed.
+        """
+
+        if self._closed:
+            raise RuntimeError("Cannot save through a closed SaveQueue")
+
+        self._slots.acquire()
+        try:
+            staging = self._take_buffer(image.width, image.height)
+            try:
+                img = _download(image, staging)
+                if self.processes:
+                    # Worker processes cannot see this memory: send a copy and
+                    # recycle the buffer right away.
+                    payload = (img.size, img.tobytes())
+                    img.close()
+                    self._give_buffer(staging)
+                    staging = None
+                    future = self._executor.submit(_encode_bytes, payload, os.fspath(filename), format, params)
+                else:
+                    future = self._executor.submit(_encode, img, filename, format, params)
+            except BaseException:
+                if staging is not None:
+                    self._give_buffer(staging)
+                raise
+        except BaseException:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(lambda done, staging=staging: self._finish(done, staging))
+        return future
+
+    def join(self) -> None:
+        """
+        Blocks until every queued save has finished.
+
+        Raises:
+            Exception: The error of the first save that failed since the last
+                `join`, if any. It is also available from that save's future.
+        """
+
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures)
+        with self._lock:
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        """
+        Waits for the queued saves, stops the workers and frees the host buffers.
+
+        Raises:
+            Exception: The error of the first failed save, if any.
+        """
+
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.join()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._free_idle()
+            _queues.discard(self)
+
+    def __enter__(self) -> "SaveQueue":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _take_buffer(self, width: int, height: int) -> StagingBuffer:
+        with self._lock:
+            for i, staging in enumerate(self._idle):
+                if staging.holds(width, height):
+                    return self._idle.pop(i)
+            # Replace the smallest idle buffer rather than growing the set.
+            if self._idle:
+                smallest = min(self._idle, key=lambda buffer: buffer.width * buffer.height)
+                self._idle.remove(smallest)
+                smallest.free()
+        return StagingBuffer(width, height)
+
+    def _give_buffer(self, staging: StagingBuffer) -> None:
+        with self._lock:
+            self._idle.append(staging)
+
+    def _finish(self, future: Future, staging: StagingBuffer | None) -> None:
+        if staging is not None:
+            self._give_buffer(staging)
+        with self._lock:
+            self._futures.discard(future)
+            if self._error is None and not future.cancelled():
+                self._error = future.exception()
+        self._slots.release()
+
+    def _free_idle(self) -> None:
+        with self._lock:
+            for staging in self._idle:
+                staging.free()
+            self._idle.clear()
+
+
+def _download(image: CudaImage, staging: StagingBuffer) -> Image:
+    width, height = image.width, image.height
+    memory = staging.memory(width, height)
+    copy_to_host(staging.buffer, image.buffer, width, height, image.pitch)
+    return Image.frombuffer("RGBA", (width, height), memory, "raw", "RGBA", 0, 1)
+
+
+def _encode(img: Image, filename: str, format: str | None, params: dict) -> str:
+    try:
+        _write(img, filename, format, params)
+    finally:
+        img.close()
+    return filename
+
+
+def _write(img: Image, filename: str, format: str | None, params: dict) -> None:
+    if format is None:
+        format = Image.registered_extensions().get(os.path.splitext(os.fspath(filename))[1].lower())
+    if format is not None and format.upper() in _OPAQUE_FORMATS:
+        img = img.convert("RGB")
+    img.save(filename, format, **params)
+
+
+def _encode_bytes(payload: tuple, filename: str, format: str | None, params: dict) -> str:
+    size, data = payload
+    return _encode(Image.frombuffer("RGBA", size, data, "raw", "RGBA", 0, 1), filename, format, params)
+
+
+# Formats that cannot store an alpha channel; it is dropped before encoding.
+_OPAQUE_FORMATS = {"JPEG", "PCX", "PPM", "EPS"}
+
+_queues: "weakref.WeakSet[SaveQueue]" = weakref.WeakSet()
+_default_queue: SaveQueue | None = None
+_default_lock = threading.Lock()
+
+
+def save_image_async(image: CudaImage, filename: str, format: str | None = None, **params) -> Future:
+    """
+    Saves an image in the background through a shared `SaveQueue`.
+
+    The pixels are downloaded before this returns; encoding and writing run on
+    the shared queue's worker threads. Use a `SaveQueue` directly to choose the
+    number of workers or to wait for a batch with `join()`.
+
+    Args:
+        image (CudaImage): The image to save.
+        filename (str): Destination path, including extension.
+        format (str, optional): Pillow format name. Inferred from the extension by default.
+        **params: Encoder options forwarded to `PIL.Image.save`.
+
+    Returns:
+        concurrent.futures.Future: Resolves to `filename` once the file is written.
+
+    Example:
+        >>> future = save_image_async(frame, "frame.jpg", quality=90)
+        >>> future.result()
+    """
+
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = SaveQueue()
+    return _default_queue.save(image, filename, format, **params)
+
+
+def _free_save_buffers() -> None:
+    # Staging buffers are pinned by the backend being replaced.
+    for queue in list(_queues):
+        try:
+            queue.join()
+        except Exception:
+            pass
+        queue._free_idle()
+
+
+add_backend_listener(_free_save_buffers)
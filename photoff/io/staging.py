@@ -0,0 +1,159 @@
+import threading
+import weakref
+from ..core import _lib, ffi
+from ..core.cuda_interface import add_backend_listener
+from PIL import Image
+
+
+class StagingBuffer:
+    """
+    Host memory that pixels pass through on their way to or from a CudaImage.
+
+    `load_image`, `image_to_pil` and `save_image` accept one through their
+    `staging` parameter. Reusing it avoids a host allocation per transfer, and a
+    pinned (page-locked) buffer lets the CUDA backend DMA straight from it.
+
+    Attributes:
+        width (int): Capacity width in pixels.
+        height (int): Capacity height in pixels.
+        pinned (bool): Whether the memory is page-locked.
+        buffer (CudaBuffer): Pointer to the host memory.
+
+    Example:
+        >>> staging = StagingBuffer(3840, 2160)
+        >>> frame = image_to_pil(image, staging=staging)  # shares staging's memory
+        >>> staging.free()
+    """
+
+    def __init__(self, width: int, height: int, pinned: bool = True):
+        """
+        Allocates a staging buffer.
+
+        Args:
+            width (int): Capacity width in pixels.
+            height (int): Capacity height in pixels.
+            pinned (bool, optional): Allocate page-locked memory through the active
+                backend. Otherwise a plain `bytearray` is used. Defaults to True.
+
+        Raises:
+            MemoryError: If the pinned allocation fails.
+        """
+
+        self.width = width
+        self.height = height
+        self.pinned = pinned
+        self._free_host_buffer = None
+
+        if pinned:
+            self.buffer = _lib.create_host_buffer(width, height)
+            if self.buffer == ffi.NULL:
+                raise MemoryError(f"Could not allocate a pinned staging buffer for {width}x{height} pixels")
+            # Bound now so the buffer is released by the backend that allocated it.
+            self._free_host_buffer = _lib.free_host_buffer
+        else:
+            self._storage = bytearray(width * height * 4)
+            self.buffer = ffi.cast("uchar4*", ffi.from_buffer(self._storage))
+
+    def holds(self, width: int, height: int) -> bool:
+        """
+        Returns True if `width` x `height` pixels fit in the buffer.
+        """
+
+        return width * height <= self.width * self.height
+
+    def memory(self, width: int, height: int):
+        """
+        Returns a writable buffer-protocol view of the first `width` x `height` pixels.
+
+        Raises:
+            ValueError: If the pixels do not fit in the buffer.
+        """
+
+        if self.buffer is None:
+            raise ValueError("Staging buffer has been freed")
+        if not self.holds(width, height):
+            raise ValueError(f"Staging buffer too small: {width}x{height} does not fit in {self.width}x{self.height}")
+        return ffi.buffer(self.buffer, width * height * 4)
+
+    def free(self):
+        if self.buffer is None:
+            return
+        if self._free_host_buffer is not None:
+            self._free_host_buffer(self.buffer)
+        self.buffer = None
+        self._storage = None
+
+
+def _paste_rgba(img: Image, memory) -> None:
+    # Writes the pixels of a loaded RGBA image into `memory`, a writable buffer
+    # of exactly width * height * 4 bytes. Pillow's core paste writes into the
+    # buffer directly; it is not public API, so if it is unavailable fall back
+    # to a copy through tobytes().
+    width, height = img.size
+    try:
+        view = Image.frombuffer("RGBA", (width, height), memory, "raw", "RGBA", 0, 1)
+        paste = view.im.paste
+    except (AttributeError, TypeError, ValueError):
+        memoryview(memory).cast("B")[:] = img.tobytes()
+        return
+    paste(img.im, (0, 0, width, height))
+    view.close()
+
+
+class _StagingSlot:
+    # Per-thread buffer used by the I/O functions when the caller passes none.
+    # It grows to the largest image seen and is waited on before reuse, since
+    # a pinned upload may still be in flight on a stream. Only its thread's
+    # locals reference it, so it is released when the thread exits.
+
+    def __init__(self):
+        self.buffer = None
+        self.pending = None
+
+    def get(self, width: int, height: int) -> StagingBuffer:
+        self.wait()
+        if self.buffer is None or not self.buffer.holds(width, height):
+            if self.buffer is not None:
+                self.buffer.free()
+            self.buffer = StagingBuffer(width, height)
+        return self.buffer
+
+    def wait(self) -> None:
+        if self.pending is not None:
+            self.pending.synchronize()
+            self.pending = None
+
+    def release(self) -> None:
+        self.wait()
+        if self.buffer is not None:
+            self.buffer.free()
+            self.buffer = None
+
+    def __del__(self):
+        self.release()
+
+
+_local = threading.local()
+_slots: "weakref.WeakSet[_StagingSlot]" = weakref.WeakSet()
+_slots_lock = threading.Lock()
+
+
+def _staging_slot(direction: str) -> _StagingSlot:
+    # One slot per thread and direction ('upload' or 'download').
+    slot = getattr(_local, direction, None)
+    if slot is None:
+        slot = _StagingSlot()
+        setattr(_local, direction, slot)
+        with _slots_lock:
+            _slots.add(slot)
+    return slot
+
+
+def _free_staging_slots() -> None:
+    with _slots_lock:
+        slots = list(_slots)
+    for slot in slots:
+        slot.release()
+
+
+add_backend_listener(_free_staging_slots)
@@ -1,32 +1,105 @@
-from ..core import _lib
+from typing import Iterable
+from ..core import _lib, ffi
 from ..core.types import CudaImage
+from .pointwise import clip_roi
 
 
-def blend(background: CudaImage, over: CudaImage, x: int, y: int) -> None:
+def blend(background: CudaImage,
+          over: CudaImage,
+          x: int,
+          y: int,
+          roi: tuple[int, int, int, int] | None = None) -> None:
     """
     Blends an image (`over`) on top of another (`background`) at a specified position.
 
-    The blending respects the alpha channel of the overlaid image. No clipping is performed
-    if the `over` image exceeds the bounds of the `background`; behavior in such cases depends on the underlying CUDA implementation.
+    The blending respects the alpha channel of the overlaid image. Only the overlap of
+    both images is processed, so the cost is proportional to the size of `over`;
+    parts of `over` outside the background are clipped.
 
     Args:
         background (CudaImage): The base image to draw onto.
         over (CudaImage): The image to blend on top.
         x (int): Horizontal position in the background where the top-left corner of `over` is placed.
         y (int): Vertical position in the background where the top-left corner of `over` is placed.
+        roi (tuple[int, int, int, int], optional): `(x, y, width, height)` region of the
+            background outside which nothing is drawn.
 
     Returns:
         None
 
     Example:
         >>> blend(bg_img, icon_img, x=100, y=50)
+        >>> blend(bg_img, icon_img, x=100, y=50, roi=(0, 0, 120, 80))  # Only the top-left part
     """
+
+    if roi is not None:
+        blend_many(background, [(over, x, y)], roi)
+        return
+
     _lib.blend_buffers(background.buffer,
                        over.buffer,
                        background.width,
                        background.height,
+                       background.pitch,
                        over.width,
                        over.height,
+                       over.pitch,
                        x,
                        y,
                        )
+
+
+def blend_many(background: CudaImage,
+               layers: Iterable[tuple[CudaImage, int, int]],
+               roi: tuple[int, int, int, int] | None = None) -> None:
+    """
+    Blends several images onto a background in a single native call.
+
+    Layers are composited in order, later ones on top, with the same result as
+    calling `blend` once per layer. The background is read and written once per
+    pixel instead of once per layer, and only the area the layers cover is
+    processed. Layers may fall partly or fully outside the background.
+
+    Args:
+        background (CudaImage): The base image to draw onto.
+        layers (Iterable[tuple[CudaImage, int, int]]): `(image, x, y)` tuples, where
+            `(x, y)` is the position of the image's top-left corner in the background.
+        roi (tuple[int, int, int, int], optional): `(x, y, width, height)` region of the
+            background outside which nothing is drawn.
+
+    Returns:
+        None
+
+    Example:
+        >>> blend_many(sheet, [(thumb, x * 130, y * 130) for y in range(10) for x in range(10)])
+    """
+
+    layers = list(layers)
+    if not layers:
+        return
+
+    clip_x, clip_y, clip_width, clip_height = clip_roi(background, roi)
+
+    native_layers = ffi.new("BlendLayer[]", len(layers))
+    count = 0
+    for image, x, y in layers:
+        # Crop each layer to the clip rectangle; the native side clips to the background.
+        x0 = max(x, clip_x)
+        y0 = max(y, clip_y)
+        x1 = min(x + image.width, clip_x + clip_width)
+        y1 = min(y + image.height, clip_y + clip_height)
+        if x0 >= x1 or y0 >= y1:
+            continue
+
+        native = native_layers[count]
+        native.src = image.buffer + ((y0 - y) * image.pitch + (x0 - x))
+        native.width = x1 - x0
+        native.height = y1 - y0
+        native.pitch = image.pitch
+        native.x = x0
+        native.y = y0
+        count += 1
+
+    if count:
+        _lib.blend_layers(background.buffer, background.width, background.height, background.pitch,
+                          native_layers, count)
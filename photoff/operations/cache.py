@@ -0,0 +1,310 @@
+import inspect
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import astuple as _astuple, dataclass as _dataclass
+from enum import Enum
+from typing import Hashable
+from ..core import _lib
+from ..core.buffer import copy_buffers_same_size
+from ..core.cuda_interface import add_backend_listener
+from ..core.types import CudaImage, RGBA, DistanceField
+from ..pipeline import Pipeline
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def content_hash(image: CudaImage) -> int:
+    """
+    Hashes the pixels and size of an image on the device.
+
+    Only a 64-bit value is transferred, so hashing costs one read of the image
+    instead of a download. Images with equal pixels and size hash equally on
+    both backends. The hash is not cryptographic.
+
+    Args:
+        image (CudaImage): Image to hash. Inside a `Stream` this waits for the
+            work queued so far.
+
+    Returns:
+        int: Unsigned 64-bit hash.
+
+    Example:
+        >>> content_hash(logo) == content_hash(logo_copy)
+        True
+    """
+
+    return int(_lib.hash_image(image.buffer, image.width, image.height, image.pitch))
+
+
+@_dataclass
+class EffectCacheStats:
+    """
+    Snapshot of effect cache counters.
+
+    Attributes:
+        hits (int): `apply` calls served from a cached result.
+        misses (int): `apply` calls that ran the effects.
+        evictions (int): Results freed by LRU trimming.
+        entries (int): Results currently cached.
+        bytes_in_use (int): Bytes held by cached results.
+        max_bytes (int): Budget for cached results.
+    """
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes_in_use: int
+    max_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class EffectCache:
+    """
+    Memoizes the result of an effect chain applied to an image.
+
+    The chain is a `Pipeline`, so strokes, shadows, corner radii, blurs and any
+    other recorded operation can be cached together. A result is keyed by the
+    image's content, either an explicit `key` or `content_hash(image)`, and by
+    the operations and parameters of the chain. Repeated decorations of the same
+    logo or text then cost a hash and a copy instead of the effect kernels.
+
+    Cached results are bounded by `max_bytes`; the least recently used ones are
+    freed first. All methods are thread-safe.
+
+    Attributes:
+        max_bytes (int): Budget for cached results.
+
+    Example:
+        >>> decorate = (Pipeline()
+        ...             .add(apply_corner_radius, 24)
+        ...             .add(apply_stroke, 6, RGBA(255, 255, 255), inner=False)
+        ...             .add(apply_shadow, 16, 0.6, RGBA(0, 0, 0)))
+        >>> cache = EffectCache()
+        >>> for frame in frames:
+        ...     badge = cache.apply(logo, decorate, key="logo")
+        ...     blend(frame, badge, 40, 40)
+        >>> print(cache.stats().hit_rate)
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Creates an empty cache.
+
+        Args:
+            max_bytes (int, optional): Budget for cached results. Defaults to 256 MiB.
+
+        Raises:
+            ValueError: If `max_bytes` is negative.
+        """
+
+        if max_bytes < 0:
+            raise ValueError(f"max_bytes must be >= 0, got {max_bytes}")
+
+        self._lock = threading.Lock()
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, CudaImage] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._bytes_in_use = 0
+        _caches.add(self)
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int):
+        if value < 0:
+            raise ValueError(f"max_bytes must be >= 0, got {value}")
+        with self._lock:
+            self._max_bytes = value
+            self._trim_locked(None)
+
+    def apply(self,
+              image: CudaImage,
+              effects: Pipeline,
+              key: Hashable | None = None,
+              out: CudaImage | None = None) -> CudaImage:
+        """
+        Returns `image` with the effects applied, computing it only on a cache miss.
+
+        `image` itself is never modified: on a miss the effects run on a copy
+        that is then cached.
+
+        Args:
+            image (CudaImage): Source image, already padded for effects that draw
+                outside the shape.
+            effects (Pipeline): Operations to apply. Scratch arguments such as
+                `image_copy_cache` or `distance_field` are not part of the key.
+            key (Hashable, optional): Identifies the image's content, e.g. a file
+                name or the text rendered into it. Must change whenever the pixels
+                do. Defaults to `content_hash(image)`.
+            out (CudaImage, optional): Image to copy the result into. Must match
+                the image dimensions.
+
+        Returns:
+            CudaImage: `out` if provided. Otherwise the cached result itself, which
+                must not be modified and stays valid only until the next `apply`
+                or `clear` on this cache.
+
+        Raises:
+            ValueError: If `out` does not match the image dimensions.
+            TypeError: If a parameter of the chain cannot be used as a key.
+        """
+
+        width, height = image.width, image.height
+        if out is not None and (out.width != width or out.height != height):
+            raise ValueError(f"Output image dimensions must match source image dimensions: {width}x{height}, got {out.width}x{out.height}")
+
+        content = key if key is not None else ("hash", content_hash(image))
+        entry_key = (content, width, height, _chain_key(effects))
+
+        with self._lock:
+            result = self._entries.get(entry_key)
+            if result is not None:
+                self._entries.move_to_end(entry_key)
+                self._hits += 1
+            else:
+                self._misses += 1
+
+        if result is None:
+            result = CudaImage(width, height)
+            try:
+                _copy(result, image)
+                effects.run(result)
+            except BaseException:
+                result.free()
+                raise
+            with self._lock:
+                previous = self._entries.pop(entry_key, None)
+                if previous is not None:
+                    # Another thread computed the same entry meanwhile.
+                    self._bytes_in_use -= _nbytes(previous)
+                    previous.free()
+                self._entries[entry_key] = result
+                self._bytes_in_use += _nbytes(result)
+                self._trim_locked(entry_key)
+
+        if out is None:
+            return result
+        _copy(out, result)
+        return out
+
+    def clear(self) -> None:
+        """
+        Frees every cached result. The counters are kept.
+        """
+
+        with self._lock:
+            for result in self._entries.values():
+                result.free()
+            self._entries.clear()
+            self._bytes_in_use = 0
+
+    def stats(self) -> EffectCacheStats:
+        """
+        Returns a snapshot of the cache counters.
+        """
+
+        with self._lock:
+            return EffectCacheStats(hits=self._hits,
+                                    misses=self._misses,
+                                    evictions=self._evictions,
+                                    entries=len(self._entries),
+                                    bytes_in_use=self._bytes_in_use,
+                                    max_bytes=self._max_bytes,
+                                    )
+
+    def reset_stats(self) -> None:
+        """
+        Zeroes the hit, miss and eviction counters.
+        """
+
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    def _trim_locked(self, keep: tuple | None) -> None:
+        # The newest result is returned to the caller, so it survives even if it
+        # alone exceeds the budget; the next insertion evicts it.
+        for entry_key in list(self._entries):
+            if self._bytes_in_use <= self._max_bytes:
+                break
+            if entry_key == keep:
+                continue
+            result = self._entries.pop(entry_key)
+            self._bytes_in_use -= _nbytes(result)
+            result.free()
+            self._evictions += 1
+
+
+def _copy(dst: CudaImage, src: CudaImage) -> None:
+    copy_buffers_same_size(dst.buffer, src.buffer, src.width, src.height, dst.pitch, src.pitch)
+
+
+def _nbytes(image: CudaImage) -> int:
+    return image.width * image.height * 4
+
+
+# Arguments that only provide scratch memory or precomputed data derived from
+# the image; they do not change the result.
+_SCRATCH_ARGUMENTS = {"distance_field"}
+
+
+def _chain_key(effects: Pipeline) -> tuple:
+    steps = []
+    for step in effects._steps:
+        operation = step.operation
+        try:
+            bound = inspect.signature(operation).bind(None, *step.args, **step.kwargs)
+            bound.apply_defaults()
+            params = list(bound.arguments.items())[1:]
+        except (TypeError, ValueError):
+            params = list(enumerate(step.args)) + sorted(step.kwargs.items())
+        steps.append((getattr(operation, "__module__", None),
+                      getattr(operation, "__qualname__", repr(operation)),
+                      tuple((name, _freeze(value)) for name, value in params
+                            if not (isinstance(name, str) and
+                                    (name.endswith("_cache") or name in _SCRATCH_ARGUMENTS))),
+                      ))
+    return tuple(steps)
+
+
+def _freeze(value):
+    if isinstance(value, CudaImage):
+        # e.g. the key image of apply_chroma_key
+        return ("image", content_hash(value))
+    if isinstance(value, RGBA):
+        return ("rgba",) + _astuple(value)
+    if isinstance(value, DistanceField):
+        raise TypeError("A DistanceField can only be passed as distance_field, which is not part of the key")
+    if isinstance(value, Enum):
+        return (type(value).__qualname__, value.value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((name, _freeze(item)) for name, item in value.items()))
+    try:
+        hash(value)
+    except TypeError:
+        raise TypeError(f"Effect parameter of type {type(value).__name__} cannot be part of a cache key") from None
+    return value
+
+
+_caches: "weakref.WeakSet[EffectCache]" = weakref.WeakSet()
+
+
+def _clear_effect_caches() -> None:
+    # Cached results belong to the backend being replaced.
+    for cache in list(_caches):
+        cache.clear()
+
+
+add_backend_listener(_clear_effect_caches)
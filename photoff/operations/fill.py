@@ -1,8 +1,10 @@
 from ..core import _lib
 from ..core.types import CudaImage, RGBA
+from .pointwise import (_check_gradient_direction, _fill_color_op, _fill_gradient_op,
+                        _run_pointwise)
 
 
-def fill_color(image: CudaImage, color: RGBA) -> None:
+def fill_color(image: CudaImage, color: RGBA, roi: tuple[int, int, int, int] | None = None) -> None:
     """
     Fills the entire image with a solid color.
 
@@ -11,17 +13,25 @@ def fill_color(image: CudaImage, color: RGBA) -> None:
     Args:
         image (CudaImage): The image to fill.
         color (RGBA): The fill color to apply.
+        roi (tuple[int, int, int, int], optional): `(x, y, width, height)` region to
+            fill instead of the whole image. See `clip_roi`.
 
     Returns:
         None
 
     Example:
         >>> fill_color(img, RGBA(255, 255, 255, 255))  # Fill with solid white
+        >>> fill_color(img, RGBA(255, 0, 0), roi=(10, 10, 64, 32))  # Red rectangle
     """
 
+    if roi is not None:
+        _run_pointwise(image, [_fill_color_op(color)], roi=roi)
+        return
+
     _lib.fill_color(image.buffer,
                     image.width,
                     image.height,
+                    image.pitch,
                     color.r,
                     color.g,
                     color.b,
@@ -32,7 +42,8 @@ def fill_gradient(image: CudaImage,
                   color1: RGBA,
                   color2: RGBA,
                   direction: int = 0,
-                  seamless: bool = False) -> None:
+                  seamless: bool = False,
+                  roi: tuple[int, int, int, int] | None = None) -> None:
     """
     Fills the image with a linear gradient between two colors.
 
@@ -49,6 +60,8 @@ def fill_gradient(image: CudaImage,
             - 3 = diagonal (bottom-left to top-right)
             Defaults to 0.
         seamless (bool, optional): Whether the gradient should repeat seamlessly. Defaults to False.
+        roi (tuple[int, int, int, int], optional): `(x, y, width, height)` region to
+            fill instead of the whole image; the gradient spans the region.
 
     Returns:
         None
@@ -59,12 +72,16 @@ def fill_gradient(image: CudaImage,
     Example:
         >>> fill_gradient(img, RGBA(0, 0, 0, 255), RGBA(255, 255, 255, 255), direction=1)
     """
-    if direction not in (0, 1, 2, 3):
-        raise ValueError(f"Invalid gradient direction: {direction}. Must be 0, 1, 2 or 3.")
+    if roi is not None:
+        _run_pointwise(image, [_fill_gradient_op(color1, color2, direction, seamless)], roi=roi)
+        return
+
+    _check_gradient_direction(direction)
 
     _lib.fill_gradient(image.buffer,
                        image.width,
                        image.height,
+                       image.pitch,
                        color1.r,
                        color1.g,
                        color1.b,
@@ -1,41 +1,59 @@
-from ..core import _lib
-from ..core.types import CudaImage, RGBA
-from ..core.buffer import copy_buffers_same_size
+from ..core import _lib, ffi
+from ..core.types import CudaImage, RGBA, DistanceField
+from .pointwise import (_channel_index, _check_flip, _chroma_key_op, _corner_radius_op,
+                        _flip_mirror, _grayscale_op, _opacity_op, _run_pointwise, clip_roi)
 
+DISTANCE_FIELD_MAX_EXTENT = 0xFFFF
 
-def apply_corner_radius(image: CudaImage, size: int) -> None:
+
+def apply_corner_radius(image: CudaImage, size: int, roi: tuple[int, int, int, int] | None = None) -> None:
     """
     Applies a rounded corner mask to an image in-place.
 
+    Only the four `size` x `size` corner squares are processed.
+
     Args:
         image (CudaImage): Image to be modified.
         size (int): Radius of the corner in pixels.
+        roi (tuple[int, int, int, int], optional): `(x, y, width, height)` region to
+            round the corners of instead of the whole image. See `clip_roi`.
 
     Returns:
         None
     """
 
-    _lib.apply_corner_radius(image.buffer, image.width, image.height, size)
+    if roi is not None:
+        _run_pointwise(image, [_corner_radius_op(size)], roi=roi)
+        return
 
+    _lib.apply_corner_radius(image.buffer, image.width, image.height, image.pitch, size)
 
-def apply_opacity(image: CudaImage, opacity: float) -> None:
+
+def apply_opacity(image: CudaImage, opacity: float, roi: tuple[int, int, int, int] | None = None) -> None:
     """
     Modifies the alpha channel of an image to apply global opacity.
 
     Args:
         image (CudaImage): Image to modify.
         opacity (float): Opacity value between 0.0 (transparent) and 1.0 (opaque).
+        roi (tuple[int, int, int, int], optional): `(x, y, width, height)` region to
+            fade instead of the whole image. See `clip_roi`.
 
     Returns:
         None
     """
 
-    _lib.apply_opacity(image.buffer, image.width, image.height, opacity)
+    if roi is not None:
+        _run_pointwise(image, [_opacity_op(opacity)], roi=roi)
+        return
+
+    _lib.apply_opacity(image.buffer, image.width, image.height, image.pitch, opacity)
 
 
 def apply_flip(image: CudaImage,
                flip_horizontal: bool = False,
-               flip_vertical: bool = False) -> None:
+               flip_vertical: bool = False,
+               roi: tuple[int, int, int, int] | None = None) -> None:
     """
     Flips an image horizontally or vertically in-place.
 
@@ -43,6 +61,8 @@ def apply_flip(image: CudaImage,
         image (CudaImage): Image to flip.
         flip_horizontal (bool, optional): Flip the image horizontally. Defaults to False.
         flip_vertical (bool, optional): Flip the image vertically. Defaults to False.
+        roi (tuple[int, int, int, int], optional): `(x, y, width, height)` region to
+            mirror in place instead of the whole image. See `clip_roi`.
 
     Raises:
         ValueError: If both `flip_horizontal` and `flip_vertical` are True.
@@ -50,25 +70,34 @@ def apply_flip(image: CudaImage,
     Returns:
         None
     """
-    
-    if flip_horizontal and flip_vertical:
-        raise ValueError("Cannot flip both horizontal and vertical at the same time")
 
-    _lib.apply_flip(image.buffer, image.width, image.height, flip_horizontal, flip_vertical)
+    if roi is not None:
+        _run_pointwise(image, [], load_mirror=_flip_mirror(flip_horizontal, flip_vertical), roi=roi)
+        return
 
+    _check_flip(flip_horizontal, flip_vertical)
 
-def apply_grayscale(image: CudaImage) -> None:
+    _lib.apply_flip(image.buffer, image.width, image.height, image.pitch, flip_horizontal, flip_vertical)
+
+
+def apply_grayscale(image: CudaImage, roi: tuple[int, int, int, int] | None = None) -> None:
     """
     Converts an image to grayscale in-place using luminosity method.
 
     Args:
         image (CudaImage): Image to convert.
+        roi (tuple[int, int, int, int], optional): `(x, y, width, height)` region to
+            convert instead of the whole image. See `clip_roi`.
 
     Returns:
         None
     """
 
-    _lib.apply_grayscale(image.buffer, image.width, image.height)
+    if roi is not None:
+        _run_pointwise(image, [_grayscale_op()], roi=roi)
+        return
+
+    _lib.apply_grayscale(image.buffer, image.width, image.height, image.pitch)
 
 
 def apply_chroma_key(image: CudaImage,
@@ -76,7 +105,8 @@ def apply_chroma_key(image: CudaImage,
                      channel: str = "A",
                      threshold: int = 128,
                      invert: bool = False,
-                     zero_all_channels: bool = False) -> None:
+                     zero_all_channels: bool = False,
+                     roi: tuple[int, int, int, int] | None = None) -> None:
     """
     Applies a chroma key mask based on a channel of another image.
 
@@ -87,6 +117,9 @@ def apply_chroma_key(image: CudaImage,
         threshold (int, optional): Threshold (0–255) to apply masking. Defaults to 128.
         invert (bool, optional): Invert the mask logic. Defaults to False.
         zero_all_channels (bool, optional): If True, sets RGB to zero where mask applies. Defaults to False.
+        roi (tuple[int, int, int, int], optional): `(x, y, width, height)` region to
+            key instead of the whole image. The key image is aligned with the
+            region's top-left corner.
 
     Raises:
         ValueError: If the provided channel is invalid.
@@ -94,68 +127,159 @@ def apply_chroma_key(image: CudaImage,
     Returns:
         None
     """
-    
-    channel_upper = (channel.upper() if isinstance(channel, str) else str(channel).upper())
-
-    if channel_upper == "R":
-        channel_idx = 0
-    elif channel_upper == "G":
-        channel_idx = 1
-    elif channel_upper == "B":
-        channel_idx = 2
-    elif channel_upper == "A":
-        channel_idx = 3
-    else:
-        raise ValueError(f"Invalid channel: {channel}, must be one of 'R', 'G', 'B', 'A'")
+
+    if roi is not None:
+        _run_pointwise(image, [_chroma_key_op(key_image, channel, threshold, invert, zero_all_channels)], roi=roi)
+        return
 
     _lib.apply_chroma_key(image.buffer,
                           key_image.buffer,
                           image.width,
                           image.height,
+                          image.pitch,
                           key_image.width,
                           key_image.height,
-                          channel_idx,
+                          key_image.pitch,
+                          _channel_index(channel),
                           threshold,
                           invert,
                           zero_all_channels,
                           )
 
 
+def compute_alpha_distance_field(image: CudaImage,
+                                 distance_field_cache: DistanceField = None,
+                                 image_copy_cache: CudaImage = None,
+                                 row_scratch_cache: CudaImage = None) -> DistanceField:
+    """
+    Computes the exact signed Euclidean distance from every pixel to the alpha edge.
+
+    Pixels count as opaque when their alpha is non-zero. The transform is linear in
+    the number of pixels, independent of any stroke width or shadow radius, and the
+    result can be passed to `apply_stroke` and `apply_shadow` to share it between
+    several effects on the same layer.
+
+    Args:
+        image (CudaImage): Image whose alpha channel defines the shape.
+        distance_field_cache (DistanceField, optional): Pre-allocated field for the result.
+            Must match image dimensions.
+        image_copy_cache (CudaImage, optional): Optional scratch buffer for the column
+            pass. Must match image size.
+        row_scratch_cache (CudaImage, optional): Optional scratch buffer for the row
+            pass. Must match image size.
+
+    Returns:
+        DistanceField: A new (or reused) distance field. Free it with `.free()`.
+
+    Raises:
+        ValueError: If width + height exceeds 65535.
+        ValueError: If a provided cache does not match the image dimensions.
+
+    Example:
+        >>> field = compute_alpha_distance_field(logo)
+        >>> apply_stroke(logo, 12, RGBA(0, 0, 0, 255), inner=False, distance_field=field)
+        >>> apply_shadow(logo, 24, 0.8, RGBA(0, 0, 0, 255), distance_field=field)
+        >>> field.free()
+    """
+
+    if image.width + image.height > DISTANCE_FIELD_MAX_EXTENT:
+        raise ValueError(f"Image too large for a distance field: {image.width}x{image.height}, width + height must not exceed {DISTANCE_FIELD_MAX_EXTENT}")
+
+    if distance_field_cache is not None:
+        if (distance_field_cache.width != image.width or distance_field_cache.height != image.height):
+            raise ValueError(f"Distance field dimensions must match original image dimensions: {image.width}x{image.height}, got {distance_field_cache.width}x{distance_field_cache.height}")
+    for cache in (image_copy_cache, row_scratch_cache):
+        if cache is not None:
+            if (cache.width != image.width or cache.height != image.height):
+                raise ValueError(f"Scratch buffer dimensions must match original image dimensions: {image.width}x{image.height}, got {cache.width}x{cache.height}")
+            _check_packed(cache)
+
+    field = distance_field_cache
+    temporaries = []
+    if image_copy_cache is None:
+        image_copy_cache = CudaImage(image.width, image.height)
+        temporaries.append(image_copy_cache)
+    if row_scratch_cache is None:
+        row_scratch_cache = CudaImage(image.width, image.height)
+        temporaries.append(row_scratch_cache)
+
+    try:
+        if field is None:
+            field = DistanceField(image.width, image.height)
+        _lib.compute_distance_field(field.buffer,
+                                    ffi.cast("uint32_t*", image_copy_cache.buffer),
+                                    ffi.cast("uint32_t*", row_scratch_cache.buffer),
+                                    image.buffer,
+                                    image.width,
+                                    image.height,
+                                    image.pitch,
+                                    )
+    except BaseException:
+        if field is not None and field is not distance_field_cache:
+            field.free()
+        raise
+    finally:
+        for temporary in temporaries:
+            temporary.free()
+
+    return field
+
+
+def _resolve_distance_field(image: CudaImage,
+                            distance_field: DistanceField,
+                            image_copy_cache: CudaImage) -> tuple[DistanceField, bool]:
+    if distance_field is None:
+        return compute_alpha_distance_field(image, image_copy_cache=image_copy_cache), True
+
+    if (distance_field.width != image.width or distance_field.height != image.height):
+        raise ValueError(f"Distance field dimensions must match original image dimensions: {image.width}x{image.height}, got {distance_field.width}x{distance_field.height}")
+    return distance_field, False
+
+
 def apply_stroke(image: CudaImage,
                  stroke_width: int,
                  stroke_color: RGBA,
                  image_copy_cache: CudaImage = None,
-                 inner: bool = True) -> None:
+                 inner: bool = True,
+                 distance_field: DistanceField = None,
+                 roi: tuple[int, int, int, int] | None = None) -> None:
     """
     Draws a stroke (outline) around the non-transparent areas of an image.
 
+    The stroke is resolved from the alpha distance field, so its cost does not
+    depend on `stroke_width`. With `roi`, only the region is read and written,
+    as if it were the whole image.
+
     Args:
         image (CudaImage): Image to which the stroke will be applied.
         stroke_width (int): Width of the stroke in pixels.
         stroke_color (RGBA): Color of the stroke.
-        image_copy_cache (CudaImage, optional): Optional cache of the original image. Must match dimensions.
+        image_copy_cache (CudaImage, optional): Optional scratch buffer used to compute the
+            distance field. Must match dimensions.
         inner (bool, optional): If True, stroke is drawn inside the shape; otherwise outside. Defaults to True.
+        distance_field (DistanceField, optional): Field from `compute_alpha_distance_field`
+            to reuse. Computed on the fly if omitted.
+        roi (tuple[int, int, int, int], optional): `(x, y, width, height)` region to
+            stroke instead of the whole image. See `clip_roi`. The cache and the
+            distance field must then match the clipped region.
 
     Raises:
-        ValueError: If the provided cache does not match image dimensions.
+        ValueError: If the provided cache or distance field does not match image dimensions.
 
     Returns:
         None
     """
-    
-    need_free = False
-    if image_copy_cache is None:
-        image_copy_cache = CudaImage(image.width, image.height)
-        copy_buffers_same_size(image_copy_cache.buffer, image.buffer, image.width, image.height)
-        need_free = True
-    else:
-        if (image_copy_cache.width != image.width or image_copy_cache.height != image.height):
-            raise ValueError(f"Destination image dimensions must match original image dimensions: {image.width}x{image.height}, got {image_copy_cache.width}x{image_copy_cache.height}")
+
+    image = _roi_view(image, roi)
+    if image is None:
+        return
+    field, need_free = _resolve_distance_field(image, distance_field, image_copy_cache)
 
     _lib.apply_stroke(image.buffer,
-                      image_copy_cache.buffer,
+                      field.buffer,
                       image.width,
                       image.height,
+                      image.pitch,
                       stroke_width,
                       stroke_color.r,
                       stroke_color.g,
@@ -165,7 +289,7 @@ def apply_stroke(image: CudaImage,
                       )
 
     if need_free:
-        image_copy_cache.free()
+        field.free()
 
 
 def apply_shadow(image: CudaImage,
@@ -173,38 +297,47 @@ def apply_shadow(image: CudaImage,
                  intensity: float,
                  shadow_color: RGBA,
                  image_copy_cache: CudaImage = None,
-                 inner: bool = False) -> None:
+                 inner: bool = False,
+                 distance_field: DistanceField = None,
+                 roi: tuple[int, int, int, int] | None = None) -> None:
     """
     Applies a shadow effect around the opaque regions of an image.
 
+    The shadow falloff is read from the alpha distance field, so its cost does not
+    depend on `radius`. With `roi`, only the region is read and written, as if
+    it were the whole image.
+
     Args:
         image (CudaImage): Image to apply the shadow to.
         radius (float): Blur radius of the shadow.
         intensity (float): Intensity multiplier of the shadow.
         shadow_color (RGBA): Color of the shadow.
-        image_copy_cache (CudaImage, optional): Optional image copy buffer. Must match original image size.
+        image_copy_cache (CudaImage, optional): Optional scratch buffer used to compute the
+            distance field. Must match original image size.
         inner (bool, optional): Whether to draw the shadow inside the shape. Defaults to False.
+        distance_field (DistanceField, optional): Field from `compute_alpha_distance_field`
+            to reuse. Computed on the fly if omitted.
+        roi (tuple[int, int, int, int], optional): `(x, y, width, height)` region to
+            shade instead of the whole image. See `clip_roi`. The cache and the
+            distance field must then match the clipped region.
 
     Raises:
-        ValueError: If the cache does not match the image dimensions.
+        ValueError: If the cache or distance field does not match the image dimensions.
 
     Returns:
         None
     """
-    
-    need_free = False
-    if image_copy_cache is None:
-        image_copy_cache = CudaImage(image.width, image.height)
-        copy_buffers_same_size(image_copy_cache.buffer, image.buffer, image.width, image.height)
-        need_free = True
-    else:
-        if (image_copy_cache.width != image.width or image_copy_cache.height != image.height):
-            raise ValueError(f"Destination image dimensions must match original image dimensions: {image.width}x{image.height}, got {image_copy_cache.width}x{image_copy_cache.height}")
+
+    image = _roi_view(image, roi)
+    if image is None:
+        return
+    field, need_free = _resolve_distance_field(image, distance_field, image_copy_cache)
 
     _lib.apply_shadow(image.buffer,
-                      image_copy_cache.buffer,
+                      field.buffer,
                       image.width,
                       image.height,
+                      image.pitch,
                       radius,
                       intensity,
                       shadow_color.r,
@@ -215,19 +348,30 @@ def apply_shadow(image: CudaImage,
                       )
 
     if need_free:
-        image_copy_cache.free()
+        field.free()
 
 
 def apply_gaussian_blur(image: CudaImage,
                         radius: float,
-                        image_copy_cache: CudaImage = None) -> None:
+                        image_copy_cache: CudaImage = None,
+                        roi: tuple[int, int, int, int] | None = None) -> None:
     """
     Applies a Gaussian blur effect to an image in-place.
 
+    The blur runs as a horizontal pass into an intermediate buffer followed by a
+    vertical pass back into `image`, so the cost per pixel grows linearly with the
+    radius and any radius is supported. With `roi`, only the region is read and
+    written, as if it were the whole image: its edges are clamped rather than
+    blended with the pixels around it.
+
     Args:
         image (CudaImage): Image to blur.
-        radius (float): Radius of the blur in pixels.
-        image_copy_cache (CudaImage, optional): Optional buffer. Must match image size.
+        radius (float): Radius of the blur in pixels. Values <= 0 leave the image unchanged.
+        image_copy_cache (CudaImage, optional): Optional intermediate buffer. Must match image size.
+            Its contents are overwritten; it does not need to hold a copy of the image.
+        roi (tuple[int, int, int, int], optional): `(x, y, width, height)` region to
+            blur instead of the whole image. See `clip_roi`. The cache must then
+            match the clipped region.
 
     Raises:
         ValueError: If the cache does not match the image dimensions.
@@ -235,17 +379,37 @@ def apply_gaussian_blur(image: CudaImage,
     Returns:
         None
     """
-    
+
+    image = _roi_view(image, roi)
+    if image is None:
+        return
     need_free = False
     if image_copy_cache is None:
         image_copy_cache = CudaImage(image.width, image.height)
-        copy_buffers_same_size(image_copy_cache.buffer, image.buffer, image.width, image.height)
         need_free = True
     else:
         if (image_copy_cache.width != image.width or image_copy_cache.height != image.height):
-            raise ValueError(f"El buffer auxiliar debe coincidir con las dimensiones de la imagen original: {image.width}x{image.height}, recibido {image_copy_cache.width}x{image_copy_cache.height}")
+            raise ValueError(f"Intermediate buffer dimensions must match original image dimensions: {image.width}x{image.height}, got {image_copy_cache.width}x{image_copy_cache.height}")
+        _check_packed(image_copy_cache)
 
-    _lib.apply_gaussian_blur(image.buffer, image_copy_cache.buffer, image.width, image.height, radius)
+    _lib.apply_gaussian_blur(image.buffer, image_copy_cache.buffer, image.width, image.height, image.pitch, radius)
 
     if need_free:
-        image_copy_cache.free()
\ No newline at end of file
+        image_copy_cache.free()
+
+
+def _roi_view(image: CudaImage, roi: tuple[int, int, int, int] | None) -> CudaImage | None:
+    # The image itself without roi, a view of the clipped region with one, or
+    # None if the region does not overlap the image.
+    if roi is None:
+        return image
+    x, y, width, height = clip_roi(image, roi)
+    if not width or not height:
+        return None
+    return image.view(x, y, width, height)
+
+
+def _check_packed(cache: CudaImage) -> None:
+    # Scratch buffers are indexed as packed rows by the native code.
+    if cache.pitch != cache.width:
+        raise ValueError(f"Scratch buffer must not be a view: pitch {cache.pitch} != width {cache.width}")
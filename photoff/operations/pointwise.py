@@ -0,0 +1,186 @@
+from dataclasses import dataclass as _dataclass, field as _field
+from typing import Sequence
+from ..core import _lib, ffi
+from ..core.types import CudaImage, RGBA
+
+# Mirrors the POINTWISE_* constants of photoff.h.
+POINTWISE_MAX_OPS = 16
+
+_FILL_COLOR = 0
+_FILL_GRADIENT = 1
+_GRAYSCALE = 2
+_OPACITY = 3
+_CORNER_RADIUS = 4
+_CHROMA_KEY = 5
+_TINT = 6
+
+_MIRROR_X = 1
+_MIRROR_Y = 2
+
+_CHROMA_INVERT = 1
+_CHROMA_ZERO_ALL = 2
+
+_GENERATORS = (_FILL_COLOR, _FILL_GRADIENT)
+
+
+def clip_roi(image: CudaImage, roi: tuple[int, int, int, int] | None) -> tuple[int, int, int, int]:
+    """
+    Clips a region of interest to the bounds of an image.
+
+    Operations that take `roi=(x, y, w, h)` run as if the region were the whole
+    image: fills and gradients span the region, corner radii round its corners,
+    flips mirror inside it, and pixels outside it are left untouched. Regions
+    that extend past the image are clipped first.
+
+    Args:
+        image (CudaImage): Image the region refers to.
+        roi (tuple[int, int, int, int] | None): `(x, y, width, height)` in pixels,
+            or None for the whole image.
+
+    Returns:
+        tuple[int, int, int, int]: The clipped region. Its width or height is 0 if
+            it does not overlap the image.
+
+    Raises:
+        ValueError: If the region has a negative width or height.
+
+    Example:
+        >>> clip_roi(CudaImage(100, 100), (90, -10, 20, 20))
+        (90, 0, 10, 10)
+    """
+
+    if roi is None:
+        return 0, 0, image.width, image.height
+
+    x, y, width, height = roi
+    if width < 0 or height < 0:
+        raise ValueError(f"Invalid roi size: {width}x{height}")
+
+    x0 = min(max(x, 0), image.width)
+    y0 = min(max(y, 0), image.height)
+    x1 = min(max(x + width, 0), image.width)
+    y1 = min(max(y + height, 0), image.height)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+@_dataclass
+class _Op:
+    # One entry of a native pointwise chain; `fields` are PointwiseOp members.
+    kind: int
+    fields: dict = _field(default_factory=dict)
+    key_image: CudaImage | None = None
+
+
+def _fill_color_op(color: RGBA) -> _Op:
+    return _Op(_FILL_COLOR, {"color1": color})
+
+
+def _fill_gradient_op(color1: RGBA, color2: RGBA, direction: int, seamless: bool) -> _Op:
+    _check_gradient_direction(direction)
+    return _Op(_FILL_GRADIENT, {"color1": color1,
+                                "color2": color2,
+                                "param": direction,
+                                "flags": int(bool(seamless)),
+                                })
+
+
+def _grayscale_op() -> _Op:
+    return _Op(_GRAYSCALE)
+
+
+def _opacity_op(opacity: float) -> _Op:
+    return _Op(_OPACITY, {"amount": min(max(opacity, 0.0), 1.0)})
+
+
+def _tint_op(color: RGBA) -> _Op:
+    # Replaces RGB with the color's and scales alpha by its alpha, turning a
+    # coverage mask into colored pixels.
+    return _Op(_TINT, {"color1": color})
+
+
+def _corner_radius_op(size: int) -> _Op:
+    return _Op(_CORNER_RADIUS, {"param": size})
+
+
+def _chroma_key_op(key_image: CudaImage,
+                   channel: str,
+                   threshold: int,
+                   invert: bool,
+                   zero_all_channels: bool) -> _Op:
+    if not 0 <= threshold <= 255:
+        raise ValueError(f"Invalid threshold: {threshold}, must be between 0 and 255")
+
+    flags = 0
+    if invert:
+        flags |= _CHROMA_INVERT
+    if zero_all_channels:
+        flags |= _CHROMA_ZERO_ALL
+
+    return _Op(_CHROMA_KEY, {"param": _channel_index(channel),
+                             "threshold": threshold,
+                             "flags": flags,
+                             }, key_image)
+
+
+def _flip_mirror(flip_horizontal: bool, flip_vertical: bool) -> int:
+    _check_flip(flip_horizontal, flip_vertical)
+    return ((_MIRROR_X if flip_horizontal else 0) |
+            (_MIRROR_Y if flip_vertical else 0))
+
+
+def _run_pointwise(image: CudaImage,
+                   ops: Sequence[_Op],
+                   mirrors: Sequence[int] | None = None,
+                   load_mirror: int = 0,
+                   roi: tuple[int, int, int, int] | None = None) -> None:
+    # Runs up to POINTWISE_MAX_OPS operations in one pass over `roi` of `image`.
+    x, y, width, height = clip_roi(image, roi)
+    if not width or not height:
+        return
+
+    native_ops = ffi.new("PointwiseOp[]", max(len(ops), 1))
+    for i, (native, op) in enumerate(zip(native_ops, ops)):
+        native.kind = op.kind
+        native.mirror = mirrors[i] if mirrors is not None else 0
+        for name, value in op.fields.items():
+            if name.startswith("color"):
+                value = (value.r, value.g, value.b, value.a)
+            setattr(native, name, value)
+        if op.key_image is not None:
+            native.key = op.key_image.buffer
+            native.key_width = op.key_image.width
+            native.key_height = op.key_image.height
+            native.key_pitch = op.key_image.pitch
+
+    _lib.apply_pointwise_ops(image.buffer + (y * image.pitch + x),
+                             width,
+                             height,
+                             image.pitch,
+                             native_ops,
+                             len(ops),
+                             load_mirror,
+                             )
+
+
+def _check_gradient_direction(direction: int) -> None:
+    if direction not in (0, 1, 2, 3):
+        raise ValueError(f"Invalid gradient direction: {direction}. Must be 0, 1, 2 or 3.")
+
+
+def _check_flip(flip_horizontal: bool, flip_vertical: bool) -> None:
+    if flip_horizontal and flip_vertical:
+        raise ValueError("Cannot flip both horizontal and vertical at the same time")
+
+
+def _channel_index(channel: str) -> int:
+    channel_upper = (channel.upper() if isinstance(channel, str) else str(channel).upper())
+
+    if channel_upper == "R":
+        return 0
+    elif channel_upper == "G":
+        return 1
+    elif channel_upper == "B":
+        return 2
+    elif channel_upper == "A":
+        return 3
+    raise ValueError(f"Invalid channel: {channel}, must be one of 'R', 'G', 'B', 'A'")
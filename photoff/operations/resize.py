@@ -1,5 +1,9 @@
+import threading
+from collections import OrderedDict
 from enum import Enum
-from ..core import _lib
+from typing import Sequence
+from ..core import _lib, ffi
+from ..core.cuda_interface import add_backend_listener
 from ..core.types import CudaImage
 
 
@@ -10,7 +14,19 @@ class ResizeMethod(Enum):
     Attributes:
         BILINEAR: Bilinear interpolation (smooth, reasonably fast).
         NEAREST: Nearest neighbor interpolation (fastest, lowest quality).
-        BICUBIC: Bicubic interpolation (higher quality, slower).
+        BICUBIC: Bicubic filter (higher quality, slower). Separable, see below.
+        AREA: Averages every source pixel under each output pixel (box filter). The
+            method of choice for large reductions, where the other methods skip
+            source pixels and alias.
+        LANCZOS3: Lanczos filter with 3 lobes (sharpest, for high-quality renditions).
+            Separable.
+        MITCHELL: Mitchell-Netravali filter (B = C = 1/3), softer than bicubic with
+            less ringing. Separable.
+
+    Separable methods resample rows, then columns, with weights computed once per
+    source size, destination size and method. They are widened by the reduction
+    ratio when downscaling, so every source pixel contributes and the result
+    matches Pillow's `Image.resize` with the same filter within rounding.
 
     Usage:
         method = ResizeMethod.BICUBIC
@@ -18,6 +34,131 @@ class ResizeMethod(Enum):
     BILINEAR = "bilinear"
     NEAREST = "nearest"
     BICUBIC = "bicubic"
+    AREA = "area"
+    LANCZOS3 = "lanczos3"
+    MITCHELL = "mitchell"
+
+
+# Mirrors the RESIZE_* constants of photoff.h.
+_NATIVE_METHODS = {
+    ResizeMethod.NEAREST: 0,
+    ResizeMethod.BILINEAR: 1,
+    ResizeMethod.BICUBIC: 2,
+    ResizeMethod.AREA: 3,
+    ResizeMethod.LANCZOS3: 4,
+    ResizeMethod.MITCHELL: 5,
+}
+
+_SEPARABLE_METHODS = {ResizeMethod.BICUBIC, ResizeMethod.LANCZOS3, ResizeMethod.MITCHELL}
+
+_MAX_RESAMPLE_TABLES = 64
+
+
+class _ResampleTables:
+    # LRU of native coefficient tables keyed by (source size, destination size,
+    # method, covered range). Tables used by a call in progress are pinned so
+    # trimming cannot free them.
+
+    def __init__(self, max_tables: int):
+        self._lock = threading.Lock()
+        self._max_tables = max_tables
+        self._tables: OrderedDict[tuple, list] = OrderedDict()
+
+    def acquire(self,
+                pins: list,
+                src_size: int,
+                dst_size: int,
+                method: ResizeMethod,
+                dst_range: tuple[int, int] | None = None,
+                src_range: tuple[int, int] | None = None):
+        # Returns NULL when the size does not change, which skips the pass. The
+        # ranges, (first, count), restrict a table to part of the resample; see
+        # `_source_range`.
+        if src_size == dst_size:
+            return ffi.NULL
+
+        dst_first, dst_count = dst_range if dst_range is not None else (0, dst_size)
+        src_first, src_count = src_range if src_range is not None else (0, src_size)
+        key = (src_size, dst_size, method, dst_first, dst_count, src_first, src_count)
+        with self._lock:
+            entry = self._tables.get(key)
+            if entry is not None:
+                self._tables.move_to_end(key)
+                entry[1] += 1
+                pins.append(key)
+                return entry[0]
+
+        table = _lib.create_resample_table(src_size, dst_size, _NATIVE_METHODS[method],
+                                           dst_first, dst_count, src_first, src_count)
+        if table == ffi.NULL:
+            raise RuntimeError(f"Could not create a resample table for {src_size} -> {dst_size} pixels")
+
+        with self._lock:
+            entry = self._tables.get(key)
+            if entry is not None:
+                # Another thread built the same table meanwhile.
+                duplicate, table = table, entry[0]
+                entry[1] += 1
+            else:
+                duplicate = None
+                self._tables[key] = [table, 1]
+            pins.append(key)
+        if duplicate is not None:
+            _lib.free_resample_table(duplicate)
+        return table
+
+    def release(self, pins: list) -> None:
+        with self._lock:
+            for key in pins:
+                self._tables[key][1] -= 1
+            evicted = []
+            for key in list(self._tables):
+                if len(self._tables) <= self._max_tables:
+                    break
+                if self._tables[key][1] == 0:
+                    evicted.append(self._tables.pop(key)[0])
+        for table in evicted:
+            _lib.free_resample_table(table)
+
+    def clear(self) -> None:
+        with self._lock:
+            tables = [entry[0] for entry in self._tables.values()]
+            self._tables.clear()
+        for table in tables:
+            _lib.free_resample_table(table)
+
+
+_resample_tables = _ResampleTables(_MAX_RESAMPLE_TABLES)
+
+# Tables belong to the backend being replaced.
+add_backend_listener(_resample_tables.clear)
+
+
+# Filter support in source pixels at scale 1, as in the native backends.
+_FILTER_SUPPORT = {
+    ResizeMethod.BICUBIC: 2.0,
+    ResizeMethod.LANCZOS3: 3.0,
+    ResizeMethod.MITCHELL: 2.0,
+}
+
+
+def _source_range(src_size: int, dst_size: int, method: ResizeMethod, dst_first: int, dst_count: int) -> tuple[int, int]:
+    # Source pixels, (first, count), read by outputs [dst_first, dst_first +
+    # dst_count) of a separable resample. Mirrors the tap bounds computed by
+    # create_resample_table, so a table built for this region has every tap.
+    if src_size == dst_size:
+        return dst_first, dst_count
+    scale = src_size / dst_size
+    support = _FILTER_SUPPORT[method] * max(scale, 1.0)
+    first = max(int((dst_first + 0.5) * scale - support + 0.5), 0)
+    end = min(int((dst_first + dst_count - 1 + 0.5) * scale + support + 0.5), src_size)
+    return first, end - first
+
+
+def _needs_temp(image: CudaImage, width: int, height: int) -> bool:
+    # Both passes run, with the horizontal one writing a temp image.
+    return image.width != width and image.height != height
+
 
 def resize(image: CudaImage,
            width: int,
@@ -28,8 +169,11 @@ def resize(image: CudaImage,
     """
     Resizes a CudaImage to the specified dimensions using the chosen interpolation method.
 
-    Supports bilinear, nearest-neighbor, and bicubic resampling. A cache image can be reused
-    for performance to avoid memory allocation.
+    Supports nearest-neighbor, bilinear, bicubic, area, Lanczos and Mitchell
+    resampling. A cache image can be reused for performance to avoid memory
+    allocation. For thumbnails of large images use `ResizeMethod.AREA`, which
+    reads every source pixel once and does not alias, or one of the separable
+    filters for higher quality.
 
     Args:
         image (CudaImage): The input image to resize.
@@ -58,17 +202,194 @@ def resize(image: CudaImage,
         result = resize_image_cache
 
     if method == ResizeMethod.BILINEAR:
-        _lib.resize_bilinear(result.buffer, image.buffer, width, height, image.width, image.height)
+        _lib.resize_bilinear(result.buffer, image.buffer,
+                             width, height, result.pitch,
+                             image.width, image.height, image.pitch)
     elif method == ResizeMethod.NEAREST:
-        _lib.resize_nearest(result.buffer, image.buffer, width, height, image.width, image.height)
-    elif method == ResizeMethod.BICUBIC:
-        _lib.resize_bicubic(result.buffer, image.buffer, width, height, image.width, image.height)
+        _lib.resize_nearest(result.buffer, image.buffer,
+                            width, height, result.pitch,
+                            image.width, image.height, image.pitch)
+    elif method in _SEPARABLE_METHODS:
+        pins = []
+        temp = CudaImage(width, image.height) if _needs_temp(image, width, height) else None
+        try:
+            horizontal = _resample_tables.acquire(pins, image.width, width, method)
+            vertical = _resample_tables.acquire(pins, image.height, height, method)
+            _lib.resize_separable(result.buffer, image.buffer,
+                                  width, height, result.pitch,
+                                  image.width, image.height, image.pitch,
+                                  temp.buffer if temp is not None else ffi.NULL,
+                                  temp.pitch if temp is not None else 0,
+                                  horizontal, vertical)
+        finally:
+            _resample_tables.release(pins)
+            if temp is not None:
+                temp.free()
+    elif method == ResizeMethod.AREA:
+        _lib.resize_area(result.buffer, image.buffer,
+                         width, height, result.pitch,
+                         image.width, image.height, image.pitch)
     else:
         raise ValueError(f"Unsupported resize method: {method}")
 
     return result
 
 
+def resize_many(image: CudaImage,
+                sizes: Sequence[tuple[int, int]],
+                method: ResizeMethod = ResizeMethod.BICUBIC,
+                caches: Sequence[CudaImage] | None = None,
+                cascade: bool = True,
+                ) -> list[CudaImage]:
+    """
+    Resizes an image to several sizes in a single native call.
+
+    With `cascade`, each rendition is computed from the smallest larger rendition
+    that is at least twice its width and height, and from the source otherwise.
+    For a chain such as 2048, 1024, 512, 256 and 128 pixels only the first
+    rendition reads the full-resolution source, and each further one reads a
+    quarter of the pixels of the one before. Halving steps also reduce the
+    aliasing of bilinear and bicubic. The pixels then differ slightly from
+    independent `resize` calls; pass `cascade=False` to resample every
+    rendition from the source.
+
+    Args:
+        image (CudaImage): The input image.
+        sizes (Sequence[tuple[int, int]]): `(width, height)` of each rendition, in any order.
+        method (ResizeMethod, optional): Resampling method. Defaults to BICUBIC.
+        caches (Sequence[CudaImage], optional): Pre-allocated images for the
+            renditions, in the order of `sizes`. Each must match its size.
+        cascade (bool, optional): Compute renditions from larger ones. Defaults to True.
+
+    Returns:
+        list[CudaImage]: The renditions, in the order of `sizes`.
+
+    Raises:
+        ValueError: If a size is smaller than 1x1.
+        ValueError: If `caches` does not hold one image per size, or an image does
+            not match its size.
+        ValueError: If the interpolation method is not supported.
+
+    Example:
+        >>> renditions = resize_many(upload, [(2048, 1365), (1024, 683), (512, 341), (256, 171)],
+        ...                          method=ResizeMethod.AREA)
+    """
+
+    if method not in _NATIVE_METHODS:
+        raise ValueError(f"Unsupported resize method: {method}")
+    if caches is not None and len(caches) != len(sizes):
+        raise ValueError(f"caches must hold one image per size: {len(sizes)}, got {len(caches)}")
+
+    results = []
+    for i, (width, height) in enumerate(sizes):
+        if width < 1 or height < 1:
+            raise ValueError(f"Invalid resize dimensions: {width}x{height}")
+        if caches is None:
+            results.append(CudaImage(width, height))
+        else:
+            cache = caches[i]
+            if cache.width != width or cache.height != height:
+                raise ValueError(f"Destination image dimensions must match resize dimensions: {width}x{height}, got {cache.width}x{cache.height}")
+            results.append(cache)
+
+    if not results:
+        return results
+
+    # Largest first, so every rendition can cascade from one computed before it.
+    order = sorted(range(len(results)), key=lambda i: results[i].width * results[i].height, reverse=True)
+    targets = ffi.new("ResizeTarget[]", len(order))
+    pins = []
+    temps = []
+    try:
+        for slot, i in enumerate(order):
+            result = results[i]
+            target = targets[slot]
+            target.dst = result.buffer
+            target.width = result.width
+            target.height = result.height
+            target.pitch = result.pitch
+            target.source = -1
+            source = image
+            if cascade:
+                for earlier in reversed(range(slot)):
+                    larger = results[order[earlier]]
+                    if larger.width >= 2 * result.width and larger.height >= 2 * result.height:
+                        target.source = earlier
+                        source = larger
+                        break
+
+            if method in _SEPARABLE_METHODS:
+                target.horizontal = _resample_tables.acquire(pins, source.width, result.width, method)
+                target.vertical = _resample_tables.acquire(pins, source.height, result.height, method)
+                if _needs_temp(source, result.width, result.height):
+                    temp = CudaImage(result.width, source.height)
+                    temps.append(temp)
+                    target.temp = temp.buffer
+                    target.temp_pitch = temp.pitch
+
+        _lib.resize_many(image.buffer, image.width, image.height, image.pitch,
+                         targets, len(order), _NATIVE_METHODS[method])
+    finally:
+        _resample_tables.release(pins)
+        for temp in temps:
+            temp.free()
+
+    return results
+
+
+def build_pyramid(image: CudaImage,
+                  levels: int,
+                  method: ResizeMethod = ResizeMethod.AREA,
+                  pyramid_cache: Sequence[CudaImage] | None = None,
+                  ) -> list[CudaImage]:
+    """
+    Builds successive half-size reductions of an image.
+
+    Each level is half the width and height of the previous one, rounded down and
+    at least 1 pixel, and is computed from the previous level. The source is thus
+    read once, and every further level costs a quarter of the one before. With
+    `ResizeMethod.AREA` each level averages 2x2 blocks, which gives thumbnails free
+    of aliasing at any reduction ratio; a level can also be used as the starting
+    point of a final `resize` to an exact size.
+
+    Args:
+        image (CudaImage): The full-resolution image. It is not part of the result.
+        levels (int): Number of reductions to build.
+        method (ResizeMethod, optional): Resampling method of each halving. Defaults to AREA.
+        pyramid_cache (Sequence[CudaImage], optional): Pre-allocated images for the
+            levels, in order. Each must match its level's dimensions.
+
+    Returns:
+        list[CudaImage]: The levels, largest first. Images not taken from
+            `pyramid_cache` are allocated from the buffer pool.
+
+    Raises:
+        ValueError: If `levels` is negative.
+        ValueError: If `pyramid_cache` does not hold one image per level, or an image
+            does not match its level's dimensions.
+
+    Example:
+        >>> half, quarter, eighth = build_pyramid(photo, 3)
+        >>> thumb = resize(eighth, 200, 133, method=ResizeMethod.AREA)
+    """
+
+    if levels < 0:
+        raise ValueError(f"levels must be >= 0, got {levels}")
+    if pyramid_cache is not None and len(pyramid_cache) != levels:
+        raise ValueError(f"pyramid_cache must hold one image per level: {levels}, got {len(pyramid_cache)}")
+
+    pyramid = []
+    source = image
+    for level in range(levels):
+        width = max(source.width // 2, 1)
+        height = max(source.height // 2, 1)
+        cache = pyramid_cache[level] if pyramid_cache is not None else None
+        source = resize(source, width, height, method=method, resize_image_cache=cache)
+        pyramid.append(source)
+
+    return pyramid
+
+
 def crop_margins(image: CudaImage,
                  left: int = 0,
                  top: int = 0,
@@ -123,8 +444,10 @@ def crop_margins(image: CudaImage,
                     image.buffer,
                     image.width,
                     image.height,
+                    image.pitch,
                     new_width,
                     new_height,
+                    result.pitch,
                     left,
                     top,
                     )
@@ -1,7 +1,30 @@
-from PIL import Image, ImageDraw, ImageFont 
+import functools
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass as _dataclass
+from PIL import Image, ImageDraw, ImageFont
+from ..core.cuda_interface import add_backend_listener
 from ..core.types import CudaImage, RGBA
-from ..core.cuda_interface import ffi 
-from ..core.buffer import copy_to_device
+from ..io import pil_to_image
+from .blend import blend, blend_many
+from .fill import fill_color
+from .pointwise import _run_pointwise, _tint_op
+
+# Pillow's default spacing between the lines of multiline text.
+_LINE_SPACING = 4
+
+_TRANSPARENT = RGBA(0, 0, 0, 0)
+
+
+@functools.lru_cache(maxsize=64)
+def _load_font(font_path: str, font_size: int) -> ImageFont.FreeTypeFont:
+    # Parsing a font file costs far more than drawing a short string with it.
+    try:
+        return ImageFont.truetype(font_path, font_size)
+    except Exception as e:
+        raise ValueError(f"Error loading font '{font_path}': {e}")
+
 
 def render_text(text: str,
                 font_path: str,
@@ -13,7 +36,9 @@ def render_text(text: str,
 
     The function uses Pillow (PIL) to rasterize the text and transfers the resulting
     RGBA image into GPU memory as a `CudaImage`. Font metrics are computed to fit
-    the rendered text exactly, avoiding unnecessary padding.
+    the rendered text exactly, avoiding unnecessary padding. Loaded fonts are
+    cached, so repeated calls with the same font and size do not reparse the file.
+    For text redrawn every frame, use a `TextRenderer` instead.
 
     Args:
         text (str): The string to render.
@@ -30,17 +55,13 @@ def render_text(text: str,
     Example:
         >>> img = render_text("Hello GPU!", "/fonts/Roboto-Regular.ttf", 32, RGBA(255, 255, 255, 255))
     """
-    
-    try:
-        font = ImageFont.truetype(font_path, font_size)
-    except Exception as e:
-        raise ValueError(f"Error loading font '{font_path}': {e}")
 
-    tmp_img = Image.new("RGBA", (1, 1))
-    tmp_draw = ImageDraw.Draw(tmp_img)
+    font = _load_font(font_path, font_size)
+
     try:
         left, top, right, bottom = font.getbbox(text)
     except AttributeError:
+        tmp_draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
         left, top, right, bottom = tmp_draw.textbbox((0, 0), text, font=font)
 
     width, height = right - left, bottom - top
@@ -49,10 +70,398 @@ def render_text(text: str,
     draw = ImageDraw.Draw(pil_img)
     draw.text((-left, -top), text, fill=(color.r, color.g, color.b, color.a), font=font)
 
-    cuda_img = CudaImage(width, height)
+    return pil_to_image(pil_img)
+
+
+@_dataclass
+class TextRendererStats:
+    """
+    Snapshot of text renderer counters.
+
+    Attributes:
+        glyphs_rasterized (int): Glyphs drawn by Pillow and uploaded to the atlas.
+        glyphs_drawn (int): Glyphs blitted from the atlas.
+        layout_hits (int): Strings whose layout was cached.
+        layout_misses (int): Strings laid out with the font metrics.
+        atlas_pages (int): Device images currently holding glyphs.
+        atlas_resets (int): Times the atlas was emptied because a draw left it
+            with more than `max_pages` pages.
+    """
+    glyphs_rasterized: int
+    glyphs_drawn: int
+    layout_hits: int
+    layout_misses: int
+    atlas_pages: int
+    atlas_resets: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.layout_hits + self.layout_misses
+        return self.layout_hits / total if total else 0.0
+
+
+@_dataclass(frozen=True)
+class _Layout:
+    # Size of the text's bounding box, and glyphs as (character, x, y) of their
+    # top-left corner relative to it.
+    width: int
+    height: int
+    glyphs: tuple[tuple[str, int, int], ...]
+
+
+class TextRenderer:
+    """
+    Draws text from a device-resident glyph atlas.
+
+    Each glyph is rasterized by Pillow once per font and size, uploaded as an
+    alpha coverage mask into an atlas page on the device and from then on drawn
+    by blitting that region: a string is composed with a single `blend_many`
+    call of its glyphs and colored by one pointwise pass, with no rasterization
+    or upload, so changing the color, e.g. to fade text, costs nothing extra.
+    Fonts and the glyph positions of recently drawn strings are cached too. A
+    counter or a ticker redrawn every frame then costs a few small blits instead
+    of rendering and uploading a new image.
+
+    Glyphs are placed independently at whole-pixel positions, so the result can
+    differ slightly from `render_text`, which rasterizes the whole string at once.
+    Lines are separated by newlines; complex scripts that need shaping beyond
+    per-character advances are not supported. All methods are thread-safe.
+
+    Attributes:
+        page_size (int): Width and height of each atlas page in pixels.
+        max_pages (int): Atlas pages kept between draws. A string needing more
+            adds pages until it is drawn, after which the atlas is emptied.
+
+    Example:
+        >>> text = TextRenderer()
+        >>> for frame, score in frames:
+        ...     text.draw(frame, f"{score:06d}", 60, 980, "/fonts/Roboto-Bold.ttf", 48,
+        ...               RGBA(255, 255, 255), background=RGBA(0, 0, 0, 160))
+    """
+
+    def __init__(self, page_size: int = 1024, max_pages: int = 4, max_layouts: int = 1024):
+        """
+        Creates a renderer with an empty atlas. Pages are allocated as glyphs are added.
+
+        Args:
+            page_size (int, optional): Width and height of each atlas page. Larger
+                glyphs get a page of their own. Defaults to 1024.
+            max_pages (int, optional): Atlas pages kept between draws; once a draw
+                leaves more, the atlas is emptied and refilled with the glyphs
+                in use. Defaults to 4.
+            max_layouts (int, optional): Strings whose layout is cached. Defaults to 1024.
+
+        Raises:
+            ValueError: If an argument is smaller than 1.
+        """
+
+        if page_size < 1 or max_pages < 1 or max_layouts < 1:
+            raise ValueError(f"page_size, max_pages and max_layouts must be >= 1, got {page_size}, {max_pages} and {max_layouts}")
+
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._max_layouts = max_layouts
+
+        self._lock = threading.RLock()
+        self._pages: list[CudaImage] = []
+        # Shelf packing of the page glyphs are added to: current shelf top, its
+        # height, and the next free column on it.
+        self._shelf_page: CudaImage | None = None
+        self._shelf_y = 0
+        self._shelf_height = 0
+        self._shelf_x = 0
+        # (font_path, font_size, character) -> atlas view of the glyph's coverage
+        # in alpha over white, or None for glyphs without pixels such as spaces.
+        self._glyphs: dict[tuple, CudaImage | None] = {}
+        self._layouts: OrderedDict[tuple, _Layout] = OrderedDict()
+
+        self._glyphs_rasterized = 0
+        self._glyphs_drawn = 0
+        self._layout_hits = 0
+        self._layout_misses = 0
+        self._atlas_resets = 0
+        _renderers.add(self)
+
+    def measure(self, text: str, font_path: str, font_size: int = 24) -> tuple[int, int]:
+        """
+        Returns the size of the text's bounding box, without drawing it.
+
+        Args:
+            text (str): The string to measure.
+            font_path (str): Path to a TrueType (.ttf) or OpenType (.otf) font file.
+            font_size (int, optional): Font size in points. Defaults to 24.
+
+        Returns:
+            tuple[int, int]: Width and height in pixels.
+
+        Raises:
+            ValueError: If the font file cannot be loaded.
+        """
+
+        with self._lock:
+            layout = self._layout(text, font_path, font_size)
+        return layout.width, layout.height
+
+    def draw(self,
+             target: CudaImage,
+             text: str,
+             x: int,
+             y: int,
+             font_path: str,
+             font_size: int = 24,
+             color: RGBA = RGBA(0, 0, 0, 255),
+             background: RGBA | None = None) -> tuple[int, int, int, int]:
+        """
+        Draws text onto an image by blitting glyphs from the atlas.
+
+        Args:
+            target (CudaImage): Image to draw onto, e.g. a layer of a `Scene` or a
+                view of a frame. Glyphs outside it are clipped.
+            text (str): The string to draw.
+            x (int): Horizontal position of the text's bounding box.
+            y (int): Vertical position of the text's bounding box.
+            font_path (str): Path to a TrueType (.ttf) or OpenType (.otf) font file.
+            font_size (int, optional): Font size in points. Defaults to 24.
+            color (RGBA, optional): Text color. Defaults to opaque black.
+            background (RGBA, optional): Color to fill the bounding box with before
+                drawing, which erases text drawn there previously. Defaults to
+                None, blending the glyphs over the existing pixels.
+
+        Returns:
+            tuple[int, int, int, int]: The bounding box `(x, y, width, height)` drawn
+                into, e.g. to pass to `Layer.invalidate`.
+
+        Raises:
+            ValueError: If the font file cannot be loaded.
+
+        Example:
+            >>> rect = text.draw(clock_image, "12:04:59", 0, 0, font, 32, background=RGBA(0, 0, 0, 0))
+            >>> clock.invalidate(rect)
+        """
+
+        with self._lock:
+            layout = self._layout(text, font_path, font_size)
+            rect = (x, y, layout.width, layout.height)
+
+            # Pages are only added while the glyphs are gathered, so every view
+            # in `layers` stays valid until they are blended.
+            layers = self._blits(layout, font_path, font_size)
+
+            if background is not None:
+                fill_color(target, background, roi=rect)
+            if layers:
+                if background is not None and background.a == 0:
+                    # Nothing shows through the box, so the coverage can be
+                    # composed and tinted in place.
+                    blend_many(target, [(glyph, x + gx, y + gy) for glyph, gx, gy in layers], rect)
+                    _run_pointwise(target, [_tint_op(color)], roi=rect)
+                else:
+                    self._draw_tinted(target, layout, layers, x, y, color)
+            self._glyphs_drawn += len(layers)
+
+            if len(self._pages) > self.max_pages:
+                self._reset()
+
+        return rect
+
+    def render(self,
+               text: str,
+               font_path: str,
+               font_size: int = 24,
+               color: RGBA = RGBA(0, 0, 0, 255),
+               container: CudaImage | None = None) -> CudaImage:
+        """
+        Draws text into an image sized to fit it, like `render_text`.
+
+        Args:
+            text (str): The string to render.
+            font_path (str): Path to a TrueType (.ttf) or OpenType (.otf) font file.
+            font_size (int, optional): Font size in points. Defaults to 24.
+            color (RGBA, optional): Text color. Defaults to opaque black.
+            container (CudaImage, optional): Pre-allocated image buffer. Must be large
+                enough to hold the text.
+
+        Returns:
+            CudaImage: A new or reused image holding the text on a transparent background.
+
+        Raises:
+            ValueError: If the font file cannot be loaded.
+            ValueError: If the text is larger than the provided container.
+        """
+
+        width, height = self.measure(text, font_path, font_size)
+        width, height = max(width, 1), max(height, 1)
+
+        if container is None:
+            container = CudaImage(width, height)
+        if not container.holds(width, height):
+            raise ValueError(f"Text dimensions exceed container dimensions: {width}x{height}, got {container.width}x{container.height}")
+        container.width = width
+        container.height = height
+
+        self.draw(container, text, 0, 0, font_path, font_size, color, background=RGBA(0, 0, 0, 0))
+        return container
+
+    def stats(self) -> TextRendererStats:
+        """
+        Returns a snapshot of the renderer counters.
+        """
+
+        with self._lock:
+            return TextRendererStats(glyphs_rasterized=self._glyphs_rasterized,
+                                     glyphs_drawn=self._glyphs_drawn,
+                                     layout_hits=self._layout_hits,
+                                     layout_misses=self._layout_misses,
+                                     atlas_pages=len(self._pages),
+                                     atlas_resets=self._atlas_resets,
+                                     )
+
+    def clear(self) -> None:
+        """
+        Frees the atlas and forgets cached layouts. The counters are kept.
+        """
+
+        with self._lock:
+            self._free_pages()
+            self._layouts.clear()
+
+    def free(self) -> None:
+        """
+        Frees the atlas. The renderer remains usable and refills it on the next draw.
+        """
+
+        self.clear()
+
+    def _layout(self, text: str, font_path: str, font_size: int) -> _Layout:
+        key = (font_path, font_size, text)
+        layout = self._layouts.get(key)
+        if layout is not None:
+            self._layouts.move_to_end(key)
+            self._layout_hits += 1
+            return layout
+
+        self._layout_misses += 1
+        font = _load_font(font_path, font_size)
+        line_height = font.getbbox("A")[3] + _LINE_SPACING
+
+        placed = []
+        boxes = []
+        for row, line in enumerate(text.split("\n")):
+            for i, character in enumerate(line):
+                left, top, right, bottom = font.getbbox(character)
+                if right <= left or bottom <= top:
+                    continue
+                # The advance up to a character includes the kerning before it.
+                pen_x = round(font.getlength(line[:i]))
+                gx, gy = pen_x + left, row * line_height + top
+                placed.append((character, gx, gy))
+                boxes.append((gx, gy, gx + right - left, gy + bottom - top))
+
+        if not boxes:
+            layout = _Layout(0, 0, ())
+        else:
+            x0 = min(box[0] for box in boxes)
+            y0 = min(box[1] for box in boxes)
+            x1 = max(box[2] for box in boxes)
+            y1 = max(box[3] for box in boxes)
+            layout = _Layout(x1 - x0, y1 - y0,
+                             tuple((character, gx - x0, gy - y0) for character, gx, gy in placed))
+
+        self._layouts[key] = layout
+        if len(self._layouts) > self._max_layouts:
+            self._layouts.popitem(last=False)
+        return layout
+
+    def _blits(self, layout: _Layout, font_path: str, font_size: int) -> list:
+        layers = []
+        for character, gx, gy in layout.glyphs:
+            glyph = self._glyph(font_path, font_size, character)
+            if glyph is not None:
+                layers.append((glyph, gx, gy))
+        return layers
+
+    def _draw_tinted(self, target: CudaImage, layout: _Layout, layers: list, x: int, y: int, color: RGBA) -> None:
+        # Composes the coverage of the whole string in a scratch image first, so
+        # overlapping glyphs are tinted once and blended over the target together.
+        scratch = CudaImage(layout.width, layout.height)
+        try:
+            fill_color(scratch, _TRANSPARENT)
+            blend_many(scratch, layers)
+            _run_pointwise(scratch, [_tint_op(color)])
+            blend(target, scratch, x, y)
+        finally:
+            scratch.free()
+
+    def _glyph(self, font_path: str, font_size: int, character: str) -> CudaImage | None:
+        key = (font_path, font_size, character)
+        if key in self._glyphs:
+            return self._glyphs[key]
+
+        font = _load_font(font_path, font_size)
+        left, top, right, bottom = font.getbbox(character)
+        width, height = right - left, bottom - top
+        if width <= 0 or height <= 0:
+            self._glyphs[key] = None
+            return None
+
+        bitmap = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        ImageDraw.Draw(bitmap).text((-left, -top), character, fill=(255, 255, 255, 255), font=font)
+
+        glyph = self._allocate(width, height)
+        pil_to_image(bitmap, container=glyph)
+        self._glyphs[key] = glyph
+        self._glyphs_rasterized += 1
+        return glyph
+
+    def _allocate(self, width: int, height: int) -> CudaImage:
+        size = self.page_size
+        if width > size or height > size:
+            # Oversized glyphs get a page of their own.
+            page = CudaImage(width, height)
+            self._pages.append(page)
+            return page.view(0, 0, width, height)
+
+        if self._shelf_page is not None and self._shelf_x + width > size:
+            # Open a new shelf under the current one.
+            self._shelf_y += self._shelf_height
+            self._shelf_height = 0
+            self._shelf_x = 0
+        if self._shelf_page is None or self._shelf_y + height > size:
+            # Pages past max_pages are kept until the draw that needed them
+            # ends; the atlas is emptied there, never while gathering glyphs.
+            self._shelf_page = CudaImage(size, size)
+            self._pages.append(self._shelf_page)
+            self._shelf_y = 0
+            self._shelf_height = 0
+            self._shelf_x = 0
+
+        glyph = self._shelf_page.view(self._shelf_x, self._shelf_y, width, height)
+        self._shelf_x += width
+        self._shelf_height = max(self._shelf_height, height)
+        return glyph
+
+    def _reset(self) -> None:
+        self._free_pages()
+        self._atlas_resets += 1
+
+    def _free_pages(self) -> None:
+        for page in self._pages:
+            page.free()
+        self._pages.clear()
+        self._glyphs.clear()
+        self._shelf_page = None
+        self._shelf_y = 0
+        self._shelf_height = 0
+        self._shelf_x = 0
+
+
+_renderers: "weakref.WeakSet[TextRenderer]" = weakref.WeakSet()
+
+
+def _clear_text_renderers() -> None:
+    # Atlas pages belong to the backend being replaced.
+    for renderer in list(_renderers):
+        renderer.clear()
 
-    host_buf = bytearray(pil_img.tobytes())
-    src_ptr = ffi.cast("uchar4*", ffi.from_buffer(host_buf))
-    copy_to_device(cuda_img.buffer, src_ptr, width, height)
 
-    return cuda_img
\ No newline at end of file
+add_backend_listener(_clear_text_renderers)
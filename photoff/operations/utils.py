@@ -1,5 +1,5 @@
 from ..core.types import CudaImage, RGBA
-from .blend import blend
+from .blend import blend, blend_many
 from .fill import fill_color
 from .resize import resize, ResizeMethod
 
@@ -270,23 +270,15 @@ def create_image_grid(image: CudaImage,
         result = grid_image_cache
     
     fill_color(result, background_color)
-    
-    count = 0
-    for y in range(grid_height):
-        for x in range(grid_width):
-            if count >= num_images:
-                break
-                
-            pos_x = x * (image.width + spacing)
-            pos_y = y * (image.height + spacing)
-            
-            blend(result, image, pos_x, pos_y)
-            
-            count += 1
-        
-        if count >= num_images:
-            break
-    
+
+    layers = []
+    for idx in range(num_images):
+        pos_x = (idx % grid_width) * (image.width + spacing)
+        pos_y = (idx // grid_width) * (image.height + spacing)
+        layers.append((image, pos_x, pos_y))
+
+    blend_many(result, layers)
+
     return result
 
 
@@ -345,11 +337,14 @@ def create_image_collage(images: list[CudaImage],
 
     fill_color(result, background_color)
 
+    layers = []
     for idx, img in enumerate(images):
         col = idx % grid_width
         row = idx // grid_width
         x_pos = col * (img_w + spacing)
         y_pos = row * (img_h + spacing)
-        blend(result, img, x_pos, y_pos)
+        layers.append((img, x_pos, y_pos))
+
+    blend_many(result, layers)
 
     return result
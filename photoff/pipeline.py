@@ -0,0 +1,239 @@
+import inspect
+from dataclasses import dataclass as _dataclass
+from typing import Callable
+from .core.types import CudaImage
+from .operations.fill import fill_color, fill_gradient
+from .operations.filters import (apply_chroma_key, apply_corner_radius, apply_flip,
+                                 apply_grayscale, apply_opacity)
+from .operations.pointwise import (POINTWISE_MAX_OPS, _GENERATORS, _chroma_key_op, _corner_radius_op,
+                                   _fill_color_op, _fill_gradient_op, _flip_mirror, _grayscale_op,
+                                   _opacity_op, _run_pointwise)
+
+
+@_dataclass
+class PipelineStats:
+    """
+    Pass counts of the last `Pipeline.run`.
+
+    Attributes:
+        operations (int): Operations recorded in the pipeline.
+        passes (int): Native calls actually made over the image.
+    """
+    operations: int
+    passes: int
+
+    @property
+    def passes_saved(self) -> int:
+        return self.operations - self.passes
+
+
+class _Step:
+    def __init__(self, operation: Callable, args: tuple, kwargs: dict):
+        self.operation = operation
+        self.args = args
+        self.kwargs = kwargs
+        self.op = None
+        self.mirror = 0
+        self.is_flip = False
+
+        builder = _BUILDERS.get(operation)
+        if builder is not None:
+            bound = inspect.signature(operation).bind(None, *args, **kwargs)
+            bound.apply_defaults()
+            # An operation restricted to a region does not fuse with whole-image ones.
+            if bound.arguments.get("roi") is None:
+                builder(self, bound.arguments)
+
+    @property
+    def kind(self) -> int | None:
+        return self.op.kind if self.op is not None else None
+
+    @property
+    def key_image(self) -> CudaImage | None:
+        return self.op.key_image if self.op is not None else None
+
+    @property
+    def fusable(self) -> bool:
+        return self.op is not None or self.is_flip
+
+
+def _build_fill_color(step: _Step, params: dict) -> None:
+    step.op = _fill_color_op(params["color"])
+
+
+def _build_fill_gradient(step: _Step, params: dict) -> None:
+    step.op = _fill_gradient_op(params["color1"], params["color2"], params["direction"], params["seamless"])
+
+
+def _build_grayscale(step: _Step, params: dict) -> None:
+    step.op = _grayscale_op()
+
+
+def _build_opacity(step: _Step, params: dict) -> None:
+    step.op = _opacity_op(params["opacity"])
+
+
+def _build_corner_radius(step: _Step, params: dict) -> None:
+    step.op = _corner_radius_op(params["size"])
+
+
+def _build_chroma_key(step: _Step, params: dict) -> None:
+    step.op = _chroma_key_op(params["key_image"],
+                             params["channel"],
+                             params["threshold"],
+                             params["invert"],
+                             params["zero_all_channels"],
+                             )
+
+
+def _build_flip(step: _Step, params: dict) -> None:
+    step.mirror = _flip_mirror(params["flip_horizontal"], params["flip_vertical"])
+    step.is_flip = True
+
+
+_BUILDERS = {
+    fill_color: _build_fill_color,
+    fill_gradient: _build_fill_gradient,
+    apply_grayscale: _build_grayscale,
+    apply_opacity: _build_opacity,
+    apply_corner_radius: _build_corner_radius,
+    apply_chroma_key: _build_chroma_key,
+    apply_flip: _build_flip,
+}
+
+
+class Pipeline:
+    """
+    Records image operations and runs consecutive pointwise ones as a single pass.
+
+    `fill_color`, `fill_gradient`, `apply_grayscale`, `apply_opacity`,
+    `apply_corner_radius`, `apply_chroma_key` and `apply_flip` only look at one
+    pixel (or one mirrored pixel) at a time, so a run of them is executed as one
+    read/write pass over the buffer instead of one pass each. Operations before
+    a fill in the same run are skipped since the fill overwrites them. Any other
+    operation, e.g. `apply_gaussian_blur` or `blend`, is called as-is and ends
+    the current run. The result is the same as calling the operations one by one.
+
+    Example:
+        >>> pipeline = (Pipeline()
+        ...             .add(fill_gradient, RGBA(255, 0, 0, 255), RGBA(0, 0, 255, 255), direction=1)
+        ...             .add(apply_grayscale)
+        ...             .add(apply_opacity, 0.5)
+        ...             .add(apply_flip, flip_horizontal=True))
+        >>> pipeline.run(image)
+        >>> print(pipeline.stats.passes_saved)  # 3
+    """
+
+    def __init__(self):
+        self._steps: list[_Step] = []
+        self._stats = PipelineStats(operations=0, passes=0)
+
+    def add(self, operation: Callable, *args, **kwargs) -> "Pipeline":
+        """
+        Records `operation(image, *args, **kwargs)` to run on the pipeline's image.
+
+        Args:
+            operation (Callable): A photoff operation taking the image as its first argument.
+            *args: Remaining positional arguments of the operation.
+            **kwargs: Keyword arguments of the operation.
+
+        Returns:
+            Pipeline: The pipeline itself, for chaining.
+
+        Raises:
+            ValueError: If the arguments of a fusable operation are invalid.
+        """
+
+        self._steps.append(_Step(operation, args, kwargs))
+        return self
+
+    def run(self, image: CudaImage) -> None:
+        """
+        Applies the recorded operations to an image in-place.
+
+        Args:
+            image (CudaImage): Image to process.
+
+        Returns:
+            None
+        """
+
+        passes = 0
+        run = []
+        for step in self._steps:
+            if step.fusable and not _is_same_image(step.key_image, image):
+                run.append(step)
+                continue
+            passes += _run_fused(image, run)
+            run = []
+            step.operation(image, *step.args, **step.kwargs)
+            passes += 1
+        passes += _run_fused(image, run)
+
+        self._stats = PipelineStats(operations=len(self._steps), passes=passes)
+
+    __call__ = run
+
+    @property
+    def stats(self) -> PipelineStats:
+        """
+        Pass counts of the last `run`.
+        """
+
+        return self._stats
+
+
+def _is_same_image(key_image: CudaImage | None, image: CudaImage) -> bool:
+    # A chroma key read from the image being processed would see pixels the
+    # fused pass has already rewritten, so it runs on its own. Views of the
+    # same image may overlap, so they count as the same image too.
+    return key_image is not None and _root(key_image).buffer == _root(image).buffer
+
+
+def _root(image: CudaImage) -> CudaImage:
+    while image.parent is not None:
+        image = image.parent
+    return image
+
+
+def _run_fused(image: CudaImage, steps: list[_Step]) -> int:
+    for i in range(len(steps) - 1, -1, -1):
+        if steps[i].kind in _GENERATORS:
+            steps = steps[i:]
+            break
+
+    passes = 0
+    chunk = []
+    ops = 0
+    for step in steps:
+        if step.kind is not None and ops == POINTWISE_MAX_OPS:
+            passes += _run_chunk(image, chunk)
+            chunk = []
+            ops = 0
+        chunk.append(step)
+        if step.kind is not None:
+            ops += 1
+    if chunk:
+        passes += _run_chunk(image, chunk)
+    return passes
+
+
+def _run_chunk(image: CudaImage, steps: list[_Step]) -> int:
+    ops = [step for step in steps if step.kind is not None]
+
+    # Walk backwards so each operation knows the flips recorded after it.
+    mirrors = []
+    mirror = 0
+    for step in reversed(steps):
+        if step.kind is None:
+            mirror ^= step.mirror
+        else:
+            mirrors.append(mirror)
+    mirrors.reverse()
+    load_mirror = 0 if ops and ops[0].kind in _GENERATORS else mirror
+
+    if not ops and not load_mirror:
+        return 0
+
+    _run_pointwise(image, [step.op for step in ops], mirrors, load_mirror)
+    return 1
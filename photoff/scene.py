@@ -0,0 +1,391 @@
+from dataclasses import dataclass as _dataclass
+from .core.buffer import copy_buffers_same_size
+from .core.types import CudaImage, RGBA
+from .operations.blend import blend_many
+from .operations.fill import fill_color
+from .operations.filters import apply_opacity
+
+# Rectangles are (x, y, width, height), like the `roi` of the operations.
+Rect = tuple[int, int, int, int]
+
+
+@_dataclass
+class SceneStats:
+    """
+    Work done by the last `Scene.render`.
+
+    Attributes:
+        regions (int): Disjoint rectangles that were recomposited.
+        pixels_recomposited (int): Canvas pixels filled and blended again.
+        pixels_total (int): Pixels of the canvas.
+    """
+    regions: int
+    pixels_recomposited: int
+    pixels_total: int
+
+    @property
+    def recomposited_fraction(self) -> float:
+        return self.pixels_recomposited / self.pixels_total if self.pixels_total else 0.0
+
+
+class Layer:
+    """
+    An image placed on a `Scene`, created by `Scene.add_layer`.
+
+    Changing `image`, the position, `opacity` or `visible` marks the area the
+    layer covered and now covers for recompositing. The scene cannot see drawing
+    into the layer's image, so call `invalidate()` after changing its pixels.
+
+    Attributes:
+        image (CudaImage): The layer's pixels.
+        x (int): Horizontal position of the image's top-left corner on the canvas.
+        y (int): Vertical position of the image's top-left corner on the canvas.
+        opacity (float): Multiplier of the image's alpha, between 0.0 and 1.0.
+        visible (bool): Whether the layer is drawn.
+
+    Example:
+        >>> clock = scene.add_layer(clock_image, 1700, 40)
+        >>> draw_text(clock_image, now())
+        >>> clock.invalidate()
+    """
+
+    def __init__(self, scene: "Scene", image: CudaImage, x: int, y: int, opacity: float, visible: bool):
+        self._scene = scene
+        self._image = image
+        self._x = x
+        self._y = y
+        self._opacity = min(max(opacity, 0.0), 1.0)
+        self._visible = visible
+        # Copy of the image with the opacity applied, and the parts of it that
+        # no longer match the image, in layer coordinates.
+        self._faded: CudaImage | None = None
+        self._faded_stale: list[Rect] = []
+
+    @property
+    def image(self) -> CudaImage:
+        return self._image
+
+    @image.setter
+    def image(self, image: CudaImage):
+        self._mark_bounds()
+        self._image = image
+        self._drop_faded()
+        self._mark_bounds()
+
+    @property
+    def x(self) -> int:
+        return self._x
+
+    @x.setter
+    def x(self, value: int):
+        self.move_to(value, self._y)
+
+    @property
+    def y(self) -> int:
+        return self._y
+
+    @y.setter
+    def y(self, value: int):
+        self.move_to(self._x, value)
+
+    @property
+    def opacity(self) -> float:
+        return self._opacity
+
+    @opacity.setter
+    def opacity(self, value: float):
+        value = min(max(value, 0.0), 1.0)
+        if value == self._opacity:
+            return
+        self._opacity = value
+        if self._faded is not None:
+            self._faded_stale = [(0, 0, self._image.width, self._image.height)]
+        self._mark_bounds()
+
+    @property
+    def visible(self) -> bool:
+        return self._visible
+
+    @visible.setter
+    def visible(self, value: bool):
+        if value == self._visible:
+            return
+        self._visible = value
+        self._scene._mark(self.bounds)
+
+    @property
+    def bounds(self) -> Rect:
+        """
+        The canvas rectangle the layer's image covers, `(x, y, width, height)`.
+        """
+
+        return self._x, self._y, self._image.width, self._image.height
+
+    def move_to(self, x: int, y: int) -> None:
+        """
+        Moves the layer's top-left corner to `(x, y)` on the canvas.
+        """
+
+        if (x, y) == (self._x, self._y):
+            return
+        self._mark_bounds()
+        self._x = x
+        self._y = y
+        self._mark_bounds()
+
+    def invalidate(self, rect: Rect | None = None) -> None:
+        """
+        Marks pixels of the layer's image as changed.
+
+        Args:
+            rect (tuple[int, int, int, int], optional): `(x, y, width, height)` in
+                image coordinates. Defaults to the whole image.
+        """
+
+        if rect is None:
+            rect = (0, 0, self._image.width, self._image.height)
+        if self._faded is not None:
+            self._faded_stale.append(rect)
+        if self._visible:
+            x, y, width, height = rect
+            self._scene._mark((self._x + x, self._y + y, width, height))
+
+    def _mark_bounds(self) -> None:
+        if self._visible:
+            self._scene._mark(self.bounds)
+
+    def _source(self) -> CudaImage:
+        # The image to blend: the image itself, or its faded copy.
+        if self._opacity >= 1.0:
+            return self._image
+
+        width, height = self._image.width, self._image.height
+        if self._faded is None or not self._faded.holds(width, height):
+            self._drop_faded()
+            self._faded = CudaImage(width, height)
+            self._faded_stale = [(0, 0, width, height)]
+        self._faded.width = width
+        self._faded.height = height
+
+        for x, y, w, h in _merge_rects(_clip(rect, width, height) for rect in self._faded_stale):
+            faded = self._faded.view(x, y, w, h)
+            source = self._image.view(x, y, w, h)
+            copy_buffers_same_size(faded.buffer, source.buffer, w, h, faded.pitch, source.pitch)
+            apply_opacity(faded, self._opacity)
+        self._faded_stale = []
+        return self._faded
+
+    def _drop_faded(self) -> None:
+        if self._faded is not None:
+            self._faded.free()
+            self._faded = None
+        self._faded_stale = []
+
+
+class Scene:
+    """
+    Persistent canvas of positioned layers that recomposites only what changed.
+
+    Each `render()` collects the rectangles touched since the previous one (layers
+    added, removed, moved, shown, hidden, faded or redrawn), merges overlapping ones
+    into disjoint regions and, for each region only, refills the background and
+    blends the layers over it in order with one `blend_many` call. The rest of the
+    canvas keeps last frame's pixels. For an overlay where only a clock changes,
+    a frame costs the clock's area instead of the whole canvas.
+
+    Attributes:
+        canvas (CudaImage): The composited image.
+        background (RGBA): Color under all layers.
+        layers (list[Layer]): Layers from bottom to top.
+        stats (SceneStats): Work done by the last `render`.
+
+    Example:
+        >>> scene = Scene(1920, 1080)
+        >>> scene.add_layer(backdrop)
+        >>> counter = scene.add_layer(counter_image, 60, 980)
+        >>> for frame in frames:
+        ...     draw_counter(counter_image, frame)
+        ...     counter.invalidate()
+        ...     save_image(scene.render(), f"out/{frame:05d}.png")
+        >>> print(scene.stats.recomposited_fraction)
+    """
+
+    def __init__(self,
+                 width: int,
+                 height: int,
+                 background: RGBA = RGBA(0, 0, 0, 0),
+                 canvas: CudaImage | None = None):
+        """
+        Creates an empty scene.
+
+        Args:
+            width (int): Canvas width in pixels.
+            height (int): Canvas height in pixels.
+            background (RGBA, optional): Color under all layers. Defaults to transparent.
+            canvas (CudaImage, optional): Image to composite into, e.g. a view of a
+                larger frame. Must match the scene size. Allocated if not provided.
+
+        Raises:
+            ValueError: If the canvas does not match the scene size.
+        """
+
+        if canvas is None:
+            canvas = CudaImage(width, height)
+            self._owns_canvas = True
+        else:
+            if canvas.width != width or canvas.height != height:
+                raise ValueError(f"Canvas dimensions must match scene dimensions: {width}x{height}, got {canvas.width}x{canvas.height}")
+            self._owns_canvas = False
+
+        self.canvas = canvas
+        self._background = background
+        self._layers: list[Layer] = []
+        self._dirty: list[Rect] = [(0, 0, width, height)]
+        self.stats = SceneStats(regions=0, pixels_recomposited=0, pixels_total=width * height)
+
+    @property
+    def width(self) -> int:
+        return self.canvas.width
+
+    @property
+    def height(self) -> int:
+        return self.canvas.height
+
+    @property
+    def background(self) -> RGBA:
+        return self._background
+
+    @background.setter
+    def background(self, color: RGBA):
+        if color != self._background:
+            self._background = color
+            self.invalidate()
+
+    @property
+    def layers(self) -> list[Layer]:
+        return list(self._layers)
+
+    def add_layer(self,
+                  image: CudaImage,
+                  x: int = 0,
+                  y: int = 0,
+                  opacity: float = 1.0,
+                  visible: bool = True,
+                  index: int | None = None) -> Layer:
+        """
+        Places an image on the scene.
+
+        Args:
+            image (CudaImage): The layer's pixels. The scene keeps a reference, not a copy.
+            x (int, optional): Horizontal position of the top-left corner. Defaults to 0.
+            y (int, optional): Vertical position of the top-left corner. Defaults to 0.
+            opacity (float, optional): Alpha multiplier between 0.0 and 1.0. Defaults to 1.0.
+            visible (bool, optional): Whether the layer is drawn. Defaults to True.
+            index (int, optional): Stacking position, 0 being the bottom. Defaults to the top.
+
+        Returns:
+            Layer: Handle used to move, fade, hide, redraw or remove the layer.
+        """
+
+        layer = Layer(self, image, x, y, opacity, visible)
+        if index is None:
+            self._layers.append(layer)
+        else:
+            self._layers.insert(index, layer)
+        layer._mark_bounds()
+        return layer
+
+    def remove_layer(self, layer: Layer) -> None:
+        """
+        Removes a layer from the scene and frees its faded copy, if any.
+
+        Raises:
+            ValueError: If the layer does not belong to the scene.
+        """
+
+        self._layers.remove(layer)
+        layer._mark_bounds()
+        layer._drop_faded()
+
+    def invalidate(self, rect: Rect | None = None) -> None:
+        """
+        Marks a canvas rectangle for recompositing, e.g. after drawing onto the canvas.
+
+        Args:
+            rect (tuple[int, int, int, int], optional): `(x, y, width, height)`.
+                Defaults to the whole canvas.
+        """
+
+        self._mark(rect if rect is not None else (0, 0, self.width, self.height))
+
+    def render(self) -> CudaImage:
+        """
+        Recomposites the regions changed since the last render.
+
+        Returns:
+            CudaImage: The canvas, up to date. With nothing changed it is returned
+                without any work.
+        """
+
+        regions = _merge_rects(self._dirty)
+        self._dirty = []
+
+        if regions:
+            sources = [(layer._source(), layer.x, layer.y)
+                       for layer in self._layers
+                       if layer.visible and layer.opacity > 0.0]
+            for region in regions:
+                fill_color(self.canvas, self._background, roi=region)
+                blend_many(self.canvas, sources, roi=region)
+
+        self.stats = SceneStats(regions=len(regions),
+                                pixels_recomposited=sum(w * h for _, _, w, h in regions),
+                                pixels_total=self.width * self.height)
+        return self.canvas
+
+    def free(self) -> None:
+        """
+        Frees the canvas, if the scene allocated it, and the layers' faded copies.
+        Layer images belong to the caller and are not freed.
+        """
+
+        for layer in self._layers:
+            layer._drop_faded()
+        if self._owns_canvas:
+            self.canvas.free()
+
+    def _mark(self, rect: Rect) -> None:
+        rect = _clip(rect, self.width, self.height)
+        if rect[2] and rect[3]:
+            self._dirty.append(rect)
+
+
+def _clip(rect: Rect, width: int, height: int) -> Rect:
+    x, y, w, h = rect
+    x0 = min(max(x, 0), width)
+    y0 = min(max(y, 0), height)
+    x1 = min(max(x + w, 0), width)
+    y1 = min(max(y + h, 0), height)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def _merge_rects(rects) -> list[Rect]:
+    # Merges overlapping or touching rectangles into their bounding boxes until
+    # the result is disjoint, so no pixel is composited twice.
+    merged: list[Rect] = []
+    for x, y, w, h in rects:
+        if not w or not h:
+            continue
+        x0, y0, x1, y1 = x, y, x + w, y + h
+        i = 0
+        while i < len(merged):
+            mx, my, mw, mh = merged[i]
+            if mx <= x1 and x0 <= mx + mw and my <= y1 and y0 <= my + mh:
+                x0, y0 = min(x0, mx), min(y0, my)
+                x1, y1 = max(x1, mx + mw), max(y1, my + mh)
+                merged.pop(i)
+                i = 0
+            else:
+                i += 1
+        merged.append((x0, y0, x1 - x0, y1 - y0))
+    return merged
@@ -0,0 +1,820 @@
+import os
+import queue
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass as _dataclass
+from typing import Callable, Iterable
+from PIL import Image
+from .core.buffer import copy_buffers_same_size, copy_to_device, copy_to_host
+from .core.types import CudaImage, _import_numpy
+from .io.saving import _write
+from .io.staging import StagingBuffer, _paste_rgba
+
+DEFAULT_RING_SIZE = 3
+
+_Y4M_MAGIC = b"YUV4MPEG2"
+
+
+class FrameSource(ABC):
+    """
+    Produces RGBA frames in host memory for a `FramePipeline`.
+
+    Attributes:
+        fps (float | None): Frame rate declared by the source, if any.
+    """
+
+    fps: float | None = None
+
+    @abstractmethod
+    def read(self) -> tuple[int, int, StagingBuffer] | None:
+        """
+        Reads the next frame.
+
+        Returns:
+            tuple[int, int, StagingBuffer] | None: `(width, height, staging)` with the
+                pixels packed at the start of `staging`, valid until the next call.
+                None at the end of the sequence.
+        """
+
+    def close(self) -> None:
+        """
+        Releases the file and host buffers of the source.
+        """
+
+    def __enter__(self) -> "FrameSource":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+class FrameSink(ABC):
+    """
+    Consumes RGBA frames from host memory for a `FramePipeline`.
+
+    Attributes:
+        fps (float | None): Frame rate to declare, for formats that store one.
+            None lets the pipeline use the source's.
+    """
+
+    fps: float | None = None
+
+    @abstractmethod
+    def write(self, width: int, height: int, memory) -> None:
+        """
+        Writes one frame.
+
+        Args:
+            width (int): Frame width in pixels.
+            height (int): Frame height in pixels.
+            memory: Buffer of `width * height` packed RGBA pixels, only valid
+                during the call.
+        """
+
+    def close(self) -> None:
+        """
+        Flushes the sink and releases its file.
+        """
+
+    def __enter__(self) -> "FrameSink":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def _open_file(target, mode: str):
+    # Returns (file, owned). '-' is stdin or stdout; file objects such as a
+    # subprocess pipe are used as they are and left open.
+    if isinstance(target, (str, os.PathLike)):
+        if os.fspath(target) == "-":
+            return (sys.stdin.buffer if "r" in mode else sys.stdout.buffer), False
+        return open(target, mode), True
+    return target, False
+
+
+def _read_exactly(f, memory) -> bool:
+    # Fills `memory` from a file or pipe, which may return short reads.
+    # Returns False at a clean end of stream.
+    view = memoryview(memory).cast("B")
+    filled = 0
+    while filled < len(view):
+        count = f.readinto(view[filled:])
+        if not count:
+            if filled == 0:
+                return False
+            raise ValueError(f"Truncated frame: got {filled} of {len(view)} bytes")
+        filled += count
+    return True
+
+
+def _staging(staging: StagingBuffer | None, width: int, height: int) -> StagingBuffer:
+    # Reuses a staging buffer while the frame fits, replacing it otherwise.
+    if staging is not None and staging.holds(width, height):
+        return staging
+    if staging is not None:
+        staging.free()
+    return StagingBuffer(width, height)
+
+
+class RawVideoReader(FrameSource):
+    """
+    Reads packed 8-bit RGBA frames, e.g. ffmpeg's `-f rawvideo -pix_fmt rgba` output.
+
+    Frames have no header, so their size must be given. Each frame is read
+    straight into a page-locked staging buffer.
+
+    Args:
+        source (str | file): Path, '-' for stdin, or a binary file object such
+            as `subprocess.Popen(...).stdout`. File objects are not closed.
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+        fps (float, optional): Frame rate to declare to the sink.
+
+    Example:
+        >>> ffmpeg = subprocess.Popen(["ffmpeg", "-i", "in.mp4", "-f", "rawvideo",
+        ...                            "-pix_fmt", "rgba", "-"], stdout=subprocess.PIPE)
+        >>> source = RawVideoReader(ffmpeg.stdout, 1920, 1080, fps=30)
+    """
+
+    def __init__(self, source, width: int, height: int, fps: float | None = None):
+        if width < 1 or height < 1:
+            raise ValueError(f"Frame size must be positive, got {width}x{height}")
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self._file, self._owned = _open_file(source, "rb")
+        self._staging: StagingBuffer | None = None
+
+    def read(self) -> tuple[int, int, StagingBuffer] | None:
+        self._staging = _staging(self._staging, self.width, self.height)
+        if not _read_exactly(self._file, self._staging.memory(self.width, self.height)):
+            return None
+        return self.width, self.height, self._staging
+
+    def close(self) -> None:
+        if self._owned:
+            self._file.close()
+        if self._staging is not None:
+            self._staging.free()
+            self._staging = None
+
+
+class RawVideoWriter(FrameSink):
+    """
+    Writes packed 8-bit RGBA frames, e.g. for ffmpeg's `-f rawvideo -pix_fmt rgba -i -`.
+
+    Args:
+        target (str | file): Path, '-' for stdout, or a binary file object such
+            as `subprocess.Popen(...).stdin`. File objects are flushed, not closed.
+    """
+
+    def __init__(self, target):
+        self._file, self._owned = _open_file(target, "wb")
+
+    def write(self, width: int, height: int, memory) -> None:
+        self._file.write(memory)
+
+    def close(self) -> None:
+        if self._owned:
+            self._file.close()
+        else:
+            self._file.flush()
+
+
+class Y4MReader(FrameSource):
+    """
+    Reads YUV4MPEG2 (`.y4m`) frames and converts them to RGBA.
+
+    Supports 8-bit 4:2:0, 4:2:2, 4:4:4 and mono streams, decoded as BT.601
+    limited range, which is what ffmpeg writes by default. Chroma is upsampled
+    by replication. The conversion runs on the host with NumPy.
+
+    Args:
+        source (str | file): Path, '-' for stdin, or a binary file object.
+            File objects are not closed.
+
+    Attributes:
+        width (int): Frame width from the stream header.
+        height (int): Frame height from the stream header.
+        fps (float | None): Frame rate from the stream header.
+
+    Raises:
+        ImportError: If NumPy is not installed.
+        ValueError: If the stream is not YUV4MPEG2 or uses an unsupported colorspace.
+    """
+
+    _CHROMA = {"420": (2, 2), "420jpeg": (2, 2), "420paldv": (2, 2), "420mpeg2": (2, 2),
+               "422": (2, 1), "444": (1, 1), "mono": None}
+
+    def __init__(self, source):
+        self._np = _import_numpy()
+        self._file, self._owned = _open_file(source, "rb")
+        self.fps = None
+        colorspace = "420jpeg"
+        try:
+            tokens = self._file.readline().split()
+            if not tokens or tokens[0] != _Y4M_MAGIC:
+                raise ValueError("Not a YUV4MPEG2 stream")
+            params = {token[:1].decode(): token[1:].decode() for token in tokens[1:]}
+            self.width = int(params["W"])
+            self.height = int(params["H"])
+            if "F" in params:
+                numerator, denominator = params["F"].split(":")
+                if int(denominator):
+                    self.fps = int(numerator) / int(denominator)
+            colorspace = params.get("C", colorspace)
+            if colorspace not in self._CHROMA:
+                raise ValueError(f"Unsupported Y4M colorspace {colorspace}; "
+                                 f"expected one of {', '.join(self._CHROMA)}")
+        except BaseException:
+            if self._owned:
+                self._file.close()
+            raise
+
+        self._subsampling = self._CHROMA[colorspace]
+        luma = self.width * self.height
+        if self._subsampling is None:
+            self._chroma_size = (0, 0)
+        else:
+            sx, sy = self._subsampling
+            self._chroma_size = (-(-self.width // sx), -(-self.height // sy))
+        chroma = self._chroma_size[0] * self._chroma_size[1]
+        self._planes = bytearray(luma + 2 * chroma)
+        self._staging: StagingBuffer | None = None
+
+    def read(self) -> tuple[int, int, StagingBuffer] | None:
+        np = self._np
+        line = self._file.readline()
+        if not line:
+            return None
+        if not line.startswith(b"FRAME"):
+            raise ValueError("Corrupt Y4M stream: missing FRAME marker")
+        if not _read_exactly(self._file, self._planes):
+            raise ValueError("Truncated frame: got 0 bytes after FRAME marker")
+
+        width, height = self.width, self.height
+        planes = np.frombuffer(self._planes, dtype=np.uint8)
+        y = planes[:width * height].reshape(height, width)
+        if self._subsampling is None:
+            u = v = None
+        else:
+            chroma_width, chroma_height = self._chroma_size
+            chroma = chroma_width * chroma_height
+            sx, sy = self._subsampling
+            u, v = (planes[width * height + i * chroma:width * height + (i + 1) * chroma]
+                    .reshape(chroma_height, chroma_width)
+                    .repeat(sy, axis=0).repeat(sx, axis=1)[:height, :width]
+                    for i in range(2))
+
+        self._staging = _staging(self._staging, width, height)
+        out = np.frombuffer(self._staging.memory(width, height), dtype=np.uint8).reshape(height, width, 4)
+        _yuv_to_rgba(np, y, u, v, out)
+        return width, height, self._staging
+
+    def close(self) -> None:
+        if self._owned:
+            self._file.close()
+        if self._staging is not None:
+            self._staging.free()
+            self._staging = None
+
+
+class Y4MWriter(FrameSink):
+    """
+    Writes frames as YUV4MPEG2 (`.y4m`), e.g. for `ffmpeg -f yuv4mpegpipe -i -`.
+
+    Frames are converted from RGBA to BT.601 limited range YUV on the host with
+    NumPy; alpha is dropped. The stream header is written with the first frame,
+    whose size every later frame must match.
+
+    Args:
+        target (str | file): Path, '-' for stdout, or a binary file object.
+            File objects are flushed, not closed.
+        fps (float, optional): Frame rate to declare. Defaults to the source's,
+            or 30 if it has none.
+        chroma (str, optional): '420' for 4:2:0 subsampling, which every player
+            accepts, or '444' to keep full chroma. Defaults to '420'.
+
+    Raises:
+        ImportError: If NumPy is not installed.
+        ValueError: If `chroma` is not '420' or '444'.
+    """
+
+    def __init__(self, target, fps: float | None = None, chroma: str = "420"):
+        if chroma not in ("420", "444"):
+            raise ValueError(f"chroma must be '420' or '444', got {chroma!r}")
+        self._np = _import_numpy()
+        self.fps = fps
+        self.chroma = chroma
+        self._file, self._owned = _open_file(target, "wb")
+        self._size: tuple[int, int] | None = None
+
+    def write(self, width: int, height: int, memory) -> None:
+        np = self._np
+        if self._size is None:
+            self._size = (width, height)
+            numerator, denominator = _frame_rate(self.fps or 30)
+            colorspace = "420jpeg" if self.chroma == "420" else "444"
+            self._file.write(b"YUV4MPEG2 W%d H%d F%d:%d Ip A1:1 C%s\n"
+                             % (width, height, numerator, denominator, colorspace.encode()))
+        elif self._size != (width, height):
+            raise ValueError(f"Y4M frames must all be {self._size[0]}x{self._size[1]}, got {width}x{height}")
+
+        rgba = np.frombuffer(memory, dtype=np.uint8).reshape(height, width, 4)
+        y, u, v = _rgba_to_yuv(np, rgba, self.chroma == "420")
+        self._file.write(b"FRAME\n")
+        for plane in (y, u, v):
+            self._file.write(plane.tobytes())
+
+    def close(self) -> None:
+        if self._owned:
+            self._file.close()
+        else:
+            self._file.flush()
+
+
+def _frame_rate(fps: float) -> tuple[int, int]:
+    # NTSC rates such as 29.97 are exactly 30000:1001.
+    for denominator in (1, 1001):
+        numerator = fps * denominator
+        if abs(numerator - round(numerator)) < 1e-3 * denominator:
+            return round(numerator), denominator
+    return round(fps * 1000), 1000
+
+
+def _yuv_to_rgba(np, y, u, v, out) -> None:
+    luma = (y.astype(np.float32) - 16.0) * 1.164
+    if u is None:
+        red = green = blue = luma
+    else:
+        u = u.astype(np.float32) - 128.0
+        v = v.astype(np.float32) - 128.0
+        red = luma + 1.596 * v
+        green = luma - 0.392 * u - 0.813 * v
+        blue = luma + 2.017 * u
+    for channel, value in enumerate((red, green, blue)):
+        out[..., channel] = np.clip(value + 0.5, 0, 255)
+    out[..., 3] = 255
+
+
+def _rgba_to_yuv(np, rgba, subsample: bool):
+    rgb = rgba[..., :3].astype(np.float32)
+    y = rgb @ np.array([0.257, 0.504, 0.098], dtype=np.float32) + 16.0
+    u = rgb @ np.array([-0.148, -0.291, 0.439], dtype=np.float32) + 128.0
+    v = rgb @ np.array([0.439, -0.368, -0.071], dtype=np.float32) + 128.0
+    if subsample:
+        height, width = y.shape
+        pad = ((0, height % 2), (0, width % 2))
+        u, v = (np.pad(plane, pad, mode="edge") for plane in (u, v))
+        u, v = ((plane[0::2, 0::2] + plane[1::2, 0::2] + plane[0::2, 1::2] + plane[1::2, 1::2]) * 0.25
+                for plane in (u, v))
+    return tuple(np.clip(plane + 0.5, 0, 255).astype(np.uint8) for plane in (y, u, v))
+
+
+def _frame_path(pattern: str, index: int) -> str:
+    # printf-style patterns as used by ffmpeg ('%05d'), or str.format ('{:05d}').
+    return pattern % index if "%" in pattern else pattern.format(index)
+
+
+class ImageSequenceReader(FrameSource):
+    """
+    Reads a numbered sequence of image files, decoded by Pillow.
+
+    Args:
+        frames (str | Iterable[str]): A pattern such as 'in/%05d.png' or
+            'in/{:05d}.png', read from `start` until the first missing number,
+            or an iterable of paths.
+        start (int, optional): First frame number of a pattern. Defaults to 0.
+        fps (float, optional): Frame rate to declare to the sink.
+
+    Example:
+        >>> source = ImageSequenceReader("frames/%05d.png", start=1, fps=24)
+    """
+
+    def __init__(self, frames: str | Iterable[str], start: int = 0, fps: float | None = None):
+        self.fps = fps
+        if isinstance(frames, str):
+            self._paths = None
+            self._pattern = frames
+            self._next = start
+        else:
+            self._paths = iter(frames)
+        self._staging: StagingBuffer | None = None
+
+    def read(self) -> tuple[int, int, StagingBuffer] | None:
+        if self._paths is not None:
+            path = next(self._paths, None)
+            if path is None:
+                return None
+        else:
+            path = _frame_path(self._pattern, self._next)
+            if not os.path.exists(path):
+                return None
+            self._next += 1
+
+        with Image.open(path) as img:
+            if img.mode != "RGBA":
+                img = img.convert("RGBA")
+            width, height = img.size
+            self._staging = _staging(self._staging, width, height)
+            img.load()
+            _paste_rgba(img, self._staging.memory(width, height))
+        return width, height, self._staging
+
+    def close(self) -> None:
+        if self._staging is not None:
+            self._staging.free()
+            self._staging = None
+
+
+class ImageSequenceWriter(FrameSink):
+    """
+    Writes each frame to a numbered image file, encoded by Pillow.
+
+    Args:
+        pattern (str): Destination pattern such as 'out/%05d.png' or 'out/{:05d}.jpg'.
+        start (int, optional): Number of the first frame. Defaults to 0.
+        format (str, optional): Pillow format name. Inferred from the extension by default.
+        **params: Encoder options forwarded to `PIL.Image.save`, such as
+            `compress_level` for PNG or `quality` for JPEG.
+    """
+
+    def __init__(self, pattern: str, start: int = 0, format: str | None = None, **params):
+        self.pattern = pattern
+        self.format = format
+        self.params = params
+        self._next = start
+
+    def write(self, width: int, height: int, memory) -> None:
+        img = Image.frombuffer("RGBA", (width, height), memory, "raw", "RGBA", 0, 1)
+        try:
+            _write(img, _frame_path(self.pattern, self._next), self.format, self.params)
+        finally:
+            img.close()
+        self._next += 1
+
+
+def _as_source(source, size: tuple[int, int] | None, fps: float | None) -> FrameSource:
+    if isinstance(source, FrameSource):
+        return source
+    if isinstance(source, (str, os.PathLike)) and os.fspath(source) != "-":
+        path = os.fspath(source)
+        if path.lower().endswith(".y4m"):
+            return Y4MReader(path)
+        if "%" in path or "{" in path:
+            return ImageSequenceReader(path, fps=fps)
+    elif not isinstance(source, (str, os.PathLike)) and not hasattr(source, "readinto"):
+        return ImageSequenceReader(source, fps=fps)
+    if size is None:
+        raise ValueError("size=(width, height) is required to read raw RGBA frames")
+    return RawVideoReader(source, *size, fps=fps)
+
+
+def _as_sink(sink) -> FrameSink | None:
+    if sink is None or isinstance(sink, FrameSink):
+        return sink
+    if isinstance(sink, (str, os.PathLike)) and os.fspath(sink) != "-":
+        path = os.fspath(sink)
+        if path.lower().endswith(".y4m"):
+            return Y4MWriter(path)
+        if "%" in path or "{" in path:
+            return ImageSequenceWriter(path)
+    return RawVideoWriter(sink)
+
+
+@_dataclass
+class FrameStats:
+    """
+    Counters of a `FramePipeline` run.
+
+    The stage times are the time each stage spent working rather than waiting
+    for the others; the largest one is the bottleneck.
+
+    Attributes:
+        frames (int): Frames that went through every stage.
+        dropped (int): Frames read but discarded because every ring buffer was busy.
+        elapsed (float): Seconds since the run started.
+        read_time (float): Seconds spent reading and uploading.
+        process_time (float): Seconds spent in the callback.
+        write_time (float): Seconds spent downloading and writing.
+    """
+    frames: int
+    dropped: int
+    elapsed: float
+    read_time: float
+    process_time: float
+    write_time: float
+
+    @property
+    def fps(self) -> float:
+        # Sustained throughput over the whole run.
+        return self.frames / self.elapsed if self.elapsed else 0.0
+
+
+class _Slot:
+    # One ring entry: the uploaded frame, and a copy of the callback's result
+    # when it returned an image the pipeline does not own.
+    def __init__(self):
+        self.image: CudaImage | None = None
+        self.output: CudaImage | None = None
+        self.result: CudaImage | None = None
+        self.index = 0
+
+    def free(self) -> None:
+        for image in (self.image, self.output):
+            if image is not None:
+                image.free()
+        self.image = self.output = self.result = None
+
+
+class FramePipeline:
+    """
+    Streams frames through a callback: read and upload, process, download and write.
+
+    The three stages run on their own threads and hand frames along through a
+    ring of `ring_size` reusable `CudaImage` buffers, so reading frame n+1 and
+    writing frame n-1 overlap with processing frame n. The callback runs on the
+    thread that called `run()`. It receives each uploaded frame and its index
+    in the source, and either modifies the frame in place and returns None, or
+    returns another image to write, which is copied before the callback is
+    called again, so it may be reused across frames.
+
+    By default a slow stage makes the reader wait, so every frame is written.
+    With `drop_frames`, a frame that arrives while every ring buffer is busy is
+    discarded instead, which keeps a live source such as a capture pipe from
+    backing up; `FrameStats.dropped` counts them.
+
+    Args:
+        source: A `FrameSource`, or what to open as one: a '.y4m' path, an
+            image sequence pattern ('%05d' or '{:05d}'), a list of image paths,
+            or a path, '-' or binary file object of raw RGBA frames (needs `size`).
+        sink (optional): A `FrameSink`, or a '.y4m' path, an image sequence
+            pattern, or a path, '-' or binary file object for raw RGBA frames.
+            Defaults to no output.
+        process (Callable[[CudaImage, int], CudaImage | None], optional): The
+            per-frame callback. Defaults to passing frames through unchanged.
+        size (tuple[int, int], optional): `(width, height)` of raw RGBA frames.
+        fps (float, optional): Frame rate of raw frames and image sequences.
+        ring_size (int, optional): Number of frame buffers. Defaults to 3, one
+            per stage.
+        drop_frames (bool, optional): Discard frames instead of waiting when the
+            ring is full. Defaults to False.
+
+    Raises:
+        ValueError: If `ring_size` is smaller than 1, or raw frames have no `size`.
+
+    Example:
+        >>> def overlay(frame, index):
+        ...     blend(frame, logo, 20, 20)
+        >>> ffmpeg = subprocess.Popen(["ffmpeg", "-i", "in.mp4", "-f", "yuv4mpegpipe", "-"],
+        ...                           stdout=subprocess.PIPE)
+        >>> stats = FramePipeline(Y4MReader(ffmpeg.stdout), "out/%05d.png", overlay).run()
+        >>> print(f"{stats.fps:.1f} fps, {stats.dropped} dropped")
+    """
+
+    def __init__(self,
+                 source,
+                 sink=None,
+                 process: Callable[[CudaImage, int], CudaImage | None] | None = None,
+                 size: tuple[int, int] | None = None,
+                 fps: float | None = None,
+                 ring_size: int = DEFAULT_RING_SIZE,
+                 drop_frames: bool = False):
+        if ring_size < 1:
+            raise ValueError(f"ring_size must be >= 1, got {ring_size}")
+
+        self.source = _as_source(source, size, fps)
+        try:
+            self.sink = _as_sink(sink)
+        except BaseException:
+            self.source.close()
+            raise
+        if self.sink is not None and self.sink.fps is None:
+            self.sink.fps = self.source.fps
+        self.process = process
+        self.ring_size = ring_size
+        self.drop_frames = drop_frames
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._error: BaseException | None = None
+        self._started = None
+        self._frames = 0
+        self._dropped = 0
+        self._times = [0.0, 0.0, 0.0]
+
+    def run(self, max_frames: int | None = None) -> FrameStats:
+        """
+        Processes frames until the source ends, `max_frames` are read or `stop()` is called.
+
+        The source and sink are closed when the run ends, so a pipeline runs once.
+
+        Args:
+            max_frames (int, optional): Number of source frames to read, dropped
+                ones included. Defaults to all.
+
+        Returns:
+            FrameStats: Counters of the run.
+
+        Raises:
+            Exception: The first error raised by the source, the callback or the sink.
+        """
+
+        slots = [_Slot() for _ in range(self.ring_size)]
+        free: queue.Queue = queue.Queue()
+        ready: queue.Queue = queue.Queue()
+        done: queue.Queue = queue.Queue()
+        for slot in slots:
+            free.put(slot)
+
+        self._started = time.perf_counter()
+        reader = threading.Thread(target=self._read_stage, args=(free, ready, max_frames),
+                                  name="photoff-frames-read", daemon=True)
+        writer = threading.Thread(target=self._write_stage, args=(free, done),
+                                  name="photoff-frames-write", daemon=True)
+        reader.start()
+        writer.start()
+        try:
+            self._process_stage(free, ready, done)
+        finally:
+            self._stop.set()
+            writer.join()
+            reader.join()
+            elapsed = time.perf_counter() - self._started
+            for slot in slots:
+                slot.free()
+            try:
+                self.source.close()
+            finally:
+                if self.sink is not None:
+                    self.sink.close()
+
+        stats = self.stats()
+        stats.elapsed = elapsed
+        if self._error is not None:
+            raise self._error
+        return stats
+
+    def stop(self) -> None:
+        """
+        Makes a running `run()` return after the frames already read. Thread-safe.
+        """
+
+        self._stop.set()
+
+    def stats(self) -> FrameStats:
+        """
+        Returns a snapshot of the counters, also while running on another thread.
+        """
+
+        with self._lock:
+            elapsed = time.perf_counter() - self._started if self._started is not None else 0.0
+            return FrameStats(frames=self._frames,
+                              dropped=self._dropped,
+                              elapsed=elapsed,
+                              read_time=self._times[0],
+                              process_time=self._times[1],
+                              write_time=self._times[2],
+                              )
+
+    def _fail(self, error: BaseException) -> None:
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+    def _add_time(self, stage: int, start: float) -> None:
+        with self._lock:
+            self._times[stage] += time.perf_counter() - start
+
+    def _read_stage(self, free: queue.Queue, ready: queue.Queue, max_frames: int | None) -> None:
+        index = 0
+        try:
+            while not self._stop.is_set() and (max_frames is None or index < max_frames):
+                start = time.perf_counter()
+                frame = self.source.read()
+                if frame is None:
+                    break
+                width, height, staging = frame
+                index += 1
+                if self.drop_frames:
+                    try:
+                        slot = free.get_nowait()
+                    except queue.Empty:
+                        with self._lock:
+                            self._dropped += 1
+                        continue
+                else:
+                    self._add_time(0, start)
+                    slot = free.get()
+                    start = time.perf_counter()
+
+                if slot.image is None or not slot.image.holds(width, height):
+                    if slot.image is not None:
+                        slot.image.free()
+                    slot.image = CudaImage(width, height)
+                slot.image.width = width
+                slot.image.height = height
+                copy_to_device(slot.image.buffer, staging.buffer, width, height, slot.image.pitch)
+                slot.index = index - 1
+                ready.put(slot)
+                self._add_time(0, start)
+        except BaseException as error:
+            self._fail(error)
+        finally:
+            ready.put(None)
+
+    def _process_stage(self, free: queue.Queue, ready: queue.Queue, done: queue.Queue) -> None:
+        try:
+            while True:
+                slot = ready.get()
+                if slot is None:
+                    break
+                if self._error is not None:
+                    # Drain: hand the buffer back so the reader can finish.
+                    free.put(slot)
+                    continue
+                start = time.perf_counter()
+                try:
+                    result = self.process(slot.image, slot.index) if self.process is not None else None
+                    if result is None or result is slot.image:
+                        slot.result = slot.image
+                    else:
+                        slot.result = self._keep(slot, result)
+                except BaseException as error:
+                    self._fail(error)
+                    free.put(slot)
+                    continue
+                self._add_time(1, start)
+                done.put(slot)
+        finally:
+            done.put(None)
+
+    def _keep(self, slot: _Slot, image: CudaImage) -> CudaImage:
+        # Copies a result the callback may overwrite for the next frame.
+        width, height = image.width, image.height
+        if slot.output is None or not slot.output.holds(width, height):
+            if slot.output is not None:
+                slot.output.free()
+            slot.output = CudaImage(width, height)
+        slot.output.width = width
+        slot.output.height = height
+        copy_buffers_same_size(slot.output.buffer, image.buffer, width, height,
+                               slot.output.pitch, image.pitch)
+        return slot.output
+
+    def _write_stage(self, free: queue.Queue, done: queue.Queue) -> None:
+        staging = None
+        try:
+            while True:
+                slot = done.get()
+                if slot is None:
+                    break
+                try:
+                    if self._error is None:
+                        start = time.perf_counter()
+                        if self.sink is not None:
+                            image = slot.result
+                            width, height = image.width, image.height
+                            staging = _staging(staging, width, height)
+                            copy_to_host(staging.buffer, image.buffer, width, height, image.pitch)
+                            self.sink.write(width, height, staging.memory(width, height))
+                        with self._lock:
+                            self._frames += 1
+                            self._times[2] += time.perf_counter() - start
+                except BaseException as error:
+                    self._fail(error)
+                finally:
+                    free.put(slot)
+        finally:
+            if staging is not None:
+                staging.free()
+
+
+def process_frames(source,
+                   sink=None,
+                   process: Callable[[CudaImage, int], CudaImage | None] | None = None,
+                   max_frames: int | None = None,
+                   **options) -> FrameStats:
+    """
+    Runs a `FramePipeline` from `source` to `sink` and returns its counters.
+
+    Args:
+        source: What to read; see `FramePipeline`.
+        sink (optional): Where to write; see `FramePipeline`.
+        process (Callable[[CudaImage, int], CudaImage | None], optional): The
+            per-frame callback.
+        max_frames (int, optional): Number of source frames to read. Defaults to all.
+        **options: `size`, `fps`, `ring_size` and `drop_frames`, as for `FramePipeline`.
+
+    Returns:
+        FrameStats: Counters of the run.
+
+    Example:
+        >>> stats = process_frames("in/%05d.png", "out.y4m", lambda frame, i: apply_grayscale(frame))
+    """
+
+    return FramePipeline(source, sink, process, **options).run(max_frames)
@@ -0,0 +1,406 @@
+import inspect
+import math
+import os
+from dataclasses import dataclass as _dataclass
+from typing import Callable
+from PIL import Image
+from .core import ffi, _lib
+from .core.types import CudaImage, DistanceField, _import_numpy
+from .io import RAW_EXTENSION, image_to_pil, map_raw, pil_to_image
+from .io.raw import _raw_header
+from .io.saving import _write
+from .operations.fill import fill_color
+from .operations.filters import (apply_gaussian_blur, apply_grayscale, apply_opacity, apply_shadow,
+                                 apply_stroke)
+from .operations.resize import ResizeMethod, _SEPARABLE_METHODS, _resample_tables, _source_range
+from .pipeline import Pipeline
+
+DEFAULT_MAX_TILE_BYTES = 256 * 1024 * 1024
+
+# Device bytes per source pixel of a tile running effects: the tile, the blur's
+# intermediate buffer and the distance field with its two scratch buffers.
+_EFFECT_BYTES_PER_PIXEL = 20
+
+
+def _blur_halo(params: dict) -> int:
+    radius = params["radius"]
+    # gaussianKernelRadius, plus one for float rounding.
+    return math.ceil(1.5 * radius) + 1 if radius > 0 else 0
+
+
+def _stroke_halo(params: dict) -> int:
+    return math.ceil(params["stroke_width"]) + 1
+
+
+def _shadow_halo(params: dict) -> int:
+    return math.ceil(params["radius"]) + 1
+
+
+def _pointwise_halo(params: dict) -> int:
+    return 0
+
+
+# Pixels around its output an operation reads, from its bound arguments.
+# Operations that depend on the whole image, such as `apply_corner_radius`,
+# `apply_flip` or `fill_gradient`, cannot be tiled and are not listed.
+_HALOS: dict[Callable, Callable[[dict], int]] = {
+    apply_gaussian_blur: _blur_halo,
+    apply_stroke: _stroke_halo,
+    apply_shadow: _shadow_halo,
+    apply_grayscale: _pointwise_halo,
+    apply_opacity: _pointwise_halo,
+    fill_color: _pointwise_halo,
+}
+
+
+def effects_halo(effects: Pipeline) -> int:
+    """
+    Returns the margin, in source pixels, a tile needs for `effects` to be exact.
+
+    The margin of each operation is the distance it reads around a pixel: about
+    1.5 times the radius for `apply_gaussian_blur`, the width for `apply_stroke`
+    and the radius for `apply_shadow`, nothing for pointwise operations. Chained
+    operations add up their margins.
+
+    Args:
+        effects (Pipeline): Operations to run per tile.
+
+    Returns:
+        int: Margin in pixels on each side of a tile.
+
+    Raises:
+        ValueError: If an operation depends on the whole image (e.g.
+            `apply_corner_radius`, `apply_flip`, `fill_gradient`), takes a `roi`,
+            a scratch buffer or a precomputed distance field, or is unknown.
+
+    Example:
+        >>> effects_halo(Pipeline().add(apply_gaussian_blur, 8).add(apply_stroke, 4, RGBA(0, 0, 0)))
+        18
+    """
+
+    halo = 0
+    for step in effects._steps:
+        name = getattr(step.operation, "__name__", repr(step.operation))
+        compute = _HALOS.get(step.operation)
+        if compute is None:
+            raise ValueError(f"{name} cannot be tiled; pass halo= to process_tiled to tile it anyway")
+        bound = inspect.signature(step.operation).bind(None, *step.args, **step.kwargs)
+        bound.apply_defaults()
+        params = dict(list(bound.arguments.items())[1:])
+        for param, value in params.items():
+            if value is None:
+                continue
+            if param == "roi" or param.endswith("_cache") or isinstance(value, (CudaImage, DistanceField)):
+                raise ValueError(f"{name} cannot be tiled with {param}=, which refers to the whole image")
+        halo += compute(params)
+    return halo
+
+
+@_dataclass
+class TiledStats:
+    """
+    Work done by `process_tiled`.
+
+    Attributes:
+        tiles (int): Tiles processed.
+        tile_width (int): Width of the output tiles, except at the right edge.
+        tile_height (int): Height of the output tiles, except at the bottom edge.
+        halo (int): Margin read around each tile, in source pixels.
+        source_pixels_read (int): Source pixels uploaded, margins included.
+        source_pixels (int): Pixels of the source image.
+        peak_tile_bytes (int): Device memory held by the largest tile.
+    """
+    tiles: int
+    tile_width: int
+    tile_height: int
+    halo: int
+    source_pixels_read: int
+    source_pixels: int
+    peak_tile_bytes: int
+
+    @property
+    def read_amplification(self) -> float:
+        return self.source_pixels_read / self.source_pixels if self.source_pixels else 0.0
+
+
+class _Axis:
+    # Tiling of one dimension: for each output span, the source span the resize
+    # reads (`resampled`) and the one uploaded with the effects' margin (`read`).
+
+    def __init__(self, src_size: int, dst_size: int, tile: int, method: ResizeMethod, halo: int):
+        self.src_size = src_size
+        self.dst_size = dst_size
+        self.spans = []
+        for first in range(0, dst_size, tile):
+            count = min(tile, dst_size - first)
+            if src_size == dst_size:
+                resampled = (first, count)
+            else:
+                resampled = _source_range(src_size, dst_size, method, first, count)
+            read_first = max(resampled[0] - halo, 0)
+            read_end = min(resampled[0] + resampled[1] + halo, src_size)
+            self.spans.append(((first, count), resampled, (read_first, read_end - read_first)))
+
+    def max_read(self) -> int:
+        return max(read[1] for _, _, read in self.spans)
+
+    def max_resampled(self) -> int:
+        return max(resampled[1] for _, resampled, _ in self.spans)
+
+
+def _tile_bytes(x_axis: _Axis, y_axis: _Axis, tile: int, bytes_per_pixel: int) -> int:
+    tile_width = min(tile, x_axis.dst_size)
+    tile_height = min(tile, y_axis.dst_size)
+    total = x_axis.max_read() * y_axis.max_read() * bytes_per_pixel
+    if (x_axis.src_size, y_axis.src_size) != (x_axis.dst_size, y_axis.dst_size):
+        # Output tile and the resize's intermediate buffer.
+        total += tile_width * tile_height * 4
+        total += tile_width * y_axis.max_resampled() * 4
+    return total
+
+
+def _open_source(source):
+    # Returns (width, height, read, close) where read(x, y, w, h, container)
+    # uploads a region.
+    if isinstance(source, (str, os.PathLike)):
+        if _raw_header(source) is not None:
+            return _open_source(map_raw(source))
+        img = Image.open(source)
+        return (*img.size, _pil_reader(img), img.close)
+    if isinstance(source, Image.Image):
+        return (*source.size, _pil_reader(source), None)
+
+    np = _import_numpy()
+    array = np.asarray(source)
+    if array.ndim != 3 or array.shape[2] != 4 or array.dtype != np.uint8:
+        raise ValueError(f"Expected a HxWx4 uint8 array, got shape {array.shape} and dtype {array.dtype}")
+
+    def read(x, y, w, h, container):
+        return CudaImage.from_array(array[y:y + h, x:x + w], out=container)
+
+    return array.shape[1], array.shape[0], read, None
+
+
+def _pil_reader(img: Image.Image):
+    def read(x, y, w, h, container):
+        return pil_to_image(img.crop((x, y, x + w, y + h)), container)
+    return read
+
+
+def _open_output(output, width: int, height: int, format: str | None, params: dict):
+    # Returns (write, finish) where write(tile, x, y) downloads a tile into place.
+    if isinstance(output, (str, os.PathLike)) and os.fspath(output).lower().endswith(RAW_EXTENSION):
+        return _open_output(map_raw(output, "w+", size=(width, height)), width, height, format, params)
+    if isinstance(output, (str, os.PathLike)):
+        canvas = Image.new("RGBA", (width, height))
+
+        def finish():
+            try:
+                _write(canvas, output, format, params)
+            finally:
+                canvas.close()
+
+        return _pil_writer(canvas), finish
+    if isinstance(output, Image.Image):
+        if output.mode != "RGBA" or output.size != (width, height):
+            raise ValueError(f"Output image must be RGBA of {width}x{height}, got {output.mode} of {output.size[0]}x{output.size[1]}")
+        return _pil_writer(output), None
+
+    np = _import_numpy()
+    if not isinstance(output, np.ndarray):
+        raise TypeError(f"Output must be a path, a PIL image or a NumPy array, got {type(output).__name__}")
+    if output.shape != (height, width, 4) or output.dtype != np.uint8:
+        raise ValueError(f"Output array must be uint8 of shape {(height, width, 4)}, got shape {output.shape} and dtype {output.dtype}")
+
+    def write(tile, x, y):
+        output[y:y + tile.height, x:x + tile.width] = tile.to_array()
+
+    return write, None
+
+
+def _pil_writer(canvas: Image.Image):
+    def write(tile, x, y):
+        img = image_to_pil(tile)
+        canvas.paste(img, (x, y))
+        img.close()
+    return write
+
+
+def process_tiled(source,
+                  output,
+                  effects: Pipeline | None = None,
+                  size: tuple[int, int] | None = None,
+                  method: ResizeMethod = ResizeMethod.LANCZOS3,
+                  halo: int | None = None,
+                  max_tile_bytes: int = DEFAULT_MAX_TILE_BYTES,
+                  tile_size: int | None = None,
+                  format: str | None = None,
+                  **params) -> TiledStats:
+    """
+    Applies effects and a resize to an image larger than device memory, tile by tile.
+
+    The output is cut into square tiles. For each one, only the source region it
+    depends on is uploaded: the pixels the resize filter reads, widened by a
+    margin (halo) covering the reach of the effects. The effects run on that
+    region at source resolution, the region is resized into the tile, and the
+    tile is downloaded into place. The result is the same as running the effects
+    and `resize` on the whole image, while device memory stays below
+    `max_tile_bytes`.
+
+    Host memory depends on the source and output: raw files (see `save_raw`)
+    and `numpy.memmap` arrays are read or written one tile at a time, whereas
+    other image files are decoded whole by Pillow and an encoded output is
+    assembled in host memory before encoding.
+
+    Args:
+        source: Path of an image or raw file, a PIL image, or a HxWx4 uint8 NumPy
+            array such as a `numpy.memmap`.
+        output: Path to save the result to (a `.praw` path is written as a raw
+            file, tile by tile), an RGBA PIL image or a uint8 NumPy array of the
+            output size to write into.
+        effects (Pipeline, optional): Operations to apply at source resolution.
+            Only operations with a bounded reach are supported: Gaussian blur,
+            stroke, shadow, grayscale, opacity and fill_color, without `roi` or
+            scratch buffers.
+        size (tuple[int, int], optional): Output `(width, height)`. Defaults to
+            the source size.
+        method (ResizeMethod, optional): Resampling method; must be separable
+            (BICUBIC, LANCZOS3 or MITCHELL). Defaults to LANCZOS3.
+        halo (int, optional): Margin to read around each tile, in source pixels.
+            Required for operations `effects_halo` does not know. Defaults to
+            `effects_halo(effects)`.
+        max_tile_bytes (int, optional): Device memory budget of a tile. Defaults
+            to 256 MiB.
+        tile_size (int, optional): Output tile side. Defaults to the largest that
+            fits `max_tile_bytes`.
+        format (str, optional): Pillow format name when `output` is a path.
+            Inferred from the extension by default.
+        **params: Encoder options forwarded to `PIL.Image.save` when `output` is a path.
+
+    Returns:
+        TiledStats: Tiles processed and source pixels read.
+
+    Raises:
+        ValueError: If an effect cannot be tiled, the method is not separable,
+            the output does not match `size`, or a single output pixel does not
+            fit in `max_tile_bytes`.
+
+    Example:
+        >>> effects = Pipeline().add(apply_gaussian_blur, 6).add(apply_grayscale)
+        >>> stats = process_tiled("scan.tif", "preview.png", effects, size=(8000, 6000))
+        >>> print(stats.tiles, stats.read_amplification)
+    """
+
+    if halo is None:
+        halo = effects_halo(effects) if effects is not None else 0
+    if halo < 0:
+        raise ValueError(f"halo must be >= 0, got {halo}")
+
+    src_width, src_height, read, close = _open_source(source)
+    try:
+        width, height = size if size is not None else (src_width, src_height)
+        resized = (width, height) != (src_width, src_height)
+        if resized and method not in _SEPARABLE_METHODS:
+            raise ValueError(f"Tiled resizing needs a separable method (BICUBIC, LANCZOS3 or MITCHELL), got {method}")
+
+        bytes_per_pixel = _EFFECT_BYTES_PER_PIXEL if effects is not None else 4
+
+        def axes(tile):
+            return (_Axis(src_width, width, tile, method, halo),
+                    _Axis(src_height, height, tile, method, halo))
+
+        if tile_size is None:
+            low, high = 1, max(width, height)
+            if _tile_bytes(*axes(low), low, bytes_per_pixel) > max_tile_bytes:
+                raise ValueError(f"max_tile_bytes of {max_tile_bytes} cannot hold a single tile with a halo of {halo}")
+            while low < high:
+                middle = (low + high + 1) // 2
+                if _tile_bytes(*axes(middle), middle, bytes_per_pixel) <= max_tile_bytes:
+                    low = middle
+                else:
+                    high = middle - 1
+            tile_size = low
+        elif tile_size < 1:
+            raise ValueError(f"tile_size must be >= 1, got {tile_size}")
+
+        x_axis, y_axis = axes(tile_size)
+        tile_width = min(tile_size, width)
+        tile_height = min(tile_size, height)
+        write, finish = _open_output(output, width, height, format, params)
+
+        region = CudaImage(x_axis.max_read(), y_axis.max_read())
+        result = temp = None
+        if resized:
+            result = CudaImage(tile_width, tile_height)
+            if src_width != width and src_height != height:
+                temp = CudaImage(tile_width, y_axis.max_resampled())
+
+        pixels_read = 0
+        try:
+            for (oy, oh), (ry, rh), (ey, eh) in y_axis.spans:
+                for (ox, ow), (rx, rw), (ex, ew) in x_axis.spans:
+                    read(ex, ey, ew, eh, region)
+                    pixels_read += ew * eh
+                    if effects is not None:
+                        effects.run(region)
+
+                    source_view = region.view(rx - ex, ry - ey, rw, rh)
+                    if resized:
+                        result.width = ow
+                        result.height = oh
+                        _resize_region(result, source_view, temp, method,
+                                       (src_width, width, ox, rx), (src_height, height, oy, ry))
+                        write(result, ox, oy)
+                    else:
+                        write(source_view, ox, oy)
+
+            if finish is not None:
+                finish()
+        finally:
+            region.free()
+            if result is not None:
+                result.free()
+            if temp is not None:
+                temp.free()
+    finally:
+        if close is not None:
+            close()
+
+    return TiledStats(tiles=len(x_axis.spans) * len(y_axis.spans),
+                      tile_width=tile_width,
+                      tile_height=tile_height,
+                      halo=halo,
+                      source_pixels_read=pixels_read,
+                      source_pixels=src_width * src_height,
+                      peak_tile_bytes=_tile_bytes(x_axis, y_axis, tile_size, bytes_per_pixel),
+                      )
+
+
+def _resize_region(result: CudaImage,
+                   source: CudaImage,
+                   temp: CudaImage | None,
+                   method: ResizeMethod,
+                   horizontal: tuple[int, int, int, int],
+                   vertical: tuple[int, int, int, int]) -> None:
+    # Resizes a source region into one output tile with tables restricted to
+    # the tile, so its pixels equal those of the whole-image resize. Each axis
+    # is (source size, output size, tile offset, region offset).
+    pins = []
+    try:
+        tables = []
+        for (src_size, dst_size, dst_first, src_first), dst_count, src_count in (
+                (horizontal, result.width, source.width), (vertical, result.height, source.height)):
+            tables.append(_resample_tables.acquire(pins, src_size, dst_size, method,
+                                                   (dst_first, dst_count), (src_first, src_count)))
+        use_temp = tables[0] != ffi.NULL and tables[1] != ffi.NULL
+        if use_temp:
+            temp.width = result.width
+            temp.height = source.height
+        _lib.resize_separable(result.buffer, source.buffer,
+                              result.width, result.height, result.pitch,
+                              source.width, source.height, source.pitch,
+                              temp.buffer if use_temp else ffi.NULL,
+                              temp.pitch if use_temp else 0,
+                              tables[0], tables[1])
+    finally:
+        _resample_tables.release(pins)
@@ -0,0 +1,30 @@
+import subprocess
+import os
+
+lib_name = "photoff_cpu"
+
+
+def compile_cpu_so():
+
+    output_so = f"./{lib_name}.so"
+    if os.path.exists(output_so):
+        os.remove(output_so)
+
+    source_file = f"./photoff_cpu_src/{lib_name}.c"
+
+    command = ["gcc", "-O3", "-fopenmp", "-shared", "-fPIC", source_file, "-o", output_so, "-lm"]
+
+    print("Running command:")
+    print(" ".join(command))
+
+    try:
+        subprocess.check_call(command)
+        print("Shared object successfully compiled at:")
+        print(output_so)
+    except subprocess.CalledProcessError as e:
+        print("Compilation error:")
+        print(e)
+
+
+if __name__ == "__main__":
+    compile_cpu_so()
@@ -0,0 +1,33 @@
+import subprocess
+import os
+
+lib_name = "photoff_cpu"
+
+
+def compile_cpu_dll():
+
+    if os.path.exists(f"./{lib_name}.dll"):
+        os.remove(f"./{lib_name}.dll")
+
+    source_file = f"./photoff_cpu_src/{lib_name}.c"
+    output_dll = f"./{lib_name}.dll"
+
+    command = ["cl", "/O2", "/openmp", "/LD", "/MD", source_file, f"/Fe:{output_dll}"]
+
+    print("Running command:")
+    print(" ".join(command))
+
+    try:
+        subprocess.check_call(command)
+        print("DLL successfully compiled at:")
+        print(output_dll)
+    except subprocess.CalledProcessError as e:
+        print("Compilation error:")
+        print(e)
+
+    for leftover in (f"./{lib_name}.exp", f"./{lib_name}.lib", f"./{lib_name}.obj"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+if __name__ == "__main__":
+    compile_cpu_dll()
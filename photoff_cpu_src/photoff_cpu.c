@@ -0,0 +1,1458 @@
+#include "photoff_cpu.h"
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+
+#ifdef _WIN32
+  #include <malloc.h>
+#endif
+
+#ifdef _OPENMP
+  #include <omp.h>
+#endif
+
+// Images are processed in contiguous row tiles, one tile per core. Small
+// images stay on the calling thread, where spinning up the team costs more
+// than the work itself.
+#define PARALLEL_MIN_PIXELS (64u * 1024u)
+#define PARALLEL(width, height) ((uint64_t)(width) * (uint64_t)(height) >= PARALLEL_MIN_PIXELS)
+
+#define BUFFER_ALIGNMENT 64
+
+static inline uchar4 make_uchar4(unsigned char x, unsigned char y, unsigned char z, unsigned char w) {
+    uchar4 p = {x, y, z, w};
+    return p;
+}
+
+static inline int imin(int a, int b) { return a < b ? a : b; }
+static inline int imax(int a, int b) { return a > b ? a : b; }
+
+static void* aligned_buffer_alloc(size_t size) {
+#ifdef _WIN32
+    return _aligned_malloc(size, BUFFER_ALIGNMENT);
+#else
+    size_t rounded = (size + BUFFER_ALIGNMENT - 1) / BUFFER_ALIGNMENT * BUFFER_ALIGNMENT;
+    return aligned_alloc(BUFFER_ALIGNMENT, rounded ? rounded : BUFFER_ALIGNMENT);
+#endif
+}
+
+static void aligned_buffer_free(void* buffer) {
+#ifdef _WIN32
+    _aligned_free(buffer);
+#else
+    free(buffer);
+#endif
+}
+
+// Per-pixel helpers ----------------------------------------------------------
+//
+// Each helper mirrors the CUDA kernel of the same name in photoff.cu so both
+// backends produce identical pixels.
+
+static inline void blendPixel(uchar4* dst, uchar4 s) {
+    if (s.w == 0)                 return;
+    if (s.w == 255) { *dst = s;   return; }
+
+    uchar4 d = *dst;
+
+    const uint16_t sa   = s.w;
+    const uint16_t da   = d.w;
+    const uint16_t invA = 255 - sa;
+
+    const uint16_t outA = sa + ((da * invA + 127) >> 8);
+
+    const uint32_t tmpR = (s.x * sa + ((uint32_t)d.x * da * invA + 127)) >> 8;
+    const uint32_t tmpG = (s.y * sa + ((uint32_t)d.y * da * invA + 127)) >> 8;
+    const uint32_t tmpB = (s.z * sa + ((uint32_t)d.z * da * invA + 127)) >> 8;
+
+    d.x = (unsigned char)((tmpR + (outA >> 1)) / outA);
+    d.y = (unsigned char)((tmpG + (outA >> 1)) / outA);
+    d.z = (unsigned char)((tmpB + (outA >> 1)) / outA);
+    d.w = (unsigned char)(outA);
+
+    *dst = d;
+}
+
+static int gaussianKernelRadius(float radius) {
+    float sigma = radius / 2.0f;
+    return imax(1, (int)ceilf(3.0f * sigma));
+}
+
+static void buildGaussianWeights(float radius, float* weights, int kernelRadius) {
+    float sigma = radius / 2.0f;
+    float total = 0.0f;
+    for (int k = 0; k <= kernelRadius; k++) {
+        weights[k] = expf(-(float)(k * k) / (2.0f * sigma * sigma));
+        total += k == 0 ? weights[k] : 2.0f * weights[k];
+    }
+    for (int k = 0; k <= kernelRadius; k++) {
+        weights[k] /= total;
+    }
+}
+
+static void gaussianBlurPass(const uchar4* src,
+                             uchar4* dst,
+                             uint32_t width,
+                             uint32_t height,
+                             uint32_t src_pitch,
+                             uint32_t dst_pitch,
+                             const float* weights,
+                             int kernelRadius,
+                             bool vertical) {
+    #pragma omp parallel for schedule(static) if (PARALLEL(width, height))
+    for (int y = 0; y < (int)height; y++) {
+        uchar4* row = dst + (size_t)y * dst_pitch;
+        for (int x = 0; x < (int)width; x++) {
+            float sumR = 0.0f, sumG = 0.0f, sumB = 0.0f, sumA = 0.0f;
+
+            for (int k = -kernelRadius; k <= kernelRadius; k++) {
+                int sampleX = vertical ? x : imin((int)width - 1, imax(0, x + k));
+                int sampleY = vertical ? imin((int)height - 1, imax(0, y + k)) : y;
+
+                uchar4 sample = src[(size_t)sampleY * src_pitch + sampleX];
+                float weightedAlpha = weights[k < 0 ? -k : k] * sample.w;
+
+                sumR += sample.x * weightedAlpha;
+                sumG += sample.y * weightedAlpha;
+                sumB += sample.z * weightedAlpha;
+                sumA += weightedAlpha;
+            }
+
+            if (sumA > 0.0f) {
+                row[x] = make_uchar4((unsigned char)(sumR / sumA + 0.5f),
+                                     (unsigned char)(sumG / sumA + 0.5f),
+                                     (unsigned char)(sumB / sumA + 0.5f),
+                                     (unsigned char)(sumA + 0.5f));
+            } else {
+                row[x] = make_uchar4(0, 0, 0, 0);
+            }
+        }
+    }
+}
+
+// Alpha distance field -------------------------------------------------------
+//
+// Exact Euclidean distance transform (Meijster et al.) of the alpha mask. Each
+// pixel stores the distance to the nearest pixel of the opposite class:
+// positive for transparent pixels (distance to the shape), negative for opaque
+// pixels (distance to the nearest in-bounds transparent pixel), +/-INFINITY
+// when no such pixel exists. Column distances for both classes are packed as
+// two 16-bit halves, which bounds width + height to DISTANCE_FIELD_MAX_EXTENT.
+
+#define DISTANCE_FIELD_MAX_EXTENT 0xFFFFu
+
+static inline int64_t edtF(int64_t x, int64_t i, int64_t gi) {
+    return (x - i) * (x - i) + gi * gi;
+}
+
+static inline int64_t edtSep(int64_t i, int64_t u, int64_t gi, int64_t gu) {
+    return (u * u - i * i + gu * gu - gi * gi) / (2 * (u - i));
+}
+
+static void columnDistances(uint32_t* columns,
+                            const uchar4* src,
+                            uint32_t width,
+                            uint32_t height,
+                            uint32_t src_pitch) {
+    const uint32_t inf = width + height;
+    const int tile = 64;
+    const int tiles = ((int)width + tile - 1) / tile;
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(width, height))
+    for (int t = 0; t < tiles; t++) {
+        const int x0 = t * tile;
+        const int x1 = imin(x0 + tile, (int)width);
+
+        for (int y = 0; y < (int)height; y++) {
+            const uchar4* src_row = src + (size_t)y * src_pitch;
+            uint32_t* row = columns + (size_t)y * width;
+            const uint32_t* above = row - width;
+            for (int x = x0; x < x1; x++) {
+                bool opaque = src_row[x].w != 0;
+                uint32_t toOpaque = opaque ? 0 : (y == 0 ? inf : imin(inf, (above[x] & 0xFFFF) + 1));
+                uint32_t toClear = !opaque ? 0 : (y == 0 ? inf : imin(inf, (above[x] >> 16) + 1));
+                row[x] = toOpaque | (toClear << 16);
+            }
+        }
+
+        for (int y = (int)height - 2; y >= 0; y--) {
+            uint32_t* row = columns + (size_t)y * width;
+            const uint32_t* below = row + width;
+            for (int x = x0; x < x1; x++) {
+                uint32_t toOpaque = imin(row[x] & 0xFFFF, (below[x] & 0xFFFF) + 1);
+                uint32_t toClear = imin(row[x] >> 16, (below[x] >> 16) + 1);
+                row[x] = toOpaque | (toClear << 16);
+            }
+        }
+    }
+}
+
+static void rowDistances(float* field_row,
+                         uint32_t* st,
+                         const uint32_t* columns_row,
+                         const uchar4* src_row,
+                         int width,
+                         int64_t inf,
+                         bool toOpaque) {
+    const int shift = toOpaque ? 0 : 16;
+    #define G(i) ((int64_t)((columns_row[(i)] >> shift) & 0xFFFF))
+    #define S(q) ((int64_t)(st[(q)] & 0xFFFF))
+    #define T(q) ((int64_t)(st[(q)] >> 16))
+
+    int q = 0;
+    st[0] = 0;
+
+    for (int u = 1; u < width; u++) {
+        while (q >= 0 && edtF(T(q), S(q), G(S(q))) > edtF(T(q), u, G(u))) q--;
+
+        if (q < 0) {
+            q = 0;
+            st[0] = (uint32_t)u;
+        } else {
+            int64_t w = 1 + edtSep(S(q), u, G(S(q)), G(u));
+            if (w < width) {
+                q++;
+                st[q] = (uint32_t)u | ((uint32_t)w << 16);
+            }
+        }
+    }
+
+    for (int u = width - 1; u >= 0; u--) {
+        bool opaque = src_row[u].w != 0;
+        if (opaque != toOpaque) {
+            int64_t d2 = edtF(u, S(q), G(S(q)));
+            float d = d2 >= inf * inf ? INFINITY : sqrtf((float)d2);
+            field_row[u] = toOpaque ? d : -d;
+        }
+        if (u == T(q)) q--;
+    }
+
+    #undef G
+    #undef S
+    #undef T
+}
+
+static inline float shadowWeight(float distance, float radius, float intensity) {
+    int r2 = (int)(radius * radius);
+    float minDistance = rintf(distance * distance) <= r2 ? distance : radius;
+    float weight = 1.0f - (minDistance / radius);
+    return fmaxf(0.0f, fminf(1.0f, weight)) * intensity;
+}
+
+static uchar4 resizeAreaPixel(const uchar4* src,
+                              int dst_x,
+                              int dst_y,
+                              uint32_t dst_width,
+                              uint32_t dst_height,
+                              uint32_t src_width,
+                              uint32_t src_height,
+                              uint32_t src_pitch) {
+    float scale_x = (float)(src_width) / dst_width;
+    float scale_y = (float)(src_height) / dst_height;
+
+    // Source rectangle covered by the destination pixel; pixels on its edges
+    // are weighted by the fraction they overlap.
+    float left = dst_x * scale_x;
+    float right = fminf((dst_x + 1) * scale_x, (float)src_width);
+    float top = dst_y * scale_y;
+    float bottom = fminf((dst_y + 1) * scale_y, (float)src_height);
+
+    int x0 = (int)left;
+    int x1 = imin((int)ceilf(right), (int)src_width);
+    int y0 = (int)top;
+    int y1 = imin((int)ceilf(bottom), (int)src_height);
+
+    float rx = 0.0f, ry = 0.0f, rz = 0.0f, rw = 0.0f;
+    float totalWeight = 0.0f;
+
+    // Whole pixels inside the rectangle are summed exactly; only the first and
+    // last column and row are weighted.
+    float weight_left = fminf(right, (float)(x0 + 1)) - left;
+    float weight_right = x1 - 1 > x0 ? right - (float)(x1 - 1) : 0.0f;
+    float rowWeight = weight_left + weight_right + (float)imax(x1 - x0 - 2, 0);
+
+    for (int sy = y0; sy < y1; sy++) {
+        float wy = fminf(bottom, (float)(sy + 1)) - fmaxf(top, (float)sy);
+        const uchar4* src_row = src + (size_t)sy * src_pitch;
+
+        uint32_t sum_x = 0, sum_y = 0, sum_z = 0, sum_w = 0;
+        for (int sx = x0 + 1; sx < x1 - 1; sx++) {
+            uchar4 pixel = src_row[sx];
+            sum_x += pixel.x;
+            sum_y += pixel.y;
+            sum_z += pixel.z;
+            sum_w += pixel.w;
+        }
+
+        uchar4 first = src_row[x0];
+        uchar4 last = src_row[x1 - 1];
+        rx += wy * (sum_x + weight_left * first.x + weight_right * last.x);
+        ry += wy * (sum_y + weight_left * first.y + weight_right * last.y);
+        rz += wy * (sum_z + weight_left * first.z + weight_right * last.z);
+        rw += wy * (sum_w + weight_left * first.w + weight_right * last.w);
+        totalWeight += wy * rowWeight;
+    }
+
+    if (totalWeight > 0.0f) {
+        rx = fmaxf(0.0f, fminf(255.0f, rx / totalWeight));
+        ry = fmaxf(0.0f, fminf(255.0f, ry / totalWeight));
+        rz = fmaxf(0.0f, fminf(255.0f, rz / totalWeight));
+        rw = fmaxf(0.0f, fminf(255.0f, rw / totalWeight));
+    }
+
+    return make_uchar4((unsigned char)lrintf(rx),
+                       (unsigned char)lrintf(ry),
+                       (unsigned char)lrintf(rz),
+                       (unsigned char)lrintf(rw));
+}
+
+static uchar4 resizeBilinearPixel(const uchar4* src,
+                                  int dst_x,
+                                  int dst_y,
+                                  uint32_t dst_width,
+                                  uint32_t dst_height,
+                                  uint32_t src_width,
+                                  uint32_t src_height,
+                                  uint32_t src_pitch) {
+    float scale_x = (float)(src_width - 1) / dst_width;
+    float scale_y = (float)(src_height - 1) / dst_height;
+
+    float src_x = dst_x * scale_x;
+    float src_y = dst_y * scale_y;
+
+    int x1 = (int)src_x;
+    int y1 = (int)src_y;
+    int x2 = imin(x1 + 1, (int)src_width - 1);
+    int y2 = imin(y1 + 1, (int)src_height - 1);
+
+    float wx2 = src_x - x1;
+    float wy2 = src_y - y1;
+    float wx1 = 1.0f - wx2;
+    float wy1 = 1.0f - wy2;
+
+    uchar4 p11 = src[(size_t)y1 * src_pitch + x1];
+    uchar4 p21 = src[(size_t)y1 * src_pitch + x2];
+    uchar4 p12 = src[(size_t)y2 * src_pitch + x1];
+    uchar4 p22 = src[(size_t)y2 * src_pitch + x2];
+
+    return make_uchar4(
+        (unsigned char)(p11.x * wx1 * wy1 + p21.x * wx2 * wy1 + p12.x * wx1 * wy2 + p22.x * wx2 * wy2),
+        (unsigned char)(p11.y * wx1 * wy1 + p21.y * wx2 * wy1 + p12.y * wx1 * wy2 + p22.y * wx2 * wy2),
+        (unsigned char)(p11.z * wx1 * wy1 + p21.z * wx2 * wy1 + p12.z * wx1 * wy2 + p22.z * wx2 * wy2),
+        (unsigned char)(p11.w * wx1 * wy1 + p21.w * wx2 * wy1 + p12.w * wx1 * wy2 + p22.w * wx2 * wy2));
+}
+
+static inline bool isCornerTransparent(int x, int y, uint32_t width, uint32_t height, uint32_t radius) {
+    int dx, dy;
+
+    if (x < radius && y < radius) {
+        dx = radius - 1 - x;
+        dy = radius - 1 - y;
+    } else if (x >= width - radius && y < radius) {
+        dx = x - (width - radius);
+        dy = radius - 1 - y;
+    } else if (x < radius && y >= height - radius) {
+        dx = radius - 1 - x;
+        dy = y - (height - radius);
+    } else if (x >= width - radius && y >= height - radius) {
+        dx = x - (width - radius);
+        dy = y - (height - radius);
+    } else {
+        return false;
+    }
+    return dx * dx + dy * dy > radius * radius;
+}
+
+static uchar4 gradientPixel(int x,
+                            int y,
+                            uint32_t width,
+                            uint32_t height,
+                            uchar4 c1,
+                            uchar4 c2,
+                            int direction,
+                            bool seamless) {
+    float factor = 0.0f;
+
+    float nx = (float)x / (float)(width - 1) - 0.5f;
+    float ny = (float)y / (float)(height - 1) - 0.5f;
+
+    switch (direction) {
+        case 0: // horizontal
+            factor = (float)x / (float)(width - 1);
+            break;
+        case 1: // vertical
+            factor = (float)y / (float)(height - 1);
+            break;
+        case 2: { // diagonal
+            float u = (float)x / (float)(width - 1);
+            float v = (float)y / (float)(height - 1);
+            factor = (u + v) * 0.5f;
+            break;
+        }
+        case 3: // radial
+            factor = sqrtf(nx*nx + ny*ny) * 1.414f;
+            factor = fminf(1.0f, factor);
+            break;
+    }
+
+    if (seamless) {
+        factor = factor < 0.5f ?
+                factor * 2.0f :
+                2.0f * (1.0f - factor);
+    }
+
+    return make_uchar4((unsigned char)(c1.x + (c2.x - c1.x) * factor),
+                       (unsigned char)(c1.y + (c2.y - c1.y) * factor),
+                       (unsigned char)(c1.z + (c2.z - c1.z) * factor),
+                       (unsigned char)(c1.w + (c2.w - c1.w) * factor));
+}
+
+static inline uchar4 grayscalePixel(uchar4 pixel) {
+    if (pixel.w == 0) return pixel;
+
+    unsigned char gray = (unsigned char)(
+        0.299f * pixel.x +
+        0.587f * pixel.y +
+        0.114f * pixel.z
+    );
+    return make_uchar4(gray, gray, gray, pixel.w);
+}
+
+static inline uchar4 opacityPixel(uchar4 pixel, float opacity) {
+    float currentAlpha = pixel.w / 255.0f;
+    float newAlpha = currentAlpha * opacity;
+    pixel.w = (unsigned char)(newAlpha * 255.0f);
+    return pixel;
+}
+
+static inline uchar4 tintPixel(uchar4 pixel, uchar4 color) {
+    return make_uchar4(color.x, color.y, color.z,
+                       (unsigned char)((pixel.w * color.w + 127) / 255));
+}
+
+static inline uchar4 chromaKeyPixel(uchar4 pixel,
+                                    uchar4 keyPixel,
+                                    int channel,
+                                    unsigned char threshold,
+                                    bool invert,
+                                    bool zero_all_channels) {
+    unsigned char channelValue;
+    switch (channel) {
+        case 0: channelValue = keyPixel.x; break; // R
+        case 1: channelValue = keyPixel.y; break; // G
+        case 2: channelValue = keyPixel.z; break; // B
+        case 3: channelValue = keyPixel.w; break; // A
+        default: channelValue = keyPixel.y; break; // Default to G
+    }
+
+    bool makeTransparent = invert ?
+                          (channelValue <= threshold) :
+                          (channelValue > threshold);
+
+    if (makeTransparent) {
+        if (zero_all_channels) {
+            return make_uchar4(0, 0, 0, 0);
+        }
+        pixel.w = 0;
+    }
+    return pixel;
+}
+
+// Content hash: mirrors hashMix/hashPixel of photoff.cu, so both backends
+// return the same value for the same pixels.
+static inline uint64_t hashMix(uint64_t z) {
+    z = (z ^ (z >> 30)) * 0xbf58476d1ce4e5b9ull;
+    z = (z ^ (z >> 27)) * 0x94d049bb133111ebull;
+    return z ^ (z >> 31);
+}
+
+static inline uint64_t hashPixel(uchar4 p, uint64_t index) {
+    uint32_t value = (uint32_t)p.x | ((uint32_t)p.y << 8) | ((uint32_t)p.z << 16) | ((uint32_t)p.w << 24);
+    return hashMix((index << 32) ^ value);
+}
+
+// Fused pointwise chain. photoff.cu runs the whole chain per pixel; here each
+// operation sweeps one row at a time while the row is in L1, which keeps the
+// single pass over memory and lets the per-operation loops vectorize. Mirror
+// conventions are described in photoff.h.
+static void runPointwiseRow(uchar4* row,
+                            int y,
+                            uint32_t width,
+                            uint32_t height,
+                            const PointwiseOp* ops,
+                            uint32_t count) {
+    for (uint32_t i = 0; i < count; i++) {
+        const PointwiseOp* op = &ops[i];
+        bool mirror_x = (op->mirror & POINTWISE_MIRROR_X) != 0;
+        int oy = (op->mirror & POINTWISE_MIRROR_Y) ? (int)height - 1 - y : y;
+
+        switch (op->kind) {
+            case POINTWISE_FILL_COLOR:
+                for (int x = 0; x < (int)width; x++) {
+                    row[x] = op->color1;
+                }
+                break;
+            case POINTWISE_FILL_GRADIENT:
+                for (int x = 0; x < (int)width; x++) {
+                    int ox = mirror_x ? (int)width - 1 - x : x;
+                    row[x] = gradientPixel(ox, oy, width, height, op->color1, op->color2, op->param, op->flags != 0);
+                }
+                break;
+            case POINTWISE_GRAYSCALE:
+                for (int x = 0; x < (int)width; x++) {
+                    row[x] = grayscalePixel(row[x]);
+                }
+                break;
+            case POINTWISE_OPACITY:
+                for (int x = 0; x < (int)width; x++) {
+                    row[x] = opacityPixel(row[x], op->amount);
+                }
+                break;
+            case POINTWISE_CORNER_RADIUS:
+                // Same unsigned comparisons as isCornerTransparent: rows between
+                // the corners are never touched.
+                if ((uint32_t)oy >= (uint32_t)op->param && (uint32_t)oy < height - (uint32_t)op->param) break;
+                for (int x = 0; x < (int)width; x++) {
+                    int ox = mirror_x ? (int)width - 1 - x : x;
+                    if (isCornerTransparent(ox, oy, width, height, (uint32_t)op->param)) {
+                        row[x] = make_uchar4(0, 0, 0, 0);
+                    }
+                }
+                break;
+            case POINTWISE_CHROMA_KEY: {
+                if (oy >= (int)op->key_height) break;
+                const uchar4* key_row = op->key + (size_t)oy * op->key_pitch;
+                bool invert = (op->flags & POINTWISE_CHROMA_INVERT) != 0;
+                bool zero_all = (op->flags & POINTWISE_CHROMA_ZERO_ALL) != 0;
+                for (int x = 0; x < (int)width; x++) {
+                    int ox = mirror_x ? (int)width - 1 - x : x;
+                    if (ox < (int)op->key_width) {
+                        row[x] = chromaKeyPixel(row[x], key_row[ox], op->param,
+                                                (unsigned char)op->threshold, invert, zero_all);
+                    }
+                }
+                break;
+            }
+            case POINTWISE_TINT:
+                for (int x = 0; x < (int)width; x++) {
+                    row[x] = tintPixel(row[x], op->color1);
+                }
+                break;
+        }
+    }
+}
+
+static void loadPointwiseRow(uchar4* dst, const uchar4* src, uint32_t width, bool mirror_x) {
+    if (!mirror_x) {
+        memcpy(dst, src, width * sizeof(uchar4));
+        return;
+    }
+    for (int x = 0; x < (int)width; x++) {
+        dst[x] = src[width - 1 - x];
+    }
+}
+
+// Separable resampling -------------------------------------------------------
+//
+// Tables follow Pillow's coefficient computation (Image.resize), so separable
+// resizes match it within rounding. The CUDA backend builds the same tables.
+
+struct ResampleTable {
+    uint32_t src_size;  // pixels of the source region read
+    uint32_t dst_size;  // outputs covered
+    uint32_t taps;      // weights stored per output index, zero padded
+    int32_t* bounds;    // first source index and number of taps per output index
+    float* weights;     // dst_size * taps
+};
+
+static const double RESAMPLE_PI = 3.14159265358979323846;
+
+static double bicubicFilter(double x) {
+    const double a = -0.5;
+    x = fabs(x);
+    if (x < 1.0) return ((a + 2.0) * x - (a + 3.0)) * x * x + 1.0;
+    if (x < 2.0) return (((x - 5.0) * x + 8.0) * x - 4.0) * a;
+    return 0.0;
+}
+
+static double sincFilter(double x) {
+    if (x == 0.0) return 1.0;
+    x *= RESAMPLE_PI;
+    return sin(x) / x;
+}
+
+static double lanczos3Filter(double x) {
+    if (-3.0 < x && x < 3.0) return sincFilter(x) * sincFilter(x / 3.0);
+    return 0.0;
+}
+
+static double mitchellFilter(double x) {
+    // Mitchell-Netravali with B = C = 1/3.
+    const double B = 1.0 / 3.0;
+    const double C = 1.0 / 3.0;
+    x = fabs(x);
+    if (x < 1.0) {
+        return ((12.0 - 9.0 * B - 6.0 * C) * x * x * x +
+                (-18.0 + 12.0 * B + 6.0 * C) * x * x +
+                (6.0 - 2.0 * B)) / 6.0;
+    }
+    if (x < 2.0) {
+        return ((-B - 6.0 * C) * x * x * x +
+                (6.0 * B + 30.0 * C) * x * x +
+                (-12.0 * B - 48.0 * C) * x +
+                (8.0 * B + 24.0 * C)) / 6.0;
+    }
+    return 0.0;
+}
+
+// Computes the taps of outputs [dst_first, dst_first + dst_count) on the host,
+// relative to a source region of src_count pixels starting at src_first.
+// Returns 0 for methods that are not separable, empty ranges or on allocation
+// failure.
+static int buildResampleTable(ResampleTable* table, uint32_t src_size, uint32_t dst_size, int32_t method,
+                              uint32_t dst_first, uint32_t dst_count,
+                              uint32_t src_first, uint32_t src_count) {
+    double (*filter)(double);
+    double support;
+    switch (method) {
+        case RESIZE_BICUBIC:  filter = bicubicFilter;  support = 2.0; break;
+        case RESIZE_LANCZOS3: filter = lanczos3Filter; support = 3.0; break;
+        case RESIZE_MITCHELL: filter = mitchellFilter; support = 2.0; break;
+        default: return 0;
+    }
+    if (!src_size || !dst_size || !dst_count || !src_count) return 0;
+    if ((uint64_t)dst_first + dst_count > dst_size || (uint64_t)src_first + src_count > src_size) return 0;
+
+    double scale = (double)src_size / dst_size;
+    double filter_scale = scale > 1.0 ? scale : 1.0;
+    support *= filter_scale;
+
+    uint32_t taps = (uint32_t)ceil(support) * 2 + 1;
+    int32_t* bounds = (int32_t*)malloc(sizeof(int32_t) * 2 * dst_count);
+    float* weights = (float*)calloc((size_t)dst_count * taps, sizeof(float));
+    if (!bounds || !weights) {
+        free(bounds);
+        free(weights);
+        return 0;
+    }
+
+    for (uint32_t j = 0; j < dst_count; j++) {
+        double center = (dst_first + j + 0.5) * scale;
+        int first = imax((int)(center - support + 0.5), (int)src_first);
+        int last = imin((int)(center + support + 0.5), (int)(src_first + src_count));
+        int count = imax(imin(last - first, (int)taps), 0);
+
+        float* w = weights + (size_t)j * taps;
+        double total = 0.0;
+        for (int k = 0; k < count; k++) {
+            double weight = filter((k + first - center + 0.5) / filter_scale);
+            w[k] = (float)weight;
+            total += weight;
+        }
+        if (total != 0.0) {
+            for (int k = 0; k < count; k++) w[k] = (float)(w[k] / total);
+        }
+
+        bounds[2 * j] = count ? first - (int)src_first : 0;
+        bounds[2 * j + 1] = count;
+    }
+
+    table->src_size = src_count;
+    table->dst_size = dst_count;
+    table->taps = taps;
+    table->bounds = bounds;
+    table->weights = weights;
+    return 1;
+}
+
+static inline uchar4 roundPixel(float x, float y, float z, float w) {
+    return make_uchar4((unsigned char)lrintf(fmaxf(0.0f, fminf(255.0f, x))),
+                       (unsigned char)lrintf(fmaxf(0.0f, fminf(255.0f, y))),
+                       (unsigned char)lrintf(fmaxf(0.0f, fminf(255.0f, z))),
+                       (unsigned char)lrintf(fmaxf(0.0f, fminf(255.0f, w))));
+}
+
+// Resamples the rows of `src` (`height` rows of table->src_size pixels) into
+// rows of table->dst_size pixels.
+static void resampleHorizontal(uchar4* dst, uint32_t dst_pitch,
+                               const uchar4* src, uint32_t src_pitch,
+                               uint32_t height, const ResampleTable* table) {
+    const uint32_t width = table->dst_size;
+    const uint32_t taps = table->taps;
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(width * taps, height))
+    for (int y = 0; y < (int)height; y++) {
+        uchar4* row = dst + (size_t)y * dst_pitch;
+        const uchar4* src_row = src + (size_t)y * src_pitch;
+
+        for (uint32_t x = 0; x < width; x++) {
+            const uchar4* in = src_row + table->bounds[2 * x];
+            const int count = table->bounds[2 * x + 1];
+            const float* w = table->weights + (size_t)x * taps;
+
+            float rx = 0.0f, ry = 0.0f, rz = 0.0f, rw = 0.0f;
+            for (int k = 0; k < count; k++) {
+                rx += w[k] * in[k].x;
+                ry += w[k] * in[k].y;
+                rz += w[k] * in[k].z;
+                rw += w[k] * in[k].w;
+            }
+            row[x] = roundPixel(rx, ry, rz, rw);
+        }
+    }
+}
+
+// Resamples the columns of `src` (`width` columns of table->src_size pixels)
+// into columns of table->dst_size pixels.
+static void resampleVertical(uchar4* dst, uint32_t dst_pitch,
+                             const uchar4* src, uint32_t src_pitch,
+                             uint32_t width, const ResampleTable* table) {
+    const uint32_t height = table->dst_size;
+    const uint32_t taps = table->taps;
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(width * taps, height))
+    for (int y = 0; y < (int)height; y++) {
+        uchar4* row = dst + (size_t)y * dst_pitch;
+        const uchar4* in = src + (size_t)table->bounds[2 * y] * src_pitch;
+        const int count = table->bounds[2 * y + 1];
+        const float* w = table->weights + (size_t)y * taps;
+
+        for (uint32_t x = 0; x < width; x++) {
+            float rx = 0.0f, ry = 0.0f, rz = 0.0f, rw = 0.0f;
+            for (int k = 0; k < count; k++) {
+                uchar4 pixel = in[(size_t)k * src_pitch + x];
+                rx += w[k] * pixel.x;
+                ry += w[k] * pixel.y;
+                rz += w[k] * pixel.z;
+                rw += w[k] * pixel.w;
+            }
+            row[x] = roundPixel(rx, ry, rz, rw);
+        }
+    }
+}
+
+// Exported ABI ---------------------------------------------------------------
+
+uchar4* create_buffer(uint32_t width,
+                      uint32_t height) {
+    uchar4* buffer = (uchar4*)aligned_buffer_alloc((size_t)width * height * sizeof(uchar4));
+    if (!buffer) {
+        printf("Error in create_buffer: out of host memory for %ux%u\n", width, height);
+        return NULL;
+    }
+    return buffer;
+}
+
+void free_buffer(uchar4* buffer) {
+    if (buffer) {
+        aligned_buffer_free(buffer);
+    }
+}
+
+void copy_buffers_same_size(uchar4* dst,
+                            const uchar4* src,
+                            uint32_t width,
+                            uint32_t height,
+                            uint32_t dst_pitch,
+                            uint32_t src_pitch) {
+    if (!dst || !src) {
+        printf("Error: Null pointer provided to copy_buffers_same_size\n");
+        return;
+    }
+
+    if (dst_pitch == width && src_pitch == width) {
+        memmove(dst, src, (size_t)width * height * sizeof(uchar4));
+        return;
+    }
+
+    // Views of one buffer may overlap; walk the rows in the order memmove would.
+    if (dst <= src) {
+        for (uint32_t y = 0; y < height; y++) {
+            memmove(dst + (size_t)y * dst_pitch, src + (size_t)y * src_pitch, width * sizeof(uchar4));
+        }
+    } else {
+        for (uint32_t y = height; y-- > 0;) {
+            memmove(dst + (size_t)y * dst_pitch, src + (size_t)y * src_pitch, width * sizeof(uchar4));
+        }
+    }
+}
+
+uint64_t hash_image(const uchar4* buffer,
+                    uint32_t width,
+                    uint32_t height,
+                    uint32_t pitch) {
+    uint64_t sum = 0;
+    if (buffer) {
+        #pragma omp parallel for schedule(static) reduction(+:sum) if (PARALLEL(width, height))
+        for (int y = 0; y < (int)height; y++) {
+            const uchar4* row = buffer + (size_t)y * pitch;
+            const uint64_t base = (uint64_t)y * width;
+            uint64_t local = 0;
+            for (int x = 0; x < (int)width; x++) {
+                local += hashPixel(row[x], base + x);
+            }
+            sum += local;
+        }
+    }
+    return hashMix(sum ^ hashMix(((uint64_t)width << 32) | height));
+}
+
+uchar4* create_host_buffer(uint32_t width,
+                           uint32_t height) {
+    // Image buffers already live in host memory; there is nothing to pin.
+    return create_buffer(width, height);
+}
+
+void free_host_buffer(uchar4* buffer) {
+    free_buffer(buffer);
+}
+
+void copy_to_device(uchar4* d_dst,
+                    const uchar4* h_src,
+                    uint32_t width,
+                    uint32_t height,
+                    uint32_t dst_pitch) {
+    if (!d_dst || !h_src) return;
+
+    if (dst_pitch == width) {
+        memcpy(d_dst, h_src, (size_t)width * height * sizeof(uchar4));
+        return;
+    }
+    for (uint32_t y = 0; y < height; y++) {
+        memcpy(d_dst + (size_t)y * dst_pitch, h_src + (size_t)y * width, width * sizeof(uchar4));
+    }
+}
+
+void copy_to_host(uchar4* h_dst,
+                  const uchar4* d_src,
+                  uint32_t width,
+                  uint32_t height,
+                  uint32_t src_pitch) {
+    if (!h_dst || !d_src) return;
+
+    if (src_pitch == width) {
+        memcpy(h_dst, d_src, (size_t)width * height * sizeof(uchar4));
+        return;
+    }
+    for (uint32_t y = 0; y < height; y++) {
+        memcpy(h_dst + (size_t)y * width, d_src + (size_t)y * src_pitch, width * sizeof(uchar4));
+    }
+}
+
+void blend_buffers(uchar4* dst,
+                   const uchar4* src,
+                   uint32_t dst_width,
+                   uint32_t dst_height,
+                   uint32_t dst_pitch,
+                   uint32_t src_width,
+                   uint32_t src_height,
+                   uint32_t src_pitch,
+                   int32_t x,
+                   int32_t y) {
+    if (!dst || !src) return;
+
+    // Only the overlap of the two rectangles can change.
+    const int x0 = imax(0, x);
+    const int y0 = imax(0, y);
+    const int64_t src_right  = (int64_t)x + src_width;
+    const int64_t src_bottom = (int64_t)y + src_height;
+    const int x1 = (int)(src_right  < dst_width  ? src_right  : dst_width);
+    const int y1 = (int)(src_bottom < dst_height ? src_bottom : dst_height);
+    if (x0 >= x1 || y0 >= y1) return;
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(x1 - x0, y1 - y0))
+    for (int py = y0; py < y1; py++) {
+        uchar4* dst_row = dst + (size_t)py * dst_pitch;
+        const uchar4* src_row = src + (size_t)(py - y) * src_pitch - x;
+        for (int px = x0; px < x1; px++) {
+            blendPixel(&dst_row[px], src_row[px]);
+        }
+    }
+}
+
+void blend_layers(uchar4* dst,
+                  uint32_t dst_width,
+                  uint32_t dst_height,
+                  uint32_t dst_pitch,
+                  const BlendLayer* layers,
+                  uint32_t count) {
+    if (!dst || (count && !layers)) return;
+
+    // Rows covered by any layer; each row runs every layer over it in order,
+    // so the row stays in cache while the layers are stacked on it.
+    int y0 = (int)dst_height, y1 = 0;
+    uint64_t area = 0;
+    for (uint32_t i = 0; i < count; i++) {
+        const BlendLayer* layer = &layers[i];
+        const int64_t bottom = (int64_t)layer->y + layer->height;
+        if (!layer->src || bottom <= 0 || layer->y >= (int64_t)dst_height) continue;
+        y0 = imin(y0, imax(0, layer->y));
+        y1 = imax(y1, (int)(bottom < dst_height ? bottom : dst_height));
+        area += (uint64_t)layer->width * layer->height;
+    }
+    if (y0 >= y1) return;
+
+    #pragma omp parallel for schedule(static) if (area >= PARALLEL_MIN_PIXELS)
+    for (int py = y0; py < y1; py++) {
+        uchar4* dst_row = dst + (size_t)py * dst_pitch;
+        for (uint32_t i = 0; i < count; i++) {
+            const BlendLayer* layer = &layers[i];
+            if (!layer->src || py < layer->y || py >= (int64_t)layer->y + layer->height) continue;
+
+            const int x0 = imax(0, layer->x);
+            const int64_t right = (int64_t)layer->x + layer->width;
+            const int x1 = (int)(right < dst_width ? right : dst_width);
+            const uchar4* src_row = layer->src + (size_t)(py - layer->y) * layer->pitch - layer->x;
+            for (int px = x0; px < x1; px++) {
+                blendPixel(&dst_row[px], src_row[px]);
+            }
+        }
+    }
+}
+
+void resize_bilinear(uchar4* dst,
+                     const uchar4* src,
+                     uint32_t dst_width,
+                     uint32_t dst_height,
+                     uint32_t dst_pitch,
+                     uint32_t src_width,
+                     uint32_t src_height,
+                     uint32_t src_pitch) {
+    if (!dst || !src) return;
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(dst_width, dst_height))
+    for (int y = 0; y < (int)dst_height; y++) {
+        uchar4* row = dst + (size_t)y * dst_pitch;
+        for (int x = 0; x < (int)dst_width; x++) {
+            row[x] = resizeBilinearPixel(src, x, y, dst_width, dst_height, src_width, src_height, src_pitch);
+        }
+    }
+}
+
+void resize_nearest(uchar4* dst,
+                    const uchar4* src,
+                    uint32_t dst_width,
+                    uint32_t dst_height,
+                    uint32_t dst_pitch,
+                    uint32_t src_width,
+                    uint32_t src_height,
+                    uint32_t src_pitch) {
+    if (!dst || !src) return;
+
+    float scale_x = (float)src_width / dst_width;
+    float scale_y = (float)src_height / dst_height;
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(dst_width, dst_height))
+    for (int y = 0; y < (int)dst_height; y++) {
+        uchar4* row = dst + (size_t)y * dst_pitch;
+        const uchar4* src_row = src + (size_t)(int)(y * scale_y) * src_pitch;
+        for (int x = 0; x < (int)dst_width; x++) {
+            row[x] = src_row[(int)(x * scale_x)];
+        }
+    }
+}
+
+void resize_area(uchar4* dst,
+                 const uchar4* src,
+                 uint32_t dst_width,
+                 uint32_t dst_height,
+                 uint32_t dst_pitch,
+                 uint32_t src_width,
+                 uint32_t src_height,
+                 uint32_t src_pitch) {
+    if (!dst || !src) return;
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(src_width, src_height))
+    for (int y = 0; y < (int)dst_height; y++) {
+        uchar4* row = dst + (size_t)y * dst_pitch;
+        for (int x = 0; x < (int)dst_width; x++) {
+            row[x] = resizeAreaPixel(src, x, y, dst_width, dst_height, src_width, src_height, src_pitch);
+        }
+    }
+}
+
+ResampleTable* create_resample_table(uint32_t src_size,
+                                     uint32_t dst_size,
+                                     int32_t method,
+                                     uint32_t dst_first,
+                                     uint32_t dst_count,
+                                     uint32_t src_first,
+                                     uint32_t src_count) {
+    ResampleTable* table = (ResampleTable*)malloc(sizeof(ResampleTable));
+    if (!table) return NULL;
+    if (!buildResampleTable(table, src_size, dst_size, method, dst_first, dst_count, src_first, src_count)) {
+        free(table);
+        return NULL;
+    }
+    return table;
+}
+
+void free_resample_table(ResampleTable* table) {
+    if (!table) return;
+    free(table->bounds);
+    free(table->weights);
+    free(table);
+}
+
+void resize_separable(uchar4* dst,
+                      const uchar4* src,
+                      uint32_t dst_width,
+                      uint32_t dst_height,
+                      uint32_t dst_pitch,
+                      uint32_t src_width,
+                      uint32_t src_height,
+                      uint32_t src_pitch,
+                      uchar4* temp,
+                      uint32_t temp_pitch,
+                      const ResampleTable* horizontal,
+                      const ResampleTable* vertical) {
+    if (!dst || !src) return;
+    if (horizontal && (horizontal->src_size != src_width || horizontal->dst_size != dst_width)) return;
+    if (vertical && (vertical->src_size != src_height || vertical->dst_size != dst_height)) return;
+
+    if (horizontal && vertical) {
+        if (!temp) return;
+        resampleHorizontal(temp, temp_pitch, src, src_pitch, src_height, horizontal);
+        resampleVertical(dst, dst_pitch, temp, temp_pitch, dst_width, vertical);
+    } else if (horizontal) {
+        resampleHorizontal(dst, dst_pitch, src, src_pitch, dst_height, horizontal);
+    } else if (vertical) {
+        resampleVertical(dst, dst_pitch, src, src_pitch, dst_width, vertical);
+    } else {
+        copy_buffers_same_size(dst, src, dst_width, dst_height, dst_pitch, src_pitch);
+    }
+}
+
+void resize_many(const uchar4* src,
+                 uint32_t src_width,
+                 uint32_t src_height,
+                 uint32_t src_pitch,
+                 const ResizeTarget* targets,
+                 uint32_t count,
+                 int32_t method) {
+    if (!src || (count && !targets)) return;
+
+    for (uint32_t i = 0; i < count; i++) {
+        const ResizeTarget* target = &targets[i];
+        if (!target->dst) continue;
+
+        const uchar4* from = src;
+        uint32_t from_width = src_width, from_height = src_height, from_pitch = src_pitch;
+        if (target->source >= 0 && (uint32_t)target->source < i) {
+            const ResizeTarget* larger = &targets[target->source];
+            from = larger->dst;
+            from_width = larger->width;
+            from_height = larger->height;
+            from_pitch = larger->pitch;
+        }
+
+        switch (method) {
+            case RESIZE_NEAREST:
+                resize_nearest(target->dst, from, target->width, target->height, target->pitch,
+                               from_width, from_height, from_pitch);
+                break;
+            case RESIZE_BILINEAR:
+                resize_bilinear(target->dst, from, target->width, target->height, target->pitch,
+                                from_width, from_height, from_pitch);
+                break;
+            case RESIZE_AREA:
+                resize_area(target->dst, from, target->width, target->height, target->pitch,
+                            from_width, from_height, from_pitch);
+                break;
+            case RESIZE_BICUBIC:
+            case RESIZE_LANCZOS3:
+            case RESIZE_MITCHELL:
+                resize_separable(target->dst, from, target->width, target->height, target->pitch,
+                                 from_width, from_height, from_pitch,
+                                 target->temp, target->temp_pitch, target->horizontal, target->vertical);
+                break;
+        }
+    }
+}
+
+void fill_color(uchar4* buffer,
+                uint32_t width,
+                uint32_t height,
+                uint32_t pitch,
+                unsigned char r,
+                unsigned char g,
+                unsigned char b,
+                unsigned char a) {
+    if (!buffer) return;
+
+    uchar4 color = make_uchar4(r, g, b, a);
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(width, height))
+    for (int y = 0; y < (int)height; y++) {
+        uchar4* row = buffer + (size_t)y * pitch;
+        for (int x = 0; x < (int)width; x++) {
+            row[x] = color;
+        }
+    }
+}
+
+void apply_corner_radius(uchar4* buffer,
+                         uint32_t width,
+                         uint32_t height,
+                         uint32_t pitch,
+                         uint32_t size) {
+    if (!buffer) return;
+
+    // Only the four size x size corner squares can change.
+    const int band_x = (int)(size < width ? size : width);
+    const int band_y = (int)(size < height ? size : height);
+    const int right = imax(band_x, (int)width - band_x);
+    const int bottom = imax(band_y, (int)height - band_y);
+
+    const int rows = band_y + ((int)height - bottom);
+    const int cols = band_x + ((int)width - right);
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(cols, rows))
+    for (int i = 0; i < rows; i++) {
+        const int y = i < band_y ? i : bottom + (i - band_y);
+        uchar4* row = buffer + (size_t)y * pitch;
+        for (int j = 0; j < cols; j++) {
+            const int x = j < band_x ? j : right + (j - band_x);
+            if (isCornerTransparent(x, y, width, height, size)) {
+                row[x] = make_uchar4(0, 0, 0, 0);
+            }
+        }
+    }
+}
+
+void compute_distance_field(float* field,
+                            uint32_t* column_scratch,
+                            uint32_t* row_scratch,
+                            const uchar4* src,
+                            uint32_t width,
+                            uint32_t height,
+                            uint32_t src_pitch) {
+    if (!field || !column_scratch || !row_scratch || !src) return;
+    if ((uint64_t)width + height > DISTANCE_FIELD_MAX_EXTENT) {
+        printf("Error in compute_distance_field: %ux%u exceeds the supported extent\n", width, height);
+        return;
+    }
+
+    columnDistances(column_scratch, src, width, height, src_pitch);
+
+    const int64_t inf = (int64_t)width + height;
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(width, height))
+    for (int y = 0; y < (int)height; y++) {
+        const size_t offset = (size_t)y * width;
+        const uchar4* src_row = src + (size_t)y * src_pitch;
+        rowDistances(field + offset, row_scratch + offset, column_scratch + offset,
+                     src_row, (int)width, inf, true);
+        rowDistances(field + offset, row_scratch + offset, column_scratch + offset,
+                     src_row, (int)width, inf, false);
+    }
+}
+
+void apply_stroke(uchar4* buffer,
+                  const float* field,
+                  uint32_t width,
+                  uint32_t height,
+                  uint32_t pitch,
+                  int stroke_width,
+                  unsigned char stroke_r,
+                  unsigned char stroke_g,
+                  unsigned char stroke_b,
+                  unsigned char stroke_a,
+                  int mode) {
+    if (!buffer || !field) return;
+    if (mode != 0 && mode != 1) return;
+
+    uchar4 stroke_color = make_uchar4(stroke_r, stroke_g, stroke_b, stroke_a);
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(width, height))
+    for (int y = 0; y < (int)height; y++) {
+        uchar4* row = buffer + (size_t)y * pitch;
+        const float* field_row = field + (size_t)y * width;
+        for (int x = 0; x < (int)width; x++) {
+            float d = field_row[x];
+            bool isStroke;
+            if (mode == 0) {
+                isStroke = d > 0.0f && d <= stroke_width;
+            } else {
+                isStroke = d < 0.0f &&
+                           (-d <= stroke_width ||
+                            x < stroke_width || x >= (int)width - stroke_width ||
+                            y < stroke_width || y >= (int)height - stroke_width);
+            }
+            if (isStroke) row[x] = stroke_color;
+        }
+    }
+}
+
+void apply_opacity(uchar4* buffer,
+                   uint32_t width,
+                   uint32_t height,
+                   uint32_t pitch,
+                   float opacity) {
+    if (!buffer) return;
+
+    opacity = fminf(fmaxf(opacity, 0.0f), 1.0f);
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(width, height))
+    for (int y = 0; y < (int)height; y++) {
+        uchar4* row = buffer + (size_t)y * pitch;
+        for (int x = 0; x < (int)width; x++) {
+            row[x] = opacityPixel(row[x], opacity);
+        }
+    }
+}
+
+void apply_shadow(uchar4* buffer,
+                  const float* field,
+                  uint32_t width,
+                  uint32_t height,
+                  uint32_t pitch,
+                  float radius,
+                  float intensity,
+                  unsigned char shadow_r,
+                  unsigned char shadow_g,
+                  unsigned char shadow_b,
+                  unsigned char shadow_a,
+                  int mode) {
+    if (!buffer || !field) return;
+
+    uchar4 shadow_color = make_uchar4(shadow_r, shadow_g, shadow_b, shadow_a);
+    bool isInner = mode == 1;
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(width, height))
+    for (int y = 0; y < (int)height; y++) {
+        uchar4* row = buffer + (size_t)y * pitch;
+        const float* field_row = field + (size_t)y * width;
+        for (int x = 0; x < (int)width; x++) {
+            float d = field_row[x];
+
+            if (isInner) {
+                if (d > 0.0f) continue;
+                float weight = shadowWeight(-d, radius, intensity);
+                float invWeight = 1.0f - weight;
+                uchar4 pixel = row[x];
+                row[x].x = (unsigned char)(pixel.x * invWeight + shadow_color.x * weight);
+                row[x].y = (unsigned char)(pixel.y * invWeight + shadow_color.y * weight);
+                row[x].z = (unsigned char)(pixel.z * invWeight + shadow_color.z * weight);
+            } else {
+                if (d < 0.0f) continue;
+                float weight = shadowWeight(d, radius, intensity);
+                if (weight > 0.0f) {
+                    float finalAlpha = shadow_color.w / 255.0f * weight;
+                    row[x] = make_uchar4(shadow_color.x, shadow_color.y, shadow_color.z,
+                                         (unsigned char)(finalAlpha * 255.0f));
+                } else {
+                    row[x] = make_uchar4(0, 0, 0, 0);
+                }
+            }
+        }
+    }
+}
+
+void apply_flip(uchar4* buffer,
+                uint32_t width,
+                uint32_t height,
+                uint32_t pitch,
+                bool flip_horizontal,
+                bool flip_vertical) {
+    if (!buffer) return;
+
+    // Every thread owns a disjoint set of swap pairs, so the flip stays in place.
+    int rows = flip_vertical ? (int)(height / 2) : (int)height;
+    int cols = flip_horizontal ? (int)(width / 2) : (int)width;
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(width, rows))
+    for (int y = 0; y < rows; y++) {
+        int src_y = flip_vertical ? ((int)height - 1 - y) : y;
+        uchar4* row = buffer + (size_t)y * pitch;
+        uchar4* src_row = buffer + (size_t)src_y * pitch;
+        for (int x = 0; x < cols; x++) {
+            int src_x = flip_horizontal ? ((int)width - 1 - x) : x;
+            if (src_x == x && src_y == y) continue;
+
+            uchar4 temp = row[x];
+            row[x] = src_row[src_x];
+            src_row[src_x] = temp;
+        }
+    }
+}
+
+void apply_grayscale(uchar4* buffer,
+                     uint32_t width,
+                     uint32_t height,
+                     uint32_t pitch) {
+    if (!buffer) return;
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(width, height))
+    for (int y = 0; y < (int)height; y++) {
+        uchar4* row = buffer + (size_t)y * pitch;
+        for (int x = 0; x < (int)width; x++) {
+            row[x] = grayscalePixel(row[x]);
+        }
+    }
+}
+
+void crop_image(uchar4* dst,
+                const uchar4* src,
+                uint32_t src_width,
+                uint32_t src_height,
+                uint32_t src_pitch,
+                uint32_t dst_width,
+                uint32_t dst_height,
+                uint32_t dst_pitch,
+                int crop_x,
+                int crop_y) {
+    if (!src || !dst) return;
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(dst_width, dst_height))
+    for (int y = 0; y < (int)dst_height; y++) {
+        uchar4* row = dst + (size_t)y * dst_pitch;
+        int src_y = crop_y + y;
+        for (int x = 0; x < (int)dst_width; x++) {
+            int src_x = crop_x + x;
+            if (src_x >= 0 && src_x < (int)src_width && src_y >= 0 && src_y < (int)src_height) {
+                row[x] = src[(size_t)src_y * src_pitch + src_x];
+            } else {
+                row[x] = make_uchar4(0, 0, 0, 0);
+            }
+        }
+    }
+}
+
+void fill_gradient(uchar4* buffer,
+                   uint32_t width,
+                   uint32_t height,
+                   uint32_t pitch,
+                   unsigned char r1,
+                   unsigned char g1,
+                   unsigned char b1,
+                   unsigned char a1,
+                   unsigned char r2,
+                   unsigned char g2,
+                   unsigned char b2,
+                   unsigned char a2,
+                   int direction,
+                   bool seamless) {
+    if (!buffer) return;
+
+    uchar4 c1 = make_uchar4(r1, g1, b1, a1);
+    uchar4 c2 = make_uchar4(r2, g2, b2, a2);
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(width, height))
+    for (int y = 0; y < (int)height; y++) {
+        uchar4* row = buffer + (size_t)y * pitch;
+        for (int x = 0; x < (int)width; x++) {
+            row[x] = gradientPixel(x, y, width, height, c1, c2, direction, seamless);
+        }
+    }
+}
+
+void apply_gaussian_blur(uchar4* buffer,
+                         uchar4* temp_buffer,
+                         uint32_t width,
+                         uint32_t height,
+                         uint32_t pitch,
+                         float radius) {
+    if (!buffer || !temp_buffer || radius <= 0.0f) return;
+
+    int kernelRadius = gaussianKernelRadius(radius);
+    float* weights = (float*)malloc((kernelRadius + 1) * sizeof(float));
+    if (!weights) return;
+    buildGaussianWeights(radius, weights, kernelRadius);
+
+    // temp_buffer is packed; only the image itself may be a pitched view.
+    gaussianBlurPass(buffer, temp_buffer, width, height, pitch, width, weights, kernelRadius, false);
+    gaussianBlurPass(temp_buffer, buffer, width, height, width, pitch, weights, kernelRadius, true);
+
+    free(weights);
+}
+
+void apply_chroma_key(uchar4* buffer,
+                      const uchar4* key_buffer,
+                      uint32_t buffer_width,
+                      uint32_t buffer_height,
+                      uint32_t buffer_pitch,
+                      uint32_t key_width,
+                      uint32_t key_height,
+                      uint32_t key_pitch,
+                      int channel,
+                      unsigned char threshold,
+                      bool invert,
+                      bool zero_all_channels) {
+    if (!buffer || !key_buffer) return;
+
+    int rows = imin((int)buffer_height, (int)key_height);
+    int cols = imin((int)buffer_width, (int)key_width);
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(cols, rows))
+    for (int y = 0; y < rows; y++) {
+        uchar4* row = buffer + (size_t)y * buffer_pitch;
+        const uchar4* key_row = key_buffer + (size_t)y * key_pitch;
+        for (int x = 0; x < cols; x++) {
+            row[x] = chromaKeyPixel(row[x], key_row[x], channel, threshold, invert, zero_all_channels);
+        }
+    }
+}
+
+void apply_pointwise_ops(uchar4* buffer,
+                         uint32_t width,
+                         uint32_t height,
+                         uint32_t pitch,
+                         const PointwiseOp* ops,
+                         uint32_t count,
+                         int32_t load_mirror) {
+    if (!buffer || (count && !ops)) return;
+    if (count > POINTWISE_MAX_OPS) {
+        printf("Error in apply_pointwise_ops: %u operations exceed the limit of %d\n", count, POINTWISE_MAX_OPS);
+        return;
+    }
+
+    if (!load_mirror) {
+        #pragma omp parallel for schedule(static) if (PARALLEL(width, height))
+        for (int y = 0; y < (int)height; y++) {
+            runPointwiseRow(buffer + (size_t)y * pitch, y, width, height, ops, count);
+        }
+        return;
+    }
+
+    // A mirrored load reads row height-1-y for row y, so both rows of a pair
+    // are loaded into per-thread scratch before either is written back.
+    bool mirror_x = (load_mirror & POINTWISE_MIRROR_X) != 0;
+    bool mirror_y = (load_mirror & POINTWISE_MIRROR_Y) != 0;
+    int rows = mirror_y ? (int)(height + 1) / 2 : (int)height;
+
+    int threads = 1;
+#ifdef _OPENMP
+    threads = omp_get_max_threads();
+#endif
+    uchar4* scratch = (uchar4*)aligned_buffer_alloc((size_t)threads * 2 * width * sizeof(uchar4));
+    if (!scratch) {
+        printf("Error in apply_pointwise_ops: out of host memory for %ux%u\n", width, height);
+        return;
+    }
+
+    #pragma omp parallel for schedule(static) if (PARALLEL(width, height))
+    for (int y = 0; y < rows; y++) {
+        int thread = 0;
+#ifdef _OPENMP
+        thread = omp_get_thread_num();
+#endif
+        uchar4* first = scratch + (size_t)thread * 2 * width;
+        uchar4* second = first + width;
+        int pair_y = mirror_y ? (int)height - 1 - y : y;
+        uchar4* row = buffer + (size_t)y * pitch;
+        uchar4* pair_row = buffer + (size_t)pair_y * pitch;
+
+        loadPointwiseRow(first, pair_row, width, mirror_x);
+        if (pair_y != y) {
+            loadPointwiseRow(second, row, width, mirror_x);
+            runPointwiseRow(second, pair_y, width, height, ops, count);
+            memcpy(pair_row, second, width * sizeof(uchar4));
+        }
+        runPointwiseRow(first, y, width, height, ops, count);
+        memcpy(row, first, width * sizeof(uchar4));
+    }
+
+    aligned_buffer_free(scratch);
+}
@@ -1,12 +1,138 @@
 #include "photoff.h"
 #include <stdio.h>
+#include <stdlib.h>
+#include <math.h>
+#include <mutex>
+
+// Pointwise pixel operations -------------------------------------------------
+//
+// Shared by the single-operation kernels and the fused pointwise chain, so
+// both produce identical pixels.
+
+__device__ __forceinline__ bool isCornerTransparent(int x, int y, uint32_t width, uint32_t height, uint32_t radius) {
+    int dx, dy;
+
+    if (x < radius && y < radius) {
+        dx = radius - 1 - x;
+        dy = radius - 1 - y;
+    } else if (x >= width - radius && y < radius) {
+        dx = x - (width - radius);
+        dy = radius - 1 - y;
+    } else if (x < radius && y >= height - radius) {
+        dx = radius - 1 - x;
+        dy = y - (height - radius);
+    } else if (x >= width - radius && y >= height - radius) {
+        dx = x - (width - radius);
+        dy = y - (height - radius);
+    } else {
+        return false;
+    }
+    return dx * dx + dy * dy > radius * radius;
+}
+
+__device__ __forceinline__ uchar4 gradientPixel(int x,
+                                                int y,
+                                                uint32_t width,
+                                                uint32_t height,
+                                                uchar4 c1,
+                                                uchar4 c2,
+                                                int direction,
+                                                bool seamless) {
+    float factor = 0.0f;
+
+    float nx = (float)x / (float)(width - 1) - 0.5f;
+    float ny = (float)y / (float)(height - 1) - 0.5f;
+
+    switch(direction) {
+        case 0: // horizontal
+            factor = (float)x / (float)(width - 1);
+            break;
+        case 1: // vertical
+            factor = (float)y / (float)(height - 1);
+            break;
+        case 2: { // diagonal
+            float u = (float)x / (float)(width - 1);
+            float v = (float)y / (float)(height - 1);
+            factor = (u + v) * 0.5f;
+            break;
+        }
+        case 3: // radial
+            factor = sqrtf(nx*nx + ny*ny) * 1.414f;
+            factor = min(1.0f, factor);
+            break;
+    }
+
+    if (seamless) {
+        factor = factor < 0.5f ? 
+                factor * 2.0f : 
+                2.0f * (1.0f - factor);
+    }
+
+    return make_uchar4((unsigned char)(c1.x + (c2.x - c1.x) * factor),
+                       (unsigned char)(c1.y + (c2.y - c1.y) * factor),
+                       (unsigned char)(c1.z + (c2.z - c1.z) * factor),
+                       (unsigned char)(c1.w + (c2.w - c1.w) * factor));
+}
+
+__device__ __forceinline__ uchar4 grayscalePixel(uchar4 pixel) {
+    if (pixel.w == 0) return pixel;
+
+    unsigned char gray = (unsigned char)(
+        0.299f * pixel.x + 
+        0.587f * pixel.y + 
+        0.114f * pixel.z
+    );
+    return make_uchar4(gray, gray, gray, pixel.w);
+}
+
+__device__ __forceinline__ uchar4 opacityPixel(uchar4 pixel, float opacity) {
+    float currentAlpha = pixel.w / 255.0f;
+    float newAlpha = currentAlpha * opacity;
+    pixel.w = static_cast<unsigned char>(newAlpha * 255.0f);
+    return pixel;
+}
+
+__device__ __forceinline__ uchar4 tintPixel(uchar4 pixel, uchar4 color) {
+    return make_uchar4(color.x, color.y, color.z,
+                       static_cast<unsigned char>((pixel.w * color.w + 127) / 255));
+}
+
+__device__ __forceinline__ uchar4 chromaKeyPixel(uchar4 pixel,
+                                                 uchar4 keyPixel,
+                                                 int channel,
+                                                 unsigned char threshold,
+                                                 bool invert,
+                                                 bool zero_all_channels) {
+    unsigned char channelValue;
+    switch(channel) {
+        case 0: channelValue = keyPixel.x; break; // R
+        case 1: channelValue = keyPixel.y; break; // G
+        case 2: channelValue = keyPixel.z; break; // B
+        case 3: channelValue = keyPixel.w; break; // A
+        default: channelValue = keyPixel.y; break; // Default to G
+    }
+    
+    bool makeTransparent = invert ? 
+                          (channelValue <= threshold) : 
+                          (channelValue > threshold);
+    
+    if (makeTransparent) {
+        if (zero_all_channels) {
+            return make_uchar4(0, 0, 0, 0);
+        }
+        pixel.w = 0;
+    }
+    return pixel;
+}
 
 __global__ void cropKernel(const uchar4* src,
                            uchar4* dst,
                            uint32_t src_width,
                            uint32_t src_height,
+                           uint32_t src_pitch,
                            uint32_t dst_width,
                            uint32_t dst_height,
+                           uint32_t dst_pitch,
                            int crop_x,
                            int crop_y) {
     int x = blockIdx.x * blockDim.x + threadIdx.x;
@@ -18,9 +144,9 @@ __global__ void cropKernel(const uchar4* src,
     int src_y = crop_y + y;
 
     if (src_x < src_width && src_y < src_height) {
-        dst[y * dst_width + x] = src[src_y * src_width + src_x];
+        dst[y * dst_pitch + x] = src[src_y * src_pitch + src_x];
     } else {
-        dst[y * dst_width + x] = make_uchar4(0, 0, 0, 0);
+        dst[y * dst_pitch + x] = make_uchar4(0, 0, 0, 0);
     }
 }
 
@@ -28,8 +154,10 @@ __global__ void chromaKeyKernel(uchar4* buffer,
                                 const uchar4* key_buffer,
                                 uint32_t buffer_width,
                                 uint32_t buffer_height,
+                                uint32_t buffer_pitch,
                                 uint32_t key_width,
                                 uint32_t key_height,
+                                uint32_t key_pitch,
                                 int channel,
                                 unsigned char threshold,
                                 bool invert,
@@ -39,170 +167,209 @@ __global__ void chromaKeyKernel(uchar4* buffer,
     
     if (x >= buffer_width || y >= buffer_height) return;
     
-    int buffer_idx = y * buffer_width + x;
+    int buffer_idx = y * buffer_pitch + x;
     
     if (x < key_width && y < key_height) {
-        int key_idx = y * key_width + x;
-        uchar4 keyPixel = key_buffer[key_idx];
-        
-        unsigned char channelValue;
-        switch(channel) {
-            case 0: channelValue = keyPixel.x; break; // R
-            case 1: channelValue = keyPixel.y; break; // G
-            case 2: channelValue = keyPixel.z; break; // B
-            case 3: channelValue = keyPixel.w; break; // A
-            default: channelValue = keyPixel.y; break; // Default to G
-        }
-        
-        bool makeTransparent = invert ? 
-                              (channelValue <= threshold) : 
-                              (channelValue > threshold);
-        
-        if (makeTransparent) {
-            if (zero_all_channels) {
-                buffer[buffer_idx] = make_uchar4(0, 0, 0, 0);
-            } else {
-                buffer[buffer_idx].w = 0;
-            }
-        }
+        int key_idx = y * key_pitch + x;
+        buffer[buffer_idx] = chromaKeyPixel(buffer[buffer_idx], key_buffer[key_idx],
+                                            channel, threshold, invert, zero_all_channels);
     }
 }
 
 
 __global__ void grayscaleKernel(uchar4* buffer,
                                uint32_t width,
-                               uint32_t height) {
+                               uint32_t height,
+                               uint32_t pitch) {
     int x = blockIdx.x * blockDim.x + threadIdx.x;
     int y = blockIdx.y * blockDim.y + threadIdx.y;
     
     if (x >= width || y >= height) return;
     
-    int idx = y * width + x;
-    uchar4 pixel = buffer[idx];
-    
-    if (pixel.w == 0) return;
-    
-    unsigned char gray = (unsigned char)(
-        0.299f * pixel.x + 
-        0.587f * pixel.y + 
-        0.114f * pixel.z
-    );
-    
-    buffer[idx].x = gray;
-    buffer[idx].y = gray;
-    buffer[idx].z = gray;
-}
-
-__device__ float gaussianWeight(float distance, float sigma) {
-    return expf(-(distance * distance) / (2.0f * sigma * sigma));
+    int idx = y * pitch + x;
+    buffer[idx] = grayscalePixel(buffer[idx]);
 }
 
-__global__ void gaussianBlurKernel(const uchar4* src,
-                                   uchar4* dst,
-                                   uint32_t width,
-                                   uint32_t height,
-                                   float radius) {
+__global__ void gaussianBlurPassKernel(const uchar4* src,
+                                       uchar4* dst,
+                                       uint32_t width,
+                                       uint32_t height,
+                                       uint32_t src_pitch,
+                                       uint32_t dst_pitch,
+                                       const float* weights,
+                                       int kernelRadius,
+                                       bool vertical) {
     int x = blockIdx.x * blockDim.x + threadIdx.x;
     int y = blockIdx.y * blockDim.y + threadIdx.y;
-    
+
     if (x >= width || y >= height) return;
-    
-    float sigma = radius / 2.0f;
-    
-    int kernelSize = ceilf(radius * 3.0f);
-    kernelSize = max(1, min(kernelSize, 25));
-    
+
+    // Colour is averaged weighted by alpha, so transparent texels do not
+    // bleed black into the result. The weight table is normalised.
     float sumR = 0.0f, sumG = 0.0f, sumB = 0.0f, sumA = 0.0f;
-    float totalWeight = 0.0f;
-    
-    for (int ky = -kernelSize; ky <= kernelSize; ky++) {
-        for (int kx = -kernelSize; kx <= kernelSize; kx++) {
-            int sampleX = min(width - 1, max(0, x + kx));
-            int sampleY = min(height - 1, max(0, y + ky));
-            
-            float distance = sqrtf((float)(kx * kx + ky * ky));
-            
-            if (distance > kernelSize) continue;
-            
-            float weight = gaussianWeight(distance, sigma);
-            
-            uchar4 sample = src[sampleY * width + sampleX];
-            
-            float alpha = sample.w / 255.0f;
-            
-            sumR += sample.x * weight * alpha;
-            sumG += sample.y * weight * alpha;
-            sumB += sample.z * weight * alpha;
-            sumA += sample.w * weight;
-            
-            totalWeight += weight;
-        }
+
+    for (int k = -kernelRadius; k <= kernelRadius; k++) {
+        int sampleX = vertical ? x : min((int)width - 1, max(0, x + k));
+        int sampleY = vertical ? min((int)height - 1, max(0, y + k)) : y;
+
+        uchar4 sample = src[sampleY * src_pitch + sampleX];
+        float weightedAlpha = weights[abs(k)] * sample.w;
+
+        sumR += sample.x * weightedAlpha;
+        sumG += sample.y * weightedAlpha;
+        sumB += sample.z * weightedAlpha;
+        sumA += weightedAlpha;
     }
-    
-    if (totalWeight > 0.0f) {
-        float alpha = sumA / (totalWeight * 255.0f);
-        
-        if (alpha > 0.0f) {
-            dst[y * width + x].x = (unsigned char)(sumR / (totalWeight * alpha));
-            dst[y * width + x].y = (unsigned char)(sumG / (totalWeight * alpha));
-            dst[y * width + x].z = (unsigned char)(sumB / (totalWeight * alpha));
-            dst[y * width + x].w = (unsigned char)(sumA / totalWeight);
-        } else {
-            dst[y * width + x] = make_uchar4(0, 0, 0, 0);
-        }
+
+    if (sumA > 0.0f) {
+        dst[y * dst_pitch + x] = make_uchar4((unsigned char)(sumR / sumA + 0.5f),
+                                         (unsigned char)(sumG / sumA + 0.5f),
+                                         (unsigned char)(sumB / sumA + 0.5f),
+                                         (unsigned char)(sumA + 0.5f));
     } else {
-        dst[y * width + x] = make_uchar4(0, 0, 0, 0);
+        dst[y * dst_pitch + x] = make_uchar4(0, 0, 0, 0);
     }
 }
 
 __global__ void copyBufferKernel(uchar4* dst,
                                  const uchar4* src,
                                  uint32_t width,
-                                 uint32_t height) {
+                                 uint32_t height,
+                                 uint32_t dst_pitch,
+                                 uint32_t src_pitch) {
     int x = blockIdx.x * blockDim.x + threadIdx.x;
     int y = blockIdx.y * blockDim.y + threadIdx.y;
     
     if (x >= width || y >= height) return;
     
-    int idx = y * width + x;
-    dst[idx] = src[idx];
+    dst[y * dst_pitch + x] = src[y * src_pitch + x];
 }
 
-__device__ float calculateShadowWeight(int x,
-                                       int y,
-                                       const uchar4* buffer,
-                                       uint32_t width,
-                                       uint32_t height,
-                                       float radius,
-                                       bool isInner) {
-    float minDistance = radius;
-    int r2 = radius * radius;
-    
-    for (int dy = -radius; dy <= radius; dy++) {
-        for (int dx = -radius; dx <= radius; dx++) {
-            if (dx*dx + dy*dy > r2) continue;
-            
-            int nx = x + dx;
-            int ny = y + dy;
-            
-            if (nx >= 0 && nx < width && ny >= 0 && ny < height) {
-                bool hasAlpha = buffer[ny * width + nx].w > 0;
-                if (hasAlpha != isInner) {
-                    float distance = sqrtf(dx*dx + dy*dy);
-                    minDistance = min(minDistance, distance);
-                }
+// Alpha distance field -------------------------------------------------------
+//
+// Exact Euclidean distance transform (Meijster et al.) of the alpha mask. Each
+// pixel stores the distance to the nearest pixel of the opposite class:
+// positive for transparent pixels (distance to the shape), negative for opaque
+// pixels (distance to the nearest in-bounds transparent pixel), +/-INFINITY
+// when no such pixel exists. Column distances for both classes are packed as
+// two 16-bit halves, which bounds width + height to DISTANCE_FIELD_MAX_EXTENT.
+
+#define DISTANCE_FIELD_MAX_EXTENT 0xFFFFu
+
+__device__ __forceinline__ long long edtF(long long x, long long i, long long gi) {
+    return (x - i) * (x - i) + gi * gi;
+}
+
+__device__ __forceinline__ long long edtSep(long long i, long long u, long long gi, long long gu) {
+    return (u * u - i * i + gu * gu - gi * gi) / (2 * (u - i));
+}
+
+__global__ void columnDistanceKernel(uint32_t* columns,
+                                     const uchar4* src,
+                                     uint32_t width,
+                                     uint32_t height,
+                                     uint32_t src_pitch) {
+    int x = blockIdx.x * blockDim.x + threadIdx.x;
+    if (x >= width) return;
+
+    const uint32_t inf = width + height;
+
+    for (int y = 0; y < height; y++) {
+        int idx = y * width + x;
+        bool opaque = src[y * src_pitch + x].w != 0;
+        uint32_t above = y == 0 ? 0 : columns[idx - width];
+        uint32_t toOpaque = opaque ? 0 : (y == 0 ? inf : min(inf, (above & 0xFFFF) + 1));
+        uint32_t toClear = !opaque ? 0 : (y == 0 ? inf : min(inf, (above >> 16) + 1));
+        columns[idx] = toOpaque | (toClear << 16);
+    }
+
+    for (int y = (int)height - 2; y >= 0; y--) {
+        int idx = y * width + x;
+        uint32_t current = columns[idx];
+        uint32_t below = columns[idx + width];
+        uint32_t toOpaque = min(current & 0xFFFF, (below & 0xFFFF) + 1);
+        uint32_t toClear = min(current >> 16, (below >> 16) + 1);
+        columns[idx] = toOpaque | (toClear << 16);
+    }
+}
+
+__device__ void rowDistances(float* field_row,
+                             uint32_t* st,
+                             const uint32_t* columns_row,
+                             const uchar4* src_row,
+                             int width,
+                             long long inf,
+                             bool toOpaque) {
+    const int shift = toOpaque ? 0 : 16;
+    #define G(i) ((long long)((columns_row[(i)] >> shift) & 0xFFFF))
+    #define S(q) ((long long)(st[(q)] & 0xFFFF))
+    #define T(q) ((long long)(st[(q)] >> 16))
+
+    int q = 0;
+    st[0] = 0;
+
+    for (int u = 1; u < width; u++) {
+        while (q >= 0 && edtF(T(q), S(q), G(S(q))) > edtF(T(q), u, G(u))) q--;
+
+        if (q < 0) {
+            q = 0;
+            st[0] = (uint32_t)u;
+        } else {
+            long long w = 1 + edtSep(S(q), u, G(S(q)), G(u));
+            if (w < width) {
+                q++;
+                st[q] = (uint32_t)u | ((uint32_t)w << 16);
             }
         }
     }
-    
+
+    for (int u = width - 1; u >= 0; u--) {
+        bool opaque = src_row[u].w != 0;
+        if (opaque != toOpaque) {
+            long long d2 = edtF(u, S(q), G(S(q)));
+            float d = d2 >= inf * inf ? INFINITY : sqrtf((float)d2);
+            field_row[u] = toOpaque ? d : -d;
+        }
+        if (u == T(q)) q--;
+    }
+
+    #undef G
+    #undef S
+    #undef T
+}
+
+__global__ void rowDistanceKernel(float* field,
+                                  uint32_t* row_scratch,
+                                  const uint32_t* columns,
+                                  const uchar4* src,
+                                  uint32_t width,
+                                  uint32_t height,
+                                  uint32_t src_pitch) {
+    int y = blockIdx.x * blockDim.x + threadIdx.x;
+    if (y >= height) return;
+
+    const size_t offset = (size_t)y * width;
+    const uchar4* src_row = src + (size_t)y * src_pitch;
+    const long long inf = (long long)width + height;
+
+    rowDistances(field + offset, row_scratch + offset, columns + offset,
+                 src_row, width, inf, true);
+    rowDistances(field + offset, row_scratch + offset, columns + offset,
+                 src_row, width, inf, false);
+}
+
+__device__ float shadowWeight(float distance, float radius, float intensity) {
+    int r2 = radius * radius;
+    float minDistance = rintf(distance * distance) <= r2 ? distance : radius;
     float weight = 1.0f - (minDistance / radius);
-    return max(0.0f, min(1.0f, weight));
+    return max(0.0f, min(1.0f, weight)) * intensity;
 }
 
-__global__ void shadowKernel(const uchar4* src,
-                             uchar4* dst,
+__global__ void shadowKernel(uchar4* buffer,
+                             const float* field,
                              uint32_t width,
                              uint32_t height,
+                             uint32_t pitch,
                              float radius,
                              float intensity,
                              uchar4 shadow_color,
@@ -212,52 +379,108 @@ __global__ void shadowKernel(const uchar4* src,
     
     if (x >= width || y >= height) return;
     
-    int idx = y * width + x;
-    uchar4 srcPixel = src[idx];
-    
-    if ((isInner && srcPixel.w == 0) || (!isInner && srcPixel.w > 0)) {
-        dst[idx] = srcPixel;
-        return;
-    }
-    
-    float shadowWeight = calculateShadowWeight(x, y, src, width, height, radius, isInner);
-    shadowWeight *= intensity;
+    int idx = y * pitch + x;
+    float d = field[y * width + x];
     
     if (isInner) {
-        float invWeight = 1.0f - shadowWeight;
-        dst[idx].x = (unsigned char)(srcPixel.x * invWeight + shadow_color.x * shadowWeight);
-        dst[idx].y = (unsigned char)(srcPixel.y * invWeight + shadow_color.y * shadowWeight);
-        dst[idx].z = (unsigned char)(srcPixel.z * invWeight + shadow_color.z * shadowWeight);
-        dst[idx].w = srcPixel.w;
+        if (d > 0.0f) return;
+        float weight = shadowWeight(-d, radius, intensity);
+        float invWeight = 1.0f - weight;
+        uchar4 pixel = buffer[idx];
+        buffer[idx].x = (unsigned char)(pixel.x * invWeight + shadow_color.x * weight);
+        buffer[idx].y = (unsigned char)(pixel.y * invWeight + shadow_color.y * weight);
+        buffer[idx].z = (unsigned char)(pixel.z * invWeight + shadow_color.z * weight);
     } else {
-        if (shadowWeight > 0.0f) {
-            float finalAlpha = shadow_color.w / 255.0f * shadowWeight;
-            dst[idx].x = shadow_color.x;
-            dst[idx].y = shadow_color.y;
-            dst[idx].z = shadow_color.z;
-            dst[idx].w = (unsigned char)(finalAlpha * 255.0f);
+        if (d < 0.0f) return;
+        float weight = shadowWeight(d, radius, intensity);
+        if (weight > 0.0f) {
+            float finalAlpha = shadow_color.w / 255.0f * weight;
+            buffer[idx] = make_uchar4(shadow_color.x, shadow_color.y, shadow_color.z,
+                                      (unsigned char)(finalAlpha * 255.0f));
         } else {
-            dst[idx] = make_uchar4(0, 0, 0, 0);
+            buffer[idx] = make_uchar4(0, 0, 0, 0);
         }
     }
 }
 
-__device__ float bicubicWeight(float x, float a = -0.5f) {
-    x = fabsf(x);
-    if (x <= 1.0f) {
-        return ((a + 2.0f) * x * x * x) - ((a + 3.0f) * x * x) + 1.0f;
-    } else if (x < 2.0f) {
-        return (a * x * x * x) - (5.0f * a * x * x) + (8.0f * a * x) - (4.0f * a);
+// Separable resampling passes. Each thread computes one output pixel from the
+// taps of its column (horizontal) or row (vertical) in a ResampleTable.
+
+__device__ __forceinline__ uchar4 roundPixel(float4 value) {
+    return make_uchar4(__float2int_rn(fmaxf(0.0f, fminf(255.0f, value.x))),
+                       __float2int_rn(fmaxf(0.0f, fminf(255.0f, value.y))),
+                       __float2int_rn(fmaxf(0.0f, fminf(255.0f, value.z))),
+                       __float2int_rn(fmaxf(0.0f, fminf(255.0f, value.w))));
+}
+
+__global__ void resampleHorizontalKernel(uchar4* __restrict__ dst,
+                                         uint32_t dst_pitch,
+                                         const uchar4* __restrict__ src,
+                                         uint32_t src_pitch,
+                                         uint32_t width,
+                                         uint32_t height,
+                                         const int32_t* __restrict__ bounds,
+                                         const float* __restrict__ weights,
+                                         uint32_t taps) {
+    int x = blockIdx.x * blockDim.x + threadIdx.x;
+    int y = blockIdx.y * blockDim.y + threadIdx.y;
+
+    if (x >= width || y >= height) return;
+
+    const uchar4* in = src + (size_t)y * src_pitch + bounds[2 * x];
+    const int count = bounds[2 * x + 1];
+    const float* w = weights + (size_t)x * taps;
+
+    float4 result = make_float4(0.0f, 0.0f, 0.0f, 0.0f);
+    for (int k = 0; k < count; k++) {
+        uchar4 pixel = in[k];
+        result.x += w[k] * pixel.x;
+        result.y += w[k] * pixel.y;
+        result.z += w[k] * pixel.z;
+        result.w += w[k] * pixel.w;
     }
-    return 0.0f;
+
+    dst[(size_t)y * dst_pitch + x] = roundPixel(result);
 }
 
-__global__ void resizeBicubicKernel(uchar4* dst,
-                                    const uchar4* src,
-                                    uint32_t dst_width,
-                                    uint32_t dst_height,
-                                    uint32_t src_width,
-                                    uint32_t src_height) {
+__global__ void resampleVerticalKernel(uchar4* __restrict__ dst,
+                                       uint32_t dst_pitch,
+                                       const uchar4* __restrict__ src,
+                                       uint32_t src_pitch,
+                                       uint32_t width,
+                                       uint32_t height,
+                                       const int32_t* __restrict__ bounds,
+                                       const float* __restrict__ weights,
+                                       uint32_t taps) {
+    int x = blockIdx.x * blockDim.x + threadIdx.x;
+    int y = blockIdx.y * blockDim.y + threadIdx.y;
+
+    if (x >= width || y >= height) return;
+
+    const uchar4* in = src + (size_t)bounds[2 * y] * src_pitch + x;
+    const int count = bounds[2 * y + 1];
+    const float* w = weights + (size_t)y * taps;
+
+    float4 result = make_float4(0.0f, 0.0f, 0.0f, 0.0f);
+    for (int k = 0; k < count; k++) {
+        uchar4 pixel = in[(size_t)k * src_pitch];
+        result.x += w[k] * pixel.x;
+        result.y += w[k] * pixel.y;
+        result.z += w[k] * pixel.z;
+        result.w += w[k] * pixel.w;
+    }
+
+    dst[(size_t)y * dst_pitch + x] = roundPixel(result);
+}
+
+__global__ void resizeAreaKernel(uchar4* dst,
+                                 const uchar4* src,
+                                 uint32_t dst_width,
+                                 uint32_t dst_height,
+                                 uint32_t dst_pitch,
+                                 uint32_t src_width,
+                                 uint32_t src_height,
+                                 uint32_t src_pitch) {
     int dst_x = blockIdx.x * blockDim.x + threadIdx.x;
     int dst_y = blockIdx.y * blockDim.y + threadIdx.y;
 
@@ -265,37 +488,48 @@ __global__ void resizeBicubicKernel(uchar4* dst,
 
     float scale_x = (float)(src_width) / dst_width;
     float scale_y = (float)(src_height) / dst_height;
-    
-    float src_x = dst_x * scale_x;
-    float src_y = dst_y * scale_y;
 
-    int x0 = floorf(src_x - 1.0f);
-    int y0 = floorf(src_y - 1.0f);
-    
+    // Source rectangle covered by the destination pixel; pixels on its edges
+    // are weighted by the fraction they overlap.
+    float left = dst_x * scale_x;
+    float right = fminf((dst_x + 1) * scale_x, (float)src_width);
+    float top = dst_y * scale_y;
+    float bottom = fminf((dst_y + 1) * scale_y, (float)src_height);
+
+    int x0 = (int)left;
+    int x1 = min((int)ceilf(right), (int)src_width);
+    int y0 = (int)top;
+    int y1 = min((int)ceilf(bottom), (int)src_height);
+
     float4 result = make_float4(0.0f, 0.0f, 0.0f, 0.0f);
     float totalWeight = 0.0f;
 
-    #pragma unroll
-    for (int dy = 0; dy < 4; dy++) {
-        int sy = y0 + dy;
-        float wy = bicubicWeight(src_y - sy);
-        
-        #pragma unroll
-        for (int dx = 0; dx < 4; dx++) {
-            int sx = x0 + dx;
-            
-            if (sx >= 0 && sx < src_width && sy >= 0 && sy < src_height) {
-                float wx = bicubicWeight(src_x - sx);
-                float weight = wx * wy;
-                
-                uchar4 pixel = src[sy * src_width + sx];
-                result.x += weight * pixel.x;
-                result.y += weight * pixel.y;
-                result.z += weight * pixel.z;
-                result.w += weight * pixel.w;
-                totalWeight += weight;
-            }
+    // Whole pixels inside the rectangle are summed exactly; only the first and
+    // last column and row are weighted.
+    float weight_left = fminf(right, (float)(x0 + 1)) - left;
+    float weight_right = x1 - 1 > x0 ? right - (float)(x1 - 1) : 0.0f;
+    float rowWeight = weight_left + weight_right + (float)max(x1 - x0 - 2, 0);
+
+    for (int sy = y0; sy < y1; sy++) {
+        float wy = fminf(bottom, (float)(sy + 1)) - fmaxf(top, (float)sy);
+        const uchar4* src_row = src + (size_t)sy * src_pitch;
+
+        uint32_t sum_x = 0, sum_y = 0, sum_z = 0, sum_w = 0;
+        for (int sx = x0 + 1; sx < x1 - 1; sx++) {
+            uchar4 pixel = src_row[sx];
+            sum_x += pixel.x;
+            sum_y += pixel.y;
+            sum_z += pixel.z;
+            sum_w += pixel.w;
         }
+
+        uchar4 first = src_row[x0];
+        uchar4 last = src_row[x1 - 1];
+        result.x += wy * (sum_x + weight_left * first.x + weight_right * last.x);
+        result.y += wy * (sum_y + weight_left * first.y + weight_right * last.y);
+        result.z += wy * (sum_z + weight_left * first.z + weight_right * last.z);
+        result.w += wy * (sum_w + weight_left * first.w + weight_right * last.w);
+        totalWeight += wy * rowWeight;
     }
 
     if (totalWeight > 0.0f) {
@@ -305,7 +539,7 @@ __global__ void resizeBicubicKernel(uchar4* dst,
         result.w = fmaxf(0.0f, fminf(255.0f, result.w / totalWeight));
     }
 
-    dst[dst_y * dst_width + dst_x] = make_uchar4(
+    dst[dst_y * dst_pitch + dst_x] = make_uchar4(
         __float2int_rn(result.x),
         __float2int_rn(result.y),
         __float2int_rn(result.z),
@@ -317,8 +551,10 @@ __global__ void resizeBilinearKernel(uchar4* dst,
                                      const uchar4* src,
                                      uint32_t dst_width,
                                      uint32_t dst_height,
+                                     uint32_t dst_pitch,
                                      uint32_t src_width,
-                                     uint32_t src_height) {
+                                     uint32_t src_height,
+                                     uint32_t src_pitch) {
 
     int dst_x = blockIdx.x * blockDim.x + threadIdx.x;
     int dst_y = blockIdx.y * blockDim.y + threadIdx.y;
@@ -341,12 +577,12 @@ __global__ void resizeBilinearKernel(uchar4* dst,
     float wx1 = 1.0f - wx2;
     float wy1 = 1.0f - wy2;
     
-    uchar4 p11 = src[y1 * src_width + x1];
-    uchar4 p21 = src[y1 * src_width + x2];
-    uchar4 p12 = src[y2 * src_width + x1];
-    uchar4 p22 = src[y2 * src_width + x2];
+    uchar4 p11 = src[y1 * src_pitch + x1];
+    uchar4 p21 = src[y1 * src_pitch + x2];
+    uchar4 p12 = src[y2 * src_pitch + x1];
+    uchar4 p22 = src[y2 * src_pitch + x2];
     
-    int dst_idx = dst_y * dst_width + dst_x;
+    int dst_idx = dst_y * dst_pitch + dst_x;
     dst[dst_idx].x = (unsigned char)(
         p11.x * wx1 * wy1 +
         p21.x * wx2 * wy1 +
@@ -376,8 +612,10 @@ __global__ void resizeNearestKernel(uchar4* dst,
                                     const uchar4* src,
                                     uint32_t dst_width,
                                     uint32_t dst_height,
+                                    uint32_t dst_pitch,
                                     uint32_t src_width,
-                                    uint32_t src_height) {
+                                    uint32_t src_height,
+                                    uint32_t src_pitch) {
 
     int dst_x = blockIdx.x * blockDim.x + threadIdx.x;
     int dst_y = blockIdx.y * blockDim.y + threadIdx.y;
@@ -390,49 +628,28 @@ __global__ void resizeNearestKernel(uchar4* dst,
     int src_x = (int)(dst_x * scale_x);
     int src_y = (int)(dst_y * scale_y);
     
-    dst[dst_y * dst_width + dst_x] = src[src_y * src_width + src_x];
+    dst[dst_y * dst_pitch + dst_x] = src[src_y * src_pitch + src_x];
 }
 
 
 __global__ void fillColorKernel(uchar4* buffer,
                                 uchar4 color, 
                                 uint32_t width,
-                                uint32_t height) {
+                                uint32_t height,
+                                uint32_t pitch) {
 
     int x = blockIdx.x * blockDim.x + threadIdx.x;
     int y = blockIdx.y * blockDim.y + threadIdx.y;
 
     if (x < width && y < height) {
-        int idx = y * width + x;
+        int idx = y * pitch + x;
         buffer[idx] = color;
     }
 }
 
-__global__ void blendKernel(uchar4* __restrict__ dst,
-                            const uchar4* __restrict__ src,
-                            uint32_t dst_width,
-                            uint32_t dst_height,
-                            uint32_t src_width,
-                            uint32_t src_height,
-                            int32_t pos_x,
-                            int32_t pos_y)
-{
-    const int x = blockIdx.x * blockDim.x + threadIdx.x;
-    const int y = blockIdx.y * blockDim.y + threadIdx.y;
-    if (x >= dst_width || y >= dst_height) return;
-
-    const int sx = x - pos_x;
-    const int sy = y - pos_y;
-    if (sx < 0 || sy < 0 || sx >= (int)src_width || sy >= (int)src_height) return;
-
-    const int dst_idx = y  * dst_width + x;
-    const int src_idx = sy * src_width  + sx;
-
-    const uchar4 s = src[src_idx];
-    uchar4 d = dst[dst_idx];
-
-    if (s.w == 0)                             return;
-    if (s.w == 255) { dst[dst_idx] = s;       return; }
+__device__ __forceinline__ uchar4 blendPixel(uchar4 d, uchar4 s) {
+    if (s.w == 0)   return d;
+    if (s.w == 255) return s;
 
     const uint16_t sa   = s.w;
     const uint16_t da   = d.w;
@@ -449,159 +666,159 @@ __global__ void blendKernel(uchar4* __restrict__ dst,
     d.z = static_cast<unsigned char>((tmpB + (outA >> 1)) / outA);
     d.w = static_cast<unsigned char>(outA);
 
-    dst[dst_idx] = d;
+    return d;
+}
+
+// The grid covers only the overlap [x0, x1) x [y0, y1) of both images.
+__global__ void blendKernel(uchar4* __restrict__ dst,
+                            const uchar4* __restrict__ src,
+                            uint32_t dst_pitch,
+                            uint32_t src_pitch,
+                            int32_t pos_x,
+                            int32_t pos_y,
+                            int32_t x0,
+                            int32_t y0,
+                            int32_t x1,
+                            int32_t y1)
+{
+    const int x = x0 + blockIdx.x * blockDim.x + threadIdx.x;
+    const int y = y0 + blockIdx.y * blockDim.y + threadIdx.y;
+    if (x >= x1 || y >= y1) return;
+
+    const int sx = x - pos_x;
+    const int sy = y - pos_y;
+
+    const int dst_idx = y  * dst_pitch + x;
+    const int src_idx = sy * src_pitch + sx;
+
+    const uchar4 s = src[src_idx];
+    if (s.w == 0) return;
+
+    dst[dst_idx] = blendPixel(dst[dst_idx], s);
+}
+
+// Layer batches ---------------------------------------------------------------
+//
+// blend_layers passes up to BLEND_LAYERS_PER_LAUNCH descriptors by value as a
+// kernel parameter, so no device copy of the layer list is needed. Each thread
+// reads its destination pixel once, blends every layer covering it in order and
+// writes it back once. The grid only covers the union of the batch's layers.
+//
+// Kernel parameters are limited to 4 KB unless the build targets sm_70+ with
+// CUDA 12.1 or newer, and compile_linux.py builds for nvcc's default target.
+// A BlendLayer is 32 bytes, so 64 of them leave room for the other parameters.
+
+#define BLEND_LAYERS_PER_LAUNCH 64
+
+struct BlendLayerBatch {
+    BlendLayer layers[BLEND_LAYERS_PER_LAUNCH];
+};
+
+static_assert(sizeof(BlendLayerBatch) + 64 <= 4096,
+              "blendLayersKernel parameters must fit in 4 KB");
+
+__global__ void blendLayersKernel(uchar4* __restrict__ dst,
+                                  uint32_t dst_pitch,
+                                  int32_t origin_x,
+                                  int32_t origin_y,
+                                  int32_t end_x,
+                                  int32_t end_y,
+                                  BlendLayerBatch batch,
+                                  uint32_t count)
+{
+    const int x = origin_x + blockIdx.x * blockDim.x + threadIdx.x;
+    const int y = origin_y + blockIdx.y * blockDim.y + threadIdx.y;
+    if (x >= end_x || y >= end_y) return;
+
+    const int dst_idx = y * dst_pitch + x;
+    uchar4 pixel = dst[dst_idx];
+    bool touched = false;
+
+    for (uint32_t i = 0; i < count; i++) {
+        const BlendLayer& layer = batch.layers[i];
+        const int sx = x - layer.x;
+        const int sy = y - layer.y;
+        if (sx < 0 || sy < 0 || sx >= (int)layer.width || sy >= (int)layer.height) continue;
+
+        pixel = blendPixel(pixel, layer.src[sy * layer.pitch + sx]);
+        touched = true;
+    }
+
+    if (touched) dst[dst_idx] = pixel;
 }
 
+// The grid covers only the corner squares: thread (i, j) maps to column i of
+// the left band or, past it, of the right band, and likewise for rows.
 __global__ void cornerRadiusKernel(uchar4* buffer,
                                    uint32_t width,
                                    uint32_t height,
-                                   uint32_t radius) {
+                                   uint32_t pitch,
+                                   uint32_t radius,
+                                   int band_x,
+                                   int band_y,
+                                   int right,
+                                   int bottom) {
 
-    int x = blockIdx.x * blockDim.x + threadIdx.x;
-    int y = blockIdx.y * blockDim.y + threadIdx.y;
-    
-    if (x >= width || y >= height) return;
-    
-    int idx = y * width + x;
-    
-    if (x < radius && y < radius) {
-        int dx = radius - 1 - x;
-        int dy = radius - 1 - y;
-        if (dx * dx + dy * dy > radius * radius) {
-            buffer[idx] = make_uchar4(0, 0, 0, 0);
-        }
-    }
+    int i = blockIdx.x * blockDim.x + threadIdx.x;
+    int j = blockIdx.y * blockDim.y + threadIdx.y;
 
-    else if (x >= width - radius && y < radius) {
-        int dx = x - (width - radius);
-        int dy = radius - 1 - y;
-        if (dx * dx + dy * dy > radius * radius) {
-            buffer[idx] = make_uchar4(0, 0, 0, 0);
-        }
-    }
+    if (i >= band_x + ((int)width - right) || j >= band_y + ((int)height - bottom)) return;
 
-    else if (x < radius && y >= height - radius) {
-        int dx = radius - 1 - x;
-        int dy = y - (height - radius);
-        if (dx * dx + dy * dy > radius * radius) {
-            buffer[idx] = make_uchar4(0, 0, 0, 0);
-        }
-    }
+    int x = i < band_x ? i : right + (i - band_x);
+    int y = j < band_y ? j : bottom + (j - band_y);
 
-    else if (x >= width - radius && y >= height - radius) {
-        int dx = x - (width - radius);
-        int dy = y - (height - radius);
-        if (dx * dx + dy * dy > radius * radius) {
-            buffer[idx] = make_uchar4(0, 0, 0, 0);
-        }
+    if (isCornerTransparent(x, y, width, height, radius)) {
+        buffer[y * pitch + x] = make_uchar4(0, 0, 0, 0);
     }
 }
 
-__global__ void strokeKernel(const uchar4* src,
-                             uchar4* dst,
+__global__ void strokeKernel(uchar4* buffer,
+                             const float* field,
                              uint32_t width,
                              uint32_t height,
+                             uint32_t pitch,
                              int stroke_width,
-                             uchar4 stroke_color) {
+                             uchar4 stroke_color,
+                             bool inner) {
 
     int x = blockIdx.x * blockDim.x + threadIdx.x;
     int y = blockIdx.y * blockDim.y + threadIdx.y;
     
     if (x >= width || y >= height) return;
     
-    int idx = y * width + x;
-    uchar4 pixel = src[idx];
+    float d = field[y * width + x];
 
-    if (pixel.w != 0) {
-        dst[idx] = pixel;
-        return;
-    }
-    
-    int r2 = stroke_width * stroke_width;
-    for (int dy = -stroke_width; dy <= stroke_width; dy++) {
-        for (int dx = -stroke_width; dx <= stroke_width; dx++) {
-            if (dx*dx + dy*dy > r2) continue;
-            
-            int nx = x + dx;
-            int ny = y + dy;
-            if (nx < 0 || nx >= width || ny < 0 || ny >= height) continue;
-            
-            if (src[ny * width + nx].w != 0) {
-                dst[idx] = stroke_color;
-                return;
-            }
-        }
+    bool isStroke;
+    if (!inner) {
+        isStroke = d > 0.0f && d <= stroke_width;
+    } else {
+        isStroke = d < 0.0f &&
+                   (-d <= stroke_width ||
+                    x < stroke_width || x >= (int)width - stroke_width ||
+                    y < stroke_width || y >= (int)height - stroke_width);
     }
-    dst[idx] = pixel;
-}
-
-__global__ void innerStrokeKernel(const uchar4* src,
-                                  uchar4* dst,
-                                  uint32_t width,
-                                  uint32_t height,
-                                  int stroke_width,
-                                  uchar4 stroke_color) {
 
-    int x = blockIdx.x * blockDim.x + threadIdx.x;
-    int y = blockIdx.y * blockDim.y + threadIdx.y;
-    
-    if (x >= width || y >= height) return;
-    
-    int idx = y * width + x;
-    uchar4 pixel = src[idx];
-
-    if (pixel.w == 0) {
-        dst[idx] = pixel;
-        return;
-    }
-    
-    int r2 = stroke_width * stroke_width;
-    bool isBorder = false;
-    
-    if (x < stroke_width || x >= width - stroke_width || 
-        y < stroke_width || y >= height - stroke_width) {
-        isBorder = true;
-    }
-    
-    if (!isBorder) {
-        for (int dy = -stroke_width; dy <= stroke_width && !isBorder; dy++) {
-            for (int dx = -stroke_width; dx <= stroke_width && !isBorder; dx++) {
-                if (dx*dx + dy*dy > r2) continue;
-                
-                int nx = x + dx;
-                int ny = y + dy;
-                if (nx < 0 || nx >= width || ny < 0 || ny >= height) {
-                    isBorder = true;
-                } else if (src[ny * width + nx].w == 0) {
-                    isBorder = true;
-                }
-            }
-        }
-    }
-    
-    dst[idx] = isBorder ? stroke_color : pixel;
+    if (isStroke) buffer[y * pitch + x] = stroke_color;
 }
 
 __global__ void applyOpacityKernel(uchar4* buffer, 
                                    uint32_t width, 
                                    uint32_t height,
+                                   uint32_t pitch,
                                    float opacity) {
     int x = blockIdx.x * blockDim.x + threadIdx.x;
     int y = blockIdx.y * blockDim.y + threadIdx.y;
 
     if (x >= width || y >= height) return;
 
-    int idx = y * width + x;
-    uchar4 pixel = buffer[idx];
-    
-    float currentAlpha = pixel.w / 255.0f;
-    float newAlpha = currentAlpha * opacity;
-    buffer[idx].w = static_cast<unsigned char>(newAlpha * 255.0f);
+    int idx = y * pitch + x;
+    buffer[idx] = opacityPixel(buffer[idx], opacity);
 }
 
 __global__ void flipKernel(uchar4* buffer,
                            uint32_t width,
                            uint32_t height,
+                           uint32_t pitch,
                            bool flipHorizontal,
                            bool flipVertical) {
     int x = blockIdx.x * blockDim.x + threadIdx.x;
@@ -617,8 +834,8 @@ __global__ void flipKernel(uchar4* buffer,
     
     if (src_x == x && src_y == y) return;
     
-    int idx1 = y * width + x;
-    int idx2 = src_y * width + src_x;
+    int idx1 = y * pitch + x;
+    int idx2 = src_y * pitch + src_x;
     
     uchar4 temp = buffer[idx1];
     buffer[idx1] = buffer[idx2];
@@ -629,14 +846,9 @@ __global__ void flipKernel(uchar4* buffer,
 __global__ void fillGradientKernel(uchar4* buffer, 
                                    uint32_t width,
                                    uint32_t height,
-                                   unsigned char r1,
-                                   unsigned char g1,
-                                   unsigned char b1,
-                                   unsigned char a1,
-                                   unsigned char r2,
-                                   unsigned char g2,
-                                   unsigned char b2,
-                                   unsigned char a2,
+                                   uint32_t pitch,
+                                   uchar4 c1,
+                                   uchar4 c2,
                                    int direction,
                                    bool seamless) {
     int x = blockIdx.x * blockDim.x + threadIdx.x;
@@ -644,46 +856,477 @@ __global__ void fillGradientKernel(uchar4* buffer,
 
     if (x >= (int)width || y >= (int)height) return;
 
-    float factor = 0.0f;
+    buffer[y * pitch + x] = gradientPixel(x, y, width, height, c1, c2, direction, seamless);
+}
 
-    float nx = (float)x / (float)(width - 1) - 0.5f;
-    float ny = (float)y / (float)(height - 1) - 0.5f;
+// Fused pointwise chain ------------------------------------------------------
+//
+// Runs up to POINTWISE_MAX_OPS pointwise operations in a single read/write pass.
+// Flips are folded into coordinates: op.mirror says at which mirrored position
+// an operation is evaluated, and loadMirror where the input pixel is read. When
+// the input is mirrored, the thread of the lower index of each swap pair
+// computes and writes both pixels, so the chain stays in place.
+
+struct PointwiseChain {
+    PointwiseOp ops[POINTWISE_MAX_OPS];
+};
+
+// Passed by value like BlendLayerBatch, under the same 4 KB parameter limit.
+static_assert(sizeof(PointwiseChain) + 64 <= 4096,
+              "pointwiseChainKernel parameters must fit in 4 KB");
+
+__device__ uchar4 runPointwiseChain(uchar4 pixel,
+                                    int x,
+                                    int y,
+                                    uint32_t width,
+                                    uint32_t height,
+                                    const PointwiseChain& chain,
+                                    uint32_t count) {
+    for (uint32_t i = 0; i < count; i++) {
+        const PointwiseOp& op = chain.ops[i];
+        int ox = (op.mirror & POINTWISE_MIRROR_X) ? (int)width - 1 - x : x;
+        int oy = (op.mirror & POINTWISE_MIRROR_Y) ? (int)height - 1 - y : y;
+
+        switch (op.kind) {
+            case POINTWISE_FILL_COLOR:
+                pixel = op.color1;
+                break;
+            case POINTWISE_FILL_GRADIENT:
+                pixel = gradientPixel(ox, oy, width, height, op.color1, op.color2, op.param, op.flags != 0);
+                break;
+            case POINTWISE_GRAYSCALE:
+                pixel = grayscalePixel(pixel);
+                break;
+            case POINTWISE_OPACITY:
+                pixel = opacityPixel(pixel, op.amount);
+                break;
+            case POINTWISE_CORNER_RADIUS:
+                if (isCornerTransparent(ox, oy, width, height, (uint32_t)op.param)) {
+                    pixel = make_uchar4(0, 0, 0, 0);
+                }
+                break;
+            case POINTWISE_CHROMA_KEY:
+                if (ox < op.key_width && oy < op.key_height) {
+                    pixel = chromaKeyPixel(pixel, op.key[oy * op.key_pitch + ox], op.param,
+                                           (unsigned char)op.threshold,
+                                           (op.flags & POINTWISE_CHROMA_INVERT) != 0,
+                                           (op.flags & POINTWISE_CHROMA_ZERO_ALL) != 0);
+                }
+                break;
+            case POINTWISE_TINT:
+                pixel = tintPixel(pixel, op.color1);
+                break;
+        }
+    }
+    return pixel;
+}
 
-    switch(direction) {
-        case 0: // horizontal
-            factor = (float)x / (float)(width - 1);
-            break;
-        case 1: // vertical
-            factor = (float)y / (float)(height - 1);
+__global__ void pointwiseChainKernel(uchar4* buffer,
+                                     uint32_t width,
+                                     uint32_t height,
+                                     uint32_t pitch,
+                                     PointwiseChain chain,
+                                     uint32_t count,
+                                     int loadMirror) {
+    int x = blockIdx.x * blockDim.x + threadIdx.x;
+    int y = blockIdx.y * blockDim.y + threadIdx.y;
+
+    if (x >= width || y >= height) return;
+
+    int idx = y * pitch + x;
+    if (!loadMirror) {
+        buffer[idx] = runPointwiseChain(buffer[idx], x, y, width, height, chain, count);
+        return;
+    }
+
+    int src_x = (loadMirror & POINTWISE_MIRROR_X) ? (int)width - 1 - x : x;
+    int src_y = (loadMirror & POINTWISE_MIRROR_Y) ? (int)height - 1 - y : y;
+    int src_idx = src_y * pitch + src_x;
+    if (src_idx < idx) return;
+
+    uchar4 a = buffer[src_idx];
+    uchar4 b = buffer[idx];
+    buffer[idx] = runPointwiseChain(a, x, y, width, height, chain, count);
+    if (src_idx != idx) {
+        buffer[src_idx] = runPointwiseChain(b, src_x, src_y, width, height, chain, count);
+    }
+}
+
+// Content hash ---------------------------------------------------------------
+//
+// Every pixel is mixed with its index and the results are summed, which makes
+// the hash a plain parallel reduction. photoff_cpu.c uses the same scheme.
+
+#define HASH_BLOCK 256
+#define HASH_MAX_BLOCKS 1024
+
+__host__ __device__ inline uint64_t hashMix(uint64_t z) {
+    // splitmix64 finalizer
+    z = (z ^ (z >> 30)) * 0xbf58476d1ce4e5b9ull;
+    z = (z ^ (z >> 27)) * 0x94d049bb133111ebull;
+    return z ^ (z >> 31);
+}
+
+__device__ inline uint64_t hashPixel(uchar4 p, uint64_t index) {
+    uint32_t value = (uint32_t)p.x | ((uint32_t)p.y << 8) | ((uint32_t)p.z << 16) | ((uint32_t)p.w << 24);
+    return hashMix((index << 32) ^ value);
+}
+
+__global__ void hashKernel(unsigned long long* sum,
+                           const uchar4* buffer,
+                           uint32_t width,
+                           uint32_t height,
+                           uint32_t pitch) {
+    __shared__ unsigned long long partial[HASH_BLOCK];
+
+    const uint64_t total = (uint64_t)width * height;
+    unsigned long long local = 0;
+    for (uint64_t i = (uint64_t)blockIdx.x * blockDim.x + threadIdx.x; i < total;
+         i += (uint64_t)gridDim.x * blockDim.x) {
+        const uint32_t y = (uint32_t)(i / width);
+        const uint32_t x = (uint32_t)(i - (uint64_t)y * width);
+        local += hashPixel(buffer[(size_t)y * pitch + x], i);
+    }
+
+    partial[threadIdx.x] = local;
+    __syncthreads();
+    for (int s = HASH_BLOCK / 2; s > 0; s >>= 1) {
+        if (threadIdx.x < s) partial[threadIdx.x] += partial[threadIdx.x + s];
+        __syncthreads();
+    }
+    if (threadIdx.x == 0) atomicAdd(sum, partial[0]);
+}
+
+// Separable resampling tables -----------------------------------------------
+//
+// Built on the host exactly like the CPU backend's (which follow Pillow's
+// coefficient computation) and uploaded once; the struct itself stays on the
+// host and holds device pointers.
+
+struct ResampleTable {
+    uint32_t src_size;  // pixels of the source region read
+    uint32_t dst_size;  // outputs covered
+    uint32_t taps;      // weights stored per output index, zero padded
+    int32_t* bounds;    // device: first source index and number of taps per output index
+    float* weights;     // device: dst_size * taps
+};
+
+static const double RESAMPLE_PI = 3.14159265358979323846;
+
+static double bicubicFilter(double x) {
+    const double a = -0.5;
+    x = fabs(x);
+    if (x < 1.0) return ((a + 2.0) * x - (a + 3.0)) * x * x + 1.0;
+    if (x < 2.0) return (((x - 5.0) * x + 8.0) * x - 4.0) * a;
+    return 0.0;
+}
+
+static double sincFilter(double x) {
+    if (x == 0.0) return 1.0;
+    x *= RESAMPLE_PI;
+    return sin(x) / x;
+}
+
+static double lanczos3Filter(double x) {
+    if (-3.0 < x && x < 3.0) return sincFilter(x) * sincFilter(x / 3.0);
+    return 0.0;
+}
+
+static double mitchellFilter(double x) {
+    // Mitchell-Netravali with B = C = 1/3.
+    const double B = 1.0 / 3.0;
+    const double C = 1.0 / 3.0;
+    x = fabs(x);
+    if (x < 1.0) {
+        return ((12.0 - 9.0 * B - 6.0 * C) * x * x * x +
+                (-18.0 + 12.0 * B + 6.0 * C) * x * x +
+                (6.0 - 2.0 * B)) / 6.0;
+    }
+    if (x < 2.0) {
+        return ((-B - 6.0 * C) * x * x * x +
+                (6.0 * B + 30.0 * C) * x * x +
+                (-12.0 * B - 48.0 * C) * x +
+                (8.0 * B + 24.0 * C)) / 6.0;
+    }
+    return 0.0;
+}
+
+// Computes the taps of outputs [dst_first, dst_first + dst_count) into host
+// arrays, relative to a source region of src_count pixels starting at
+// src_first. Returns false for methods that are not separable, empty ranges or
+// on allocation failure.
+static bool buildResampleTable(uint32_t src_size, uint32_t dst_size, int32_t method,
+                               uint32_t dst_first, uint32_t dst_count,
+                               uint32_t src_first, uint32_t src_count,
+                               int32_t** bounds_out, float** weights_out, uint32_t* taps_out) {
+    double (*filter)(double);
+    double support;
+    switch (method) {
+        case RESIZE_BICUBIC:  filter = bicubicFilter;  support = 2.0; break;
+        case RESIZE_LANCZOS3: filter = lanczos3Filter; support = 3.0; break;
+        case RESIZE_MITCHELL: filter = mitchellFilter; support = 2.0; break;
+        default: return false;
+    }
+    if (!src_size || !dst_size || !dst_count || !src_count) return false;
+    if ((uint64_t)dst_first + dst_count > dst_size || (uint64_t)src_first + src_count > src_size) return false;
+
+    double scale = (double)src_size / dst_size;
+    double filter_scale = scale > 1.0 ? scale : 1.0;
+    support *= filter_scale;
+
+    uint32_t taps = (uint32_t)ceil(support) * 2 + 1;
+    int32_t* bounds = (int32_t*)malloc(sizeof(int32_t) * 2 * dst_count);
+    float* weights = (float*)calloc((size_t)dst_count * taps, sizeof(float));
+    if (!bounds || !weights) {
+        free(bounds);
+        free(weights);
+        return false;
+    }
+
+    for (uint32_t j = 0; j < dst_count; j++) {
+        double center = (dst_first + j + 0.5) * scale;
+        int first = max((int)(center - support + 0.5), (int)src_first);
+        int last = min((int)(center + support + 0.5), (int)(src_first + src_count));
+        int count = max(min(last - first, (int)taps), 0);
+
+        float* w = weights + (size_t)j * taps;
+        double total = 0.0;
+        for (int k = 0; k < count; k++) {
+            double weight = filter((k + first - center + 0.5) / filter_scale);
+            w[k] = (float)weight;
+            total += weight;
+        }
+        if (total != 0.0) {
+            for (int k = 0; k < count; k++) w[k] = (float)(w[k] / total);
+        }
+
+        bounds[2 * j] = count ? first - (int)src_first : 0;
+        bounds[2 * j + 1] = count;
+    }
+
+    *bounds_out = bounds;
+    *weights_out = weights;
+    *taps_out = taps;
+    return true;
+}
+
+// Gaussian weight table -------------------------------------------------------
+//
+// The half kernel (taps 0..kernelRadius) is built once per radius on the host
+// and kept resident on the device until a different radius is requested.
+
+static std::mutex blurWeightsMutex;
+static float* d_blurWeights = nullptr;
+static int blurWeightsCapacity = 0;
+static float blurWeightsRadius = -1.0f;
+
+static int gaussianKernelRadius(float radius) {
+    float sigma = radius / 2.0f;
+    return max(1, (int)ceilf(3.0f * sigma));
+}
+
+static void buildGaussianWeights(float radius, float* weights, int kernelRadius) {
+    float sigma = radius / 2.0f;
+    float total = 0.0f;
+    for (int k = 0; k <= kernelRadius; k++) {
+        weights[k] = expf(-(float)(k * k) / (2.0f * sigma * sigma));
+        total += k == 0 ? weights[k] : 2.0f * weights[k];
+    }
+    for (int k = 0; k <= kernelRadius; k++) {
+        weights[k] /= total;
+    }
+}
+
+static const float* gaussianWeightTable(float radius, int kernelRadius) {
+    if (radius == blurWeightsRadius) return d_blurWeights;
+
+    if (kernelRadius + 1 > blurWeightsCapacity) {
+        if (d_blurWeights) cudaFree(d_blurWeights);
+        cudaError_t err = cudaMalloc(&d_blurWeights, (kernelRadius + 1) * sizeof(float));
+        if (err != cudaSuccess) {
+            printf("Error in cudaMalloc: %s\n", cudaGetErrorString(err));
+            d_blurWeights = nullptr;
+            blurWeightsCapacity = 0;
+            blurWeightsRadius = -1.0f;
+            return nullptr;
+        }
+        blurWeightsCapacity = kernelRadius + 1;
+    }
+
+    float* h_weights = (float*)malloc((kernelRadius + 1) * sizeof(float));
+    buildGaussianWeights(radius, h_weights, kernelRadius);
+    // Synchronous copy on the legacy stream: it waits for blurs already queued on
+    // any stream, so they never read a table that is being rewritten.
+    cudaMemcpy(d_blurWeights, h_weights, (kernelRadius + 1) * sizeof(float), cudaMemcpyHostToDevice);
+    free(h_weights);
+
+    blurWeightsRadius = radius;
+    return d_blurWeights;
+}
+
+// Execution context. Without a current stream every call drains the device before
+// returning, as before; once a stream is made current on the calling thread,
+// calls only enqueue work on it and synchronize_stream()/events wait for it.
+static thread_local cudaStream_t currentStream = 0;
+
+static void finishCall() {
+    if (!currentStream) cudaDeviceSynchronize();
+}
+
+static void launchResize(int32_t method,
+                         uchar4* dst,
+                         const uchar4* src,
+                         uint32_t dst_width,
+                         uint32_t dst_height,
+                         uint32_t dst_pitch,
+                         uint32_t src_width,
+                         uint32_t src_height,
+                         uint32_t src_pitch) {
+    dim3 block(16, 16);
+    dim3 grid((dst_width + block.x - 1) / block.x,
+              (dst_height + block.y - 1) / block.y);
+
+    switch (method) {
+        case RESIZE_NEAREST:
+            resizeNearestKernel<<<grid, block, 0, currentStream>>>(dst, src,
+                                                                  dst_width, dst_height, dst_pitch,
+                                                                  src_width, src_height, src_pitch);
             break;
-        case 2: // diagonal
-            float u = (float)x / (float)(width - 1);
-            float v = (float)y / (float)(height - 1);
-            factor = (u + v) * 0.5f;
+        case RESIZE_BILINEAR:
+            resizeBilinearKernel<<<grid, block, 0, currentStream>>>(dst, src,
+                                                                   dst_width, dst_height, dst_pitch,
+                                                                   src_width, src_height, src_pitch);
             break;
-        case 3: // radial
-            factor = sqrtf(nx*nx + ny*ny) * 1.414f;
-            factor = min(1.0f, factor);
+        case RESIZE_AREA:
+            resizeAreaKernel<<<grid, block, 0, currentStream>>>(dst, src,
+                                                               dst_width, dst_height, dst_pitch,
+                                                               src_width, src_height, src_pitch);
             break;
     }
+}
 
-    if (seamless) {
-        factor = factor < 0.5f ? 
-                factor * 2.0f : 
-                2.0f * (1.0f - factor);
-    }
+static void launchResample(bool horizontal,
+                           uchar4* dst,
+                           uint32_t dst_pitch,
+                           const uchar4* src,
+                           uint32_t src_pitch,
+                           uint32_t width,
+                           uint32_t height,
+                           const ResampleTable* table) {
+    dim3 block(16, 16);
+    dim3 grid((width + block.x - 1) / block.x,
+              (height + block.y - 1) / block.y);
 
-    unsigned char R = (unsigned char)(r1 + (r2 - r1) * factor);
-    unsigned char G = (unsigned char)(g1 + (g2 - g1) * factor);
-    unsigned char B = (unsigned char)(b1 + (b2 - b1) * factor);
-    unsigned char A = (unsigned char)(a1 + (a2 - a1) * factor);
+    if (horizontal) {
+        resampleHorizontalKernel<<<grid, block, 0, currentStream>>>(dst, dst_pitch, src, src_pitch, width, height,
+                                                                    table->bounds, table->weights, table->taps);
+    } else {
+        resampleVerticalKernel<<<grid, block, 0, currentStream>>>(dst, dst_pitch, src, src_pitch, width, height,
+                                                                  table->bounds, table->weights, table->taps);
+    }
+}
 
-    int idx = y * width + x;
-    buffer[idx] = make_uchar4(R, G, B, A);
+static void launchSeparable(uchar4* dst,
+                            const uchar4* src,
+                            uint32_t dst_width,
+                            uint32_t dst_height,
+                            uint32_t dst_pitch,
+                            uint32_t src_width,
+                            uint32_t src_height,
+                            uint32_t src_pitch,
+                            uchar4* temp,
+                            uint32_t temp_pitch,
+                            const ResampleTable* horizontal,
+                            const ResampleTable* vertical) {
+    if (horizontal && (horizontal->src_size != src_width || horizontal->dst_size != dst_width)) return;
+    if (vertical && (vertical->src_size != src_height || vertical->dst_size != dst_height)) return;
+
+    if (horizontal && vertical) {
+        if (!temp) return;
+        launchResample(true, temp, temp_pitch, src, src_pitch, dst_width, src_height, horizontal);
+        launchResample(false, dst, dst_pitch, temp, temp_pitch, dst_width, dst_height, vertical);
+    } else if (horizontal) {
+        launchResample(true, dst, dst_pitch, src, src_pitch, dst_width, dst_height, horizontal);
+    } else if (vertical) {
+        launchResample(false, dst, dst_pitch, src, src_pitch, dst_width, dst_height, vertical);
+    } else {
+        cudaMemcpy2DAsync(dst, (size_t)dst_pitch * sizeof(uchar4),
+                          src, (size_t)src_pitch * sizeof(uchar4),
+                          (size_t)dst_width * sizeof(uchar4), dst_height,
+                          cudaMemcpyDeviceToDevice, currentStream);
+    }
 }
 
 extern "C" {
 
+void* create_stream(void) {
+    cudaStream_t stream;
+    cudaError_t err = cudaStreamCreate(&stream);
+    if (err != cudaSuccess) {
+        printf("Error in cudaStreamCreate: %s\n", cudaGetErrorString(err));
+        return nullptr;
+    }
+    return stream;
+}
+
+void destroy_stream(void* stream) {
+    if (!stream) return;
+    cudaStreamSynchronize((cudaStream_t)stream);
+    cudaStreamDestroy((cudaStream_t)stream);
+}
+
+void set_current_stream(void* stream) {
+    currentStream = (cudaStream_t)stream;
+}
+
+void synchronize_stream(void* stream) {
+    cudaStreamSynchronize((cudaStream_t)stream);
+}
+
+void* create_event(void) {
+    cudaEvent_t event;
+    cudaError_t err = cudaEventCreateWithFlags(&event, cudaEventDisableTiming);
+    if (err != cudaSuccess) {
+        printf("Error in cudaEventCreate: %s\n", cudaGetErrorString(err));
+        return nullptr;
+    }
+    return event;
+}
+
+void destroy_event(void* event) {
+    if (event) cudaEventDestroy((cudaEvent_t)event);
+}
+
+void record_event(void* event, void* stream) {
+    cudaEventRecord((cudaEvent_t)event, (cudaStream_t)stream);
+}
+
+void synchronize_event(void* event) {
+    cudaEventSynchronize((cudaEvent_t)event);
+}
+
+bool query_event(void* event) {
+    return cudaEventQuery((cudaEvent_t)event) == cudaSuccess;
+}
+
+void* create_timing_event(void) {
+    cudaEvent_t event;
+    cudaError_t err = cudaEventCreate(&event);
+    if (err != cudaSuccess) {
+        printf("Error in cudaEventCreate: %s\n", cudaGetErrorString(err));
+        return nullptr;
+    }
+    return event;
+}
+
+float event_elapsed_ms(void* start, void* end) {
+    if (!start || !end) return -1.0f;
+    if (cudaEventSynchronize((cudaEvent_t)end) != cudaSuccess) return -1.0f;
+    float ms = 0.0f;
+    if (cudaEventElapsedTime(&ms, (cudaEvent_t)start, (cudaEvent_t)end) != cudaSuccess) return -1.0f;
+    return ms;
+}
+
 uchar4* create_buffer(uint32_t width,
                       uint32_t height) {
     uchar4* buffer;
@@ -692,21 +1335,22 @@ uchar4* create_buffer(uint32_t width,
         printf("Error in cudaMalloc: %s\n", cudaGetErrorString(err));
         return nullptr;
     }
-    cudaDeviceSynchronize();
     return buffer;
 }
 
 void free_buffer(uchar4* buffer) {
+    // cudaFree waits for outstanding work that may still use the buffer.
     if (buffer) {
         cudaFree(buffer);
     }
-    cudaDeviceSynchronize();
 }
 
 void copy_buffers_same_size(uchar4* dst,
                             const uchar4* src,
                             uint32_t width,
-                            uint32_t height) {
+                            uint32_t height,
+                            uint32_t dst_pitch,
+                            uint32_t src_pitch) {
     if (!dst || !src) {
         printf("Error: Null pointer provided to copy_buffers_same_size\n");
         return;
@@ -715,120 +1359,324 @@ void copy_buffers_same_size(uchar4* dst,
     dim3 block(16, 16);
     dim3 grid((width + block.x - 1) / block.x, (height + block.y - 1) / block.y);
     
-    copyBufferKernel<<<grid, block>>>(dst, src, width, height);
+    copyBufferKernel<<<grid, block, 0, currentStream>>>(dst, src, width, height, dst_pitch, src_pitch);
     
     cudaError_t err = cudaGetLastError();
     if (err != cudaSuccess) {
         printf("CUDA Error in copy_buffers_same_size: %s\n", cudaGetErrorString(err));
     }
     
-    cudaDeviceSynchronize();
+    finishCall();
+}
+
+uint64_t hash_image(const uchar4* buffer,
+                    uint32_t width,
+                    uint32_t height,
+                    uint32_t pitch) {
+    unsigned long long sum = 0;
+    if (buffer && width && height) {
+        unsigned long long* d_sum;
+        cudaError_t err = cudaMalloc(&d_sum, sizeof(unsigned long long));
+        if (err != cudaSuccess) {
+            printf("Error in cudaMalloc: %s\n", cudaGetErrorString(err));
+            return 0;
+        }
+        cudaMemsetAsync(d_sum, 0, sizeof(unsigned long long), currentStream);
+
+        const uint64_t total = (uint64_t)width * height;
+        const uint64_t wanted = (total + HASH_BLOCK - 1) / HASH_BLOCK;
+        const int blocks = (int)(wanted < HASH_MAX_BLOCKS ? wanted : HASH_MAX_BLOCKS);
+        hashKernel<<<blocks, HASH_BLOCK, 0, currentStream>>>(d_sum, buffer, width, height, pitch);
+
+        err = cudaGetLastError();
+        if (err != cudaSuccess) {
+            printf("CUDA Error in hash_image: %s\n", cudaGetErrorString(err));
+        }
+
+        // The value is returned to the host, so a stream catches up here.
+        cudaMemcpyAsync(&sum, d_sum, sizeof(unsigned long long), cudaMemcpyDeviceToHost, currentStream);
+        cudaStreamSynchronize(currentStream);
+        cudaFree(d_sum);
+    }
+    return hashMix(sum ^ hashMix(((uint64_t)width << 32) | height));
+}
+
+uchar4* create_host_buffer(uint32_t width,
+                           uint32_t height) {
+    // Page-locked, so transfers from/to it are DMA'd directly and can run
+    // asynchronously on a stream.
+    uchar4* buffer;
+    cudaError_t err = cudaMallocHost((void**)&buffer, (size_t)width * height * sizeof(uchar4));
+    if (err != cudaSuccess) {
+        printf("Error in cudaMallocHost: %s\n", cudaGetErrorString(err));
+        return nullptr;
+    }
+    return buffer;
+}
+
+void free_host_buffer(uchar4* buffer) {
+    if (buffer) {
+        cudaFreeHost(buffer);
+    }
 }
 
 void copy_to_device(uchar4* d_dst,
                     const uchar4* h_src,
                     uint32_t width,
-                    uint32_t height) {
+                    uint32_t height,
+                    uint32_t dst_pitch) {
     if (!d_dst || !h_src) return;
 
-    cudaMemcpy(d_dst, h_src, width * height * sizeof(uchar4), 
-               cudaMemcpyHostToDevice);
+    // From pageable memory the copy returns once h_src has been staged, so the
+    // caller may reuse it immediately even on a stream. From a host buffer it
+    // may still be in flight until the stream is synchronized. Host rows are
+    // packed; device rows are dst_pitch pixels apart.
+    cudaMemcpy2DAsync(d_dst, dst_pitch * sizeof(uchar4), h_src, width * sizeof(uchar4),
+                      width * sizeof(uchar4), height, cudaMemcpyHostToDevice, currentStream);
     
-    cudaDeviceSynchronize();
+    finishCall();
 }
 
 void copy_to_host(uchar4* h_dst,
                   const uchar4* d_src,
                   uint32_t width,
-                  uint32_t height) {
+                  uint32_t height,
+                  uint32_t src_pitch) {
     if (!h_dst || !d_src) return;
 
-    cudaMemcpy(h_dst, d_src, width * height * sizeof(uchar4), 
-               cudaMemcpyDeviceToHost);
+    cudaMemcpy2DAsync(h_dst, width * sizeof(uchar4), d_src, src_pitch * sizeof(uchar4),
+                      width * sizeof(uchar4), height, cudaMemcpyDeviceToHost, currentStream);
 
-    cudaDeviceSynchronize();
+    // The host reads h_dst next, so this is where a stream catches up.
+    cudaStreamSynchronize(currentStream);
 }
 
 void blend_buffers(uchar4* dst,
                    const uchar4* src,
                    uint32_t dst_width,
                    uint32_t dst_height,
+                   uint32_t dst_pitch,
                    uint32_t src_width,
                    uint32_t src_height,
+                   uint32_t src_pitch,
                    int32_t x,
-                   int32_t y) {          
+                   int32_t y) {
     if (!dst || !src) return;
 
+    // Only the overlap of the two rectangles can change.
+    const int64_t src_right  = (int64_t)x + src_width;
+    const int64_t src_bottom = (int64_t)y + src_height;
+    const int x0 = x > 0 ? x : 0;
+    const int y0 = y > 0 ? y : 0;
+    const int x1 = (int)(src_right  < dst_width  ? src_right  : dst_width);
+    const int y1 = (int)(src_bottom < dst_height ? src_bottom : dst_height);
+    if (x0 >= x1 || y0 >= y1) return;
+
     dim3 block(16, 16);
-    dim3 grid((dst_width + block.x - 1) / block.x,
-              (dst_height + block.y - 1) / block.y);
-              
-    blendKernel<<<grid, block>>>(dst, src, dst_width, dst_height,
-                                src_width, src_height, x, y);
+    dim3 grid((x1 - x0 + block.x - 1) / block.x,
+              (y1 - y0 + block.y - 1) / block.y);
+
+    blendKernel<<<grid, block, 0, currentStream>>>(dst, src, dst_pitch, src_pitch,
+                                                  x, y, x0, y0, x1, y1);
+
+    finishCall();
+}
+
+void blend_layers(uchar4* dst,
+                  uint32_t dst_width,
+                  uint32_t dst_height,
+                  uint32_t dst_pitch,
+                  const BlendLayer* layers,
+                  uint32_t count) {
+    if (!dst || (count && !layers)) return;
+
+    BlendLayerBatch batch;
+    for (uint32_t start = 0; start < count; start += BLEND_LAYERS_PER_LAUNCH) {
+        uint32_t batchCount = 0;
+        int64_t x0 = dst_width, y0 = dst_height, x1 = 0, y1 = 0;
+
+        for (uint32_t i = start; i < count && i < start + BLEND_LAYERS_PER_LAUNCH; i++) {
+            const BlendLayer& layer = layers[i];
+            const int64_t left   = layer.x > 0 ? layer.x : 0;
+            const int64_t top    = layer.y > 0 ? layer.y : 0;
+            const int64_t right  = (int64_t)layer.x + layer.width  < dst_width  ? (int64_t)layer.x + layer.width  : dst_width;
+            const int64_t bottom = (int64_t)layer.y + layer.height < dst_height ? (int64_t)layer.y + layer.height : dst_height;
+            if (!layer.src || left >= right || top >= bottom) continue;
+
+            if (left < x0)   x0 = left;
+            if (top < y0)    y0 = top;
+            if (right > x1)  x1 = right;
+            if (bottom > y1) y1 = bottom;
+            batch.layers[batchCount++] = layer;
+        }
+        if (!batchCount) continue;
+
+        dim3 block(16, 16);
+        dim3 grid((uint32_t)(x1 - x0 + block.x - 1) / block.x,
+                  (uint32_t)(y1 - y0 + block.y - 1) / block.y);
 
-    cudaDeviceSynchronize();
+        blendLayersKernel<<<grid, block, 0, currentStream>>>(dst, dst_pitch,
+                                                             (int32_t)x0, (int32_t)y0,
+                                                             (int32_t)x1, (int32_t)y1,
+                                                             batch, batchCount);
+    }
+
+    finishCall();
 }
 
 void resize_bilinear(uchar4* dst,
                      const uchar4* src,
                      uint32_t dst_width,
                      uint32_t dst_height,
+                     uint32_t dst_pitch,
                      uint32_t src_width,
-                     uint32_t src_height) {
+                     uint32_t src_height,
+                     uint32_t src_pitch) {
     if (!dst || !src) return;
 
-    dim3 block(16, 16);
-    dim3 grid((dst_width + block.x - 1) / block.x,
-              (dst_height + block.y - 1) / block.y);
-              
-    resizeBilinearKernel<<<grid, block>>>(dst, src,
-                                         dst_width, dst_height,
-                                         src_width, src_height);
-    
-    cudaDeviceSynchronize();
+    launchResize(RESIZE_BILINEAR, dst, src, dst_width, dst_height, dst_pitch, src_width, src_height, src_pitch);
+    finishCall();
 }
 
 void resize_nearest(uchar4* dst,
                     const uchar4* src,
                     uint32_t dst_width,
                     uint32_t dst_height,
+                    uint32_t dst_pitch,
                     uint32_t src_width,
-                    uint32_t src_height) {
+                    uint32_t src_height,
+                    uint32_t src_pitch) {
     if (!dst || !src) return;
 
-    dim3 block(16, 16);
-    dim3 grid((dst_width + block.x - 1) / block.x,
-                (dst_height + block.y - 1) / block.y);
-                
-    resizeNearestKernel<<<grid, block>>>(dst, src,
-                                        dst_width, dst_height,
-                                        src_width, src_height);
-    
-    cudaDeviceSynchronize();
+    launchResize(RESIZE_NEAREST, dst, src, dst_width, dst_height, dst_pitch, src_width, src_height, src_pitch);
+    finishCall();
 }
 
-void resize_bicubic(uchar4* dst,
-                    const uchar4* src,
-                    uint32_t dst_width,
-                    uint32_t dst_height,
-                    uint32_t src_width,
-                    uint32_t src_height) {
+void resize_area(uchar4* dst,
+                 const uchar4* src,
+                 uint32_t dst_width,
+                 uint32_t dst_height,
+                 uint32_t dst_pitch,
+                 uint32_t src_width,
+                 uint32_t src_height,
+                 uint32_t src_pitch) {
     if (!dst || !src) return;
 
-    dim3 block(16, 16);
-    dim3 grid((dst_width + block.x - 1) / block.x,
-                (dst_height + block.y - 1) / block.y);
-            
-    resizeBicubicKernel<<<grid, block>>>(dst, src,
-                                        dst_width, dst_height,
-                                        src_width, src_height);
+    launchResize(RESIZE_AREA, dst, src, dst_width, dst_height, dst_pitch, src_width, src_height, src_pitch);
+    finishCall();
+}
+
+ResampleTable* create_resample_table(uint32_t src_size,
+                                     uint32_t dst_size,
+                                     int32_t method,
+                                     uint32_t dst_first,
+                                     uint32_t dst_count,
+                                     uint32_t src_first,
+                                     uint32_t src_count) {
+    int32_t* bounds;
+    float* weights;
+    uint32_t taps;
+    if (!buildResampleTable(src_size, dst_size, method, dst_first, dst_count, src_first, src_count,
+                            &bounds, &weights, &taps)) return nullptr;
+
+    ResampleTable* table = (ResampleTable*)malloc(sizeof(ResampleTable));
+    if (table) {
+        table->src_size = src_count;
+        table->dst_size = dst_count;
+        table->taps = taps;
+        table->bounds = nullptr;
+        table->weights = nullptr;
+
+        const size_t bounds_size = sizeof(int32_t) * 2 * dst_count;
+        const size_t weights_size = sizeof(float) * dst_count * taps;
+        cudaError_t err = cudaMalloc(&table->bounds, bounds_size);
+        if (err == cudaSuccess) err = cudaMalloc(&table->weights, weights_size);
+        if (err == cudaSuccess) err = cudaMemcpy(table->bounds, bounds, bounds_size, cudaMemcpyHostToDevice);
+        if (err == cudaSuccess) err = cudaMemcpy(table->weights, weights, weights_size, cudaMemcpyHostToDevice);
+        if (err != cudaSuccess) {
+            printf("Error in create_resample_table: %s\n", cudaGetErrorString(err));
+            cudaFree(table->bounds);
+            cudaFree(table->weights);
+            free(table);
+            table = nullptr;
+        }
+    }
+
+    free(bounds);
+    free(weights);
+    return table;
+}
+
+void free_resample_table(ResampleTable* table) {
+    if (!table) return;
+    // cudaFree waits for queued work that may still read the table.
+    cudaFree(table->bounds);
+    cudaFree(table->weights);
+    free(table);
+}
+
+void resize_separable(uchar4* dst,
+                      const uchar4* src,
+                      uint32_t dst_width,
+                      uint32_t dst_height,
+                      uint32_t dst_pitch,
+                      uint32_t src_width,
+                      uint32_t src_height,
+                      uint32_t src_pitch,
+                      uchar4* temp,
+                      uint32_t temp_pitch,
+                      const ResampleTable* horizontal,
+                      const ResampleTable* vertical) {
+    if (!dst || !src) return;
+
+    launchSeparable(dst, src, dst_width, dst_height, dst_pitch,
+                    src_width, src_height, src_pitch,
+                    temp, temp_pitch, horizontal, vertical);
+    finishCall();
+}
+
+void resize_many(const uchar4* src,
+                 uint32_t src_width,
+                 uint32_t src_height,
+                 uint32_t src_pitch,
+                 const ResizeTarget* targets,
+                 uint32_t count,
+                 int32_t method) {
+    if (!src || (count && !targets)) return;
+
+    // The launches are ordered on the stream, so a target is complete before
+    // the targets cascading from it read it.
+    for (uint32_t i = 0; i < count; i++) {
+        const ResizeTarget& target = targets[i];
+        if (!target.dst) continue;
+
+        const uchar4* from = src;
+        uint32_t from_width = src_width, from_height = src_height, from_pitch = src_pitch;
+        if (target.source >= 0 && (uint32_t)target.source < i) {
+            const ResizeTarget& larger = targets[target.source];
+            from = larger.dst;
+            from_width = larger.width;
+            from_height = larger.height;
+            from_pitch = larger.pitch;
+        }
+
+        if (method == RESIZE_BICUBIC || method == RESIZE_LANCZOS3 || method == RESIZE_MITCHELL) {
+            launchSeparable(target.dst, from, target.width, target.height, target.pitch,
+                            from_width, from_height, from_pitch,
+                            target.temp, target.temp_pitch, target.horizontal, target.vertical);
+        } else {
+            launchResize(method, target.dst, from, target.width, target.height, target.pitch,
+                         from_width, from_height, from_pitch);
+        }
+    }
 
-    cudaDeviceSynchronize();
+    finishCall();
 }
 
 void fill_color(uchar4* buffer,
                 uint32_t width,
                 uint32_t height,
+                uint32_t pitch,
                 unsigned char r,
                 unsigned char g,
                 unsigned char b,
@@ -841,57 +1689,90 @@ void fill_color(uchar4* buffer,
     dim3 grid((width + block.x - 1) / block.x,
               (height + block.y - 1) / block.y);
               
-    fillColorKernel<<<grid, block>>>(buffer, color, width, height);
+    fillColorKernel<<<grid, block, 0, currentStream>>>(buffer, color, width, height, pitch);
 
-    cudaDeviceSynchronize();
+    finishCall();
 }
 
 void apply_corner_radius(uchar4* buffer,
                          uint32_t width,
                          uint32_t height,
+                         uint32_t pitch,
                          uint32_t size) {
     if (!buffer) return;
 
+    const int band_x = (int)(size < width ? size : width);
+    const int band_y = (int)(size < height ? size : height);
+    const int right = band_x > (int)width - band_x ? band_x : (int)width - band_x;
+    const int bottom = band_y > (int)height - band_y ? band_y : (int)height - band_y;
+    const int cols = band_x + ((int)width - right);
+    const int rows = band_y + ((int)height - bottom);
+    if (!cols || !rows) return;
+
     dim3 block(16, 16);
-    dim3 grid((width + block.x - 1) / block.x,
-                (height + block.y - 1) / block.y);
-                
-    cornerRadiusKernel<<<grid, block>>>(buffer, width, height, size);
+    dim3 grid((cols + block.x - 1) / block.x,
+              (rows + block.y - 1) / block.y);
+
+    cornerRadiusKernel<<<grid, block, 0, currentStream>>>(buffer, width, height, pitch, size,
+                                                          band_x, band_y, right, bottom);
 
-    cudaDeviceSynchronize();
+    finishCall();
+}
+
+void compute_distance_field(float* field,
+                            uint32_t* column_scratch,
+                            uint32_t* row_scratch,
+                            const uchar4* src,
+                            uint32_t width,
+                            uint32_t height,
+                            uint32_t src_pitch) {
+    if (!field || !column_scratch || !row_scratch || !src) return;
+    if ((uint64_t)width + height > DISTANCE_FIELD_MAX_EXTENT) {
+        printf("Error in compute_distance_field: %ux%u exceeds the supported extent\n", width, height);
+        return;
+    }
+
+    int threads = 128;
+
+    columnDistanceKernel<<<(width + threads - 1) / threads, threads, 0, currentStream>>>(column_scratch, src,
+                                                                                         width, height, src_pitch);
+    rowDistanceKernel<<<(height + threads - 1) / threads, threads, 0, currentStream>>>(field, row_scratch,
+                                                                                       column_scratch, src,
+                                                                                       width, height, src_pitch);
+
+    finishCall();
 }
 
 void apply_stroke(uchar4* buffer,
-                  const uchar4* copy_buffer,
+                  const float* field,
                   uint32_t width,
                   uint32_t height,
+                  uint32_t pitch,
                   int stroke_width,
                   unsigned char stroke_r,
                   unsigned char stroke_g,
                   unsigned char stroke_b,
                   unsigned char stroke_a,
                   int mode) {
+    if (!buffer || !field) return;
+    if (mode != 0 && mode != 1) return;
 
     uchar4 stroke_color = make_uchar4(stroke_r, stroke_g, stroke_b, stroke_a);
     dim3 block(16, 16);
     dim3 grid((width + block.x - 1) / block.x,
               (height + block.y - 1) / block.y);
     
-    if (mode == 0) {
-        strokeKernel<<<grid, block>>>(copy_buffer, buffer, width, height,
-                                        stroke_width, stroke_color);
-    } else if (mode == 1) {
-        innerStrokeKernel<<<grid, block>>>(copy_buffer, buffer, width, height,
-                                             stroke_width, stroke_color);
-    }
+    strokeKernel<<<grid, block, 0, currentStream>>>(buffer, field, width, height, pitch,
+                                                    stroke_width, stroke_color, mode == 1);
     
-    cudaDeviceSynchronize();
+    finishCall();
 }
 
 
 void apply_opacity(uchar4* buffer,
                    uint32_t width,
                    uint32_t height,
+                   uint32_t pitch,
                    float opacity) {
     if (!buffer) return;
     
@@ -901,14 +1782,15 @@ void apply_opacity(uchar4* buffer,
     dim3 grid((width + block.x - 1) / block.x,
             (height + block.y - 1) / block.y);
             
-    applyOpacityKernel<<<grid, block>>>(buffer, width, height, opacity);
-    cudaDeviceSynchronize();
+    applyOpacityKernel<<<grid, block, 0, currentStream>>>(buffer, width, height, pitch, opacity);
+    finishCall();
 }
 
 void apply_shadow(uchar4* buffer,
-                  const uchar4* copy_buffer,
+                  const float* field,
                   uint32_t width,
                   uint32_t height,
+                  uint32_t pitch,
                   float radius,
                   float intensity,
                   unsigned char shadow_r,
@@ -916,6 +1798,8 @@ void apply_shadow(uchar4* buffer,
                   unsigned char shadow_b,
                   unsigned char shadow_a,
                   int mode) {
+    if (!buffer || !field) return;
+
     dim3 block(16, 16);
     dim3 grid((width + block.x - 1) / block.x,
               (height + block.y - 1) / block.y);
@@ -923,18 +1807,19 @@ void apply_shadow(uchar4* buffer,
     uchar4 shadow_color = make_uchar4(shadow_r, shadow_g, shadow_b, shadow_a);
     bool isInner = mode == 1;
     
-    shadowKernel<<<grid, block>>>(copy_buffer, buffer,
-                                  width, height,
-                                  radius, intensity,
-                                  shadow_color, isInner);
+    shadowKernel<<<grid, block, 0, currentStream>>>(buffer, field,
+                                                    width, height, pitch,
+                                                    radius, intensity,
+                                                    shadow_color, isInner);
     
-    cudaDeviceSynchronize();
+    finishCall();
 }
 
 
 void apply_flip(uchar4* buffer,
                 uint32_t width,
                 uint32_t height,
+                uint32_t pitch,
                 bool flip_horizontal,
                 bool flip_vertical) {
     if (!buffer) return;
@@ -943,32 +1828,35 @@ void apply_flip(uchar4* buffer,
     dim3 grid((width + block.x - 1) / block.x,
               (height + block.y - 1) / block.y);
               
-    flipKernel<<<grid, block>>>(buffer, width, height,
-                               flip_horizontal, flip_vertical);
+    flipKernel<<<grid, block, 0, currentStream>>>(buffer, width, height, pitch,
+                                                 flip_horizontal, flip_vertical);
     
-    cudaDeviceSynchronize();
+    finishCall();
 }
 
 void apply_grayscale(uchar4* buffer,
                     uint32_t width,
-                    uint32_t height) {
+                    uint32_t height,
+                    uint32_t pitch) {
     if (!buffer) return;
     
     dim3 block(16, 16);
     dim3 grid((width + block.x - 1) / block.x,
               (height + block.y - 1) / block.y);
               
-    grayscaleKernel<<<grid, block>>>(buffer, width, height);
+    grayscaleKernel<<<grid, block, 0, currentStream>>>(buffer, width, height, pitch);
     
-    cudaDeviceSynchronize();
+    finishCall();
 }
 
 void crop_image(uchar4* dst,
                 const uchar4* src,
                 uint32_t src_width,
                 uint32_t src_height,
+                uint32_t src_pitch,
                 uint32_t dst_width,
                 uint32_t dst_height,
+                uint32_t dst_pitch,
                 int crop_x,
                 int crop_y) {
     if (!src || !dst) return;
@@ -977,16 +1865,17 @@ void crop_image(uchar4* dst,
     dim3 grid((dst_width + block.x - 1) / block.x,
               (dst_height + block.y - 1) / block.y);
 
-    cropKernel<<<grid, block>>>(src, dst,
-                                src_width, src_height,
-                                dst_width, dst_height,
-                                crop_x, crop_y);
-    cudaDeviceSynchronize();
+    cropKernel<<<grid, block, 0, currentStream>>>(src, dst,
+                                                  src_width, src_height, src_pitch,
+                                                  dst_width, dst_height, dst_pitch,
+                                                  crop_x, crop_y);
+    finishCall();
 }
 
 void fill_gradient(uchar4* buffer,
                    uint32_t width,
                    uint32_t height,
+                   uint32_t pitch,
                    unsigned char r1,
                    unsigned char g1,
                    unsigned char b1,
@@ -1003,34 +1892,48 @@ void fill_gradient(uchar4* buffer,
     dim3 grid((width + block.x - 1) / block.x,
               (height + block.y - 1) / block.y);
 
-    fillGradientKernel<<<grid, block>>>(buffer, width, height,
-                                            r1, g1, b1, a1,
-                                            r2, g2, b2, a2,
-                                            direction, seamless);
-    cudaDeviceSynchronize();
+    fillGradientKernel<<<grid, block, 0, currentStream>>>(buffer, width, height, pitch,
+                                                          make_uchar4(r1, g1, b1, a1),
+                                                          make_uchar4(r2, g2, b2, a2),
+                                                          direction, seamless);
+    finishCall();
 }
 
 void apply_gaussian_blur(uchar4* buffer,
-                         const uchar4* copy_buffer,
+                         uchar4* temp_buffer,
                          uint32_t width,
                          uint32_t height,
+                         uint32_t pitch,
                          float radius) {
-    
+    if (!buffer || !temp_buffer || radius <= 0.0f) return;
+
+    std::lock_guard<std::mutex> lock(blurWeightsMutex);
+
+    int kernelRadius = gaussianKernelRadius(radius);
+    const float* weights = gaussianWeightTable(radius, kernelRadius);
+    if (!weights) return;
+
     dim3 block(16, 16);
     dim3 grid((width + block.x - 1) / block.x,
               (height + block.y - 1) / block.y);
-    
-    gaussianBlurKernel<<<grid, block>>>(copy_buffer, buffer, width, height, radius);
-    
-    cudaDeviceSynchronize();
+
+    // temp_buffer is packed; only the image itself may be a pitched view.
+    gaussianBlurPassKernel<<<grid, block, 0, currentStream>>>(buffer, temp_buffer, width, height, pitch, width,
+                                                              weights, kernelRadius, false);
+    gaussianBlurPassKernel<<<grid, block, 0, currentStream>>>(temp_buffer, buffer, width, height, width, pitch,
+                                                              weights, kernelRadius, true);
+
+    finishCall();
 }
 
 void apply_chroma_key(uchar4* buffer,
                     const uchar4* key_buffer,
                     uint32_t buffer_width,
                     uint32_t buffer_height,
+                    uint32_t buffer_pitch,
                     uint32_t key_width,
                     uint32_t key_height,
+                    uint32_t key_pitch,
                     int channel,
                     unsigned char threshold,
                     bool invert,
@@ -1041,13 +1944,41 @@ void apply_chroma_key(uchar4* buffer,
     dim3 grid((buffer_width + block.x - 1) / block.x,
               (buffer_height + block.y - 1) / block.y);
               
-    chromaKeyKernel<<<grid, block>>>(buffer, key_buffer, 
-                                     buffer_width, buffer_height, 
-                                     key_width, key_height, 
-                                     channel, threshold, invert,
-                                     zero_all_channels);
+    chromaKeyKernel<<<grid, block, 0, currentStream>>>(buffer, key_buffer,
+                                                       buffer_width, buffer_height, buffer_pitch,
+                                                       key_width, key_height, key_pitch,
+                                                       channel, threshold, invert,
+                                                       zero_all_channels);
     
-    cudaDeviceSynchronize();
+    finishCall();
+}
+
+void apply_pointwise_ops(uchar4* buffer,
+                         uint32_t width,
+                         uint32_t height,
+                         uint32_t pitch,
+                         const PointwiseOp* ops,
+                         uint32_t count,
+                         int32_t load_mirror) {
+    if (!buffer || (count && !ops)) return;
+    if (count > POINTWISE_MAX_OPS) {
+        printf("Error in apply_pointwise_ops: %u operations exceed the limit of %d\n", count, POINTWISE_MAX_OPS);
+        return;
+    }
+
+    PointwiseChain chain;
+    for (uint32_t i = 0; i < count; i++) {
+        chain.ops[i] = ops[i];
+    }
+
+    dim3 block(16, 16);
+    dim3 grid((width + block.x - 1) / block.x,
+              (height + block.y - 1) / block.y);
+
+    pointwiseChainKernel<<<grid, block, 0, currentStream>>>(buffer, width, height, pitch,
+                                                            chain, count, load_mirror);
+
+    finishCall();
 }
 
 }
\ No newline at end of file
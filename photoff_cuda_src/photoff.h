@@ -10,74 +10,230 @@
 
 extern "C" {
 
+// Execution Context ----------------------------------------------------------
+
+EXPORT void* create_stream(void);
+EXPORT void destroy_stream(void* stream);
+EXPORT void set_current_stream(void* stream);
+EXPORT void synchronize_stream(void* stream);
+
+EXPORT void* create_event(void);
+EXPORT void destroy_event(void* event);
+EXPORT void record_event(void* event, void* stream);
+EXPORT void synchronize_event(void* event);
+EXPORT bool query_event(void* event);
+// Events that record timestamps, for profiling. event_elapsed_ms waits for
+// `end` and returns the device time between the two events, or -1 on error.
+EXPORT void* create_timing_event(void);
+EXPORT float event_elapsed_ms(void* start, void* end);
+
 // Buffer Management ----------------------------------------------------------
 
 EXPORT uchar4* create_buffer(uint32_t width, uint32_t height);
-EXPORT void copy_buffers_same_size(uchar4* dst, const uchar4* src, uint32_t width, uint32_t height);
+EXPORT void copy_buffers_same_size(uchar4* dst, const uchar4* src, uint32_t width, uint32_t height,
+                                   uint32_t dst_pitch, uint32_t src_pitch);
 EXPORT void free_buffer(uchar4* buffer);
 
+// 64-bit hash of the pixels of an image, for keying caches by content. Both
+// backends return the same value for the same pixels and size. Not
+// cryptographic. Waits for the work queued on the current stream.
+EXPORT uint64_t hash_image(const uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch);
+
 // Host - Device Memory Transfer ----------------------------------------------
 
-EXPORT void copy_to_host(uchar4* h_dst, const uchar4* d_src, uint32_t width, uint32_t height);
-EXPORT void copy_to_device(uchar4* d_dst, const uchar4* h_src, uint32_t width, uint32_t height);
+EXPORT uchar4* create_host_buffer(uint32_t width, uint32_t height);
+EXPORT void free_host_buffer(uchar4* buffer);
+
+// Host buffers are packed; the device side has rows `pitch` pixels apart.
+EXPORT void copy_to_host(uchar4* h_dst, const uchar4* d_src, uint32_t width, uint32_t height,
+                         uint32_t src_pitch);
+EXPORT void copy_to_device(uchar4* d_dst, const uchar4* h_src, uint32_t width, uint32_t height,
+                           uint32_t dst_pitch);
+
+// Pitches ---------------------------------------------------------------------
+//
+// Every image argument is followed by its pitch: the distance in pixels
+// between the starts of consecutive rows. A pitch larger than the width lets
+// an operation read or write a rectangle inside a larger buffer in place.
+// Scratch buffers (blur temporaries, distance fields) are always packed.
 
 // Blend ----------------------------------------------------------------------
 
-EXPORT void blend_buffers(uchar4* dst, const uchar4* src, uint32_t dst_width, uint32_t dst_height,
-                          uint32_t src_width, uint32_t src_height, int32_t x, int32_t y);
+EXPORT void blend_buffers(uchar4* dst, const uchar4* src,
+                          uint32_t dst_width, uint32_t dst_height, uint32_t dst_pitch,
+                          uint32_t src_width, uint32_t src_height, uint32_t src_pitch,
+                          int32_t x, int32_t y);
+
+// Composites `count` layers in order (later layers on top) in a single call.
+// Layer i is a `width` x `height` image whose top-left corner lands at (x, y);
+// its rows are `pitch` pixels apart, so a layer can be a crop of a larger image.
+
+typedef struct {
+    const uchar4* src;
+    uint32_t width;
+    uint32_t height;
+    uint32_t pitch;
+    int32_t x;
+    int32_t y;
+} BlendLayer;
+
+EXPORT void blend_layers(uchar4* dst, uint32_t dst_width, uint32_t dst_height, uint32_t dst_pitch,
+                         const BlendLayer* layers, uint32_t count);
 
 // Fill Effects ---------------------------------------------------------------
 
-EXPORT void fill_color(uchar4* buffer, uint32_t width, uint32_t height,
+EXPORT void fill_color(uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch,
                        unsigned char r, unsigned char g, unsigned char b, unsigned char a);
 
-EXPORT void fill_gradient(uchar4* buffer, uint32_t width, uint32_t height,
+EXPORT void fill_gradient(uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch,
                           unsigned char r1, unsigned char g1, unsigned char b1, unsigned char a1,
                           unsigned char r2, unsigned char g2, unsigned char b2, unsigned char a2,
                           int direction, bool seamless);
 
 // Filters --------------------------------------------------------------------
 
-EXPORT void apply_corner_radius(uchar4* buffer, uint32_t width, uint32_t height, uint32_t size);
-EXPORT void apply_opacity(uchar4* buffer, uint32_t width, uint32_t height, float opacity);
-EXPORT void apply_flip(uchar4* buffer, uint32_t width, uint32_t height, bool flip_horizontal, bool flip_vertical);
-EXPORT void apply_grayscale(uchar4* buffer, uint32_t width, uint32_t height);
+EXPORT void apply_corner_radius(uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch,
+                                uint32_t size);
+EXPORT void apply_opacity(uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch, float opacity);
+EXPORT void apply_flip(uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch,
+                       bool flip_horizontal, bool flip_vertical);
+EXPORT void apply_grayscale(uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch);
 
 EXPORT void apply_chroma_key(uchar4* buffer, const uchar4* key_buffer,
-                             uint32_t buffer_width, uint32_t buffer_height,
-                             uint32_t key_width, uint32_t key_height,
+                             uint32_t buffer_width, uint32_t buffer_height, uint32_t buffer_pitch,
+                             uint32_t key_width, uint32_t key_height, uint32_t key_pitch,
                              int channel, unsigned char threshold,
                              bool invert, bool zero_all_channels);
 
-EXPORT void apply_stroke(uchar4* buffer, const uchar4* copy_buffer, uint32_t width, uint32_t height,
+EXPORT void compute_distance_field(float* field, uint32_t* column_scratch, uint32_t* row_scratch,
+                                   const uchar4* src, uint32_t width, uint32_t height,
+                                   uint32_t src_pitch);
+
+EXPORT void apply_stroke(uchar4* buffer, const float* field, uint32_t width, uint32_t height, uint32_t pitch,
                          int stroke_width, unsigned char stroke_r, unsigned char stroke_g,
                          unsigned char stroke_b, unsigned char stroke_a, int mode);
 
-EXPORT void apply_shadow(uchar4* buffer, const uchar4* copy_buffer, uint32_t width, uint32_t height,
+EXPORT void apply_shadow(uchar4* buffer, const float* field, uint32_t width, uint32_t height, uint32_t pitch,
                          float radius, float intensity,
                          unsigned char shadow_r, unsigned char shadow_g,
                          unsigned char shadow_b, unsigned char shadow_a, int mode);
 
-EXPORT void apply_gaussian_blur(uchar4* buffer, const uchar4* copy_buffer,
-                                uint32_t width, uint32_t height, float radius);
+EXPORT void apply_gaussian_blur(uchar4* buffer, uchar4* temp_buffer,
+                                uint32_t width, uint32_t height, uint32_t pitch, float radius);
+
+// Pointwise Chains -----------------------------------------------------------
+//
+// A chain applies several pointwise operations in one pass over the buffer.
+// `mirror` holds the flips recorded after an operation (POINTWISE_MIRROR_*),
+// i.e. the mirrored position it is evaluated at; `load_mirror` is the mirrored
+// position the input pixel is read from.
+
+#define POINTWISE_MAX_OPS 16
+
+#define POINTWISE_FILL_COLOR 0      // color1
+#define POINTWISE_FILL_GRADIENT 1   // color1, color2, param = direction, flags = seamless
+#define POINTWISE_GRAYSCALE 2
+#define POINTWISE_OPACITY 3         // amount, clamped to [0, 1]
+#define POINTWISE_CORNER_RADIUS 4   // param = radius
+#define POINTWISE_CHROMA_KEY 5      // key, key_width, key_height, key_pitch, param = channel, threshold, flags
+#define POINTWISE_TINT 6            // color1: replaces RGB, scales alpha by color1.a
+
+#define POINTWISE_MIRROR_X 1
+#define POINTWISE_MIRROR_Y 2
+
+#define POINTWISE_CHROMA_INVERT 1
+#define POINTWISE_CHROMA_ZERO_ALL 2
+
+typedef struct {
+    int32_t kind;
+    int32_t mirror;
+    uchar4 color1;
+    uchar4 color2;
+    int32_t param;
+    int32_t flags;
+    float amount;
+    uint32_t threshold;
+    const uchar4* key;
+    uint32_t key_width;
+    uint32_t key_height;
+    uint32_t key_pitch;
+} PointwiseOp;
+
+EXPORT void apply_pointwise_ops(uchar4* buffer, uint32_t width, uint32_t height, uint32_t pitch,
+                                const PointwiseOp* ops, uint32_t count, int32_t load_mirror);
 
 // Resize and Crop ------------------------------------------------------------
 
 EXPORT void resize_bilinear(uchar4* dst, const uchar4* src,
-                            uint32_t dst_width, uint32_t dst_height,
-                            uint32_t src_width, uint32_t src_height);
+                            uint32_t dst_width, uint32_t dst_height, uint32_t dst_pitch,
+                            uint32_t src_width, uint32_t src_height, uint32_t src_pitch);
 
 EXPORT void resize_nearest(uchar4* dst, const uchar4* src,
-                           uint32_t dst_width, uint32_t dst_height,
-                           uint32_t src_width, uint32_t src_height);
-
-EXPORT void resize_bicubic(uchar4* dst, const uchar4* src,
-                           uint32_t dst_width, uint32_t dst_height,
-                           uint32_t src_width, uint32_t src_height);
+                           uint32_t dst_width, uint32_t dst_height, uint32_t dst_pitch,
+                           uint32_t src_width, uint32_t src_height, uint32_t src_pitch);
+
+EXPORT void resize_area(uchar4* dst, const uchar4* src,
+                        uint32_t dst_width, uint32_t dst_height, uint32_t dst_pitch,
+                        uint32_t src_width, uint32_t src_height, uint32_t src_pitch);
+
+// Separable resampling. BICUBIC, LANCZOS3 and MITCHELL run a horizontal pass
+// from the source into a `dst_width` x `src_height` temp image, then a vertical
+// pass from it into the destination. Each pass reads, for every output column
+// or row, the first source index and the weights of its taps from a table
+// built once per (source size, destination size, method). When downscaling,
+// filters are widened by the reduction ratio so every source pixel contributes.
+// A NULL table skips its pass: the other one reads the source or writes the
+// destination directly, and temp is unused.
+//
+// A table can cover part of a resample, e.g. one tile of a larger image: it
+// holds outputs [dst_first, dst_first + dst_count) of a src_size -> dst_size
+// resample, reading a source region of src_count pixels that starts at
+// src_first. Taps outside the region are dropped, as at the image edges.
+
+typedef struct ResampleTable ResampleTable;
+
+EXPORT ResampleTable* create_resample_table(uint32_t src_size, uint32_t dst_size, int32_t method,
+                                            uint32_t dst_first, uint32_t dst_count,
+                                            uint32_t src_first, uint32_t src_count);
+
+EXPORT void free_resample_table(ResampleTable* table);
+
+EXPORT void resize_separable(uchar4* dst, const uchar4* src,
+                             uint32_t dst_width, uint32_t dst_height, uint32_t dst_pitch,
+                             uint32_t src_width, uint32_t src_height, uint32_t src_pitch,
+                             uchar4* temp, uint32_t temp_pitch,
+                             const ResampleTable* horizontal, const ResampleTable* vertical);
+
+// Resamples one source into several destinations in a single call. Target i
+// is computed from the source image or, when its `source` is >= 0, from that
+// earlier target, so smaller renditions can cascade from larger ones. With a
+// separable method, each target also supplies its temp image and tables.
+
+#define RESIZE_NEAREST 0
+#define RESIZE_BILINEAR 1
+#define RESIZE_BICUBIC 2
+#define RESIZE_AREA 3
+#define RESIZE_LANCZOS3 4
+#define RESIZE_MITCHELL 5
+
+typedef struct {
+    uchar4* dst;
+    uint32_t width;
+    uint32_t height;
+    uint32_t pitch;
+    int32_t source;
+    uchar4* temp;
+    uint32_t temp_pitch;
+    const ResampleTable* horizontal;
+    const ResampleTable* vertical;
+} ResizeTarget;
+
+EXPORT void resize_many(const uchar4* src, uint32_t src_width, uint32_t src_height, uint32_t src_pitch,
+                        const ResizeTarget* targets, uint32_t count, int32_t method);
 
 EXPORT void crop_image(uchar4* dst, const uchar4* src,
-                       uint32_t src_width, uint32_t src_height,
-                       uint32_t dst_width, uint32_t dst_height,
+                       uint32_t src_width, uint32_t src_height, uint32_t src_pitch,
+                       uint32_t dst_width, uint32_t dst_height, uint32_t dst_pitch,
                        int crop_x, int crop_y);
 
 }
@@ -0,0 +1,16 @@
+import os
+
+# The suite runs on the host backend, so it needs no GPU.
+os.environ["PHOTOFF_BACKEND"] = "cpu"
+
+import pytest
+from photoff.core.cuda_interface import _lib
+
+
+def pytest_collection_modifyitems(config, items):
+    try:
+        _lib.load()
+    except OSError as e:
+        skip = pytest.mark.skip(reason=f"CPU backend library not found: {e}")
+        for item in items:
+            item.add_marker(skip)
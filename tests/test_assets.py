@@ -0,0 +1,50 @@
+from PIL import Image
+from photoff.core.profile import Profiler
+from photoff.core.types import CudaImage
+from photoff.io import AssetCache, image_to_pil
+
+
+def _write_png(tmp_path, name="asset.png", size=(10, 10), color=(200, 30, 60, 255)):
+    path = tmp_path / name
+    Image.new("RGBA", size, color).save(path)
+    return str(path)
+
+
+def test_freeing_a_dropped_asset_releases_it_once(tmp_path):
+    cache = AssetCache()
+    image = cache.load(_write_png(tmp_path))
+
+    with Profiler() as profiler:
+        cache.invalidate()
+        image.free()
+        del image
+        first = CudaImage(10, 10)
+        second = CudaImage(10, 10)
+
+    assert "free_buffer" not in {record.name for record in profiler.records}
+    assert first.buffer != second.buffer
+    first.free()
+    second.free()
+
+
+def test_freeing_a_resident_asset_keeps_it_resident(tmp_path):
+    cache = AssetCache()
+    path = _write_png(tmp_path)
+    cache.load(path).free()
+
+    other = CudaImage(10, 10)
+    image = cache.load(path)
+
+    assert image.buffer != other.buffer
+    assert image_to_pil(image).getpixel((0, 0)) == (200, 30, 60, 255)
+    assert cache.stats().hits == 1
+    other.free()
+
+
+def test_dropped_asset_stays_valid_while_held(tmp_path):
+    cache = AssetCache()
+    image = cache.load(_write_png(tmp_path))
+    cache.clear()
+
+    assert cache.stats().bytes_in_use == 0
+    assert image_to_pil(image).getpixel((5, 5)) == (200, 30, 60, 255)
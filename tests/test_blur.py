@@ -0,0 +1,115 @@
+import math
+import pytest
+from photoff.core.types import CudaImage
+from photoff.operations.filters import apply_gaussian_blur
+
+np = pytest.importorskip("numpy")
+
+
+def _weights(radius: float) -> np.ndarray:
+    sigma = radius / 2.0
+    kernel_radius = max(1, math.ceil(3.0 * sigma))
+    weights = np.exp(-np.arange(kernel_radius + 1) ** 2 / (2.0 * sigma * sigma))
+    return weights / (weights[0] + 2.0 * weights[1:].sum())
+
+
+def _blur_pass(pixels: np.ndarray, weights: np.ndarray, axis: int) -> np.ndarray:
+    # One alpha-weighted pass with clamped edges, rounded to 8 bits like the
+    # native passes.
+    kernel_radius = len(weights) - 1
+    size = pixels.shape[axis]
+    pixels = pixels.astype(np.float64)
+    sum_rgb = np.zeros(pixels.shape[:2] + (3,))
+    sum_a = np.zeros(pixels.shape[:2])
+    for k in range(-kernel_radius, kernel_radius + 1):
+        index = np.clip(np.arange(size) + k, 0, size - 1)
+        sample = np.take(pixels, index, axis=axis)
+        weighted_alpha = weights[abs(k)] * sample[..., 3]
+        sum_rgb += sample[..., :3] * weighted_alpha[..., None]
+        sum_a += weighted_alpha
+
+    out = np.zeros(pixels.shape, dtype=np.uint8)
+    covered = sum_a > 0
+    out[..., :3][covered] = np.floor(sum_rgb[covered] / sum_a[covered][:, None] + 0.5)
+    out[..., 3][covered] = np.floor(sum_a[covered] + 0.5)
+    return out
+
+
+def _reference_blur(pixels: np.ndarray, radius: float) -> np.ndarray:
+    weights = _weights(radius)
+    return _blur_pass(_blur_pass(pixels, weights, axis=1), weights, axis=0)
+
+
+def _noise(width: int, height: int) -> np.ndarray:
+    rng = np.random.default_rng(2)
+    pixels = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+    pixels[rng.random((height, width)) < 0.1, 3] = 0
+    return pixels
+
+
+def _max_difference(a: np.ndarray, b: np.ndarray) -> int:
+    return int(np.abs(a.astype(int) - b.astype(int)).max())
+
+
+@pytest.mark.parametrize("radius", [1.5, 6, 40])
+def test_blur_matches_separable_reference(radius):
+    pixels = _noise(73, 41)
+    image = CudaImage.from_array(pixels)
+
+    apply_gaussian_blur(image, radius)
+
+    assert _max_difference(image.to_array(), _reference_blur(pixels, radius)) <= 1
+    image.free()
+
+
+def test_blur_with_cache_matches_without():
+    pixels = _noise(64, 32)
+    image = CudaImage.from_array(pixels)
+    cached = CudaImage.from_array(pixels)
+    cache = CudaImage(64, 32)
+
+    apply_gaussian_blur(image, 30)
+    apply_gaussian_blur(cached, 30, image_copy_cache=cache)
+
+    assert np.array_equal(image.to_array(), cached.to_array())
+    for buffer in (image, cached, cache):
+        buffer.free()
+
+
+def test_blur_roi_blurs_only_the_region():
+    pixels = _noise(80, 60)
+    image = CudaImage.from_array(pixels)
+    x, y, width, height = 12, 7, 50, 33
+
+    apply_gaussian_blur(image, 30, roi=(x, y, width, height))
+
+    result = image.to_array()
+    region = pixels[y:y + height, x:x + width]
+    assert _max_difference(result[y:y + height, x:x + width], _reference_blur(region, 30)) <= 1
+    outside = np.ones(pixels.shape[:2], dtype=bool)
+    outside[y:y + height, x:x + width] = False
+    assert np.array_equal(result[outside], pixels[outside])
+    image.free()
+
+
+def test_blur_roi_clips_to_the_image():
+    pixels = _noise(40, 30)
+    image = CudaImage.from_array(pixels)
+
+    apply_gaussian_blur(image, 8, roi=(25, -5, 100, 20))
+
+    result = image.to_array()
+    assert _max_difference(result[:15, 25:], _reference_blur(pixels[:15, 25:], 8)) <= 1
+    assert np.array_equal(result[15:], pixels[15:])
+    assert np.array_equal(result[:, :25], pixels[:, :25])
+    image.free()
+
+
+def test_blur_without_radius_leaves_the_image_unchanged():
+    pixels = _noise(16, 16)
+    image = CudaImage.from_array(pixels)
+
+    apply_gaussian_blur(image, 0)
+
+    assert np.array_equal(image.to_array(), pixels)
+    image.free()
@@ -0,0 +1,51 @@
+import pytest
+from photoff.core import ffi
+from photoff.core.pool import get_buffer_pool
+from photoff.core.types import CudaImage, DistanceField, RGBA
+from photoff.operations.fill import fill_color
+from photoff.operations.filters import compute_alpha_distance_field
+
+np = pytest.importorskip("numpy")
+
+
+def _field_values(field: DistanceField) -> "np.ndarray":
+    return np.frombuffer(ffi.buffer(field.buffer, field.width * field.height * 4), dtype=np.float32).copy()
+
+
+@pytest.fixture
+def shape():
+    image = CudaImage(40, 30)
+    fill_color(image, RGBA(0, 0, 0, 0))
+    fill_color(image, RGBA(255, 255, 255, 255), roi=(10, 8, 15, 12))
+    yield image
+    image.free()
+
+
+def test_caches_give_the_same_field_without_allocating(shape):
+    expected = compute_alpha_distance_field(shape)
+    field = DistanceField(40, 30)
+    column_scratch = CudaImage(40, 30)
+    row_scratch = CudaImage(40, 30)
+    pool = get_buffer_pool()
+    before = pool.stats()
+
+    result = compute_alpha_distance_field(shape, field, column_scratch, row_scratch)
+
+    after = pool.stats()
+    assert result is field
+    assert (after.hits, after.misses) == (before.hits, before.misses)
+    assert np.array_equal(_field_values(result), _field_values(expected))
+    for buffer in (expected, field, column_scratch, row_scratch):
+        buffer.free()
+
+
+def test_mismatched_row_scratch_is_rejected_before_allocating(shape):
+    row_scratch = CudaImage(40, 29)
+    before = get_buffer_pool().stats()
+
+    with pytest.raises(ValueError, match="40x30, got 40x29"):
+        compute_alpha_distance_field(shape, row_scratch_cache=row_scratch)
+
+    after = get_buffer_pool().stats()
+    assert (after.hits, after.misses) == (before.hits, before.misses)
+    row_scratch.free()
@@ -0,0 +1,41 @@
+import gc
+import threading
+from PIL import Image
+from photoff.core.profile import Profiler
+from photoff.io import image_to_pil, pil_to_image, save_image
+from photoff.io.staging import _slots
+
+
+def _upload_and_save(path: str) -> None:
+    image = pil_to_image(Image.new("RGBA", (32, 24), (10, 20, 30, 255)))
+    save_image(image, path)
+    image.free()
+
+
+def test_staging_slots_are_freed_when_their_thread_exits(tmp_path):
+    before = len(_slots)
+
+    with Profiler() as profiler:
+        threads = [threading.Thread(target=_upload_and_save, args=(str(tmp_path / f"{i}.png"),))
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        del threads
+        gc.collect()
+
+    calls = [record.name for record in profiler.records]
+    assert calls.count("create_host_buffer") == 8
+    assert calls.count("free_host_buffer") == 8
+    assert len(_slots) == before
+
+
+def test_staging_slot_is_reused_by_its_thread():
+    with Profiler() as profiler:
+        for _ in range(3):
+            image = pil_to_image(Image.new("RGBA", (16, 16), (1, 2, 3, 4)))
+            assert image_to_pil(image).getpixel((0, 0)) == (1, 2, 3, 4)
+            image.free()
+
+    assert [record.name for record in profiler.records].count("create_host_buffer") <= 1
@@ -0,0 +1,166 @@
+import threading
+import pytest
+from photoff.core import Stream, current_stream, ffi
+from photoff.core.profile import Profiler
+from photoff.core.stream import _BARRIER_CALLS, _IMMEDIATE_CALLS
+from photoff.core.types import CudaImage, RGBA
+from photoff.io import image_to_pil
+from photoff.operations.blend import blend
+from photoff.operations.cache import content_hash
+from photoff.operations.fill import fill_color, fill_gradient
+from photoff.operations.filters import apply_gaussian_blur, apply_grayscale
+
+
+def _compose(background: CudaImage, logo: CudaImage) -> None:
+    fill_gradient(background, RGBA(255, 0, 0, 255), RGBA(0, 0, 255, 255), 2)
+    fill_color(logo, RGBA(20, 200, 90, 180))
+    blend(background, logo, 10, 12)
+    apply_gaussian_blur(background, 3)
+    apply_grayscale(background, roi=(0, 0, 32, 48))
+
+
+def _raw(image: CudaImage) -> bytes:
+    # Host memory as it is now, without waiting for any stream.
+    return bytes(ffi.buffer(image.buffer, image.width * image.height * 4))
+
+
+@pytest.fixture
+def images():
+    created = [CudaImage(64, 48), CudaImage(20, 16)]
+    yield created
+    for image in created:
+        image.free()
+
+
+@pytest.fixture
+def blocked():
+    # Holds a stream's worker until the test sets the returned gate. Set it
+    # before the stream is collected: closing a stream joins its worker.
+    gates = []
+
+    def block(stream: Stream) -> threading.Event:
+        gate = threading.Event()
+        gates.append(gate)
+        stream._queue.submit(gate.wait, ())
+        return gate
+
+    yield block
+    for gate in gates:
+        gate.set()
+
+
+def _expected(images) -> bytes:
+    background, logo = images
+    _compose(background, logo)
+    return image_to_pil(background).tobytes()
+
+
+def test_results_match_inside_and_outside_a_stream(images):
+    expected = _expected(images)
+    background, logo = images
+    fill_color(background, RGBA(0, 0, 0, 0))
+
+    with Stream():
+        _compose(background, logo)
+        result = image_to_pil(background).tobytes()
+
+    assert result == expected
+
+
+def test_synchronize_waits_for_queued_work(images, blocked):
+    expected = _expected(images)
+    background, logo = images
+    fill_color(background, RGBA(0, 0, 0, 0))
+    before = _raw(background)
+
+    with Stream() as s:
+        gate = blocked(s)
+        _compose(background, logo)
+        assert _raw(background) == before
+        gate.set()
+        s.synchronize()
+        assert _raw(background) == expected
+
+
+def test_event_completes_after_the_work_before_it(images, blocked):
+    expected = _expected(images)
+    background, logo = images
+    fill_color(background, RGBA(0, 0, 0, 0))
+
+    with Stream() as s:
+        gate = blocked(s)
+        _compose(background, logo)
+        done = s.record_event()
+        fill_color(background, RGBA(1, 2, 3, 4))
+        assert not done.query()
+        gate.set()
+        done.synchronize()
+        assert done.query()
+        assert _raw(background) in (expected, bytes((1, 2, 3, 4)) * (64 * 48))
+        s.synchronize()
+        assert _raw(background) == bytes((1, 2, 3, 4)) * (64 * 48)
+
+
+def test_queued_calls_run_on_the_stream_worker(images):
+    background, _ = images
+
+    with Profiler() as profiler:
+        fill_color(background, RGBA(9, 9, 9, 9))
+        with Stream() as s:
+            fill_color(background, RGBA(8, 8, 8, 8))
+        s.synchronize()
+
+    threads = [record.thread for record in profiler.records if record.name == "fill_color"]
+    assert threads[0] == threading.get_ident()
+    assert threads[1] != threading.get_ident()
+    assert current_stream() is None
+
+
+def test_barrier_calls_see_queued_work(images, blocked):
+    background, _ = images
+    fill_color(background, RGBA(7, 7, 7, 7))
+    expected_hash = content_hash(background)
+    fill_color(background, RGBA(0, 0, 0, 0))
+    assert {"copy_to_host", "hash_image"} <= _BARRIER_CALLS
+
+    with Stream() as s:
+        gate = blocked(s)
+        fill_color(background, RGBA(7, 7, 7, 7))
+        gate.set()
+        assert content_hash(background) == expected_hash
+        fill_color(background, RGBA(5, 6, 7, 8))
+        assert image_to_pil(background).getpixel((0, 0)) == (5, 6, 7, 8)
+
+
+def test_immediate_calls_do_not_wait_for_the_queue(blocked):
+    assert {"create_buffer", "free_buffer"} <= _IMMEDIATE_CALLS
+
+    with Stream() as s:
+        gate = blocked(s)
+        # An unusual size misses the pool, so the buffer is created while the
+        # worker is still blocked.
+        image = CudaImage(1237, 3)
+        assert image.buffer is not None and image.buffer != ffi.NULL
+        image.free()
+
+    gate.set()
+    s.synchronize()
+
+
+def test_buffers_freed_in_a_stream_are_recycled_after_its_work(blocked):
+    with Stream() as s:
+        gate = blocked(s)
+        image = CudaImage(211, 7)
+        freed = image.buffer
+        fill_color(image, RGBA(1, 1, 1, 1))
+        image.free()
+        other = CudaImage(211, 7)
+        held = other.buffer
+        assert held != freed
+        other.free()
+
+    gate.set()
+    s.synchronize()
+    reused = CudaImage(211, 7)
+    assert reused.buffer in (freed, held)
+    reused.free()